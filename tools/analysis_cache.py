@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache for Gemini review analyses
+
+Analyses are cached under a hash of what determines the model's answer:
+
+- the review's normalized content fields (RMT, business, review and matching inputs)
+- the prompt format, the model name and generation settings
+- the analysis schema version (a hash of ComprehensiveRMTAnalysis' JSON schema)
+
+Volatile fields such as the extraction_id and the relative review time ("2 weeks
+ago") are not part of the key, so a review re-extracted under a new extraction_id,
+or analyzed again by a later rerun, hits the cache instead of calling Gemini.
+Changing the model, the prompt format or the schema changes the key, so stale
+answers are never reused. Reviews matching several RMTs
+are still analyzed once per RMT because the RMT is part of the prompt (the mention
+analysis is RMT-specific).
+
+The cache lives in the analysis_cache table of the monitoring database (SQLite or
+PostgreSQL via storage_backends); responses are stored through blob_codec.
+"""
+
+import hashlib
+import json
+import logging
+import re
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from blob_codec import encode_blob, decode_blob
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_CACHE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS analysis_cache (
+    cache_key TEXT PRIMARY KEY,
+    model_name TEXT NOT NULL,
+    schema_version TEXT NOT NULL,
+    response_json TEXT NOT NULL,
+    response_codec TEXT DEFAULT 'raw',
+    created_at TIMESTAMP NOT NULL
+);
+"""
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def schema_version(schema: Dict[str, Any]) -> str:
+    """Short stable hash of a JSON schema"""
+    return hashlib.sha256(json.dumps(schema, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return _WHITESPACE.sub(' ', value).strip()
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    return value
+
+
+def cache_key(content: Dict[str, Any], model_name: str, version: str,
+              settings: Optional[Dict[str, Any]] = None) -> str:
+    """Content hash of one analysis request (whitespace in text fields is normalized)"""
+    payload = json.dumps({
+        'content': _normalize(content),
+        'model': model_name,
+        'schema_version': version,
+        'settings': settings or {},
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class AnalysisCache(ABC):
+    """Maps cache keys to raw analysis response JSON"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        """Cached response JSON, or None"""
+
+    @abstractmethod
+    def put(self, key: str, model_name: str, version: str, response_json: str):
+        """Store a response (an existing entry for the key is kept)"""
+
+
+class DatabaseAnalysisCache(AnalysisCache):
+    """Cache stored in the monitoring database"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        with self.backend.connect() as conn:
+            conn.execute(ANALYSIS_CACHE_TABLE_SQL)
+
+    def get(self, key: str) -> Optional[str]:
+        with self.backend.connect() as conn:
+            row = conn.execute(
+                "SELECT response_json, response_codec FROM analysis_cache WHERE cache_key = ?", (key,)
+            ).fetchone()
+            return decode_blob(conn, row[0], row[1]) if row else None
+
+    def put(self, key: str, model_name: str, version: str, response_json: str):
+        with self.backend.connect() as conn:
+            value, codec = encode_blob(conn, response_json, 'analysis')
+            self.backend.bulk_insert(
+                conn, 'analysis_cache',
+                ('cache_key', 'model_name', 'schema_version', 'response_json', 'response_codec', 'created_at'),
+                [(key, model_name, version, value, codec, datetime.now())],
+                ignore_conflicts=True
+            )
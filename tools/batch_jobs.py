@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Offline Batch Jobs for Gemini Review Analysis
+
+Large analysis backlogs (rebuilds, 10k+ reviews) do not need interactive latency.
+This module serializes analysis requests into a JSONL job file in the Gemini Batch
+API format, submits it through a pluggable BatchJobClient, and reads the results
+back so run_analysis_only.py can ingest them into ai_analyses.
+
+Clients:
+- GeminiBatchJobClient - Gemini Batch API (uploaded JSONL file, asynchronous job)
+- FakeBatchJobClient   - local stand-in that "completes" jobs from a response
+                         function; used for tests and dry runs, no API key needed
+
+Job file line (request):
+    {"key": "<extraction_id>", "request": {"contents": [...], "generationConfig": {...}}}
+
+Result file line:
+    {"key": "<extraction_id>", "response": {"candidates": [{"content": {"parts": [{"text": "..."}]}}],
+                                            "usageMetadata": {"promptTokenCount": ..., ...}}}
+    {"key": "<extraction_id>", "error": {"code": 400, "message": "..."}}
+
+Jobs are tracked in the analysis_batch_jobs table so they can be polled and
+ingested by a later invocation (--resume-batch-jobs) after the submitting process
+has exited.
+"""
+
+import json
+import logging
+import os
+import shutil
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+BATCH_JOBS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS analysis_batch_jobs (
+    job_name TEXT PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    backend TEXT NOT NULL,
+    job_file TEXT NOT NULL,
+    result_file TEXT,
+    state TEXT NOT NULL,  -- 'submitted', 'succeeded', 'failed', 'ingested'
+    request_count INTEGER NOT NULL,
+    ingested_count INTEGER DEFAULT 0,
+    submitted_at TIMESTAMP NOT NULL,
+    completed_at TIMESTAMP
+);
+"""
+
+# Normalized job states
+STATE_RUNNING = 'running'
+STATE_SUCCEEDED = 'succeeded'
+STATE_FAILED = 'failed'
+
+MAX_REQUESTS_PER_JOB = 10000
+
+
+def build_request_line(key: str, prompt: str, generation_config: Dict[str, Any],
+                       system_instruction: Optional[str] = None) -> str:
+    """One Batch API request line"""
+    request = {
+        "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+        "generationConfig": generation_config,
+    }
+    if system_instruction:
+        request["systemInstruction"] = {"parts": [{"text": system_instruction}]}
+    return json.dumps({"key": key, "request": request}, ensure_ascii=False)
+
+
+def write_job_files(job_dir: str, prefix: str, requests: Iterable[Tuple[str, str]],
+                    generation_config: Dict[str, Any],
+                    max_requests: int = MAX_REQUESTS_PER_JOB,
+                    system_instruction: Optional[str] = None) -> List[Tuple[str, int]]:
+    """
+    Write (key, prompt) requests to one or more JSONL job files
+
+    Returns:
+        (path, request count) per file written
+    """
+    os.makedirs(job_dir, exist_ok=True)
+    files = []
+    handle = None
+    count = 0
+
+    for key, prompt in requests:
+        if handle is None or count >= max_requests:
+            if handle is not None:
+                handle.close()
+                files.append((path, count))
+            path = os.path.join(job_dir, f"{prefix}_part{len(files):03d}.jsonl")
+            handle = open(path, 'w', encoding='utf-8')
+            count = 0
+        handle.write(build_request_line(key, prompt, generation_config, system_instruction) + "\n")
+        count += 1
+
+    if handle is not None:
+        handle.close()
+        files.append((path, count))
+    return files
+
+
+def iter_result_lines(result_file: str) -> Iterator[Tuple[str, Optional[str], Optional[str], Optional[Dict[str, Any]]]]:
+    """
+    Read a result JSONL file
+
+    Yields:
+        (key, response text or None, error message or None, usageMetadata or None)
+    """
+    with open(result_file, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                logger.warning(f"Skipping unparseable result line {line_number} in {result_file}")
+                continue
+
+            key = record.get('key')
+            if 'error' in record:
+                yield key, None, str(record['error']), None
+                continue
+            try:
+                parts = record['response']['candidates'][0]['content']['parts']
+            except (KeyError, IndexError, TypeError):
+                yield key, None, "response has no candidate text", None
+                continue
+            yield key, ''.join(part.get('text', '') for part in parts), None, record['response'].get('usageMetadata')
+
+
+class BatchJobClient(ABC):
+    """Submits JSONL job files and fetches their results"""
+
+    name: str = ''
+
+    @abstractmethod
+    def submit(self, job_file: str, display_name: str) -> str:
+        """Submit a job file; returns the job name used for polling"""
+
+    @abstractmethod
+    def get_state(self, job_name: str) -> str:
+        """STATE_RUNNING, STATE_SUCCEEDED or STATE_FAILED"""
+
+    @abstractmethod
+    def download_results(self, job_name: str, destination: str) -> str:
+        """Write the job's result JSONL to destination and return the path"""
+
+    def wait(self, job_name: str, poll_interval: float = 60.0, timeout: Optional[float] = None) -> str:
+        """Poll until the job finishes (or timeout); returns the last state"""
+        started = time.time()
+        while True:
+            state = self.get_state(job_name)
+            if state != STATE_RUNNING:
+                return state
+            if timeout is not None and time.time() - started >= timeout:
+                return state
+            logger.info(f"Batch job {job_name} still running, next check in {poll_interval:.0f}s")
+            time.sleep(poll_interval)
+
+
+class GeminiBatchJobClient(BatchJobClient):
+    """Gemini Batch API client (file-based jobs)"""
+
+    name = 'gemini'
+
+    SUCCEEDED_STATES = {'JOB_STATE_SUCCEEDED', 'JOB_STATE_PARTIALLY_SUCCEEDED'}
+    FAILED_STATES = {'JOB_STATE_FAILED', 'JOB_STATE_CANCELLED', 'JOB_STATE_EXPIRED'}
+
+    def __init__(self, api_key: str, model_name: str):
+        from google import genai
+        from google.genai import types
+
+        self.client = genai.Client(api_key=api_key)
+        self.types = types
+        self.model_name = model_name
+
+    def submit(self, job_file: str, display_name: str) -> str:
+        uploaded = self.client.files.upload(
+            file=job_file,
+            config=self.types.UploadFileConfig(display_name=display_name, mime_type='jsonl')
+        )
+        job = self.client.batches.create(
+            model=self.model_name,
+            src=uploaded.name,
+            config={'display_name': display_name}
+        )
+        logger.info(f"Submitted batch job {job.name} ({job_file})")
+        return job.name
+
+    def get_state(self, job_name: str) -> str:
+        job = self.client.batches.get(name=job_name)
+        state = job.state.name if job.state else ''
+        if state in self.SUCCEEDED_STATES:
+            return STATE_SUCCEEDED
+        if state in self.FAILED_STATES:
+            return STATE_FAILED
+        return STATE_RUNNING
+
+    def download_results(self, job_name: str, destination: str) -> str:
+        job = self.client.batches.get(name=job_name)
+        if not job.dest or not job.dest.file_name:
+            raise RuntimeError(f"Batch job {job_name} has no result file")
+        content = self.client.files.download(file=job.dest.file_name)
+        with open(destination, 'wb') as f:
+            f.write(content)
+        return destination
+
+
+class FakeBatchJobClient(BatchJobClient):
+    """
+    Local batch backend for tests
+
+    Jobs complete after `polls_until_done` state checks. Each request's prompt is
+    passed to respond(key, prompt), which returns the response text (or raises to
+    produce an error line). The default responder returns a fixed neutral analysis.
+    """
+
+    name = 'fake'
+
+    def __init__(self, work_dir: str = 'fake_batch_jobs',
+                 respond: Optional[Callable[[str, str], str]] = None, polls_until_done: int = 1):
+        self.work_dir = work_dir
+        self.respond = respond or _default_fake_response
+        self.polls_until_done = polls_until_done
+        self._polls: Dict[str, int] = {}
+        os.makedirs(work_dir, exist_ok=True)
+
+    def _job_path(self, job_name: str, suffix: str) -> str:
+        return os.path.join(self.work_dir, f"{job_name.replace('/', '_')}.{suffix}")
+
+    def submit(self, job_file: str, display_name: str) -> str:
+        job_name = f"fakeBatches/{display_name}"
+        shutil.copyfile(job_file, self._job_path(job_name, 'requests.jsonl'))
+        return job_name
+
+    def get_state(self, job_name: str) -> str:
+        if not os.path.exists(self._job_path(job_name, 'requests.jsonl')):
+            return STATE_FAILED
+        self._polls[job_name] = self._polls.get(job_name, 0) + 1
+        if self._polls[job_name] < self.polls_until_done:
+            return STATE_RUNNING
+        return STATE_SUCCEEDED
+
+    def download_results(self, job_name: str, destination: str) -> str:
+        with open(self._job_path(job_name, 'requests.jsonl'), 'r', encoding='utf-8') as requests_file, \
+                open(destination, 'w', encoding='utf-8') as results_file:
+            for line in requests_file:
+                request = json.loads(line)
+                prompt = request['request']['contents'][0]['parts'][0]['text']
+                try:
+                    text = self.respond(request['key'], prompt)
+                    record = {"key": request['key'],
+                              "response": {"candidates": [{"content": {"parts": [{"text": text}]}}],
+                                           "usageMetadata": {"promptTokenCount": len(prompt) // 4,
+                                                             "candidatesTokenCount": len(text) // 4}}}
+                except Exception as e:
+                    record = {"key": request['key'], "error": {"code": 500, "message": str(e)}}
+                results_file.write(json.dumps(record) + "\n")
+        return destination
+
+
+def _default_fake_response(key: str, prompt: str) -> str:
+    return json.dumps({
+        "extraction_id": key,
+        "sentiment_analysis": {"overall_sentiment": "neutral", "confidence_score": 0.5, "emotional_tone": "neutral"},
+        "rmt_mention_analysis": {"mention_type": "unclear", "mention_confidence": 0.5,
+                                 "mention_context": "unclear", "name_variations_detected": []},
+        "service_quality_metrics": {"technical_skill_rating": None, "communication_rating": None,
+                                    "professionalism_rating": None, "pain_relief_effectiveness": None,
+                                    "treatment_approach": None},
+        "business_context_analysis": {"business_name_confidence": 0.5, "staff_context": "unclear",
+                                      "appointment_booking_mentioned": False, "facility_quality_mentioned": False},
+        "review_classification": {"review_authenticity": "unclear", "review_detail_level": "brief",
+                                  "specific_treatment_mentioned": False, "repeat_client_indicated": False,
+                                  "recommendation_given": False},
+        "key_positive_points": [], "key_negative_points": [], "notable_quotes": [],
+        "overall_analysis_confidence": 0.5, "potential_false_positive": False,
+        "analysis_notes": "Generated by FakeBatchJobClient"
+    })
+
+
+def create_batch_client(backend: str, api_key: Optional[str] = None, model_name: Optional[str] = None,
+                        work_dir: str = 'fake_batch_jobs') -> BatchJobClient:
+    if backend == 'gemini':
+        return GeminiBatchJobClient(api_key, model_name)
+    if backend == 'fake':
+        return FakeBatchJobClient(work_dir)
+    raise ValueError(f"Unknown batch backend: {backend}")
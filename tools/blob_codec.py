@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+"""
+Blob Codec for large JSON/text columns
+
+Transparent zstd compression for the bulky text columns in the monitoring database:
+
+- ai_analyses.analysis_json               (family 'analysis')
+- meta_leaderboard_runs.input_json/output_json (family 'meta_run')
+- rmt_profiles.reviews_data               (family 'reviews')
+- analysis_cache.response_json            (family 'analysis')
+
+Each compressed column has a sibling codec marker column ('<column>_codec' or
+'input_codec'/'output_codec') holding one of:
+
+- 'raw' (or NULL)        - stored as plain text, the historical format
+- 'zstd'                 - zstd frame without dictionary
+- 'zstd-dict:<dict_id>'  - zstd frame compressed against a trained dictionary
+                           stored in blob_dictionaries
+
+Writers call encode_blob() and store the (value, codec) pair; readers call
+decode_blob() or wrap the value in a LazyBlob which only decompresses on first
+access. When the zstandard package is not installed new blobs are written raw and
+reading a compressed blob raises a clear error.
+
+Requirements:
+    pip install zstandard
+
+Usage:
+    # One-shot migration of existing rows (trains a dictionary per column family)
+    python blob_codec.py migrate --db-path rmt_monitoring.db --train-dictionary --vacuum
+
+    # Revert every blob to plain text
+    python blob_codec.py migrate --db-path rmt_monitoring.db --codec raw
+
+    # Report size and read latency for raw / zstd / zstd+dictionary
+    python blob_codec.py benchmark --db-path rmt_monitoring.db --sample 2000
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import statistics
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+CODEC_RAW = 'raw'
+CODEC_ZSTD = 'zstd'
+CODEC_ZSTD_DICT_PREFIX = 'zstd-dict:'
+
+COMPRESSION_LEVEL = 9
+MIN_COMPRESS_BYTES = 256  # Smaller blobs (e.g. '[]') stay raw so SQL filters on them keep working
+DICTIONARY_SIZE = 112 * 1024
+DICTIONARY_SAMPLE_ROWS = 2000
+
+# Set RMT_BLOB_COMPRESSION=off to keep writing plain text even with zstandard installed
+COMPRESSION_ENABLED = os.environ.get('RMT_BLOB_COMPRESSION', 'on').lower() not in ('0', 'off', 'false', 'no')
+
+# (table, primary key, value column, codec column, dictionary family)
+BLOB_COLUMNS: List[Tuple[str, str, str, str, str]] = [
+    ('ai_analyses', 'analysis_id', 'analysis_json', 'analysis_json_codec', 'analysis'),
+    ('meta_leaderboard_runs', 'run_id', 'input_json', 'input_codec', 'meta_run'),
+    ('meta_leaderboard_runs', 'run_id', 'output_json', 'output_codec', 'meta_run'),
+    ('rmt_profiles', 'profile_id', 'reviews_data', 'reviews_data_codec', 'reviews'),
+    ('analysis_cache', 'cache_key', 'response_json', 'response_codec', 'analysis'),
+]
+
+BLOB_DICTIONARIES_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS blob_dictionaries (
+    dict_id TEXT PRIMARY KEY,
+    family TEXT NOT NULL,
+    dictionary BLOB NOT NULL,
+    sample_count INTEGER,
+    created_at TIMESTAMP NOT NULL
+);
+"""
+
+# Dictionaries are content-addressed, so caching them process-wide is safe across databases
+_dictionary_cache: Dict[str, bytes] = {}
+_active_dictionary: Dict[Tuple[str, str], Optional[str]] = {}
+# zstandard compressor/decompressor objects are not safe to share between threads
+_local = threading.local()
+
+
+def compression_available() -> bool:
+    return zstandard is not None and COMPRESSION_ENABLED
+
+
+def ensure_codec_schema(conn: sqlite3.Connection):
+    """Create blob_dictionaries and add codec marker columns to any existing blob tables"""
+    if _is_postgres(conn):
+        # Codec columns are part of the PostgreSQL schema and values are always stored raw
+        return
+    conn.execute(BLOB_DICTIONARIES_TABLE_SQL)
+    for table, _, _, codec_column, _ in BLOB_COLUMNS:
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()}
+        if columns and codec_column not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {codec_column} TEXT DEFAULT '{CODEC_RAW}'")
+            logger.info(f"Added codec column {table}.{codec_column}")
+
+
+def _is_postgres(conn) -> bool:
+    return getattr(conn, 'dialect', 'sqlite') == 'postgres'
+
+
+def _db_key(conn: sqlite3.Connection) -> str:
+    row = conn.execute("PRAGMA database_list").fetchone()
+    return row[2] if row else ''
+
+
+def _load_dictionary(conn: Optional[sqlite3.Connection], dict_id: str) -> bytes:
+    if dict_id not in _dictionary_cache:
+        row = conn.execute(
+            "SELECT dictionary FROM blob_dictionaries WHERE dict_id = ?", (dict_id,)
+        ).fetchone() if conn is not None else None
+        if not row:
+            raise ValueError(f"Compression dictionary {dict_id} not found in blob_dictionaries")
+        _dictionary_cache[dict_id] = bytes(row[0])
+    return _dictionary_cache[dict_id]
+
+
+def _active_dictionary_id(conn: sqlite3.Connection, family: str) -> Optional[str]:
+    """Most recently trained dictionary for a column family (cached per database)"""
+    key = (_db_key(conn), family)
+    if key not in _active_dictionary:
+        try:
+            row = conn.execute("""
+                SELECT dict_id, dictionary FROM blob_dictionaries
+                WHERE family = ? ORDER BY created_at DESC LIMIT 1
+            """, (family,)).fetchone()
+        except sqlite3.OperationalError:
+            row = None  # blob_dictionaries not created yet
+        if row:
+            _dictionary_cache[row[0]] = bytes(row[1])
+        _active_dictionary[key] = row[0] if row else None
+    return _active_dictionary[key]
+
+
+def _compressor(dict_id: Optional[str]):
+    compressors = _local.__dict__.setdefault('compressors', {})
+    if dict_id not in compressors:
+        dict_data = zstandard.ZstdCompressionDict(_dictionary_cache[dict_id]) if dict_id else None
+        compressors[dict_id] = zstandard.ZstdCompressor(level=COMPRESSION_LEVEL, dict_data=dict_data)
+    return compressors[dict_id]
+
+
+def _decompressor(dict_id: Optional[str]):
+    decompressors = _local.__dict__.setdefault('decompressors', {})
+    if dict_id not in decompressors:
+        dict_data = zstandard.ZstdCompressionDict(_dictionary_cache[dict_id]) if dict_id else None
+        decompressors[dict_id] = zstandard.ZstdDecompressor(dict_data=dict_data)
+    return decompressors[dict_id]
+
+
+def encode_blob(conn: sqlite3.Connection, text: Optional[str], family: str,
+                codec: Optional[str] = None) -> Tuple[Union[str, bytes, None], str]:
+    """
+    Encode text for storage in a blob column
+
+    Args:
+        conn: Open connection (used to look up the family's trained dictionary)
+        text: Text to store
+        family: Dictionary family of the column ('analysis', 'meta_run', 'reviews')
+        codec: Force 'raw' or 'zstd'; by default zstd (with dictionary if trained) when available
+
+    Returns:
+        (value to store, codec marker to store alongside it)
+    """
+    if text is None:
+        return None, CODEC_RAW
+    if codec == CODEC_RAW or (codec is None and not compression_available()):
+        return text, CODEC_RAW
+    if _is_postgres(conn):
+        # TEXT columns there are TOAST-compressed by the server; keep them queryable
+        return text, CODEC_RAW
+
+    data = text.encode('utf-8')
+    if len(data) < MIN_COMPRESS_BYTES:
+        return text, CODEC_RAW
+
+    dict_id = _active_dictionary_id(conn, family) if codec is None else None
+    compressed = _compressor(dict_id).compress(data)
+    return compressed, f"{CODEC_ZSTD_DICT_PREFIX}{dict_id}" if dict_id else CODEC_ZSTD
+
+
+def decode_blob(conn: Optional[sqlite3.Connection], value: Union[str, bytes, None],
+                codec: Optional[str]) -> Optional[str]:
+    """Decode a stored blob back to text (conn is only needed for uncached dictionaries)"""
+    if value is None:
+        return None
+    if not codec or codec == CODEC_RAW:
+        return value.decode('utf-8') if isinstance(value, bytes) else value
+
+    if zstandard is None:
+        raise RuntimeError(f"Blob is stored with codec '{codec}' but zstandard is not installed (pip install zstandard)")
+
+    dict_id = None
+    if codec.startswith(CODEC_ZSTD_DICT_PREFIX):
+        dict_id = codec[len(CODEC_ZSTD_DICT_PREFIX):]
+        _load_dictionary(conn, dict_id)
+    elif codec != CODEC_ZSTD:
+        raise ValueError(f"Unknown blob codec: {codec}")
+
+    return _decompressor(dict_id).decompress(value).decode('utf-8')
+
+
+class LazyBlob:
+    """Stored blob that is only decompressed the first time its text is needed"""
+
+    __slots__ = ('_value', '_codec', '_text')
+
+    def __init__(self, conn: Optional[sqlite3.Connection], value: Union[str, bytes, None], codec: Optional[str]):
+        self._value = value
+        self._codec = codec
+        self._text = None
+        # Resolve the dictionary now, while the connection is still open
+        if codec and codec.startswith(CODEC_ZSTD_DICT_PREFIX):
+            _load_dictionary(conn, codec[len(CODEC_ZSTD_DICT_PREFIX):])
+
+    @property
+    def text(self) -> Optional[str]:
+        if self._text is None and self._value is not None:
+            self._text = decode_blob(None, self._value, self._codec)
+            self._value = None
+        return self._text
+
+    def json(self, default: Any = None) -> Any:
+        return json.loads(self.text) if self.text else default
+
+    def __str__(self) -> str:
+        return self.text or ''
+
+
+def train_dictionary(conn: sqlite3.Connection, family: str, sample_rows: int = DICTIONARY_SAMPLE_ROWS) -> Optional[str]:
+    """Train a zstd dictionary for a column family from existing rows and make it active"""
+    if zstandard is None:
+        raise RuntimeError("Dictionary training requires zstandard (pip install zstandard)")
+
+    samples = []
+    for table, _, column, codec_column, column_family in BLOB_COLUMNS:
+        if column_family != family or not _table_exists(conn, table):
+            continue
+        rows = conn.execute(f"""
+            SELECT {column}, {codec_column} FROM {table}
+            WHERE {column} IS NOT NULL ORDER BY RANDOM() LIMIT ?
+        """, (sample_rows,)).fetchall()
+        samples.extend(decode_blob(conn, value, codec).encode('utf-8') for value, codec in rows)
+
+    samples = [s for s in samples if len(s) >= MIN_COMPRESS_BYTES]
+    if len(samples) < 10:
+        logger.info(f"Not enough samples to train a '{family}' dictionary ({len(samples)})")
+        return None
+
+    try:
+        dictionary = zstandard.train_dictionary(DICTIONARY_SIZE, samples).as_bytes()
+    except zstandard.ZstdError as e:
+        logger.warning(f"Dictionary training failed for '{family}': {e}")
+        return None
+
+    dict_id = hashlib.sha1(dictionary).hexdigest()[:16]
+    conn.execute("""
+        INSERT OR IGNORE INTO blob_dictionaries (dict_id, family, dictionary, sample_count, created_at)
+        VALUES (?, ?, ?, ?, ?)
+    """, (dict_id, family, dictionary, len(samples), datetime.now()))
+    _dictionary_cache[dict_id] = dictionary
+    _active_dictionary[(_db_key(conn), family)] = dict_id
+    logger.info(f"Trained '{family}' dictionary {dict_id} from {len(samples)} samples ({len(dictionary)} bytes)")
+    return dict_id
+
+
+def migrate(db_path: str, codec: Optional[str] = None, train: bool = False,
+            batch_size: int = 500, vacuum: bool = False) -> Dict[str, int]:
+    """
+    Re-encode every blob column in place
+
+    Args:
+        db_path: SQLite database path
+        codec: 'raw' to decompress everything, 'zstd' for dictionary-less zstd,
+               None for zstd with the family's trained dictionary when there is one
+        train: Train a dictionary per family before re-encoding
+        batch_size: Rows re-encoded per transaction
+        vacuum: VACUUM afterwards so freed pages are returned to the filesystem
+
+    Returns:
+        Rows rewritten per table.column
+    """
+    if codec != CODEC_RAW and zstandard is None:
+        raise RuntimeError("Compression requires zstandard (pip install zstandard)")
+
+    rewritten = {}
+    with sqlite3.connect(db_path) as conn:
+        ensure_codec_schema(conn)
+
+        if train and codec != CODEC_RAW:
+            for family in sorted({column[4] for column in BLOB_COLUMNS}):
+                if any(_table_exists(conn, c[0]) for c in BLOB_COLUMNS if c[4] == family):
+                    train_dictionary(conn, family)
+
+        for table, key, column, codec_column, family in BLOB_COLUMNS:
+            if not _table_exists(conn, table):
+                continue
+
+            target = codec
+            if codec is None:
+                dict_id = _active_dictionary_id(conn, family)
+                target = f"{CODEC_ZSTD_DICT_PREFIX}{dict_id}" if dict_id else CODEC_ZSTD
+
+            keys = [row[0] for row in conn.execute(f"""
+                SELECT {key} FROM {table}
+                WHERE {column} IS NOT NULL AND COALESCE({codec_column}, '{CODEC_RAW}') != ?
+                  AND (? = '{CODEC_RAW}' OR COALESCE({codec_column}, '{CODEC_RAW}') != '{CODEC_RAW}'
+                       OR LENGTH(CAST({column} AS BLOB)) >= ?)
+            """, (target, target, MIN_COMPRESS_BYTES)).fetchall()]
+
+            count = 0
+            for start in range(0, len(keys), batch_size):
+                batch = keys[start:start + batch_size]
+                placeholders = ','.join('?' * len(batch))
+                rows = conn.execute(
+                    f"SELECT {key}, {column}, {codec_column} FROM {table} WHERE {key} IN ({placeholders})",
+                    batch
+                ).fetchall()
+                for row_key, value, current_codec in rows:
+                    text = decode_blob(conn, value, current_codec)
+                    new_value, new_codec = encode_blob(conn, text, family, codec)
+                    conn.execute(
+                        f"UPDATE {table} SET {column} = ?, {codec_column} = ? WHERE {key} = ?",
+                        (new_value, new_codec, row_key)
+                    )
+                    count += 1
+                conn.commit()
+
+            rewritten[f"{table}.{column}"] = count
+            logger.info(f"Re-encoded {count} rows in {table}.{column}")
+
+    if vacuum:
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("VACUUM")
+        logger.info("Database vacuumed")
+
+    return rewritten
+
+
+def _table_exists(conn: sqlite3.Connection, table: str) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone() is not None
+
+
+def benchmark(db_path: str, sample: int = 2000) -> Dict[str, Dict[str, Any]]:
+    """
+    Compare stored size and read latency of raw, zstd and zstd+dictionary per column family
+
+    Works on an in-memory sample and never modifies the database.
+    """
+    if zstandard is None:
+        raise RuntimeError("Benchmark requires zstandard (pip install zstandard)")
+
+    results = {}
+    with sqlite3.connect(db_path) as conn:
+        for table, _, column, codec_column, family in BLOB_COLUMNS:
+            if not _table_exists(conn, table):
+                continue
+            rows = conn.execute(f"""
+                SELECT {column}, {codec_column} FROM {table}
+                WHERE {column} IS NOT NULL ORDER BY RANDOM() LIMIT ?
+            """, (sample,)).fetchall()
+            texts = [decode_blob(conn, value, codec).encode('utf-8') for value, codec in rows]
+            if not texts:
+                continue
+
+            # Train on half the sample and measure on the rest so the dictionary is not overfit
+            train_set, test_set = texts[::2], texts[1::2] or texts
+            variants = {
+                'raw': (lambda b: b, lambda b: b),
+                'zstd': _zstd_pair(None),
+            }
+            try:
+                dictionary = zstandard.train_dictionary(DICTIONARY_SIZE, train_set)
+                variants['zstd+dict'] = _zstd_pair(dictionary)
+            except zstandard.ZstdError as e:
+                logger.info(f"Skipping dictionary variant for {table}.{column}: {e}")
+
+            total_raw = sum(len(t) for t in test_set)
+            column_results = {'rows': len(test_set), 'raw_bytes': total_raw}
+            for name, (compress, decompress) in variants.items():
+                stored = [compress(t) for t in test_set]
+                latencies = []
+                for blob in stored:
+                    started = time.perf_counter()
+                    json.loads(decompress(blob))
+                    latencies.append((time.perf_counter() - started) * 1e6)
+                size = sum(len(b) for b in stored)
+                column_results[name] = {
+                    'bytes': size,
+                    'ratio': round(total_raw / size, 2) if size else 0,
+                    'read_mean_us': round(statistics.mean(latencies), 1),
+                    'read_p95_us': round(sorted(latencies)[min(len(latencies) - 1, int(len(latencies) * 0.95))], 1),
+                }
+            results[f"{table}.{column}"] = column_results
+
+    return results
+
+
+def _zstd_pair(dictionary):
+    compressor = zstandard.ZstdCompressor(level=COMPRESSION_LEVEL, dict_data=dictionary)
+    decompressor = zstandard.ZstdDecompressor(dict_data=dictionary)
+    return compressor.compress, decompressor.decompress
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Blob compression tools for the monitoring database')
+    parser.add_argument('command', choices=['migrate', 'benchmark'], help='Operation to run')
+    parser.add_argument('--db-path', default='rmt_monitoring.db', help='Database file path')
+    parser.add_argument('--codec', choices=[CODEC_RAW, CODEC_ZSTD], help='Target codec for migrate (default: zstd)')
+    parser.add_argument('--train-dictionary', action='store_true', help='Train per-family dictionaries before migrating')
+    parser.add_argument('--batch-size', type=int, default=500, help='Rows per transaction during migrate')
+    parser.add_argument('--vacuum', action='store_true', help='VACUUM after migrating to shrink the file')
+    parser.add_argument('--sample', type=int, default=2000, help='Rows sampled per column for benchmark')
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'migrate':
+            size_before = os.path.getsize(args.db_path)
+            rewritten = migrate(args.db_path, args.codec, args.train_dictionary, args.batch_size, args.vacuum)
+            size_after = os.path.getsize(args.db_path)
+            print("\n✅ Migration complete:")
+            for column, count in rewritten.items():
+                print(f"   📄 {column}: {count} rows re-encoded")
+            print(f"   💾 Database size: {size_before / 1e6:.1f} MB → {size_after / 1e6:.1f} MB")
+
+        elif args.command == 'benchmark':
+            results = benchmark(args.db_path, args.sample)
+            for column, stats in results.items():
+                print(f"\n📊 {column} ({stats['rows']} rows, {stats['raw_bytes'] / 1e3:.1f} KB raw)")
+                for name in ('raw', 'zstd', 'zstd+dict'):
+                    if name in stats:
+                        s = stats[name]
+                        print(f"   {name:10s} {s['bytes'] / 1e3:10.1f} KB  ratio {s['ratio']:5.2f}x  "
+                              f"read mean {s['read_mean_us']:8.1f} µs  p95 {s['read_p95_us']:8.1f} µs")
+
+    except Exception as e:
+        logger.error(f"❌ {args.command} failed: {e}")
+        exit(1)
+
+if __name__ == "__main__":
+    main()
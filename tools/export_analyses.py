@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Columnar export of AI review analyses
+
+Flattens the ComprehensiveRMTAnalysis JSON stored in ai_analyses.analysis_json into
+typed columns and streams it to Parquet (or Arrow IPC) so analysts can query the
+analyses directly instead of parsing JSON row by row.
+
+Output is a Hive-style dataset partitioned by analysis_run_id:
+
+    analyses_dataset/
+    ├── analysis_run_id=full_1719300000/part-0.parquet
+    └── analysis_run_id=analysis_only_1719400000/part-0.parquet
+
+Rows are read from SQLite in chunks and written as record batches, so memory use is
+bounded by --chunk-size rather than the size of the table. Runs that already have a
+partition are skipped, which makes repeated exports incremental appends. Runs that are
+still in progress are never exported.
+
+Requirements:
+    pip install pyarrow
+
+Usage:
+    # Export every completed run that has not been exported yet
+    python export_analyses.py --output-dir analyses_dataset
+
+    # Arrow IPC instead of Parquet, re-exporting one run
+    python export_analyses.py --format ipc --run-id full_1719300000 --force
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from blob_codec import ensure_codec_schema, decode_blob
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+except ImportError as e:
+    print(f"Error importing pyarrow: {e}")
+    print("Please install it with: pip install pyarrow")
+    exit(1)
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+DB_PATH = "rmt_monitoring.db"
+
+# Columns taken directly from ai_analyses
+ROW_COLUMNS: List[Tuple[str, pa.DataType]] = [
+    ("analysis_id", pa.string()),
+    ("profile_id", pa.string()),
+    ("analysis_run_id", pa.string()),
+    ("review_hash", pa.string()),
+    ("analyzed_at", pa.timestamp("us")),
+    ("gemini_model_used", pa.string()),
+]
+
+# Columns flattened out of ComprehensiveRMTAnalysis: (column, path in analysis_json, type)
+ANALYSIS_COLUMNS: List[Tuple[str, Tuple[str, ...], pa.DataType]] = [
+    ("extraction_id", ("extraction_id",), pa.string()),
+    ("sentiment_overall", ("sentiment_analysis", "overall_sentiment"), pa.string()),
+    ("sentiment_confidence", ("sentiment_analysis", "confidence_score"), pa.float64()),
+    ("emotional_tone", ("sentiment_analysis", "emotional_tone"), pa.string()),
+    ("mention_type", ("rmt_mention_analysis", "mention_type"), pa.string()),
+    ("mention_confidence", ("rmt_mention_analysis", "mention_confidence"), pa.float64()),
+    ("mention_context", ("rmt_mention_analysis", "mention_context"), pa.string()),
+    ("name_variations_detected", ("rmt_mention_analysis", "name_variations_detected"), pa.list_(pa.string())),
+    ("technical_skill_rating", ("service_quality_metrics", "technical_skill_rating"), pa.int8()),
+    ("communication_rating", ("service_quality_metrics", "communication_rating"), pa.int8()),
+    ("professionalism_rating", ("service_quality_metrics", "professionalism_rating"), pa.int8()),
+    ("pain_relief_effectiveness", ("service_quality_metrics", "pain_relief_effectiveness"), pa.string()),
+    ("treatment_approach", ("service_quality_metrics", "treatment_approach"), pa.string()),
+    ("business_name_confidence", ("business_context_analysis", "business_name_confidence"), pa.float64()),
+    ("staff_context", ("business_context_analysis", "staff_context"), pa.string()),
+    ("appointment_booking_mentioned", ("business_context_analysis", "appointment_booking_mentioned"), pa.bool_()),
+    ("facility_quality_mentioned", ("business_context_analysis", "facility_quality_mentioned"), pa.bool_()),
+    ("review_authenticity", ("review_classification", "review_authenticity"), pa.string()),
+    ("review_detail_level", ("review_classification", "review_detail_level"), pa.string()),
+    ("specific_treatment_mentioned", ("review_classification", "specific_treatment_mentioned"), pa.bool_()),
+    ("repeat_client_indicated", ("review_classification", "repeat_client_indicated"), pa.bool_()),
+    ("recommendation_given", ("review_classification", "recommendation_given"), pa.bool_()),
+    ("key_positive_points", ("key_positive_points",), pa.list_(pa.string())),
+    ("key_negative_points", ("key_negative_points",), pa.list_(pa.string())),
+    ("notable_quotes", ("notable_quotes",), pa.list_(pa.string())),
+    ("overall_analysis_confidence", ("overall_analysis_confidence",), pa.float64()),
+    ("potential_false_positive", ("potential_false_positive",), pa.bool_()),
+    ("analysis_notes", ("analysis_notes",), pa.string()),
+]
+
+ANALYSIS_SCHEMA = pa.schema(
+    [pa.field(name, dtype) for name, dtype in ROW_COLUMNS] +
+    [pa.field(name, dtype) for name, _, dtype in ANALYSIS_COLUMNS]
+)
+
+FILE_EXTENSIONS = {"parquet": "parquet", "ipc": "arrow"}
+
+
+def _parse_timestamp(value: Any) -> Optional[datetime]:
+    """Parse the TIMESTAMP text SQLite stores for datetime.now()"""
+    if value is None or isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+def _lookup(data: Dict[str, Any], path: Tuple[str, ...]) -> Any:
+    for key in path:
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    return data
+
+
+def flatten_analysis(conn: sqlite3.Connection, row: sqlite3.Row) -> Dict[str, Any]:
+    """Flatten one ai_analyses row and its analysis_json into a column -> value dict"""
+    record = {name: row[name] for name, _ in ROW_COLUMNS}
+    record["analyzed_at"] = _parse_timestamp(record["analyzed_at"])
+
+    try:
+        analysis_text = decode_blob(conn, row["analysis_json"], row["analysis_json_codec"])
+        analysis = json.loads(analysis_text) if analysis_text else {}
+    except (TypeError, ValueError):
+        logger.warning(f"Unparseable analysis_json for {row['analysis_id']}, exporting row columns only")
+        analysis = {}
+
+    for name, path, _ in ANALYSIS_COLUMNS:
+        record[name] = _lookup(analysis, path)
+    return record
+
+
+def _to_record_batch(records: List[Dict[str, Any]]) -> pa.RecordBatch:
+    arrays = [
+        pa.array([record[field.name] for record in records], type=field.type)
+        for field in ANALYSIS_SCHEMA
+    ]
+    return pa.RecordBatch.from_arrays(arrays, schema=ANALYSIS_SCHEMA)
+
+
+def iter_record_batches(conn: sqlite3.Connection, run_id: str, chunk_size: int) -> Iterator[pa.RecordBatch]:
+    """Stream one run's analyses as record batches of at most chunk_size rows"""
+    cursor = conn.execute("""
+        SELECT analysis_id, profile_id, analysis_run_id, review_hash, analyzed_at,
+               gemini_model_used, analysis_json, analysis_json_codec
+        FROM ai_analyses
+        WHERE analysis_run_id = ?
+        ORDER BY analyzed_at
+    """, (run_id,))
+
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        yield _to_record_batch([flatten_analysis(conn, row) for row in rows])
+
+
+def get_exportable_runs(conn: sqlite3.Connection) -> List[Tuple[str, int]]:
+    """Analysis runs with at least one analysis whose monitoring run is no longer running"""
+    return [tuple(row) for row in conn.execute("""
+        SELECT aa.analysis_run_id, COUNT(*)
+        FROM ai_analyses aa
+        LEFT JOIN monitoring_runs mr ON mr.run_id = aa.analysis_run_id
+        WHERE mr.status IS NULL OR mr.status != 'running'
+        GROUP BY aa.analysis_run_id
+        ORDER BY MIN(aa.analyzed_at)
+    """).fetchall()]
+
+
+def partition_path(output_dir: str, run_id: str, fmt: str) -> str:
+    return os.path.join(output_dir, f"analysis_run_id={run_id}", f"part-0.{FILE_EXTENSIONS[fmt]}")
+
+
+def export_run(conn: sqlite3.Connection, run_id: str, path: str, fmt: str, chunk_size: int) -> int:
+    """Write one run's partition, going through a temp file so readers never see a partial file"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+
+    rows_written = 0
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(tmp_path, ANALYSIS_SCHEMA, compression="zstd")
+    else:
+        writer = ipc.new_file(tmp_path, ANALYSIS_SCHEMA)
+
+    try:
+        for batch in iter_record_batches(conn, run_id, chunk_size):
+            writer.write_batch(batch)
+            rows_written += batch.num_rows
+    except Exception:
+        writer.close()
+        os.remove(tmp_path)
+        raise
+
+    writer.close()
+    os.replace(tmp_path, path)
+    return rows_written
+
+
+def export_analyses(db_path: str, output_dir: str, fmt: str = "parquet", chunk_size: int = 5000,
+                    run_ids: Optional[List[str]] = None, force: bool = False) -> Dict[str, int]:
+    """
+    Export analyses to a dataset partitioned by analysis_run_id
+
+    Args:
+        db_path: SQLite database path
+        output_dir: Dataset root directory
+        fmt: 'parquet' or 'ipc'
+        chunk_size: Rows per record batch (bounds memory use)
+        run_ids: Only export these runs (default: all exportable runs)
+        force: Re-export runs that already have a partition
+
+    Returns:
+        Rows written per exported run
+    """
+    exported = {}
+
+    with sqlite3.connect(db_path) as conn:
+        conn.row_factory = sqlite3.Row
+        ensure_codec_schema(conn)
+
+        for run_id, row_count in get_exportable_runs(conn):
+            if run_ids and run_id not in run_ids:
+                continue
+
+            path = partition_path(output_dir, run_id, fmt)
+            if os.path.exists(path) and not force:
+                logger.debug(f"Skipping already exported run {run_id}")
+                continue
+
+            logger.info(f"Exporting run {run_id} ({row_count} analyses) to {path}")
+            exported[run_id] = export_run(conn, run_id, path, fmt, chunk_size)
+
+    logger.info(f"Exported {sum(exported.values())} analyses across {len(exported)} runs")
+    return exported
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export AI analyses to Parquet/Arrow IPC')
+    parser.add_argument('--db-path', default=DB_PATH, help='Database file path')
+    parser.add_argument('--output-dir', default='analyses_dataset', help='Dataset root directory')
+    parser.add_argument('--format', choices=sorted(FILE_EXTENSIONS), default='parquet', help='Output format')
+    parser.add_argument('--chunk-size', type=int, default=5000, help='Rows per record batch')
+    parser.add_argument('--run-id', action='append', dest='run_ids', help='Only export this run (repeatable)')
+    parser.add_argument('--force', action='store_true', help='Re-export runs that already have a partition')
+
+    args = parser.parse_args()
+
+    try:
+        exported = export_analyses(
+            args.db_path, args.output_dir, args.format, args.chunk_size, args.run_ids, args.force
+        )
+        if exported:
+            print(f"\n✅ Exported {len(exported)} runs to {args.output_dir}")
+            for run_id, rows in exported.items():
+                print(f"   📄 {run_id}: {rows} analyses")
+        else:
+            print("\nℹ️ Nothing to export (all completed runs already exported)")
+
+    except Exception as e:
+        logger.error(f"❌ Export failed: {e}")
+        exit(1)
+
+if __name__ == "__main__":
+    main()
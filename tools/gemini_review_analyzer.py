@@ -10,17 +10,36 @@ Requirements:
 
 Usage:
     python gemini_review_analyzer.py extracted_reviews.json
+
+    # Large dumps: stream extractions (JSON via ijson, or JSONL) and write analyses to JSONL
+    python gemini_review_analyzer.py extracted_reviews.jsonl --stream analyses.jsonl
 """
 
+import argparse
+import asyncio
 import json
-import sys
+import os
+import threading
 import time
-from typing import List, Dict, Any, Optional, Literal
+import hashlib
+from collections import deque, OrderedDict
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import List, Dict, Any, Optional, Literal, Iterable, Iterator, Tuple, AsyncIterable, AsyncIterator, Union
 from pydantic import BaseModel, Field
 from google import genai
 from google.genai import types
 import logging
 
+from analysis_cache import AnalysisCache, cache_key, schema_version
+import leaderboard_columns
+import leaderboard_engine
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -136,6 +155,15 @@ class ComprehensiveRMTAnalysis(BaseModel):
         description="Additional notes or caveats about the analysis"
     )
 
+# Changes whenever the analysis schema changes, invalidating cached analyses
+ANALYSIS_SCHEMA_VERSION = schema_version(ComprehensiveRMTAnalysis.model_json_schema())
+
+# Below this many analyses the list-based leaderboard code is faster than building a DataFrame
+COLUMNAR_MIN_ANALYSES = 500
+
+# Batched analysis buffers at most this many batches of extractions while grouping them by RMT
+BATCH_WINDOW_BATCHES = 4
+
 class RMTLeaderboardMetrics(BaseModel):
     """Aggregated metrics for leaderboard generation"""
     profile_id: str
@@ -169,28 +197,287 @@ class RMTLeaderboardMetrics(BaseModel):
         ge=0.0, le=100.0, description="Composite reputation score (0-100)"
     )
 
+class AdaptiveRateLimiter:
+    """
+    Requests-per-minute / tokens-per-minute budget shared by concurrent analysis workers
+
+    acquire() blocks until a request fits in the trailing 60 second window. Concurrency
+    follows AIMD: it is halved (and requests paused with exponential backoff) on a 429,
+    and grows by one after a full window of successful requests.
+    """
+
+    WINDOW_SECONDS = 60.0
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: Optional[int] = None,
+                 max_concurrency: int = 8, min_concurrency: int = 1,
+                 base_backoff: float = 2.0, max_backoff: float = 60.0):
+        self.requests_per_minute = max(1, int(requests_per_minute))
+        self.tokens_per_minute = tokens_per_minute
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.concurrency = self.max_concurrency
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self._lock = threading.Lock()
+        self._window = deque()  # [timestamp, tokens] per request sent in the last minute
+        self._window_tokens = 0
+        self._backoff = base_backoff
+        self._paused_until = 0.0
+        self._successes = 0
+        self._last_decrease = 0.0
+        self.rate_limited_count = 0
+
+    def _expire(self, now: float):
+        while self._window and now - self._window[0][0] >= self.WINDOW_SECONDS:
+            self._window_tokens -= self._window.popleft()[1]
+
+    def _try_acquire(self, tokens: int) -> Tuple[Optional[list], float]:
+        """(ticket, 0) if the request fits now, else (None, seconds to wait before retrying)"""
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            wait_for = self._paused_until - now
+            if wait_for <= 0:
+                fits_requests = len(self._window) < self.requests_per_minute
+                fits_tokens = (self.tokens_per_minute is None or not self._window or
+                               self._window_tokens + tokens <= self.tokens_per_minute)
+                if fits_requests and fits_tokens:
+                    ticket = [now, tokens]
+                    self._window.append(ticket)
+                    self._window_tokens += tokens
+                    return ticket, 0.0
+                wait_for = self.WINDOW_SECONDS - (now - self._window[0][0])
+        return None, min(max(wait_for, 0.01), 1.0)
+
+    def acquire(self, tokens: int = 0) -> list:
+        """Block until a request of ~tokens fits the budget; returns a ticket for record_usage()"""
+        while True:
+            ticket, wait_for = self._try_acquire(tokens)
+            if ticket:
+                return ticket
+            time.sleep(wait_for)
+
+    async def acquire_async(self, tokens: int = 0) -> list:
+        """acquire() for asyncio callers: waits without blocking the event loop"""
+        while True:
+            ticket, wait_for = self._try_acquire(tokens)
+            if ticket:
+                return ticket
+            await asyncio.sleep(wait_for)
+
+    def record_usage(self, ticket: list, tokens: Optional[int]):
+        """Replace a request's estimated token count with the actual usage"""
+        if tokens is None:
+            return
+        with self._lock:
+            if any(entry is ticket for entry in self._window):
+                self._window_tokens += tokens - ticket[1]
+            ticket[1] = tokens
+
+    def on_success(self):
+        with self._lock:
+            self._backoff = self.base_backoff
+            self._successes += 1
+            if self._successes >= self.concurrency and self.concurrency < self.max_concurrency:
+                self.concurrency += 1
+                self._successes = 0
+
+    def on_rate_limited(self, ticket: Optional[list] = None) -> float:
+        """Shrink concurrency and pause all workers; returns the pause length"""
+        with self._lock:
+            self.rate_limited_count += 1
+            now = time.monotonic()
+            # 429s for requests sent before the last decrease belong to the same burst
+            if ticket is not None and ticket[0] < self._last_decrease:
+                return max(0.0, self._paused_until - now)
+            self.concurrency = max(self.min_concurrency, self.concurrency // 2)
+            self._successes = 0
+            self._last_decrease = now
+            pause = self._backoff
+            self._paused_until = max(self._paused_until, now + pause)
+            self._backoff = min(self._backoff * 2, self.max_backoff)
+            return pause
+
+
+def _is_rate_limit_error(error: Exception) -> bool:
+    return getattr(error, 'code', None) == 429 or 'RESOURCE_EXHAUSTED' in str(error)
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """Local token estimate (~4 characters per token), used when usage metadata is missing"""
+    return len(text) // 4 + 1 if text else 0
+
+
+@dataclass
+class TokenUsage:
+    """Token counts for one or more Gemini calls"""
+    prompt_tokens: int = 0
+    output_tokens: int = 0  # Response plus thinking tokens
+    cached_tokens: int = 0  # Prompt tokens served from a (implicit or explicit) context cache
+    calls: int = 0
+    estimated_calls: int = 0  # Calls counted with estimate_tokens() instead of usage metadata
+
+    def __add__(self, other: 'TokenUsage') -> 'TokenUsage':
+        return TokenUsage(self.prompt_tokens + other.prompt_tokens, self.output_tokens + other.output_tokens,
+                          self.cached_tokens + other.cached_tokens, self.calls + other.calls,
+                          self.estimated_calls + other.estimated_calls)
+
+    def __sub__(self, other: 'TokenUsage') -> 'TokenUsage':
+        return TokenUsage(self.prompt_tokens - other.prompt_tokens, self.output_tokens - other.output_tokens,
+                          self.cached_tokens - other.cached_tokens, self.calls - other.calls,
+                          self.estimated_calls - other.estimated_calls)
+
+    @classmethod
+    def from_response(cls, response, prompt: str) -> 'TokenUsage':
+        """Usage of one call, from response.usage_metadata or estimated from the texts"""
+        usage = getattr(response, 'usage_metadata', None)
+        prompt_tokens = getattr(usage, 'prompt_token_count', None)
+        output_tokens = getattr(usage, 'candidates_token_count', None)
+        if prompt_tokens is None or output_tokens is None:
+            return cls(estimate_tokens(prompt), estimate_tokens(getattr(response, 'text', None)), 0, 1, 1)
+        output_tokens += getattr(usage, 'thoughts_token_count', None) or 0
+        return cls(prompt_tokens, output_tokens, getattr(usage, 'cached_content_token_count', None) or 0, 1, 0)
+
+    def split(self, parts: int) -> 'TokenUsage':
+        """Even share of this usage for one of several reviews analyzed by the same call"""
+        return TokenUsage(self.prompt_tokens // parts, self.output_tokens // parts,
+                          self.cached_tokens // parts, self.calls, self.estimated_calls)
+
+
+ANALYSIS_INSTRUCTIONS = """## ANALYSIS INSTRUCTIONS:
+
+1. **RMT Mention Analysis**: Carefully determine if this review actually refers to the specific RMT mentioned. Consider:
+   - Are the matched text segments actually referring to a person vs. a business name?
+   - Is there clear evidence this is about the specific RMT vs. someone with a similar name?
+   - What is the context of the mention?
+
+2. **Sentiment Analysis**: Analyze the sentiment specifically toward the healthcare professional, not just the business.
+
+3. **Service Quality Assessment**: Extract specific mentions of:
+   - Technical massage skills
+   - Communication abilities
+   - Professionalism
+   - Treatment effectiveness
+   - Pain relief outcomes
+
+4. **Authenticity Assessment**: Evaluate if the review seems authentic based on:
+   - Language patterns
+   - Specificity of details
+   - Balance of positive/negative points
+   - Length and depth
+
+5. **Business Context**: Understand whether the RMT works alone or as part of a team, and how this affects attribution.
+
+6. **Specialization**: Call out or categorize them as "Pre-natal", "Post-natal", "Sports", "Geriatric", "Rehabilitation", "Pain Management", "Stress Relief", "Relaxation", "Other".
+
+7. **False Positive Detection**: Be especially vigilant about whether this might be a false positive match.
+
+Please provide a thorough, objective analysis following the structured format. Be conservative in your confidence scores and explicit about any uncertainties."""
+
+# Compact prompts send the static text once per request as a system instruction, which
+# Gemini's implicit context caching can reuse across requests; the user turn only
+# carries the RMT and review data.
+COMPACT_SYSTEM_INSTRUCTION = f"""You are an expert analyst specializing in healthcare professional reputation analysis. You analyze Google reviews that potentially mention a Registered Massage Therapist (RMT). Each request gives the RMT's information followed by the review(s) to analyze.
+
+{ANALYSIS_INSTRUCTIONS}"""
+
+
+def _parse_json_array(text: str) -> List[Any]:
+    """Parse a JSON array, salvaging the complete leading elements of a truncated one"""
+    try:
+        parsed = json.loads(text)
+        return parsed if isinstance(parsed, list) else [parsed]
+    except ValueError:
+        pass
+
+    decoder = json.JSONDecoder()
+    items = []
+    position = text.find('[') + 1
+    while 0 < position < len(text):
+        while position < len(text) and text[position] in ' \t\r\n,':
+            position += 1
+        try:
+            item, position = decoder.raw_decode(text, position)
+        except ValueError:
+            break
+        items.append(item)
+    return items
+
+
 class GeminiReviewAnalyzer:
-    def __init__(self, api_key: str, model_name: str = "gemini-2.5-flash-preview-04-17"):
+    def __init__(self, api_key: str, model_name: str = "gemini-2.5-flash-preview-04-17",
+                 max_concurrency: int = 8, requests_per_minute: Optional[int] = None,
+                 tokens_per_minute: Optional[int] = None, batch_reviews: bool = False,
+                 compact_prompts: bool = False, base_url: Optional[str] = None):
         """
         Initialize the Gemini AI Review Analyzer
         
         Args:
             api_key: Gemini API key
             model_name: Gemini model to use
+            max_concurrency: Maximum requests in flight in iter_analyses()
+            requests_per_minute: Request budget (default: one per request_delay)
+            tokens_per_minute: Token budget (default: unlimited)
+            batch_reviews: Pack several reviews into each request in iter_analyses()
+            compact_prompts: Move the static instructions into a system instruction and
+                drop empty fields from the per-review prompt
+            base_url: Gemini API endpoint override, e.g. a local mock_gemini_server.py
+                (default: GEMINI_BASE_URL environment variable, else Google's endpoint)
         """
-        self.client = genai.Client(api_key=api_key)
+        self.base_url = base_url or os.environ.get('GEMINI_BASE_URL') or None
+        self.client = genai.Client(
+            api_key=api_key,
+            http_options=types.HttpOptions(base_url=self.base_url) if self.base_url else None
+        )
         self.model_name = model_name
+        self.compact_prompts = compact_prompts
+        self.system_instruction = COMPACT_SYSTEM_INSTRUCTION if compact_prompts else None
         
         # Analysis configuration
         self.analysis_config = types.GenerateContentConfig(
             temperature=0.1,  # Low temperature for consistent analysis
             max_output_tokens=2048,
             response_mime_type="application/json",
-            response_schema=ComprehensiveRMTAnalysis
+            response_schema=ComprehensiveRMTAnalysis,
+            system_instruction=self.system_instruction
         )
         
+        # Batch configuration: K reviews per request, sized so K responses fit the output limit
+        self.batch_reviews = batch_reviews
+        self.max_batch_size = 20
+        self.batch_config = types.GenerateContentConfig(
+            temperature=0.1,
+            max_output_tokens=32768,
+            response_mime_type="application/json",
+            response_schema=list[ComprehensiveRMTAnalysis],  # The SDK rejects typing.List
+            system_instruction=self.system_instruction
+        )
+        self._output_tokens_per_review = 1200.0  # Running estimate, refined from usage metadata
+        
+        # Optional content-addressed response cache (see analysis_cache.py)
+        self.cache: Optional[AnalysisCache] = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._cache_lock = threading.Lock()
+        
+        # Optional local pre-filter (see review_triage.py); skipped reviews get a rule-based analysis
+        self.triage = None
+        self.triage_skipped = 0
+        
+        # Token accounting: running totals, plus each review's share until its caller saves it
+        self.token_usage = TokenUsage()
+        self._review_token_usage: 'OrderedDict[str, TokenUsage]' = OrderedDict()
+        self.max_tracked_reviews = 10000
+        
         # Rate limiting
         self.request_delay = 1.0  # seconds between API calls
+        self.max_rate_limit_retries = 5
+        self.rate_limiter = AdaptiveRateLimiter(
+            requests_per_minute or int(60 / self.request_delay),
+            tokens_per_minute,
+            max_concurrency
+        )
         
     def analyze_single_review(self, extraction_data: Dict[str, Any]) -> Optional[ComprehensiveRMTAnalysis]:
         """
@@ -203,19 +490,29 @@ class GeminiReviewAnalyzer:
             ComprehensiveRMTAnalysis object or None if analysis failed
         """
         try:
+            # Obvious false positives never reach Gemini
+            skipped = self._triage_skip(extraction_data)
+            if skipped:
+                return skipped
+            
+            # Identical inputs already analyzed by this model: no API call
+            cached = self._cache_lookup(extraction_data)
+            if cached:
+                return cached
+            
             # Build comprehensive prompt
             prompt = self._build_analysis_prompt(extraction_data)
             
             # Make API call with structured output
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=prompt,
-                config=self.analysis_config
-            )
+            response = self._generate_with_rate_limit(prompt)
+            self._record_token_usage(response, prompt, [extraction_data.get('extraction_id', '')])
             
             # Parse structured response
             analysis_dict = json.loads(response.text)
             analysis = ComprehensiveRMTAnalysis(**analysis_dict)
+            # The prompt carries no extraction ID, so take it from the request
+            analysis.extraction_id = extraction_data.get('extraction_id', analysis.extraction_id)
+            self._cache_store(extraction_data, analysis)
             
             logger.info(f"Analyzed review for {extraction_data['rmt_information'].get('full_name', extraction_data['rmt_information'].get('profile_id', 'Unknown'))}")
             return analysis
@@ -224,14 +521,340 @@ class GeminiReviewAnalyzer:
             logger.error(f"Failed to analyze review {extraction_data.get('extraction_id', 'unknown')}: {e}")
             return None
     
-    def _build_analysis_prompt(self, extraction_data: Dict[str, Any]) -> str:
-        """Build a comprehensive analysis prompt for Gemini"""
-        
-        rmt_info = extraction_data['rmt_information']
+    def _triage_skip(self, extraction_data: Dict[str, Any]) -> Optional[ComprehensiveRMTAnalysis]:
+        """Rule-based analysis if the triage stage skips this extraction, else None"""
+        if self.triage is None:
+            return None
+        analysis = self.triage.skip_analysis(extraction_data)
+        if analysis:
+            with self._cache_lock:
+                self.triage_skipped += 1
+            logger.debug(f"Triage skipped review {analysis.extraction_id}: {analysis.analysis_notes}")
+        return analysis
+
+    def model_used_for(self, analysis: ComprehensiveRMTAnalysis) -> str:
+        """Model name to record with an analysis (the triage label for skipped reviews)"""
+        if self.triage is not None and self.triage.is_rule_based(analysis):
+            return self.triage.model_name
+        return self.model_name
+
+    def _record_token_usage(self, response, prompt: str, extraction_ids: List[str]) -> TokenUsage:
+        """Add a call's token usage to the running totals and share it among its reviews"""
+        usage = TokenUsage.from_response(response, prompt + (self.system_instruction or ''))
+        share = usage.split(len(extraction_ids)) if extraction_ids else usage
+        with self._cache_lock:
+            self.token_usage = self.token_usage + usage
+            for extraction_id in extraction_ids:
+                self._review_token_usage[extraction_id] = share
+            while len(self._review_token_usage) > self.max_tracked_reviews:
+                self._review_token_usage.popitem(last=False)
+        logger.debug(f"Gemini call for {len(extraction_ids)} review(s): {usage.prompt_tokens} prompt "
+                     f"({usage.cached_tokens} cached), {usage.output_tokens} output tokens"
+                     f"{' (estimated)' if usage.estimated_calls else ''}")
+        return usage
+
+    def pop_token_usage(self, extraction_id: str) -> Optional[TokenUsage]:
+        """Token usage attributed to a review's analysis (None for cache hits and triage skips)"""
+        with self._cache_lock:
+            return self._review_token_usage.pop(extraction_id, None)
+
+    def _cache_key(self, extraction_data: Dict[str, Any]) -> str:
+        """
+        Cache key of an extraction's analysis
+
+        Built from the content fields the prompt is rendered from, not the rendered prompt,
+        so the extraction_id and the relative time_description ("2 weeks ago") do not
+        change the key.
+        """
         review_content = extraction_data['review_content']
         business_context = extraction_data['business_context']
         matching_analysis = extraction_data['matching_analysis']
+        content = {
+            'rmt': self._format_rmt_section(extraction_data['rmt_information']),
+            'business': {field: business_context.get(field) for field in
+                         ('business_name', 'address', 'business_rating', 'total_reviews', 'business_types')},
+            'review': {field: review_content.get(field) for field in ('full_text', 'rating', 'author')},
+            'matching': {field: matching_analysis.get(field) for field in
+                         ('matched_text_segments', 'confidence_scores', 'max_confidence')},
+        }
+        settings = {
+            'temperature': self.analysis_config.temperature,
+            'max_output_tokens': self.analysis_config.max_output_tokens,
+            'prompt_format': 'compact' if self.compact_prompts else 'full',
+            'instructions': hashlib.sha256(ANALYSIS_INSTRUCTIONS.encode('utf-8')).hexdigest()[:16],
+        }
+        if self.system_instruction:
+            settings['system_instruction'] = hashlib.sha256(self.system_instruction.encode('utf-8')).hexdigest()[:16]
+        return cache_key(content, self.model_name, ANALYSIS_SCHEMA_VERSION, settings)
+
+    def _cache_lookup(self, extraction_data: Dict[str, Any]) -> Optional[ComprehensiveRMTAnalysis]:
+        """Cached analysis for an extraction (re-labelled with its extraction_id), counting hits and misses"""
+        if self.cache is None:
+            return None
+        try:
+            response_json = self.cache.get(self._cache_key(extraction_data))
+            analysis = ComprehensiveRMTAnalysis(**json.loads(response_json)) if response_json else None
+        except Exception as e:
+            logger.warning(f"Ignoring unusable cache entry: {e}")
+            analysis = None
+
+        with self._cache_lock:
+            if analysis:
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+        if analysis:
+            analysis.extraction_id = extraction_data.get('extraction_id', analysis.extraction_id)
+            logger.debug(f"Cache hit for review {analysis.extraction_id}")
+        return analysis
+
+    def _cache_store(self, extraction_data: Dict[str, Any], analysis: ComprehensiveRMTAnalysis):
+        if self.cache is None:
+            return
+        try:
+            self.cache.put(self._cache_key(extraction_data), self.model_name, ANALYSIS_SCHEMA_VERSION, analysis.model_dump_json())
+        except Exception as e:
+            logger.warning(f"Could not cache analysis for {analysis.extraction_id}: {e}")
+
+    def generation_config_dict(self) -> Dict[str, Any]:
+        """analysis_config as a Batch API generationConfig (JSON), for offline job files"""
+        return {
+            "temperature": self.analysis_config.temperature,
+            "maxOutputTokens": self.analysis_config.max_output_tokens,
+            "responseMimeType": self.analysis_config.response_mime_type,
+            "responseJsonSchema": ComprehensiveRMTAnalysis.model_json_schema(),
+        }
+
+    def _generate_with_rate_limit(self, prompt: str, config: Optional[types.GenerateContentConfig] = None):
+        """Call Gemini within the RPM/TPM budget, backing off and retrying on 429"""
+        config = config or self.analysis_config
+        # Prompt estimate plus the worst-case response
+        estimated_tokens = estimate_tokens(prompt + (self.system_instruction or '')) + config.max_output_tokens
+
+        for attempt in range(self.max_rate_limit_retries + 1):
+            ticket = self.rate_limiter.acquire(estimated_tokens)
+            try:
+                response = self.client.models.generate_content(
+                    model=self.model_name,
+                    contents=prompt,
+                    config=config
+                )
+            except Exception as e:
+                if not _is_rate_limit_error(e) or attempt == self.max_rate_limit_retries:
+                    raise
+                pause = self.rate_limiter.on_rate_limited(ticket)
+                logger.warning(f"Rate limited by Gemini, backing off {pause:.0f}s "
+                               f"(concurrency now {self.rate_limiter.concurrency})")
+                continue
+
+            usage = getattr(response, 'usage_metadata', None)
+            self.rate_limiter.record_usage(ticket, getattr(usage, 'total_token_count', None))
+            self.rate_limiter.on_success()
+            return response
+
+    def batch_size(self) -> int:
+        """Reviews per batched request that fit the output-token limit with 20% headroom"""
+        fit = int(self.batch_config.max_output_tokens * 0.8 / self._output_tokens_per_review)
+        return max(1, min(self.max_batch_size, fit))
+
+    def analyze_review_batch(self, extractions: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], Optional[ComprehensiveRMTAnalysis]]]:
+        """
+        Analyze several reviews in one structured-output request
+
+        Analyses are matched back to reviews by extraction_id. Reviews missing from the
+        response (or failing validation) are split in half and retried on their own, down
+        to single-review requests, so a partial failure never re-sends the whole batch.
+        """
+        if len(extractions) == 1:
+            return [(extractions[0], self.analyze_single_review(extractions[0]))]
+
+        # Serve skipped and cached reviews first; only the rest go into the batched request
+        cached = []
+        for extraction in extractions:
+            analysis = self._triage_skip(extraction) or self._cache_lookup(extraction)
+            if analysis:
+                cached.append((extraction, analysis))
+        if cached:
+            cached_ids = {extraction['extraction_id'] for extraction, _ in cached}
+            remaining = [extraction for extraction in extractions if extraction['extraction_id'] not in cached_ids]
+            return cached + (self.analyze_review_batch(remaining) if remaining else [])
+
+        results = {}
+        try:
+            prompt = self._build_batch_prompt(extractions)
+            response = self._generate_with_rate_limit(prompt, self.batch_config)
+            self._record_token_usage(response, prompt, [extraction['extraction_id'] for extraction in extractions])
+            wanted = {extraction['extraction_id'] for extraction in extractions}
+            for item in _parse_json_array(response.text):
+                try:
+                    analysis = ComprehensiveRMTAnalysis(**item)
+                except Exception:
+                    continue
+                if analysis.extraction_id in wanted:
+                    results[analysis.extraction_id] = analysis
+            self._update_output_estimate(response, len(results), len(extractions))
+        except Exception as e:
+            logger.warning(f"Batch of {len(extractions)} reviews failed: {e}")
+
+        for extraction in extractions:
+            if extraction['extraction_id'] in results:
+                self._cache_store(extraction, results[extraction['extraction_id']])
+
+        failed = [extraction for extraction in extractions if extraction['extraction_id'] not in results]
+        completed = [(extraction, results[extraction['extraction_id']])
+                     for extraction in extractions if extraction['extraction_id'] in results]
+        logger.info(f"Analyzed batch of {len(extractions)} reviews ({len(failed)} to retry)")
+
+        if failed:
+            middle = (len(failed) + 1) // 2
+            for half in (failed[:middle], failed[middle:]):
+                if half:
+                    completed.extend(self.analyze_review_batch(half))
+        return completed
+
+    def _update_output_estimate(self, response, analyzed: int, requested: int):
+        """Refine the per-review output token estimate that drives batch_size()"""
+        usage = getattr(response, 'usage_metadata', None)
+        output_tokens = getattr(usage, 'candidates_token_count', None)
+        if output_tokens and analyzed:
+            self._output_tokens_per_review = 0.7 * self._output_tokens_per_review + 0.3 * (output_tokens / analyzed)
+
+        finish_reason = str(getattr((getattr(response, 'candidates', None) or [None])[0], 'finish_reason', ''))
+        if analyzed < requested and 'MAX_TOKENS' in finish_reason:
+            # Truncated: the response needed more room per review than estimated
+            self._output_tokens_per_review *= 1.5
+
+    def _iter_batches(self, extractions: Iterable[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Group extractions by RMT (so headers are shared) and chunk them into batch_size() requests
+
+        Only BATCH_WINDOW_BATCHES batches of extractions are buffered, so a stream is
+        analyzed while it is still being produced. An RMT's reviews are sent as soon as
+        they fill a batch; when the window is full, the oldest groups share a batch.
+        """
+        groups: Dict[str, List[Dict[str, Any]]] = {}  # profile_id -> buffered extractions, oldest first
+        buffered = 0
+        for extraction in extractions:
+            profile_id = str(extraction['rmt_information'].get('profile_id', ''))
+            group = groups.setdefault(profile_id, [])
+            group.append(extraction)
+            buffered += 1
+            size = self.batch_size()
+            if len(group) >= size:
+                yield group[:size]
+                del group[:size]
+                buffered -= size
+                if not group:
+                    del groups[profile_id]
+            elif buffered >= size * BATCH_WINDOW_BATCHES:
+                batch = self._take_oldest(groups, size)
+                buffered -= len(batch)
+                yield batch
+        while groups:
+            yield self._take_oldest(groups, self.batch_size())
+
+    @staticmethod
+    def _take_oldest(groups: Dict[str, List[Dict[str, Any]]], size: int) -> List[Dict[str, Any]]:
+        """Up to size buffered extractions, whole RMT groups first, in arrival order"""
+        batch = []
+        while groups and len(batch) < size:
+            profile_id = next(iter(groups))
+            group = groups[profile_id]
+            taken = group[:size - len(batch)]
+            batch.extend(taken)
+            del group[:len(taken)]
+            if not group:
+                del groups[profile_id]
+        return batch
+
+    def iter_analyses(self, extractions: Iterable[Dict[str, Any]],
+                      batch: Optional[bool] = None) -> Iterator[Tuple[Dict[str, Any], Optional[ComprehensiveRMTAnalysis]]]:
+        """
+        Analyze extractions concurrently, yielding (extraction, analysis) as each completes
+
+        Up to rate_limiter.concurrency requests are kept in flight. Results are yielded
+        on the calling thread in completion order, so callers can save them (e.g. to
+        SQLite) as they arrive. analysis is None when the review could not be analyzed.
+        With batch (default: self.batch_reviews) each request carries several reviews.
+        """
+        use_batches = self.batch_reviews if batch is None else batch
+        if use_batches:
+            tasks = ((self.analyze_review_batch, chunk) for chunk in self._iter_batches(extractions))
+        else:
+            tasks = ((self._analyze_one, extraction) for extraction in extractions)
+        in_flight = set()
+        exhausted = False
+
+        with ThreadPoolExecutor(max_workers=self.rate_limiter.max_concurrency) as pool:
+            while True:
+                while not exhausted and len(in_flight) < self.rate_limiter.concurrency:
+                    task = next(tasks, None)
+                    if task is None:
+                        exhausted = True
+                        break
+                    in_flight.add(pool.submit(*task))
+
+                if not in_flight:
+                    break
+
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+
+    def _analyze_one(self, extraction: Dict[str, Any]) -> List[Tuple[Dict[str, Any], Optional[ComprehensiveRMTAnalysis]]]:
+        return [(extraction, self.analyze_single_review(extraction))]
+
+    def _build_analysis_prompt(self, extraction_data: Dict[str, Any]) -> str:
+        """Build a comprehensive analysis prompt for Gemini"""
+        if self.compact_prompts:
+            # Instructions travel in the system instruction
+            return (f"{self._format_rmt_section(extraction_data['rmt_information'])}\n\n"
+                    f"{self._format_compact_review_sections(extraction_data)}")
         
+        prompt = f"""
+You are an expert analyst specializing in healthcare professional reputation analysis. Please perform a comprehensive analysis of this Google review that potentially mentions a Registered Massage Therapist (RMT).
+
+{self._format_rmt_section(extraction_data['rmt_information'])}
+
+{self._format_review_sections(extraction_data)}
+
+{ANALYSIS_INSTRUCTIONS}
+"""
+        
+        return prompt.strip()
+
+    def _build_batch_prompt(self, extractions: List[Dict[str, Any]]) -> str:
+        """Build one prompt for several reviews, sharing the RMT header between reviews of the same RMT"""
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        for extraction in extractions:
+            groups.setdefault(extraction['rmt_information'].get('profile_id', 'Unknown'), []).append(extraction)
+
+        format_review = self._format_compact_review_sections if self.compact_prompts else self._format_review_sections
+        sections = []
+        for group in groups.values():
+            sections.append(self._format_rmt_section(group[0]['rmt_information']))
+            for extraction in group:
+                sections.append(f"### REVIEW {extraction['extraction_id']}\n\n{format_review(extraction)}")
+
+        return_instruction = ('Return a JSON array with exactly one analysis per review, in the order given. '
+                              'Set each analysis\'s extraction_id to the ID in its "### REVIEW <id>" heading '
+                              'and analyze every review independently.')
+        if self.compact_prompts:
+            return f"{chr(10).join(sections)}\n\n{return_instruction}"
+
+        prompt = f"""
+You are an expert analyst specializing in healthcare professional reputation analysis. Please perform a comprehensive analysis of each of the {len(extractions)} Google reviews below. Each review potentially mentions the Registered Massage Therapist (RMT) whose information precedes it.
+
+{chr(10).join(sections)}
+
+{ANALYSIS_INSTRUCTIONS}
+
+{return_instruction}
+"""
+        return prompt.strip()
+
+    @staticmethod
+    def _format_rmt_section(rmt_info: Dict[str, Any]) -> str:
         # Handle missing full_name by constructing it from first_name and last_name
         full_name = rmt_info.get('full_name')
         if not full_name:
@@ -240,18 +863,49 @@ class GeminiReviewAnalyzer:
             full_name = f"{first_name} {last_name}".strip()
             if not full_name:
                 full_name = f"RMT {rmt_info.get('profile_id', 'Unknown')}"
-        
-        prompt = f"""
-You are an expert analyst specializing in healthcare professional reputation analysis. Please perform a comprehensive analysis of this Google review that potentially mentions a Registered Massage Therapist (RMT).
 
-## RMT INFORMATION:
+        return f"""## RMT INFORMATION:
 - Name: {full_name}
 - Common Name: {rmt_info.get('common_name', 'N/A')}
 - Registration Status: {rmt_info.get('registration_status', 'Unknown')}
 - Authorized to Practice: {rmt_info.get('authorized_to_practice', 'Unknown')}
-- Profile ID: {rmt_info.get('profile_id', 'Unknown')}
+- Profile ID: {rmt_info.get('profile_id', 'Unknown')}"""
 
-## BUSINESS CONTEXT:
+    @staticmethod
+    def _format_compact_review_sections(extraction_data: Dict[str, Any]) -> str:
+        """_format_review_sections() without unknown fields, the text length and repeated segments"""
+        review_content = extraction_data['review_content']
+        business_context = extraction_data['business_context']
+        matching_analysis = extraction_data['matching_analysis']
+
+        lines = ["## BUSINESS CONTEXT:", f"- Business Name: {business_context.get('business_name') or 'Unknown'}"]
+        if business_context.get('address'):
+            lines.append(f"- Address: {business_context['address']}")
+        if business_context.get('business_rating'):
+            lines.append(f"- Business Rating: {business_context['business_rating']}/5 "
+                         f"({business_context.get('total_reviews') or 'N/A'} reviews)")
+        if business_context.get('business_types'):
+            lines.append(f"- Business Types: {', '.join(business_context['business_types'])}")
+
+        lines += ["", "## REVIEW CONTENT:",
+                  f"- Full Text: \"{review_content.get('full_text', '')}\"",
+                  f"- Rating Given: {review_content.get('rating', 0)}/5"]
+        if review_content.get('time_description'):
+            lines.append(f"- Time: {review_content['time_description']}")
+
+        segments = list(dict.fromkeys(matching_analysis.get('matched_text_segments', [])))
+        lines += ["", "## MATCHING ANALYSIS:",
+                  f"- Matched Text Segments: {segments}",
+                  f"- Maximum Confidence: {matching_analysis.get('max_confidence', 0)}%"]
+        return "\n".join(lines)
+
+    @staticmethod
+    def _format_review_sections(extraction_data: Dict[str, Any]) -> str:
+        review_content = extraction_data['review_content']
+        business_context = extraction_data['business_context']
+        matching_analysis = extraction_data['matching_analysis']
+
+        return f"""## BUSINESS CONTEXT:
 - Business Name: {business_context.get('business_name', 'Unknown')}
 - Address: {business_context.get('address', 'N/A')}
 - Business Rating: {business_context.get('business_rating', 'N/A')}/5
@@ -268,40 +922,7 @@ You are an expert analyst specializing in healthcare professional reputation ana
 ## MATCHING ANALYSIS:
 - Matched Text Segments: {matching_analysis.get('matched_text_segments', [])}
 - Confidence Scores: {matching_analysis.get('confidence_scores', [])}
-- Maximum Confidence: {matching_analysis.get('max_confidence', 0)}%
-
-## ANALYSIS INSTRUCTIONS:
-
-1. **RMT Mention Analysis**: Carefully determine if this review actually refers to the specific RMT mentioned. Consider:
-   - Are the matched text segments actually referring to a person vs. a business name?
-   - Is there clear evidence this is about the specific RMT vs. someone with a similar name?
-   - What is the context of the mention?
-
-2. **Sentiment Analysis**: Analyze the sentiment specifically toward the healthcare professional, not just the business.
-
-3. **Service Quality Assessment**: Extract specific mentions of:
-   - Technical massage skills
-   - Communication abilities
-   - Professionalism
-   - Treatment effectiveness
-   - Pain relief outcomes
-
-4. **Authenticity Assessment**: Evaluate if the review seems authentic based on:
-   - Language patterns
-   - Specificity of details
-   - Balance of positive/negative points
-   - Length and depth
-
-5. **Business Context**: Understand whether the RMT works alone or as part of a team, and how this affects attribution.
-
-6. **Specialization**: Call out or categorize them as "Pre-natal", "Post-natal", "Sports", "Geriatric", "Rehabilitation", "Pain Management", "Stress Relief", "Relaxation", "Other".
-
-7. **False Positive Detection**: Be especially vigilant about whether this might be a false positive match.
-
-Please provide a thorough, objective analysis following the structured format. Be conservative in your confidence scores and explicit about any uncertainties.
-"""
-        
-        return prompt.strip()
+- Maximum Confidence: {matching_analysis.get('max_confidence', 0)}%"""
     
     def calculate_leaderboard_metrics(self, analyses: List[ComprehensiveRMTAnalysis]) -> List[RMTLeaderboardMetrics]:
         """
@@ -313,126 +934,13 @@ Please provide a thorough, objective analysis following the structured format. B
         Returns:
             List of leaderboard metrics by RMT
         """
-        # Group analyses by RMT
-        rmt_groups = {}
-        for analysis in analyses:
-            # We need to reconstruct the RMT info from the analysis
-            # This would typically come from the original extraction data
-            profile_id = analysis.extraction_id.split('_')[0]  # Extract from ID
-            
-            if profile_id not in rmt_groups:
-                rmt_groups[profile_id] = []
-            rmt_groups[profile_id].append(analysis)
-        
-        leaderboard_metrics = []
-        
-        for profile_id, group_analyses in rmt_groups.items():
-            # Calculate metrics for this RMT
-            total_reviews = len(group_analyses)
-            
-            # Filter high-confidence reviews
-            high_confidence = [a for a in group_analyses if a.rmt_mention_analysis.mention_confidence > 0.8]
-            authentic_reviews = [a for a in group_analyses if a.review_classification.review_authenticity == "authentic"]
-            
-            # Sentiment metrics
-            sentiment_scores = []
-            positive_count = 0
-            negative_count = 0
-            
-            for analysis in group_analyses:
-                sentiment = analysis.sentiment_analysis.overall_sentiment
-                if sentiment in ["very_positive", "positive"]:
-                    positive_count += 1
-                    sentiment_scores.append(1.0 if sentiment == "very_positive" else 0.5)
-                elif sentiment in ["very_negative", "negative"]:
-                    negative_count += 1
-                    sentiment_scores.append(-1.0 if sentiment == "very_negative" else -0.5)
-                else:
-                    sentiment_scores.append(0.0)
-            
-            avg_sentiment = sum(sentiment_scores) / len(sentiment_scores) if sentiment_scores else 0.0
-            
-            # Quality metrics
-            technical_scores = [a.service_quality_metrics.technical_skill_rating for a in group_analyses 
-                             if a.service_quality_metrics.technical_skill_rating is not None]
-            communication_scores = [a.service_quality_metrics.communication_rating for a in group_analyses 
-                                  if a.service_quality_metrics.communication_rating is not None]
-            professionalism_scores = [a.service_quality_metrics.professionalism_rating for a in group_analyses 
-                                    if a.service_quality_metrics.professionalism_rating is not None]
-            
-            # Business metrics
-            recommendations = sum(1 for a in group_analyses if a.review_classification.recommendation_given)
-            repeat_clients = sum(1 for a in group_analyses if a.review_classification.repeat_client_indicated)
-            
-            # Risk indicators
-            false_positives = sum(1 for a in group_analyses if a.potential_false_positive)
-            low_confidence = sum(1 for a in group_analyses if a.rmt_mention_analysis.mention_confidence < 0.6)
-            
-            # Calculate composite score (0-100)
-            composite_score = self._calculate_composite_score(
-                total_reviews, len(high_confidence), len(authentic_reviews),
-                positive_count, negative_count, avg_sentiment,
-                technical_scores, communication_scores, professionalism_scores,
-                recommendations, repeat_clients, false_positives
-            )
-            
-            metrics = RMTLeaderboardMetrics(
-                profile_id=profile_id,
-                rmt_name=f"RMT_{profile_id}",  # Would normally come from original data
-                total_reviews_analyzed=total_reviews,
-                high_confidence_reviews=len(high_confidence),
-                authentic_reviews=len(authentic_reviews),
-                positive_sentiment_count=positive_count,
-                negative_sentiment_count=negative_count,
-                average_sentiment_score=round(avg_sentiment, 3),
-                average_technical_skill=round(sum(technical_scores) / len(technical_scores), 2) if technical_scores else None,
-                average_communication=round(sum(communication_scores) / len(communication_scores), 2) if communication_scores else None,
-                average_professionalism=round(sum(professionalism_scores) / len(professionalism_scores), 2) if professionalism_scores else None,
-                recommendation_rate=round(recommendations / total_reviews, 3) if total_reviews > 0 else 0.0,
-                repeat_client_rate=round(repeat_clients / total_reviews, 3) if total_reviews > 0 else 0.0,
-                potential_false_positives=false_positives,
-                low_confidence_matches=low_confidence,
-                composite_reputation_score=round(composite_score, 2)
-            )
-            
-            leaderboard_metrics.append(metrics)
+        if use_columnar(analyses):
+            return LeaderboardAccumulator.from_frame(leaderboard_columns.analyses_frame(analyses)).leaderboard_metrics()
         
-        # Sort by composite score
-        leaderboard_metrics.sort(key=lambda x: x.composite_reputation_score, reverse=True)
-        
-        return leaderboard_metrics
-    
-    def _calculate_composite_score(self, total_reviews: int, high_confidence: int, authentic: int,
-                                 positive: int, negative: int, avg_sentiment: float,
-                                 technical: List[float], communication: List[float], professionalism: List[float],
-                                 recommendations: int, repeat_clients: int, false_positives: int) -> float:
-        """Calculate a composite reputation score (0-100)"""
-        
-        if total_reviews == 0:
-            return 0.0
-        
-        # Base score from sentiment (0-40 points)
-        sentiment_score = max(0, min(40, (avg_sentiment + 1) * 20))  # Convert -1,1 to 0,40
-        
-        # Quality scores (0-30 points)
-        quality_scores = technical + communication + professionalism
-        quality_score = (sum(quality_scores) / len(quality_scores) - 1) * 7.5 if quality_scores else 15  # Convert 1-5 to 0-30
-        
-        # Volume and confidence bonus (0-20 points)
-        confidence_ratio = high_confidence / total_reviews if total_reviews > 0 else 0
-        volume_bonus = min(10, total_reviews)  # Up to 10 points for volume
-        confidence_bonus = confidence_ratio * 10  # Up to 10 points for confidence
-        
-        # Engagement bonus (0-10 points)
-        recommendation_bonus = (recommendations / total_reviews) * 5 if total_reviews > 0 else 0
-        repeat_client_bonus = (repeat_clients / total_reviews) * 5 if total_reviews > 0 else 0
-        
-        # Penalties
-        false_positive_penalty = min(20, false_positives * 5)  # Up to 20 point penalty
-        
-        composite = sentiment_score + quality_score + volume_bonus + confidence_bonus + recommendation_bonus + repeat_client_bonus - false_positive_penalty
-        
-        return max(0, min(100, composite))
+        accumulator = LeaderboardAccumulator()
+        for analysis in analyses:
+            accumulator.add(analysis)
+        return accumulator.leaderboard_metrics()
     
     def process_extractions(self, extraction_file: str) -> Dict[str, Any]:
         """
@@ -454,21 +962,22 @@ Please provide a thorough, objective analysis following the structured format. B
         
         analyses = []
         
-        # Process each extraction
-        for i, extraction in enumerate(extractions, 1):
-            logger.info(f"Analyzing extraction {i}/{len(extractions)}")
-            
-            analysis = self.analyze_single_review(extraction)
+        # Process extractions concurrently within the rate limit
+        for i, (extraction, analysis) in enumerate(self.iter_analyses(extractions), 1):
+            logger.info(f"Analyzed extraction {i}/{len(extractions)}")
             if analysis:
                 analyses.append(analysis)
-            
-            # Rate limiting
-            time.sleep(self.request_delay)
         
         logger.info(f"Completed analysis of {len(analyses)} reviews")
         
-        # Calculate leaderboard metrics
-        leaderboard_metrics = self.calculate_leaderboard_metrics(analyses)
+        # Calculate leaderboard metrics (large runs: one DataFrame for metrics and summary)
+        if use_columnar(analyses):
+            totals = LeaderboardAccumulator.from_frame(leaderboard_columns.analyses_frame(analyses))
+            leaderboard_metrics = totals.leaderboard_metrics()
+            summary_statistics = totals.summary_stats(leaderboard_metrics)
+        else:
+            leaderboard_metrics = self.calculate_leaderboard_metrics(analyses)
+            summary_statistics = self._generate_summary_stats(analyses, leaderboard_metrics)
         
         # Build final results
         results = {
@@ -482,11 +991,56 @@ Please provide a thorough, objective analysis following the structured format. B
             },
             "individual_analyses": [analysis.dict() for analysis in analyses],
             "leaderboard_metrics": [metrics.dict() for metrics in leaderboard_metrics],
-            "summary_statistics": self._generate_summary_stats(analyses, leaderboard_metrics)
+            "summary_statistics": summary_statistics
         }
         
         return results
     
+    def process_extractions_streaming(self, extraction_file: str, output_file: str) -> Dict[str, Any]:
+        """
+        process_extractions() for dumps too large to hold in memory
+
+        Extractions are read incrementally (see iter_extraction_file), analyses are
+        appended to output_file as JSONL as they complete, and leaderboard metrics come
+        from running aggregates, so memory does not grow with the file size. The results
+        match process_extractions() except that individual analyses are in output_file.
+        """
+        logger.info(f"Streaming extractions from {extraction_file} to {output_file}")
+        
+        accumulator = LeaderboardAccumulator()
+        total = 0
+        
+        def counted(extractions):
+            nonlocal total
+            for extraction in extractions:
+                total += 1
+                yield extraction
+        
+        with open(output_file, 'w', encoding='utf-8') as out:
+            for i, (extraction, analysis) in enumerate(self.iter_analyses(counted(iter_extraction_file(extraction_file))), 1):
+                if i % 100 == 0:
+                    logger.info(f"Analyzed {i} extractions")
+                if analysis:
+                    out.write(analysis.model_dump_json() + "\n")
+                    accumulator.add(analysis)
+        
+        logger.info(f"Completed analysis of {accumulator.analyses} reviews")
+        leaderboard_metrics = accumulator.leaderboard_metrics()
+        
+        return {
+            "analysis_metadata": {
+                "analysis_timestamp": time.strftime("%Y-%m-%d %H:%M:%S UTC"),
+                "model_used": self.model_name,
+                "total_extractions_processed": total,
+                "successful_analyses": accumulator.analyses,
+                "analysis_success_rate": round(accumulator.analyses / total, 3) if total else 0,
+                "original_extraction_metadata": read_extraction_metadata(extraction_file)
+            },
+            "individual_analyses_file": output_file,
+            "leaderboard_metrics": [metrics.dict() for metrics in leaderboard_metrics],
+            "summary_statistics": accumulator.summary_stats(leaderboard_metrics)
+        }
+    
     def _generate_summary_stats(self, analyses: List[ComprehensiveRMTAnalysis], 
                                leaderboard: List[RMTLeaderboardMetrics]) -> Dict[str, Any]:
         """Generate summary statistics from analyses"""
@@ -494,6 +1048,9 @@ Please provide a thorough, objective analysis following the structured format. B
         if not analyses:
             return {}
         
+        if use_columnar(analyses):
+            return LeaderboardAccumulator.from_frame(leaderboard_columns.analyses_frame(analyses)).summary_stats(leaderboard)
+        
         # Overall sentiment distribution
         sentiment_dist = {}
         for analysis in analyses:
@@ -525,22 +1082,352 @@ Please provide a thorough, objective analysis following the structured format. B
             "top_performers": [{"profile_id": rmt.profile_id, "score": rmt.composite_reputation_score} for rmt in top_rmts]
         }
 
+
+class LeaderboardAccumulator:
+    """
+    Running aggregates that reproduce calculate_leaderboard_metrics() and
+    _generate_summary_stats() without keeping the analyses
+
+    Memory is one small record per RMT rather than one object per review.
+    """
+
+    SENTIMENT_SCORES = leaderboard_columns.SENTIMENT_SCORES
+
+    def __init__(self):
+        self.analyses = 0
+        self._groups: Dict[str, Dict[str, float]] = {}
+        self._sentiment_distribution: Dict[str, int] = {}
+        self._confidence = {"high_confidence": 0, "medium_confidence": 0, "low_confidence": 0}
+        self._authenticity = {"authentic": 0, "suspicious": 0, "unclear": 0}
+        self._false_positives = 0
+
+    @classmethod
+    def from_frame(cls, frame) -> 'LeaderboardAccumulator':
+        """Totals for a leaderboard_columns.analyses_frame() computed with group-by reductions"""
+        accumulator = cls()
+        accumulator.analyses = len(frame)
+        accumulator._groups = leaderboard_columns.group_totals(frame)
+        counts = leaderboard_columns.summary_counts(frame)
+        accumulator._sentiment_distribution = counts["sentiment_distribution"]
+        accumulator._confidence = counts["confidence_distribution"]
+        accumulator._authenticity = counts["authenticity_stats"]
+        accumulator._false_positives = counts["potential_false_positives"]
+        return accumulator
+
+    def add(self, analysis: ComprehensiveRMTAnalysis):
+        self.analyses += 1
+        profile_id = analysis.extraction_id.split('_')[0]
+        group = self._groups.get(profile_id)
+        if group is None:
+            group = self._groups[profile_id] = dict.fromkeys((
+                'total', 'high_confidence', 'authentic', 'positive', 'negative', 'sentiment_sum',
+                'technical_sum', 'technical_count', 'communication_sum', 'communication_count',
+                'professionalism_sum', 'professionalism_count', 'recommendations', 'repeat_clients',
+                'false_positives', 'low_confidence'), 0)
+
+        mention_confidence = analysis.rmt_mention_analysis.mention_confidence
+        sentiment = analysis.sentiment_analysis.overall_sentiment
+        authenticity = analysis.review_classification.review_authenticity
+        quality = analysis.service_quality_metrics
+
+        group['total'] += 1
+        group['high_confidence'] += mention_confidence > 0.8
+        group['authentic'] += authenticity == "authentic"
+        group['positive'] += sentiment in ("very_positive", "positive")
+        group['negative'] += sentiment in ("very_negative", "negative")
+        group['sentiment_sum'] += self.SENTIMENT_SCORES.get(sentiment, 0.0)
+        for name, rating in (('technical', quality.technical_skill_rating),
+                             ('communication', quality.communication_rating),
+                             ('professionalism', quality.professionalism_rating)):
+            if rating is not None:
+                group[f'{name}_sum'] += rating
+                group[f'{name}_count'] += 1
+        group['recommendations'] += analysis.review_classification.recommendation_given
+        group['repeat_clients'] += analysis.review_classification.repeat_client_indicated
+        group['false_positives'] += analysis.potential_false_positive
+        group['low_confidence'] += mention_confidence < 0.6
+
+        self._sentiment_distribution[sentiment] = self._sentiment_distribution.get(sentiment, 0) + 1
+        if mention_confidence > 0.8:
+            self._confidence["high_confidence"] += 1
+        elif mention_confidence >= 0.5:
+            self._confidence["medium_confidence"] += 1
+        else:
+            self._confidence["low_confidence"] += 1
+        if authenticity in self._authenticity:
+            self._authenticity[authenticity] += 1
+        self._false_positives += analysis.potential_false_positive
+
+    def leaderboard_metrics(self) -> List[RMTLeaderboardMetrics]:
+        leaderboard_metrics = []
+        # Composite scores come from the shared leaderboard engine (smoothed toward this batch's means)
+        scored = leaderboard_engine.score_groups(self._groups)
+        for profile_id, group in self._groups.items():
+            total = group['total']
+            avg_sentiment = group['sentiment_sum'] / total
+            composite_score = scored[profile_id]['scores']['composite']
+
+            def average(name):
+                count = group[f'{name}_count']
+                return round(group[f'{name}_sum'] / count, 2) if count else None
+
+            leaderboard_metrics.append(RMTLeaderboardMetrics(
+                profile_id=profile_id,
+                rmt_name=f"RMT_{profile_id}",
+                total_reviews_analyzed=total,
+                high_confidence_reviews=group['high_confidence'],
+                authentic_reviews=group['authentic'],
+                positive_sentiment_count=group['positive'],
+                negative_sentiment_count=group['negative'],
+                average_sentiment_score=round(avg_sentiment, 3),
+                average_technical_skill=average('technical'),
+                average_communication=average('communication'),
+                average_professionalism=average('professionalism'),
+                recommendation_rate=round(group['recommendations'] / total, 3),
+                repeat_client_rate=round(group['repeat_clients'] / total, 3),
+                potential_false_positives=group['false_positives'],
+                low_confidence_matches=group['low_confidence'],
+                composite_reputation_score=round(composite_score, 2)
+            ))
+
+        leaderboard_metrics.sort(key=lambda x: x.composite_reputation_score, reverse=True)
+        return leaderboard_metrics
+
+    def summary_stats(self, leaderboard: List[RMTLeaderboardMetrics]) -> Dict[str, Any]:
+        if not self.analyses:
+            return {}
+        return {
+            "total_rmts_analyzed": len(leaderboard),
+            "sentiment_distribution": dict(self._sentiment_distribution),
+            "confidence_distribution": dict(self._confidence),
+            "authenticity_stats": dict(self._authenticity),
+            "potential_false_positives": self._false_positives,
+            "top_performers": [{"profile_id": rmt.profile_id, "score": rmt.composite_reputation_score}
+                               for rmt in leaderboard[:5]]
+        }
+
+
+def use_columnar(analyses: List[ComprehensiveRMTAnalysis]) -> bool:
+    """Large analysis lists are aggregated with pandas when it is installed"""
+    return len(analyses) >= COLUMNAR_MIN_ANALYSES and leaderboard_columns.available()
+
+
+def _is_jsonl(path: str) -> bool:
+    return path.endswith(('.jsonl', '.ndjson'))
+
+
+def iter_extraction_file(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Yield extractions from an extractor dump without loading it whole
+
+    JSONL files hold one extraction per line (a line with only a "metadata" key is
+    skipped). JSON files ({"metadata": ..., "extractions": [...]}) are streamed with
+    ijson when it is installed; otherwise they are loaded in full.
+    """
+    if _is_jsonl(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                if 'extraction_id' in record:
+                    yield record
+        return
+
+    if ijson is None:
+        logger.warning("ijson is not installed; loading the whole extraction file (pip install ijson to stream it)")
+        with open(path, 'r', encoding='utf-8') as f:
+            yield from json.load(f).get('extractions', [])
+        return
+
+    with open(path, 'rb') as f:
+        # use_float keeps numbers as floats/ints instead of Decimal
+        yield from ijson.items(f, 'extractions.item', use_float=True)
+
+
+def read_extraction_metadata(path: str) -> Dict[str, Any]:
+    """The dump's metadata object (read from the start of the file only when streaming)"""
+    with open(path, 'r' if _is_jsonl(path) or ijson is None else 'rb') as f:
+        if _is_jsonl(path):
+            first = f.readline().strip()
+            record = json.loads(first) if first else {}
+            return record.get('metadata', {}) if 'extraction_id' not in record else {}
+        if ijson is None:
+            return json.load(f).get('metadata', {})
+        return next(ijson.items(f, 'metadata', use_float=True), {})
+
+
+class AsyncGeminiReviewAnalyzer(GeminiReviewAnalyzer):
+    """
+    GeminiReviewAnalyzer on the async genai client (client.aio)
+
+    analyze_many() accepts a plain or async iterable of extractions and streams
+    (extraction, analysis) pairs back through an async iterator as requests complete,
+    so a producer (e.g. review extraction running in threads) and the Gemini calls can
+    share one event loop. A semaphore bounds requests in flight; the shared
+    AdaptiveRateLimiter still enforces the RPM/TPM budget and 429 backoff.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._in_flight = 0
+        self._slots: Optional[asyncio.Condition] = None
+        self._slots_loop = None
+
+    def _slot_condition(self) -> asyncio.Condition:
+        """Condition guarding _in_flight (one per event loop, as asyncio primitives are loop-bound)"""
+        loop = asyncio.get_running_loop()
+        if self._slots_loop is not loop:
+            self._slots = asyncio.Condition()
+            self._slots_loop = loop
+        return self._slots
+
+    async def _wake_slot_waiters(self):
+        """Let requests waiting for a slot re-check _in_flight against the current concurrency"""
+        slots = self._slot_condition()
+        async with slots:
+            slots.notify_all()
+
+    async def analyze_single_review_async(self, extraction_data: Dict[str, Any]) -> Optional[ComprehensiveRMTAnalysis]:
+        """Async analyze_single_review(); returns None if the analysis failed"""
+        try:
+            skipped = self._triage_skip(extraction_data)
+            if skipped:
+                return skipped
+
+            # Cache lookups hit the database, so keep them off the event loop
+            cached = await asyncio.to_thread(self._cache_lookup, extraction_data)
+            if cached:
+                return cached
+
+            prompt = self._build_analysis_prompt(extraction_data)
+
+            response = await self._generate_with_rate_limit_async(prompt)
+            self._record_token_usage(response, prompt, [extraction_data.get('extraction_id', '')])
+            analysis = ComprehensiveRMTAnalysis(**json.loads(response.text))
+            analysis.extraction_id = extraction_data.get('extraction_id', analysis.extraction_id)
+            await asyncio.to_thread(self._cache_store, extraction_data, analysis)
+
+            logger.info(f"Analyzed review for {extraction_data['rmt_information'].get('full_name', extraction_data['rmt_information'].get('profile_id', 'Unknown'))}")
+            return analysis
+
+        except Exception as e:
+            logger.error(f"Failed to analyze review {extraction_data.get('extraction_id', 'unknown')}: {e}")
+            return None
+
+    async def _generate_with_rate_limit_async(self, prompt: str):
+        """Async _generate_with_rate_limit()"""
+        estimated_tokens = estimate_tokens(prompt + (self.system_instruction or '')) + self.analysis_config.max_output_tokens
+
+        for attempt in range(self.max_rate_limit_retries + 1):
+            ticket = await self.rate_limiter.acquire_async(estimated_tokens)
+            try:
+                response = await self.client.aio.models.generate_content(
+                    model=self.model_name,
+                    contents=prompt,
+                    config=self.analysis_config
+                )
+            except Exception as e:
+                if not _is_rate_limit_error(e) or attempt == self.max_rate_limit_retries:
+                    raise
+                pause = self.rate_limiter.on_rate_limited(ticket)
+                logger.warning(f"Rate limited by Gemini, backing off {pause:.0f}s "
+                               f"(concurrency now {self.rate_limiter.concurrency})")
+                continue
+
+            usage = getattr(response, 'usage_metadata', None)
+            self.rate_limiter.record_usage(ticket, getattr(usage, 'total_token_count', None))
+            self.rate_limiter.on_success()
+            # on_success() may have raised the concurrency
+            await self._wake_slot_waiters()
+            return response
+
+    async def analyze_many(self, extractions: Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]]
+                           ) -> AsyncIterator[Tuple[Dict[str, Any], Optional[ComprehensiveRMTAnalysis]]]:
+        """
+        Analyze extractions concurrently, yielding (extraction, analysis) in completion order
+
+        Extractions are pulled from the source only when a request slot is free, so a
+        slow or unbounded async producer is consumed with backpressure.
+        """
+        semaphore = asyncio.Semaphore(self.rate_limiter.max_concurrency)
+        slots = self._slot_condition()
+        results: asyncio.Queue = asyncio.Queue()
+        finished = object()
+
+        async def run_one(extraction):
+            try:
+                # Honour AIMD shrinking of the concurrency after 429s; waiters are woken when a
+                # request finishes or on_success() raises the concurrency
+                async with slots:
+                    await slots.wait_for(lambda: self._in_flight < self.rate_limiter.concurrency)
+                    self._in_flight += 1
+                try:
+                    analysis = await self.analyze_single_review_async(extraction)
+                finally:
+                    async with slots:
+                        self._in_flight -= 1
+                        slots.notify_all()
+                await results.put((extraction, analysis))
+            finally:
+                semaphore.release()
+
+        async def feed():
+            tasks = set()  # Only unfinished tasks, so a long stream does not pile them up
+            try:
+                async for extraction in _as_async_iterable(extractions):
+                    await semaphore.acquire()
+                    task = asyncio.create_task(run_one(extraction))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                await asyncio.gather(*tasks)
+            finally:
+                await results.put(finished)
+
+        feeder = asyncio.create_task(feed())
+        try:
+            while True:
+                item = await results.get()
+                if item is finished:
+                    break
+                yield item
+            await feeder  # Re-raise a failure in the extraction source
+        finally:
+            if not feeder.done():
+                feeder.cancel()
+
+
+async def _as_async_iterable(items: Union[Iterable[Any], AsyncIterable[Any]]) -> AsyncIterator[Any]:
+    if hasattr(items, '__aiter__'):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
 def main():
     """Main execution function"""
-    if len(sys.argv) != 2:
-        print("Usage: python gemini_review_analyzer.py <extraction_file.json>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description='Analyze extracted RMT reviews with Gemini')
+    parser.add_argument('extraction_file', help='Extractor output (.json, or .jsonl with one extraction per line)')
+    parser.add_argument('--stream', metavar='ANALYSES_JSONL',
+                        help='Stream the input and write analyses to this JSONL file as they complete')
+    args = parser.parse_args()
     
     # Configuration
     GEMINI_API_KEY = "YOUR_GEMINI_API_KEY_HERE"  # Replace with your actual API key
-    extraction_file = sys.argv[1]
+    extraction_file = args.extraction_file
     
     # Initialize the analyzer
     analyzer = GeminiReviewAnalyzer(api_key=GEMINI_API_KEY)
     
     try:
         # Process extractions
-        results = analyzer.process_extractions(extraction_file)
+        if args.stream:
+            results = analyzer.process_extractions_streaming(extraction_file, args.stream)
+        else:
+            results = analyzer.process_extractions(extraction_file)
         
         # Save results
         output_filename = f"rmt_analysis_results_{int(time.time())}.json"
@@ -24,15 +24,33 @@ Usage:
 
     # Force full rebuild
     python incremental_rmt_system.py --mode=rebuild
+
+    # Apply snapshot/run retention and reclaim space
+    python incremental_rmt_system.py --mode=compact --keep-runs=10 --daily-days=90
+
+    # Analyze reviews while extraction is still running (one asyncio event loop)
+    python incremental_rmt_system.py --mode=full --async-pipeline
+
+    # Staged full run: keywords flow concurrently through discovery, place search, review
+    # fetch, matching and persistence stages connected by bounded queues
+    python incremental_rmt_system.py --mode=full --staged-pipeline --stage-workers places=8 reviews=8
+
+    # Incremental run: refresh the stalest RMTs within a Google Places request budget
+    python incremental_rmt_system.py --mode=incremental --api-budget=300
+
+    # Continue a failed or interrupted run from its checkpoints
+    python incremental_rmt_system.py --resume full_1700000000
 """
 
+import asyncio
 import sqlite3
 import json
 import time
 import argparse
 import hashlib
+import threading
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Set, Tuple, Iterable, Iterator, AsyncIterator
 from dataclasses import dataclass, asdict
 import logging
 import os
@@ -40,7 +58,18 @@ import os
 # Import our existing modules
 try:
     from rmt_review_extractor import RMTReviewExtractor, RMTData, ReviewExtraction
-    from gemini_review_analyzer import GeminiReviewAnalyzer, ComprehensiveRMTAnalysis
+    from gemini_review_analyzer import (GeminiReviewAnalyzer, AsyncGeminiReviewAnalyzer, ComprehensiveRMTAnalysis,
+                                        TokenUsage)
+    from blob_codec import ensure_codec_schema, encode_blob, decode_blob
+    from storage_backends import create_backend
+    from analysis_cache import DatabaseAnalysisCache
+    from review_triage import ReviewTriage, TriageConfig
+    from refresh_scheduler import REFRESH_SCHEDULE_SQL, ApiBudget, RefreshConfig, RefreshScheduler
+    from staged_pipeline import DEFAULT_LOG_INTERVAL, DEFAULT_QUEUE_SIZE, Stage, StagedPipeline
+    from leaderboard_engine import (EngineConfig, PERIOD_TABLE, PERIOD_TOTALS, TOTAL_KEYS, load_prior, load_totals,
+                                    score_totals)
+    from leaderboard_cache import cached, invalidate as invalidate_leaderboard_cache
+    from leaderboard_queries import cities_for, normalize_city, primary_city
 except ImportError as e:
     print(f"Error importing modules: {e}")
     print("Please ensure the extractor and analyzer modules are available")
@@ -52,6 +81,269 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# IN (...) lists are split so large profile sets stay under the bound-parameter limit
+PROFILE_ID_CHUNK = 500
+
+# Worker threads per stage of the staged full-run pipeline (--staged-pipeline); analysis
+# consumes the last queue with the analyzer's own pool (--concurrency)
+PIPELINE_STAGE_WORKERS = {
+    'discovery': 2,    # CMTO keyword searches
+    'profiles': 1,     # save_rmt_profile
+    'places': 4,       # Google Places searches per practice location
+    'reviews': 4,      # Place details / reviews
+    'matching': 2,     # Fuzzy name/location matching
+    'persistence': 1,  # save_review_extraction (locks the RMT's profile row, so safe with more workers)
+}
+
+# Columns added to existing tables after their first release, with their definitions
+ADDED_COLUMNS = {
+    'monitoring_runs': [
+        ('cache_hits', 'INTEGER DEFAULT 0'),
+        ('triage_skipped', 'INTEGER DEFAULT 0'),
+        ('prompt_tokens', 'BIGINT DEFAULT 0'),
+        ('output_tokens', 'BIGINT DEFAULT 0'),
+        ('cached_tokens', 'BIGINT DEFAULT 0'),
+    ],
+    'ai_analyses': [
+        ('prompt_tokens', 'INTEGER'),
+        ('output_tokens', 'INTEGER'),
+        ('recommendation_given', 'BOOLEAN'),
+        ('repeat_client_indicated', 'BOOLEAN'),
+    ],
+    'leaderboard_snapshots': [
+        ('city', 'TEXT'),
+    ],
+    'current_leaderboard': [
+        ('city', 'TEXT'),
+    ],
+}
+
+# Indexes on added columns, created once the columns exist
+ADDED_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_current_leaderboard_city_score "
+    "ON current_leaderboard(city, composite_reputation_score DESC)",
+]
+
+# PostgreSQL equivalent of the SQLite schema in RMTMonitoringDatabase.init_database.
+# Foreign keys are left out to match SQLite, which does not enforce them by default.
+POSTGRES_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS monitoring_runs (
+    run_id TEXT PRIMARY KEY,
+    run_type TEXT NOT NULL,
+    started_at TIMESTAMP NOT NULL,
+    completed_at TIMESTAMP,
+    search_keywords TEXT NOT NULL,
+    rmts_processed INTEGER DEFAULT 0,
+    reviews_extracted INTEGER DEFAULT 0,
+    reviews_analyzed INTEGER DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'running',
+    error_message TEXT,
+    cache_hits INTEGER DEFAULT 0,
+    triage_skipped INTEGER DEFAULT 0,
+    prompt_tokens BIGINT DEFAULT 0,
+    output_tokens BIGINT DEFAULT 0,
+    cached_tokens BIGINT DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS rmt_profiles (
+    profile_id TEXT PRIMARY KEY,
+    first_name TEXT,
+    last_name TEXT,
+    common_first_name TEXT,
+    common_last_name TEXT,
+    registration_status TEXT,
+    authorized_to_practice BOOLEAN,
+    practice_locations TEXT,
+    cmto_endpoint TEXT,
+    reviews_data TEXT,
+    reviews_data_codec TEXT DEFAULT 'raw',
+    total_reviews INTEGER DEFAULT 0,
+    last_review_date TEXT,
+    first_seen_run_id TEXT,
+    last_updated_run_id TEXT,
+    last_updated_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS ai_analyses (
+    analysis_id TEXT PRIMARY KEY,
+    profile_id TEXT NOT NULL,
+    analysis_run_id TEXT NOT NULL,
+    review_hash TEXT NOT NULL,
+    sentiment_overall TEXT,
+    sentiment_confidence DOUBLE PRECISION,
+    mention_confidence DOUBLE PRECISION,
+    technical_skill_rating INTEGER,
+    communication_rating INTEGER,
+    professionalism_rating INTEGER,
+    review_authenticity TEXT,
+    potential_false_positive BOOLEAN,
+    overall_analysis_confidence DOUBLE PRECISION,
+    analysis_json TEXT,  -- PostgreSQL compresses large values itself (TOAST), always 'raw'
+    analysis_json_codec TEXT DEFAULT 'raw',
+    analyzed_at TIMESTAMP NOT NULL,
+    gemini_model_used TEXT,
+    prompt_tokens INTEGER,
+    output_tokens INTEGER,
+    recommendation_given BOOLEAN,
+    repeat_client_indicated BOOLEAN
+);
+
+CREATE TABLE IF NOT EXISTS leaderboard_snapshots (
+    snapshot_id TEXT PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    profile_id TEXT NOT NULL,
+    rmt_name TEXT NOT NULL,
+    total_reviews_analyzed INTEGER,
+    positive_sentiment_count INTEGER,
+    negative_sentiment_count INTEGER,
+    average_sentiment_score DOUBLE PRECISION,
+    composite_reputation_score DOUBLE PRECISION,
+    recommendation_rate DOUBLE PRECISION,
+    repeat_client_rate DOUBLE PRECISION,
+    potential_false_positives INTEGER,
+    snapshot_at TIMESTAMP NOT NULL,
+    city TEXT
+);
+
+CREATE TABLE IF NOT EXISTS rmt_aggregates (
+    profile_id TEXT PRIMARY KEY,
+    total_reviews INTEGER NOT NULL DEFAULT 0,
+    positive_count INTEGER NOT NULL DEFAULT 0,
+    negative_count INTEGER NOT NULL DEFAULT 0,
+    sentiment_confidence_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    sentiment_confidence_count INTEGER NOT NULL DEFAULT 0,
+    analysis_confidence_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    analysis_confidence_count INTEGER NOT NULL DEFAULT 0,
+    false_positives INTEGER NOT NULL DEFAULT 0,
+    technical_skill_sum INTEGER NOT NULL DEFAULT 0,
+    technical_skill_count INTEGER NOT NULL DEFAULT 0,
+    communication_sum INTEGER NOT NULL DEFAULT 0,
+    communication_count INTEGER NOT NULL DEFAULT 0,
+    professionalism_sum INTEGER NOT NULL DEFAULT 0,
+    professionalism_count INTEGER NOT NULL DEFAULT 0,
+    dirty INTEGER NOT NULL DEFAULT 1,
+    updated_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS current_leaderboard (
+    profile_id TEXT PRIMARY KEY,
+    snapshot_id TEXT NOT NULL,
+    run_id TEXT NOT NULL,
+    composite_reputation_score DOUBLE PRECISION,
+    snapshot_at TIMESTAMP NOT NULL,
+    city TEXT
+);
+
+CREATE TABLE IF NOT EXISTS monitoring_run_progress (
+    run_id TEXT NOT NULL,
+    item_type TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    payload TEXT,
+    completed_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (run_id, item_type, item_id)
+);
+
+-- Same running-aggregate maintenance as the SQLite triggers; sign is +1 on insert, -1 on delete
+CREATE OR REPLACE FUNCTION apply_rmt_aggregate(r ai_analyses, sign INTEGER) RETURNS VOID AS $$
+BEGIN
+    INSERT INTO rmt_aggregates (profile_id) VALUES (r.profile_id) ON CONFLICT DO NOTHING;
+    UPDATE rmt_aggregates SET
+        total_reviews = total_reviews + sign,
+        positive_count = positive_count + sign * (CASE WHEN r.sentiment_overall IN ('positive', 'very_positive') THEN 1 ELSE 0 END),
+        negative_count = negative_count + sign * (CASE WHEN r.sentiment_overall IN ('negative', 'very_negative') THEN 1 ELSE 0 END),
+        sentiment_confidence_sum = sentiment_confidence_sum + sign * COALESCE(r.sentiment_confidence, 0),
+        sentiment_confidence_count = sentiment_confidence_count + sign * (CASE WHEN r.sentiment_confidence IS NOT NULL THEN 1 ELSE 0 END),
+        analysis_confidence_sum = analysis_confidence_sum + sign * COALESCE(r.overall_analysis_confidence, 0),
+        analysis_confidence_count = analysis_confidence_count + sign * (CASE WHEN r.overall_analysis_confidence IS NOT NULL THEN 1 ELSE 0 END),
+        false_positives = false_positives + sign * (CASE WHEN r.potential_false_positive THEN 1 ELSE 0 END),
+        technical_skill_sum = technical_skill_sum + sign * COALESCE(r.technical_skill_rating, 0),
+        technical_skill_count = technical_skill_count + sign * (CASE WHEN r.technical_skill_rating IS NOT NULL THEN 1 ELSE 0 END),
+        communication_sum = communication_sum + sign * COALESCE(r.communication_rating, 0),
+        communication_count = communication_count + sign * (CASE WHEN r.communication_rating IS NOT NULL THEN 1 ELSE 0 END),
+        professionalism_sum = professionalism_sum + sign * COALESCE(r.professionalism_rating, 0),
+        professionalism_count = professionalism_count + sign * (CASE WHEN r.professionalism_rating IS NOT NULL THEN 1 ELSE 0 END),
+        dirty = 1,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE profile_id = r.profile_id;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION trg_ai_analyses_aggregate() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM apply_rmt_aggregate(NEW, 1);
+        PERFORM apply_rmt_aggregate_period(NEW, 1);
+    ELSE
+        PERFORM apply_rmt_aggregate(OLD, -1);
+        PERFORM apply_rmt_aggregate_period(OLD, -1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_ai_analyses_aggregate ON ai_analyses;
+CREATE TRIGGER trg_ai_analyses_aggregate
+AFTER INSERT OR DELETE ON ai_analyses
+FOR EACH ROW EXECUTE FUNCTION trg_ai_analyses_aggregate();
+
+CREATE INDEX IF NOT EXISTS idx_ai_analyses_profile_id ON ai_analyses(profile_id);
+CREATE INDEX IF NOT EXISTS idx_ai_analyses_review_hash ON ai_analyses(review_hash);
+CREATE INDEX IF NOT EXISTS idx_leaderboard_snapshots_run_id ON leaderboard_snapshots(run_id);
+CREATE INDEX IF NOT EXISTS idx_rmt_aggregates_dirty ON rmt_aggregates(dirty);
+CREATE INDEX IF NOT EXISTS idx_ai_analyses_run_id ON ai_analyses(analysis_run_id);
+CREATE INDEX IF NOT EXISTS idx_leaderboard_snapshots_profile_at ON leaderboard_snapshots(profile_id, snapshot_at);
+CREATE INDEX IF NOT EXISTS idx_current_leaderboard_score ON current_leaderboard(composite_reputation_score DESC);
+"""
+
+
+def period_aggregate_schema_sql(dialect: str) -> str:
+    """
+    rmt_aggregate_periods and the ai_analyses triggers that keep it current
+
+    One row of leaderboard_engine totals per RMT and month of analyzed_at, so the
+    leaderboard engine can apply time decay without reading ai_analyses.
+    """
+    sums = {key: 'REAL' if key == 'sentiment_sum' else 'INTEGER' for key in TOTAL_KEYS}
+    if dialect == 'postgres':
+        sums['sentiment_sum'] = 'DOUBLE PRECISION'
+    columns = ''.join(f"    {key} {kind} NOT NULL DEFAULT 0,\n" for key, kind in sums.items())
+    table = (f"CREATE TABLE IF NOT EXISTS {PERIOD_TABLE} (\n    profile_id TEXT NOT NULL,\n"
+             f"    period TEXT NOT NULL,  -- YYYY-MM of analyzed_at\n{columns}"
+             f"    PRIMARY KEY (profile_id, period)\n);\n")
+
+    def updates(row: str, sign: str) -> str:
+        return ',\n'.join(f"        {key} = {key} {sign} ({PERIOD_TOTALS[key].format(r=row)})" for key in TOTAL_KEYS)
+
+    if dialect == 'postgres':
+        period = "to_char(r.analyzed_at, 'YYYY-MM')"
+        return table + f"""
+CREATE OR REPLACE FUNCTION apply_rmt_aggregate_period(r ai_analyses, sign INTEGER) RETURNS VOID AS $$
+BEGIN
+    INSERT INTO {PERIOD_TABLE} (profile_id, period) VALUES (r.profile_id, {period}) ON CONFLICT DO NOTHING;
+    UPDATE {PERIOD_TABLE} SET
+{updates('r.', '+ sign *')}
+    WHERE profile_id = r.profile_id AND period = {period};
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+    triggers = []
+    for event, row, sign in (('insert', 'NEW', '+'), ('delete', 'OLD', '-')):
+        period = f"strftime('%Y-%m', {row}.analyzed_at)"
+        insert = (f"    INSERT OR IGNORE INTO {PERIOD_TABLE} (profile_id, period) VALUES ({row}.profile_id, {period});\n"
+                  if event == 'insert' else '')
+        triggers.append(f"""
+CREATE TRIGGER IF NOT EXISTS trg_ai_analyses_period_{event}
+AFTER {event.upper()} ON ai_analyses
+BEGIN
+{insert}    UPDATE {PERIOD_TABLE} SET
+{updates(row + '.', sign)}
+    WHERE profile_id = {row}.profile_id AND period = {period};
+END;
+""")
+    return table + ''.join(triggers)
+
+
 @dataclass
 class MonitoringRun:
     """Track monitoring run metadata"""
@@ -67,15 +359,26 @@ class MonitoringRun:
     error_message: Optional[str] = None
 
 class RMTMonitoringDatabase:
-    """SQLite database for tracking RMT monitoring data"""
+    """Database for tracking RMT monitoring data (SQLite file or PostgreSQL URL)"""
     
     def __init__(self, db_path: str = "rmt_monitoring.db"):
         self.db_path = db_path
+        self.backend = create_backend(db_path)
         self.init_database()
     
     def init_database(self):
         """Initialize the database schema"""
-        with sqlite3.connect(self.db_path) as conn:
+        if self.backend.dialect == 'postgres':
+            with self.backend.connect() as conn:
+                self.backend.executescript(conn, POSTGRES_SCHEMA_SQL)
+                self.backend.executescript(conn, period_aggregate_schema_sql('postgres'))
+                self.backend.executescript(conn, REFRESH_SCHEDULE_SQL)
+                self._add_missing_columns(conn)
+                self._backfill_derived_tables(conn)
+            logger.info("Database initialized: PostgreSQL")
+            return
+
+        with self.backend.connect() as conn:
             conn.executescript("""
                 -- Monitoring runs table
                 CREATE TABLE IF NOT EXISTS monitoring_runs (
@@ -88,7 +391,12 @@ class RMTMonitoringDatabase:
                     reviews_extracted INTEGER DEFAULT 0,
                     reviews_analyzed INTEGER DEFAULT 0,
                     status TEXT NOT NULL DEFAULT 'running',
-                    error_message TEXT
+                    error_message TEXT,
+                    cache_hits INTEGER DEFAULT 0,  -- analyses served from analysis_cache
+                    triage_skipped INTEGER DEFAULT 0,  -- reviews given a rule-based analysis by review_triage
+                    prompt_tokens INTEGER DEFAULT 0,  -- Gemini token usage of the run's analyses
+                    output_tokens INTEGER DEFAULT 0,
+                    cached_tokens INTEGER DEFAULT 0
                 );
 
                 -- RMT profiles table with embedded reviews
@@ -103,6 +411,7 @@ class RMTMonitoringDatabase:
                     practice_locations TEXT,  -- JSON
                     cmto_endpoint TEXT,
                     reviews_data TEXT,  -- JSON array of all reviews with timestamps
+                    reviews_data_codec TEXT DEFAULT 'raw',  -- See blob_codec.py
                     total_reviews INTEGER DEFAULT 0,
                     last_review_date TEXT,
                     first_seen_run_id TEXT,
@@ -128,8 +437,13 @@ class RMTMonitoringDatabase:
                     potential_false_positive BOOLEAN,
                     overall_analysis_confidence REAL,
                     analysis_json TEXT,  -- Full analysis JSON
+                    analysis_json_codec TEXT DEFAULT 'raw',  -- See blob_codec.py
                     analyzed_at TIMESTAMP NOT NULL,
                     gemini_model_used TEXT,
+                    prompt_tokens INTEGER,  -- This review's share of its Gemini call (NULL if no call)
+                    output_tokens INTEGER,
+                    recommendation_given BOOLEAN,
+                    repeat_client_indicated BOOLEAN,
                     FOREIGN KEY (profile_id) REFERENCES rmt_profiles(profile_id),
                     FOREIGN KEY (analysis_run_id) REFERENCES monitoring_runs(run_id)
                 );
@@ -149,22 +463,244 @@ class RMTMonitoringDatabase:
                     repeat_client_rate REAL,
                     potential_false_positives INTEGER,
                     snapshot_at TIMESTAMP NOT NULL,
+                    city TEXT,  -- Primary practice city at snapshot time
                     FOREIGN KEY (run_id) REFERENCES monitoring_runs(run_id),
                     FOREIGN KEY (profile_id) REFERENCES rmt_profiles(profile_id)
                 );
 
+                -- Running per-RMT aggregates over ai_analyses (maintained by triggers)
+                CREATE TABLE IF NOT EXISTS rmt_aggregates (
+                    profile_id TEXT PRIMARY KEY,
+                    total_reviews INTEGER NOT NULL DEFAULT 0,
+                    positive_count INTEGER NOT NULL DEFAULT 0,
+                    negative_count INTEGER NOT NULL DEFAULT 0,
+                    sentiment_confidence_sum REAL NOT NULL DEFAULT 0,
+                    sentiment_confidence_count INTEGER NOT NULL DEFAULT 0,
+                    analysis_confidence_sum REAL NOT NULL DEFAULT 0,
+                    analysis_confidence_count INTEGER NOT NULL DEFAULT 0,
+                    false_positives INTEGER NOT NULL DEFAULT 0,
+                    technical_skill_sum INTEGER NOT NULL DEFAULT 0,
+                    technical_skill_count INTEGER NOT NULL DEFAULT 0,
+                    communication_sum INTEGER NOT NULL DEFAULT 0,
+                    communication_count INTEGER NOT NULL DEFAULT 0,
+                    professionalism_sum INTEGER NOT NULL DEFAULT 0,
+                    professionalism_count INTEGER NOT NULL DEFAULT 0,
+                    dirty INTEGER NOT NULL DEFAULT 1,  -- Changed since the last leaderboard snapshot
+                    updated_at TIMESTAMP,
+                    FOREIGN KEY (profile_id) REFERENCES rmt_profiles(profile_id)
+                );
+
+                CREATE TRIGGER IF NOT EXISTS trg_ai_analyses_aggregate_insert
+                AFTER INSERT ON ai_analyses
+                BEGIN
+                    INSERT OR IGNORE INTO rmt_aggregates (profile_id) VALUES (NEW.profile_id);
+                    UPDATE rmt_aggregates SET
+                        total_reviews = total_reviews + 1,
+                        positive_count = positive_count + (CASE WHEN NEW.sentiment_overall IN ('positive', 'very_positive') THEN 1 ELSE 0 END),
+                        negative_count = negative_count + (CASE WHEN NEW.sentiment_overall IN ('negative', 'very_negative') THEN 1 ELSE 0 END),
+                        sentiment_confidence_sum = sentiment_confidence_sum + COALESCE(NEW.sentiment_confidence, 0),
+                        sentiment_confidence_count = sentiment_confidence_count + (NEW.sentiment_confidence IS NOT NULL),
+                        analysis_confidence_sum = analysis_confidence_sum + COALESCE(NEW.overall_analysis_confidence, 0),
+                        analysis_confidence_count = analysis_confidence_count + (NEW.overall_analysis_confidence IS NOT NULL),
+                        false_positives = false_positives + (CASE WHEN NEW.potential_false_positive = 1 THEN 1 ELSE 0 END),
+                        technical_skill_sum = technical_skill_sum + COALESCE(NEW.technical_skill_rating, 0),
+                        technical_skill_count = technical_skill_count + (NEW.technical_skill_rating IS NOT NULL),
+                        communication_sum = communication_sum + COALESCE(NEW.communication_rating, 0),
+                        communication_count = communication_count + (NEW.communication_rating IS NOT NULL),
+                        professionalism_sum = professionalism_sum + COALESCE(NEW.professionalism_rating, 0),
+                        professionalism_count = professionalism_count + (NEW.professionalism_rating IS NOT NULL),
+                        dirty = 1,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE profile_id = NEW.profile_id;
+                END;
+
+                CREATE TRIGGER IF NOT EXISTS trg_ai_analyses_aggregate_delete
+                AFTER DELETE ON ai_analyses
+                BEGIN
+                    UPDATE rmt_aggregates SET
+                        total_reviews = total_reviews - 1,
+                        positive_count = positive_count - (CASE WHEN OLD.sentiment_overall IN ('positive', 'very_positive') THEN 1 ELSE 0 END),
+                        negative_count = negative_count - (CASE WHEN OLD.sentiment_overall IN ('negative', 'very_negative') THEN 1 ELSE 0 END),
+                        sentiment_confidence_sum = sentiment_confidence_sum - COALESCE(OLD.sentiment_confidence, 0),
+                        sentiment_confidence_count = sentiment_confidence_count - (OLD.sentiment_confidence IS NOT NULL),
+                        analysis_confidence_sum = analysis_confidence_sum - COALESCE(OLD.overall_analysis_confidence, 0),
+                        analysis_confidence_count = analysis_confidence_count - (OLD.overall_analysis_confidence IS NOT NULL),
+                        false_positives = false_positives - (CASE WHEN OLD.potential_false_positive = 1 THEN 1 ELSE 0 END),
+                        technical_skill_sum = technical_skill_sum - COALESCE(OLD.technical_skill_rating, 0),
+                        technical_skill_count = technical_skill_count - (OLD.technical_skill_rating IS NOT NULL),
+                        communication_sum = communication_sum - COALESCE(OLD.communication_rating, 0),
+                        communication_count = communication_count - (OLD.communication_rating IS NOT NULL),
+                        professionalism_sum = professionalism_sum - COALESCE(OLD.professionalism_rating, 0),
+                        professionalism_count = professionalism_count - (OLD.professionalism_rating IS NOT NULL),
+                        dirty = 1,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE profile_id = OLD.profile_id;
+                END;
+
                 -- Create indexes for performance
                 CREATE INDEX IF NOT EXISTS idx_ai_analyses_profile_id ON ai_analyses(profile_id);
                 CREATE INDEX IF NOT EXISTS idx_ai_analyses_review_hash ON ai_analyses(review_hash);
                 CREATE INDEX IF NOT EXISTS idx_leaderboard_snapshots_run_id ON leaderboard_snapshots(run_id);
+                -- Pointer to each RMT's newest snapshot (maintained on every snapshot write)
+                CREATE TABLE IF NOT EXISTS current_leaderboard (
+                    profile_id TEXT PRIMARY KEY,
+                    snapshot_id TEXT NOT NULL,
+                    run_id TEXT NOT NULL,
+                    composite_reputation_score REAL,
+                    snapshot_at TIMESTAMP NOT NULL,
+                    city TEXT,
+                    FOREIGN KEY (snapshot_id) REFERENCES leaderboard_snapshots(snapshot_id),
+                    FOREIGN KEY (profile_id) REFERENCES rmt_profiles(profile_id)
+                );
+
+                CREATE INDEX IF NOT EXISTS idx_rmt_aggregates_dirty ON rmt_aggregates(dirty);
+                CREATE INDEX IF NOT EXISTS idx_ai_analyses_run_id ON ai_analyses(analysis_run_id);
+                CREATE INDEX IF NOT EXISTS idx_leaderboard_snapshots_profile_at ON leaderboard_snapshots(profile_id, snapshot_at);
+                CREATE INDEX IF NOT EXISTS idx_current_leaderboard_score ON current_leaderboard(composite_reputation_score DESC);
+
+                -- Checkpoints of unfinished runs, deleted when the run completes:
+                -- 'keyword' (payload: JSON list of the RMTData its search returned),
+                -- 'profile' (reviews extracted and saved), 'analysis' (extraction_id analyzed and saved)
+                CREATE TABLE IF NOT EXISTS monitoring_run_progress (
+                    run_id TEXT NOT NULL,
+                    item_type TEXT NOT NULL,
+                    item_id TEXT NOT NULL,
+                    payload TEXT,
+                    completed_at TIMESTAMP NOT NULL,
+                    PRIMARY KEY (run_id, item_type, item_id)
+                );
             """)
+
+            # Monthly totals for the leaderboard engine
+            conn.executescript(period_aggregate_schema_sql('sqlite'))
+            # Staleness schedule of incremental runs
+            conn.executescript(REFRESH_SCHEDULE_SQL)
+
+            # Codec marker columns for databases created before blob compression
+            ensure_codec_schema(conn)
+
+            self._add_missing_columns(conn)
+            self._backfill_derived_tables(conn)
         logger.info(f"Database initialized: {self.db_path}")
+
+    def _add_missing_columns(self, conn):
+        """Columns added to existing tables after their first release"""
+        for table, added in ADDED_COLUMNS.items():
+            columns = self.backend.table_columns(conn, table)
+            for column, definition in added:
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+                    if (table, column) == ('current_leaderboard', 'city'):
+                        self._backfill_leaderboard_cities(conn)
+        for index_sql in ADDED_INDEXES:
+            conn.execute(index_sql)
+
+    def _backfill_leaderboard_cities(self, conn):
+        """Set current_leaderboard.city for pointers written before the column existed"""
+        profile_ids = [row['profile_id'] for row in conn.execute("SELECT profile_id FROM current_leaderboard").fetchall()]
+        for profile_id, city in cities_for(conn, profile_ids).items():
+            if city:
+                conn.execute("UPDATE current_leaderboard SET city = ? WHERE profile_id = ?", (city, profile_id))
+
+    def _backfill_derived_tables(self, conn):
+        """Seed rmt_aggregates, rmt_aggregate_periods and current_leaderboard for databases created before they existed"""
+        aggregates_empty = conn.execute("SELECT COUNT(*) FROM rmt_aggregates").fetchone()[0] == 0
+        has_analyses = conn.execute("SELECT 1 FROM ai_analyses LIMIT 1").fetchone() is not None
+        if aggregates_empty and has_analyses:
+            self._rebuild_rmt_aggregates(conn)
+
+        periods_empty = conn.execute(f"SELECT 1 FROM {PERIOD_TABLE} LIMIT 1").fetchone() is None
+        if periods_empty and has_analyses:
+            self._backfill_engagement_columns(conn)
+            self._rebuild_rmt_aggregate_periods(conn)
+
+        pointers_empty = conn.execute("SELECT COUNT(*) FROM current_leaderboard").fetchone()[0] == 0
+        has_snapshots = conn.execute("SELECT 1 FROM leaderboard_snapshots LIMIT 1").fetchone() is not None
+        if pointers_empty and has_snapshots:
+            latest = conn.execute("""
+                SELECT profile_id, snapshot_id, run_id, composite_reputation_score, snapshot_at, city
+                FROM leaderboard_snapshots
+                ORDER BY snapshot_at
+            """).fetchall()
+            for row in latest:
+                self.backend.upsert(conn, 'current_leaderboard', ('profile_id',), dict(zip(row.keys(), row)))
+
+    def rebuild_rmt_aggregates(self):
+        """Recompute rmt_aggregates and rmt_aggregate_periods from scratch (repair tool, marks every RMT dirty)"""
+        with self.backend.connect() as conn:
+            self._rebuild_rmt_aggregates(conn)
+            self._backfill_engagement_columns(conn)
+            self._rebuild_rmt_aggregate_periods(conn)
+
+    def _backfill_engagement_columns(self, conn):
+        """Fill recommendation_given/repeat_client_indicated from analysis_json for rows saved before they existed"""
+        rows = conn.execute("""
+            SELECT analysis_id, analysis_json, analysis_json_codec FROM ai_analyses
+            WHERE recommendation_given IS NULL OR repeat_client_indicated IS NULL
+        """).fetchall()
+        for row in rows:
+            try:
+                classification = json.loads(
+                    decode_blob(conn, row['analysis_json'], row['analysis_json_codec'])
+                ).get('review_classification') or {}
+            except (TypeError, ValueError, AttributeError):
+                continue
+            conn.execute(
+                "UPDATE ai_analyses SET recommendation_given = ?, repeat_client_indicated = ? WHERE analysis_id = ?",
+                (bool(classification.get('recommendation_given')),
+                 bool(classification.get('repeat_client_indicated')), row['analysis_id'])
+            )
+        if rows:
+            logger.info(f"Backfilled recommendation/repeat-client flags for {len(rows)} analyses")
+
+    def _rebuild_rmt_aggregate_periods(self, conn):
+        """Recompute rmt_aggregate_periods from ai_analyses inside the caller's transaction"""
+        if self.backend.dialect == 'postgres':
+            period = "to_char(analyzed_at, 'YYYY-MM')"
+        else:
+            period = "strftime('%Y-%m', analyzed_at)"
+        conn.execute(f"DELETE FROM {PERIOD_TABLE}")
+        conn.execute(f"""
+            INSERT INTO {PERIOD_TABLE} (profile_id, period, {', '.join(TOTAL_KEYS)})
+            SELECT profile_id, {period}, {', '.join(f"SUM({PERIOD_TOTALS[key].format(r='')})" for key in TOTAL_KEYS)}
+            FROM ai_analyses
+            GROUP BY profile_id, {period}
+        """)
+        logger.info(f"Rebuilt {PERIOD_TABLE} from ai_analyses")
+
+    def _rebuild_rmt_aggregates(self, conn):
+        """Recompute rmt_aggregates from ai_analyses inside the caller's transaction"""
+        conn.execute("DELETE FROM rmt_aggregates")
+        conn.execute("""
+            INSERT INTO rmt_aggregates
+            (profile_id, total_reviews, positive_count, negative_count,
+             sentiment_confidence_sum, sentiment_confidence_count,
+             analysis_confidence_sum, analysis_confidence_count, false_positives,
+             technical_skill_sum, technical_skill_count, communication_sum, communication_count,
+             professionalism_sum, professionalism_count, dirty, updated_at)
+            SELECT
+                profile_id,
+                COUNT(*),
+                SUM(CASE WHEN sentiment_overall IN ('positive', 'very_positive') THEN 1 ELSE 0 END),
+                SUM(CASE WHEN sentiment_overall IN ('negative', 'very_negative') THEN 1 ELSE 0 END),
+                COALESCE(SUM(sentiment_confidence), 0), COUNT(sentiment_confidence),
+                COALESCE(SUM(overall_analysis_confidence), 0), COUNT(overall_analysis_confidence),
+                SUM(CASE WHEN potential_false_positive THEN 1 ELSE 0 END),
+                COALESCE(SUM(technical_skill_rating), 0), COUNT(technical_skill_rating),
+                COALESCE(SUM(communication_rating), 0), COUNT(communication_rating),
+                COALESCE(SUM(professionalism_rating), 0), COUNT(professionalism_rating),
+                1,
+                CURRENT_TIMESTAMP
+            FROM ai_analyses
+            GROUP BY profile_id
+        """)
+        logger.info("Rebuilt rmt_aggregates from ai_analyses")
     
     def start_monitoring_run(self, run_type: str, search_keywords: List[str]) -> str:
         """Start a new monitoring run"""
         run_id = f"{run_type}_{int(time.time())}"
         
-        with sqlite3.connect(self.db_path) as conn:
+        with self.backend.connect() as conn:
             conn.execute("""
                 INSERT INTO monitoring_runs 
                 (run_id, run_type, started_at, search_keywords, status)
@@ -178,27 +714,37 @@ class RMTMonitoringDatabase:
         """Complete a monitoring run"""
         status = 'failed' if error else 'completed'
         
-        with sqlite3.connect(self.db_path) as conn:
+        with self.backend.connect() as conn:
             conn.execute("""
                 UPDATE monitoring_runs 
                 SET completed_at = ?, rmts_processed = ?, reviews_extracted = ?, 
-                    reviews_analyzed = ?, status = ?, error_message = ?
+                    reviews_analyzed = ?, cache_hits = ?, triage_skipped = ?,
+                    prompt_tokens = ?, output_tokens = ?, cached_tokens = ?, status = ?, error_message = ?
                 WHERE run_id = ?
             """, (
                 datetime.now(),
                 stats.get('rmts_processed', 0),
                 stats.get('reviews_extracted', 0), 
                 stats.get('reviews_analyzed', 0),
+                stats.get('cache_hits', 0),
+                stats.get('triage_skipped', 0),
+                stats.get('prompt_tokens', 0),
+                stats.get('output_tokens', 0),
+                stats.get('cached_tokens', 0),
                 status,
                 error,
                 run_id
             ))
+            if not error:
+                # Checkpoints are only needed to resume unfinished runs
+                conn.execute("DELETE FROM monitoring_run_progress WHERE run_id = ?", (run_id,))
+        invalidate_leaderboard_cache(self.db_path)
         
         logger.info(f"Completed monitoring run: {run_id} ({status})")
     
     def get_last_successful_run(self, run_type: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """Get the last successful monitoring run"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.backend.connect() as conn:
             conn.row_factory = sqlite3.Row
             
             query = """
@@ -216,9 +762,111 @@ class RMTMonitoringDatabase:
             result = conn.execute(query, params).fetchone()
             return dict(result) if result else None
     
+    def get_monitoring_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        with self.backend.connect() as conn:
+            row = conn.execute("SELECT * FROM monitoring_runs WHERE run_id = ?", (run_id,)).fetchone()
+            return dict(row) if row else None
+    
+    def reopen_monitoring_run(self, run_id: str):
+        """Mark a failed or interrupted run as running again (see IncrementalRMTMonitor.resume_run)"""
+        with self.backend.connect() as conn:
+            conn.execute("""
+                UPDATE monitoring_runs SET status = 'running', completed_at = NULL, error_message = NULL
+                WHERE run_id = ?
+            """, (run_id,))
+        logger.info(f"Resuming monitoring run: {run_id}")
+    
+    def record_run_progress(self, run_id: str, item_type: str, item_id: str, payload: Any = None, conn=None):
+        """Checkpoint one finished item of a run ('keyword', 'profile' or 'analysis')"""
+        row = {
+            'run_id': run_id,
+            'item_type': item_type,
+            'item_id': item_id,
+            'payload': json.dumps(payload) if payload is not None else None,
+            'completed_at': datetime.now(),
+        }
+        if conn is not None:
+            self.backend.upsert(conn, 'monitoring_run_progress', ('run_id', 'item_type', 'item_id'), row)
+            return
+        with self.backend.connect() as conn:
+            self.backend.upsert(conn, 'monitoring_run_progress', ('run_id', 'item_type', 'item_id'), row)
+    
+    def get_run_progress(self, run_id: str, item_type: str) -> Dict[str, Any]:
+        """item_id -> payload of a run's checkpoints of one type"""
+        with self.backend.connect() as conn:
+            rows = conn.execute(
+                "SELECT item_id, payload FROM monitoring_run_progress WHERE run_id = ? AND item_type = ?",
+                (run_id, item_type)
+            ).fetchall()
+        return {row['item_id']: json.loads(row['payload']) if row['payload'] else None for row in rows}
+    
+    def load_rmt_profiles(self, profile_ids: List[str]) -> List[RMTData]:
+        """Saved profiles as RMTData, in the given order (unknown ids are skipped)"""
+        profiles = {}
+        unique_ids = list(dict.fromkeys(profile_ids))
+        with self.backend.connect() as conn:
+            for start in range(0, len(unique_ids), PROFILE_ID_CHUNK):
+                chunk = unique_ids[start:start + PROFILE_ID_CHUNK]
+                for row in conn.execute(f"""
+                    SELECT profile_id, first_name, last_name, common_first_name, common_last_name,
+                           practice_locations, cmto_endpoint, registration_status, authorized_to_practice
+                    FROM rmt_profiles WHERE profile_id IN ({', '.join('?' * len(chunk))})
+                """, chunk).fetchall():
+                    profiles[row['profile_id']] = RMTData(
+                        profile_id=row['profile_id'],
+                        first_name=row['first_name'] or '',
+                        last_name=row['last_name'] or '',
+                        common_first_name=row['common_first_name'] or '',
+                        common_last_name=row['common_last_name'] or '',
+                        practice_locations=json.loads(row['practice_locations'] or '[]'),
+                        cmto_endpoint=row['cmto_endpoint'] or '',
+                        registration_status=row['registration_status'] or '',
+                        authorized_to_practice=bool(row['authorized_to_practice']),
+                    )
+        return [profiles[profile_id] for profile_id in profile_ids if profile_id in profiles]
+    
+    def get_run_extractions(self, run_id: str, profile_ids: Iterable[str],
+                            exclude: Iterable[str] = ()) -> List[Dict[str, Any]]:
+        """
+        Reviews a run saved for the given RMTs, in the analyzer's extraction format
+
+        exclude holds extraction_ids to leave out (e.g. those already analyzed).
+        """
+        exclude = set(exclude)
+        extractions = []
+        profile_ids = sorted(set(profile_ids))
+        with self.backend.connect() as conn:
+            for start in range(0, len(profile_ids), PROFILE_ID_CHUNK):
+                chunk = profile_ids[start:start + PROFILE_ID_CHUNK]
+                for row in conn.execute(f"""
+                    SELECT profile_id, first_name, last_name, reviews_data, reviews_data_codec
+                    FROM rmt_profiles WHERE profile_id IN ({', '.join('?' * len(chunk))})
+                """, chunk).fetchall():
+                    reviews_data = json.loads(decode_blob(conn, row['reviews_data'], row['reviews_data_codec']) or '[]')
+                    for review in reviews_data:
+                        if review.get('extraction_run_id') != run_id or review['extraction_id'] in exclude:
+                            continue
+                        extractions.append({
+                            'extraction_id': review['extraction_id'],
+                            'profile_id': row['profile_id'],
+                            'first_name': row['first_name'],
+                            'last_name': row['last_name'],
+                            'review_text': review['review_text'],
+                            'review_rating': review['review_rating'],
+                            'review_author': review['review_author'],
+                            'review_time_description': review['review_time_description'],
+                            'place_id': review['place_id'],
+                            'place_name': review['place_name'],
+                            'place_address': review['place_address'],
+                            'matched_text_segments': review['matched_text_segments'],
+                            'confidence_scores': review['confidence_scores'],
+                            'max_confidence': review['max_confidence']
+                        })
+        return extractions
+    
     def save_rmt_profile(self, rmt_data: RMTData, run_id: str):
         """Save or update RMT profile"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.backend.connect() as conn:
             # Check if profile exists
             existing = conn.execute(
                 "SELECT profile_id FROM rmt_profiles WHERE profile_id = ?",
@@ -264,15 +912,17 @@ class RMTMonitoringDatabase:
         review_content = f"{extraction.review_data['text']}|{extraction.review_data.get('author_name', '')}|{extraction.review_data.get('time', 0)}"
         review_hash = hashlib.md5(review_content.encode()).hexdigest()
         
-        with sqlite3.connect(self.db_path) as conn:
-            # Get existing reviews data
-            existing_data = conn.execute(
-                "SELECT reviews_data, total_reviews FROM rmt_profiles WHERE profile_id = ?",
+        with self.backend.connect() as conn:
+            # Get existing reviews data, locking the profile until the append is committed
+            # (concurrent persistence workers or hosts would otherwise overwrite each other)
+            existing_data = self.backend.select_for_update(
+                conn,
+                "SELECT reviews_data, total_reviews, reviews_data_codec FROM rmt_profiles WHERE profile_id = ?",
                 (extraction.rmt_data['profile_id'],)
             ).fetchone()
             
             if existing_data:
-                reviews_data = json.loads(existing_data[0] or '[]')
+                reviews_data = json.loads(decode_blob(conn, existing_data[0], existing_data[2]) or '[]')
                 total_reviews = existing_data[1] or 0
             else:
                 reviews_data = []
@@ -308,13 +958,15 @@ class RMTMonitoringDatabase:
             total_reviews += 1
             
             # Update the RMT profile with new reviews data
+            reviews_blob, reviews_codec = encode_blob(conn, json.dumps(reviews_data), 'reviews')
             conn.execute("""
                 UPDATE rmt_profiles 
-                SET reviews_data = ?, total_reviews = ?, last_review_date = ?, 
+                SET reviews_data = ?, reviews_data_codec = ?, total_reviews = ?, last_review_date = ?, 
                     last_updated_run_id = ?, last_updated_at = ?
                 WHERE profile_id = ?
             """, (
-                json.dumps(reviews_data),
+                reviews_blob,
+                reviews_codec,
                 total_reviews,
                 new_review['extracted_at'],
                 run_id,
@@ -325,8 +977,9 @@ class RMTMonitoringDatabase:
             logger.debug(f"Added new review to profile {extraction.rmt_data['profile_id']}: {extraction.extraction_id}")
             return True
     
-    def save_ai_analysis(self, analysis: ComprehensiveRMTAnalysis, run_id: str, model_used: str):
-        """Save AI analysis results"""
+    def save_ai_analysis(self, analysis: ComprehensiveRMTAnalysis, run_id: str, model_used: str,
+                         token_usage: Optional[TokenUsage] = None):
+        """Save AI analysis results (token_usage: the review's share of its Gemini call)"""
         # Extract profile_id and review_hash from the extraction_id
         # Format: {profile_id}_{place_id}_{review_hash}
         parts = analysis.extraction_id.split('_')
@@ -339,15 +992,17 @@ class RMTMonitoringDatabase:
         
         analysis_id = f"analysis_{analysis.extraction_id}_{int(time.time())}"
         
-        with sqlite3.connect(self.db_path) as conn:
+        with self.backend.connect() as conn:
+            analysis_blob, analysis_codec = encode_blob(conn, json.dumps(analysis.dict()), 'analysis')
             conn.execute("""
                 INSERT INTO ai_analyses 
                 (analysis_id, profile_id, analysis_run_id, review_hash, sentiment_overall,
                  sentiment_confidence, mention_confidence, technical_skill_rating,
                  communication_rating, professionalism_rating, review_authenticity,
                  potential_false_positive, overall_analysis_confidence, analysis_json,
-                 analyzed_at, gemini_model_used)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                 analysis_json_codec, analyzed_at, gemini_model_used, prompt_tokens, output_tokens,
+                 recommendation_given, repeat_client_indicated)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (
                 analysis_id,
                 profile_id,
@@ -362,18 +1017,24 @@ class RMTMonitoringDatabase:
                 analysis.review_classification.review_authenticity,
                 analysis.potential_false_positive,
                 analysis.overall_analysis_confidence,
-                json.dumps(analysis.dict()),
+                analysis_blob,
+                analysis_codec,
                 datetime.now(),
-                model_used
+                model_used,
+                token_usage.prompt_tokens if token_usage else None,
+                token_usage.output_tokens if token_usage else None,
+                analysis.review_classification.recommendation_given,
+                analysis.review_classification.repeat_client_indicated
             ))
+            self.record_run_progress(run_id, 'analysis', analysis.extraction_id, conn=conn)
     
     def get_unanalyzed_extractions(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """Get review extractions that haven't been analyzed yet"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.backend.connect() as conn:
             conn.row_factory = sqlite3.Row
             
             query = """
-                SELECT rp.profile_id, rp.reviews_data, rp.first_name, rp.last_name
+                SELECT rp.profile_id, rp.reviews_data, rp.reviews_data_codec, rp.first_name, rp.last_name
                 FROM rmt_profiles rp
                 WHERE rp.reviews_data IS NOT NULL AND rp.reviews_data != '[]'
             """
@@ -386,7 +1047,7 @@ class RMTMonitoringDatabase:
             
             for row in results:
                 profile_data = dict(row)
-                reviews_data = json.loads(profile_data['reviews_data'])
+                reviews_data = json.loads(decode_blob(conn, profile_data['reviews_data'], profile_data['reviews_data_codec']))
                 
                 # Get analyzed review hashes for this profile
                 analyzed_hashes = conn.execute("""
@@ -395,13 +1056,15 @@ class RMTMonitoringDatabase:
                 """, (profile_data['profile_id'],)).fetchall()
                 analyzed_hashes = [h[0] for h in analyzed_hashes]
                 
-                # Find unanalyzed reviews
+                # Find unanalyzed reviews (ai_analyses.review_hash is the extraction_id's last part)
                 for review in reviews_data:
-                    if review.get('review_hash') not in analyzed_hashes:
+                    if review['extraction_id'].split('_')[-1] not in analyzed_hashes:
                         # Convert to the format expected by the analyzer
                         extraction_data = {
                             'extraction_id': review['extraction_id'],
                             'profile_id': profile_data['profile_id'],
+                            'first_name': profile_data['first_name'],
+                            'last_name': profile_data['last_name'],
                             'review_text': review['review_text'],
                             'review_rating': review['review_rating'],
                             'review_author': review['review_author'],
@@ -417,46 +1080,297 @@ class RMTMonitoringDatabase:
             
             return unanalyzed_extractions
     
-    def get_latest_leaderboard(self, run_id: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Get the latest leaderboard data"""
-        with sqlite3.connect(self.db_path) as conn:
+    def get_latest_leaderboard(self, run_id: Optional[str] = None, city: Optional[str] = None,
+                               limit: Optional[int] = None, changed_only: bool = False) -> List[Dict[str, Any]]:
+        """
+        Get the latest leaderboard data
+
+        Without run_id this is the full current leaderboard. With run_id it is the full
+        leaderboard as of that run: the latest snapshot of every RMT written up to the
+        run's last snapshot (older history may be downsampled by compact_history()).
+        Snapshots are only written for RMTs that changed in a run, so changed_only=True
+        returns just the rows that run wrote.
+        city and limit narrow the result to the top RMTs of one city (the current
+        leaderboard is served by the (city, composite_reputation_score) index). For other
+        facets and paging, see leaderboard_queries.top_k().
+
+        Results are cached until the next completed run (see leaderboard_cache).
+        """
+        return cached(self.db_path, ('latest_leaderboard', run_id, normalize_city(city), limit, changed_only),
+                      lambda: self._read_leaderboard(run_id, city, limit, changed_only))
+
+    def _read_leaderboard(self, run_id: Optional[str], city: Optional[str],
+                          limit: Optional[int], changed_only: bool = False) -> List[Dict[str, Any]]:
+        with self.backend.connect() as conn:
             conn.row_factory = sqlite3.Row
             
-            if run_id:
+            if run_id and changed_only:
                 query = """
                     SELECT * FROM leaderboard_snapshots 
-                    WHERE run_id = ?
+                    WHERE run_id = ?{city}
                     ORDER BY composite_reputation_score DESC
                 """
-                results = conn.execute(query, (run_id,)).fetchall()
+                params: List[Any] = [run_id]
+                if city is not None:
+                    params.append(normalize_city(city))
+                query = query.format(city=" AND city = ?" if city is not None else "")
+            elif run_id:
+                # The run's last snapshot; a run that changed nothing ends when it completed
+                cutoff = conn.execute(
+                    "SELECT MAX(snapshot_at) FROM leaderboard_snapshots WHERE run_id = ?", (run_id,)
+                ).fetchone()[0]
+                if cutoff is None:
+                    run = conn.execute(
+                        "SELECT COALESCE(completed_at, started_at) FROM monitoring_runs WHERE run_id = ?", (run_id,)
+                    ).fetchone()
+                    if run is None:
+                        return []
+                    cutoff = run[0]
+                query = """
+                    SELECT * FROM (
+                        SELECT ls.*, ROW_NUMBER() OVER (
+                            PARTITION BY ls.profile_id ORDER BY ls.snapshot_at DESC
+                        ) AS snapshot_rank
+                        FROM leaderboard_snapshots ls
+                        WHERE ls.snapshot_at <= ?
+                    ) ranked
+                    WHERE snapshot_rank = 1{city}
+                    ORDER BY composite_reputation_score DESC
+                """
+                params = [cutoff]
+                if city is not None:
+                    params.append(normalize_city(city))
+                query = query.format(city=" AND city = ?" if city is not None else "")
             else:
-                # Get the most recent leaderboard
+                # Get the most recent leaderboard via the current_leaderboard pointers
                 query = """
-                    SELECT ls.* FROM leaderboard_snapshots ls
-                    INNER JOIN (
-                        SELECT profile_id, MAX(snapshot_at) as latest_snapshot
-                        FROM leaderboard_snapshots
-                        GROUP BY profile_id
-                    ) latest ON ls.profile_id = latest.profile_id 
-                                AND ls.snapshot_at = latest.latest_snapshot
-                    ORDER BY ls.composite_reputation_score DESC
+                    SELECT ls.* FROM current_leaderboard cl
+                    INNER JOIN leaderboard_snapshots ls ON ls.snapshot_id = cl.snapshot_id
+                    {where}
+                    ORDER BY cl.composite_reputation_score DESC
                 """
-                results = conn.execute(query).fetchall()
+                params = []
+                if city is not None:
+                    params.append(normalize_city(city))
+                query = query.format(where="WHERE cl.city = ?" if city is not None else "")
+            if limit:
+                query += " LIMIT ?"
+                params.append(int(limit))
+            results = [dict(row) for row in conn.execute(query, params).fetchall()]
             
-            return [dict(row) for row in results]
+            for entry in results:
+                entry.pop('snapshot_rank', None)
+            return results
+
+    def write_leaderboard_snapshots(self, run_id: str, config: Optional[EngineConfig] = None,
+                                    rescore_all: bool = False) -> int:
+        """
+        Write leaderboard snapshots for RMTs whose analyses changed since the last snapshot
+
+        Scores come from leaderboard_engine over the monthly totals in rmt_aggregate_periods
+        (population prior from one GROUP BY period), so the cost is proportional to the
+        number of changed RMTs. Time decay and the prior are evaluated when a row is
+        written, so the current rows of RMTs that did not change drift apart over time;
+        rescore_all re-scores every RMT at one as_of (see rescore_leaderboard()).
+        Returns the number of snapshot rows written.
+        """
+        config = config or EngineConfig()
+        with self.backend.connect() as conn:
+            # Changed RMTs. Their rows stay locked until the snapshot commits, so an analysis saved
+            # meanwhile (another worker) sets dirty again after the clear instead of being lost
+            where = "" if rescore_all else " WHERE dirty = 1"
+            locked = {row['profile_id'] for row in self.backend.select_for_update(
+                conn, f"SELECT profile_id FROM rmt_aggregates{where}").fetchall()}
+            changed = [row for row in conn.execute(f"""
+                SELECT ra.profile_id, rp.first_name || ' ' || rp.last_name as rmt_name, rp.practice_locations
+                FROM rmt_aggregates ra
+                INNER JOIN rmt_profiles rp ON rp.profile_id = ra.profile_id{where.replace('dirty', 'ra.dirty')}
+            """).fetchall() if row['profile_id'] in locked]
+            names = {row['profile_id']: row['rmt_name'] for row in changed}
+            cities = {row['profile_id']: primary_city(row['practice_locations']) for row in changed}
+            as_of = datetime.now()
+            prior = load_prior(conn, as_of=as_of, half_life_days=config.half_life_days)
+            totals = load_totals(self.backend, conn, names, as_of=as_of, half_life_days=config.half_life_days)
+
+            written = 0
+            for profile_id, rmt_name in names.items():
+                conn.execute("UPDATE rmt_aggregates SET dirty = 0 WHERE profile_id = ?", (profile_id,))
+                raw, decayed = totals.get(profile_id, (None, None))
+                if not raw or not raw['total']:
+                    continue
+
+                entry = score_totals(decayed, prior, config, raw)
+                composite_score = entry['scores']['composite']
+                snapshot_id = f"snapshot_{profile_id}_{int(time.time())}"
+                
+                conn.execute("""
+                    INSERT INTO leaderboard_snapshots 
+                    (snapshot_id, run_id, profile_id, rmt_name, total_reviews_analyzed,
+                     positive_sentiment_count, negative_sentiment_count, average_sentiment_score,
+                     composite_reputation_score, recommendation_rate, repeat_client_rate,
+                     potential_false_positives, snapshot_at, city)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    snapshot_id, run_id, profile_id, rmt_name, entry['reviews_analyzed'],
+                    int(raw['positive']), int(raw['negative']), entry['average_sentiment_score'],
+                    composite_score, entry['rates']['recommendation'], entry['rates']['repeat_client'],
+                    entry['potential_false_positives'], as_of, cities[profile_id]
+                ))
+                self.backend.upsert(conn, 'current_leaderboard', ('profile_id',), {
+                    'profile_id': profile_id,
+                    'snapshot_id': snapshot_id,
+                    'run_id': run_id,
+                    'composite_reputation_score': composite_score,
+                    'snapshot_at': as_of,
+                    'city': cities[profile_id],
+                })
+                written += 1
+        return written
+
+    def rescore_leaderboard(self, config: Optional[EngineConfig] = None) -> str:
+        """
+        Re-score every RMT at one as_of and prior, writing a full snapshot run
+
+        Incremental snapshots only touch changed RMTs, so run this periodically (e.g.
+        monthly) to bring time decay and the prior of every current row to the same date.
+        Reads rmt_aggregate_periods only; no API calls.
+        """
+        run_id = self.start_monitoring_run('rescore', [])
+        try:
+            written = self.write_leaderboard_snapshots(run_id, config, rescore_all=True)
+        except Exception as e:
+            self.complete_monitoring_run(run_id, {}, str(e))
+            raise
+        self.complete_monitoring_run(run_id, {'rmts_processed': written})
+        logger.info(f"Leaderboard re-scored: {written} RMTs ({run_id})")
+        return run_id
+
+    def compact_history(self, keep_full_runs: int = 10, daily_days: int = 90,
+                        run_retention_days: int = 365, vacuum_pages: Optional[int] = None) -> Dict[str, int]:
+        """
+        Apply the retention policy to leaderboard_snapshots and monitoring_runs
+
+        - Snapshots from the keep_full_runs most recent runs are kept in full.
+        - Older snapshots are downsampled to the last one per RMT per day (within
+          daily_days) or per ISO week (beyond that).
+        - Snapshots referenced by current_leaderboard are never deleted.
+        - Finished monitoring runs older than run_retention_days that nothing
+          references any more are deleted.
+        - Freed pages are released with an incremental VACUUM (the first call switches
+          the database to auto_vacuum=INCREMENTAL, which needs one full VACUUM;
+          PostgreSQL runs VACUUM ANALYZE instead).
+
+        Args:
+            keep_full_runs: Number of most recent runs whose snapshots are untouched
+            daily_days: Age in days after which daily buckets become weekly buckets
+            run_retention_days: Minimum age in days before an unreferenced run is deleted
+            vacuum_pages: Max pages to free per incremental vacuum (None = all)
+
+        Returns:
+            Counts of deleted snapshots and runs
+        """
+        daily_cutoff = datetime.now() - timedelta(days=daily_days)
+        run_cutoff = datetime.now() - timedelta(days=run_retention_days)
+
+        if self.backend.dialect == 'postgres':
+            day_bucket, week_bucket = "to_char(snapshot_at, 'YYYY-MM-DD')", "to_char(snapshot_at, 'IYYY-\"W\"IW')"
+        else:
+            # The Thursday of a date's ISO week identifies the week (strftime's %W weeks start
+            # on Monday but split the year-end week in two)
+            day_bucket, week_bucket = "date(snapshot_at)", "date(snapshot_at, '-3 days', 'weekday 4')"
+
+        with self.backend.connect() as conn:
+            snapshots_deleted = conn.execute(f"""
+                DELETE FROM leaderboard_snapshots WHERE snapshot_id IN (
+                    SELECT snapshot_id FROM (
+                        SELECT snapshot_id, ROW_NUMBER() OVER (
+                            PARTITION BY profile_id,
+                                CASE WHEN snapshot_at >= ? THEN {day_bucket} ELSE {week_bucket} END
+                            ORDER BY snapshot_at DESC
+                        ) AS bucket_rank
+                        FROM leaderboard_snapshots
+                        WHERE run_id NOT IN (
+                            SELECT run_id FROM monitoring_runs ORDER BY started_at DESC LIMIT ?
+                        )
+                    ) ranked
+                    WHERE bucket_rank > 1
+                )
+                AND snapshot_id NOT IN (SELECT snapshot_id FROM current_leaderboard)
+            """, (daily_cutoff, keep_full_runs)).rowcount
+
+            runs_deleted = conn.execute("""
+                DELETE FROM monitoring_runs
+                WHERE status != 'running'
+                  AND started_at < ?
+                  AND NOT EXISTS (SELECT 1 FROM ai_analyses aa WHERE aa.analysis_run_id = monitoring_runs.run_id)
+                  AND NOT EXISTS (SELECT 1 FROM leaderboard_snapshots ls WHERE ls.run_id = monitoring_runs.run_id)
+                  AND NOT EXISTS (SELECT 1 FROM current_leaderboard cl WHERE cl.run_id = monitoring_runs.run_id)
+                  AND NOT EXISTS (
+                      SELECT 1 FROM rmt_profiles rp
+                      WHERE rp.first_seen_run_id = monitoring_runs.run_id
+                         OR rp.last_updated_run_id = monitoring_runs.run_id
+                  )
+            """, (run_cutoff,)).rowcount
+            # Checkpoints of deleted runs can no longer be resumed
+            conn.execute("""
+                DELETE FROM monitoring_run_progress
+                WHERE NOT EXISTS (SELECT 1 FROM monitoring_runs mr WHERE mr.run_id = monitoring_run_progress.run_id)
+            """)
+
+        self.backend.reclaim_space(vacuum_pages)
+        # Pruned runs' snapshots may be cached
+        invalidate_leaderboard_cache(self.db_path)
+
+        logger.info(f"Compaction complete: {snapshots_deleted} snapshots and {runs_deleted} runs deleted")
+        return {'snapshots_deleted': snapshots_deleted, 'runs_deleted': runs_deleted}
 
 class IncrementalRMTMonitor:
     """Main class for incremental RMT monitoring"""
     
-    def __init__(self, google_api_key: str, gemini_api_key: str, db_path: str = "rmt_monitoring.db"):
+    def __init__(self, google_api_key: str, gemini_api_key: str, db_path: str = "rmt_monitoring.db",
+                 max_concurrency: int = 8, requests_per_minute: Optional[int] = None,
+                 tokens_per_minute: Optional[int] = None, batch_reviews: bool = False,
+                 use_cache: bool = True, async_pipeline: bool = False,
+                 triage_config: Optional[TriageConfig] = None, compact_prompts: bool = False,
+                 leaderboard_config: Optional[EngineConfig] = None, staged_pipeline: bool = False,
+                 stage_workers: Optional[Dict[str, int]] = None, pipeline_queue_size: int = DEFAULT_QUEUE_SIZE,
+                 pipeline_log_interval: float = DEFAULT_LOG_INTERVAL,
+                 refresh_config: Optional[RefreshConfig] = None):
         self.db = RMTMonitoringDatabase(db_path)
+        self.leaderboard_config = leaderboard_config or EngineConfig()
+        
+        # Incremental runs refresh the stalest RMTs and places within a Places request budget
+        self.refresh_config = refresh_config or RefreshConfig()
+        self.scheduler = RefreshScheduler(self.db.backend, self.refresh_config)
+        
+        # The staged pipeline runs full-run extraction stages concurrently (see _iter_staged_extractions)
+        self.staged_pipeline = staged_pipeline
+        self.stage_workers = {**PIPELINE_STAGE_WORKERS, **(stage_workers or {})}
+        self.pipeline_queue_size = pipeline_queue_size
+        self.pipeline_log_interval = pipeline_log_interval
         
         # Initialize extractor with SSL handling
         self.extractor = RMTReviewExtractor(google_api_key=google_api_key)
-        self.analyzer = GeminiReviewAnalyzer(api_key=gemini_api_key)
+        
+        # The async pipeline analyzes reviews while extraction is still running
+        self.async_pipeline = async_pipeline
+        if async_pipeline and batch_reviews:
+            logger.warning("Batched review prompts are not used by the async pipeline")
+        analyzer_class = AsyncGeminiReviewAnalyzer if async_pipeline else GeminiReviewAnalyzer
+        self.analyzer = analyzer_class(
+            api_key=gemini_api_key,
+            max_concurrency=max_concurrency,
+            requests_per_minute=requests_per_minute,
+            tokens_per_minute=tokens_per_minute,
+            batch_reviews=batch_reviews,
+            compact_prompts=compact_prompts
+        )
+        if use_cache:
+            self.analyzer.cache = DatabaseAnalysisCache(self.db.backend)
+        if triage_config:
+            self.analyzer.triage = ReviewTriage(triage_config)
         
         # Monitoring configuration
-        self.incremental_lookback_days = 30  # How far back to look for changes
         self.max_rmts_per_keyword = 50
         
     def run_full_analysis(self, search_keywords: List[str]) -> str:
@@ -467,48 +1381,28 @@ class IncrementalRMTMonitor:
         stats = {'rmts_processed': 0, 'reviews_extracted': 0, 'reviews_analyzed': 0}
         
         try:
-            # Extract all data
-            all_extractions = []
-            processed_rmts = set()
-            
-            for keyword in search_keywords:
-                logger.info(f"Processing keyword: {keyword}")
-                
-                # Get RMT profiles
-                rmt_profiles = self.extractor.search_cmto_profiles(
-                    keyword, 
-                    limit=self.max_rmts_per_keyword,
-                    get_all_pages=True
+            if self.staged_pipeline:
+                # Stages run concurrently; analysis consumes extractions as persistence emits them
+                self._analyze_and_save(
+                    (self._extraction_to_dict(extraction)
+                     for extraction in self._iter_staged_extractions(search_keywords, run_id, stats)),
+                    run_id, stats
                 )
+            elif self.async_pipeline:
+                # Extract and analyze concurrently on one event loop
+                new_extractions = self._extract_new_reviews(search_keywords, run_id, stats)
+                asyncio.run(self._analyze_and_save_async(
+                    (self._extraction_to_dict(extraction) for extraction in new_extractions), run_id, stats
+                ))
+            else:
+                # Extract all data
+                all_extractions = list(self._extract_new_reviews(search_keywords, run_id, stats))
+                logger.info(f"Extraction complete: {stats['reviews_extracted']} new reviews")
                 
-                for rmt_data in rmt_profiles:
-                    if rmt_data.profile_id in processed_rmts:
-                        continue
-                    
-                    processed_rmts.add(rmt_data.profile_id)
-                    
-                    # Save RMT profile
-                    self.db.save_rmt_profile(rmt_data, run_id)
-                    stats['rmts_processed'] += 1
-                    
-                    # Extract reviews
-                    extractions = self.extractor.extract_review_data(rmt_data)
-                    
-                    for extraction in extractions:
-                        if self.db.save_review_extraction(extraction, run_id):
-                            all_extractions.append(extraction)
-                            stats['reviews_extracted'] += 1
-            
-            logger.info(f"Extraction complete: {stats['reviews_extracted']} new reviews")
-            
-            # Analyze with AI
-            for extraction in all_extractions:
-                analysis = self.analyzer.analyze_single_review(self._extraction_to_dict(extraction))
-                if analysis:
-                    self.db.save_ai_analysis(analysis, run_id, self.analyzer.model_name)
-                    stats['reviews_analyzed'] += 1
-                
-                time.sleep(self.analyzer.request_delay)
+                # Analyze with AI
+                self._analyze_and_save(
+                    (self._extraction_to_dict(extraction) for extraction in all_extractions), run_id, stats
+                )
             
             # Generate leaderboard
             self._generate_leaderboard_snapshot(run_id)
@@ -525,7 +1419,7 @@ class IncrementalRMTMonitor:
             raise
     
     def run_incremental_update(self, search_keywords: List[str]) -> str:
-        """Run incremental update (look for new reviews)"""
+        """Run incremental update: discover new RMTs, then refresh the stalest ones (see refresh_scheduler)"""
         logger.info("Starting INCREMENTAL update")
         
         # Check when we last ran
@@ -534,65 +1428,33 @@ class IncrementalRMTMonitor:
             logger.warning("No previous successful run found, running full analysis instead")
             return self.run_full_analysis(search_keywords)
         
-        # Calculate lookback period
-        lookback_date = datetime.now() - timedelta(days=self.incremental_lookback_days)
-        logger.info(f"Looking for changes since: {lookback_date}")
-        
         run_id = self.db.start_monitoring_run('incremental', search_keywords)
         stats = {'rmts_processed': 0, 'reviews_extracted': 0, 'reviews_analyzed': 0}
         
         try:
-            # Get existing RMT profiles to check for updates
-            new_extractions = []
+            new_extractions = self._extract_scheduled_reviews(search_keywords, run_id, stats)
             
-            for keyword in search_keywords:
-                logger.info(f"Checking keyword for updates: {keyword}")
+            if self.async_pipeline:
+                asyncio.run(self._analyze_and_save_async(
+                    self._iter_incremental_work(new_extractions), run_id, stats
+                ))
+            else:
+                new_extractions = list(new_extractions)
+                logger.info(f"Incremental extraction: {stats['reviews_extracted']} new reviews")
                 
-                # Get current RMT profiles (limited search for incremental)
-                rmt_profiles = self.extractor.search_cmto_profiles(
-                    keyword, 
-                    limit=min(self.max_rmts_per_keyword, 20),  # Smaller limit for incremental
-                    get_all_pages=False  # Just first few pages
+                # Analyze only new extractions
+                self._analyze_and_save(
+                    (self._extraction_to_dict(extraction) for extraction in new_extractions), run_id, stats
                 )
                 
-                for rmt_data in rmt_profiles:
-                    # Always update RMT profile (in case of changes)
-                    self.db.save_rmt_profile(rmt_data, run_id)
-                    stats['rmts_processed'] += 1
-                    
-                    # Extract reviews (Google API limitation: always same 5 reviews)
-                    extractions = self.extractor.extract_review_data(rmt_data)
-                    
-                    for extraction in extractions:
-                        # save_review_extraction returns True only if it's new
-                        if self.db.save_review_extraction(extraction, run_id):
-                            new_extractions.append(extraction)
-                            stats['reviews_extracted'] += 1
-                            logger.info(f"Found new review for {rmt_data.first_name} {rmt_data.last_name}")
-            
-            logger.info(f"Incremental extraction: {stats['reviews_extracted']} new reviews")
-            
-            # Analyze only new extractions
-            for extraction in new_extractions:
-                analysis = self.analyzer.analyze_single_review(self._extraction_to_dict(extraction))
-                if analysis:
-                    self.db.save_ai_analysis(analysis, run_id, self.analyzer.model_name)
-                    stats['reviews_analyzed'] += 1
-                
-                time.sleep(self.analyzer.request_delay)
-            
-            # Also analyze any previously unanalyzed extractions
-            unanalyzed = self.db.get_unanalyzed_extractions(limit=50)
-            logger.info(f"Found {len(unanalyzed)} previously unanalyzed extractions")
-            
-            for extraction_data in unanalyzed:
-                # Convert database row to extraction format
-                analysis = self.analyzer.analyze_single_review(self._db_extraction_to_dict(extraction_data))
-                if analysis:
-                    self.db.save_ai_analysis(analysis, run_id, self.analyzer.model_name)
-                    stats['reviews_analyzed'] += 1
+                # Also analyze any previously unanalyzed extractions
+                unanalyzed = self.db.get_unanalyzed_extractions(limit=50)
+                logger.info(f"Found {len(unanalyzed)} previously unanalyzed extractions")
                 
-                time.sleep(self.analyzer.request_delay)
+                # Convert database rows to extraction format
+                self._analyze_and_save(
+                    (self._db_extraction_to_dict(extraction_data) for extraction_data in unanalyzed), run_id, stats
+                )
             
             # Generate updated leaderboard
             self._generate_leaderboard_snapshot(run_id)
@@ -608,6 +1470,409 @@ class IncrementalRMTMonitor:
             self.db.complete_monitoring_run(run_id, stats, error_msg)
             raise
     
+    def resume_run(self, run_id: str) -> str:
+        """
+        Continue a failed or interrupted run from its checkpoints
+
+        Keyword searches and RMTs finished before the interruption are not repeated
+        (the searches' results are read back from the checkpoint), and only the run's
+        extractions without a saved analysis are sent to Gemini. An RMT interrupted
+        midway is extracted again; reviews it already saved are deduplicated.
+        """
+        run = self.db.get_monitoring_run(run_id)
+        if not run:
+            raise ValueError(f"Unknown monitoring run: {run_id}")
+        if run['status'] == 'completed':
+            raise ValueError(f"Monitoring run {run_id} has already completed")
+        if run['status'] == 'running':
+            logger.warning(f"Run {run_id} is still marked running; resuming assumes its process has stopped")
+        
+        search_keywords = json.loads(run['search_keywords'])
+        incremental = run['run_type'] == 'incremental'
+        self.db.reopen_monitoring_run(run_id)
+        stats = {key: run[key] or 0 for key in ('rmts_processed', 'reviews_extracted', 'reviews_analyzed',
+                                                 'cache_hits', 'triage_skipped', 'prompt_tokens',
+                                                 'output_tokens', 'cached_tokens')}
+        # A run that crashed never recorded its counters; the checkpoints and saved reviews still count its progress
+        stats['rmts_processed'] = max(stats['rmts_processed'], len(self.db.get_run_progress(run_id, 'profile')))
+        stats['reviews_extracted'] = max(stats['reviews_extracted'],
+                                         len(self.db.get_run_extractions(run_id, self._run_profile_ids(run_id))))
+        stats['reviews_analyzed'] = max(stats['reviews_analyzed'], len(self.db.get_run_progress(run_id, 'analysis')))
+        
+        try:
+            if incremental:
+                for _ in self._extract_scheduled_reviews(search_keywords, run_id, stats):
+                    pass
+            elif self.staged_pipeline:
+                for _ in self._iter_staged_extractions(search_keywords, run_id, stats):
+                    pass
+            else:
+                for _ in self._extract_new_reviews(search_keywords, run_id, stats):
+                    pass
+            logger.info(f"Resumed extraction complete: {stats['reviews_extracted']} new reviews")
+            
+            # Everything the run extracted, before or after the interruption, without a saved analysis
+            pending = self.db.get_run_extractions(run_id, self._run_profile_ids(run_id),
+                                                  exclude=self.db.get_run_progress(run_id, 'analysis'))
+            logger.info(f"Analyzing {len(pending)} extractions of run {run_id}")
+            self._analyze_and_save((self._db_extraction_to_dict(extraction_data) for extraction_data in pending),
+                                   run_id, stats)
+            
+            self._generate_leaderboard_snapshot(run_id)
+            self.db.complete_monitoring_run(run_id, stats)
+            logger.info(f"Resumed run complete: {run_id}")
+            
+            return run_id
+            
+        except Exception as e:
+            error_msg = str(e)
+            logger.error(f"Resumed run failed: {error_msg}")
+            self.db.complete_monitoring_run(run_id, stats, error_msg)
+            raise
+    
+    def _run_profile_ids(self, run_id: str) -> Set[str]:
+        """Every RMT the run searched, refreshed or saved reviews for"""
+        profile_ids = {rmt['profile_id'] for rmts in self.db.get_run_progress(run_id, 'keyword').values()
+                       for rmt in rmts}
+        profile_ids.update(self.db.get_run_progress(run_id, 'profile'))
+        with self.db.backend.connect() as conn:
+            profile_ids.update(row['profile_id'] for row in conn.execute(
+                "SELECT profile_id FROM rmt_profiles WHERE last_updated_run_id = ?", (run_id,)).fetchall())
+        return profile_ids
+    
+    def _extract_new_reviews(self, search_keywords: List[str], run_id: str,
+                             stats: Dict[str, int]) -> Iterator[ReviewExtraction]:
+        """
+        Search RMT profiles, save profiles and review extractions, and yield the new extractions
+
+        Every page of each keyword is searched and each RMT is processed once. Finished
+        keyword searches and RMTs are checkpointed, and a resumed run reuses them
+        instead of repeating the requests.
+        """
+        keyword_checkpoints = self.db.get_run_progress(run_id, 'keyword')
+        extracted_rmts = set(self.db.get_run_progress(run_id, 'profile'))
+        processed_rmts = set()
+        
+        for keyword in search_keywords:
+            if keyword in keyword_checkpoints:
+                rmt_profiles = [RMTData(**rmt) for rmt in keyword_checkpoints[keyword]]
+                logger.info(f"Keyword already searched: {keyword} ({len(rmt_profiles)} RMTs from checkpoint)")
+            else:
+                logger.info(f"Processing keyword: {keyword}")
+                rmt_profiles = self.extractor.search_cmto_profiles(
+                    keyword, 
+                    limit=self.max_rmts_per_keyword,
+                    get_all_pages=True
+                )
+                self.db.record_run_progress(run_id, 'keyword', keyword, [asdict(rmt) for rmt in rmt_profiles])
+            
+            for rmt_data in rmt_profiles:
+                if rmt_data.profile_id in processed_rmts:
+                    continue
+                processed_rmts.add(rmt_data.profile_id)
+                if rmt_data.profile_id in extracted_rmts:
+                    continue  # Extracted before the run was interrupted
+                
+                # Save RMT profile
+                self.db.save_rmt_profile(rmt_data, run_id)
+                stats['rmts_processed'] += 1
+                
+                # Extract reviews (Google API limitation: always same 5 reviews)
+                extractions = self.extractor.extract_review_data(rmt_data)
+                
+                for extraction in extractions:
+                    # save_review_extraction returns True only if it's new
+                    if self.db.save_review_extraction(extraction, run_id):
+                        stats['reviews_extracted'] += 1
+                        yield extraction
+                self.db.record_run_progress(run_id, 'profile', rmt_data.profile_id)
+
+    def _extract_scheduled_reviews(self, search_keywords: List[str], run_id: str,
+                                   stats: Dict[str, int]) -> Iterator[ReviewExtraction]:
+        """
+        Incremental extraction driven by refresh_scheduler, yielding the new extractions
+
+        The keyword searches only discover RMTs (CMTO, no Google quota): profiles are
+        saved and never-seen RMTs are scheduled for an immediate refresh. The due RMTs
+        are then refreshed in priority order until the Places request budget is spent.
+        """
+        config = self.refresh_config
+        now = datetime.now()
+        keyword_checkpoints = self.db.get_run_progress(run_id, 'keyword')
+        
+        for keyword in search_keywords:
+            if keyword in keyword_checkpoints:
+                continue
+            logger.info(f"Checking keyword for new RMTs: {keyword}")
+            rmt_profiles = self.extractor.search_cmto_profiles(
+                keyword,
+                limit=self.max_rmts_per_keyword,
+                get_all_pages=True
+            )
+            for rmt_data in rmt_profiles:
+                self.db.save_rmt_profile(rmt_data, run_id)
+            self.db.record_run_progress(run_id, 'keyword', keyword, [asdict(rmt) for rmt in rmt_profiles])
+        
+        scheduled = self.scheduler.seed(now)
+        extracted_rmts = set(self.db.get_run_progress(run_id, 'profile'))
+        due = [row for row in self.scheduler.due_rmts(now) if row['profile_id'] not in extracted_rmts]
+        profiles = {rmt_data.profile_id: rmt_data
+                    for rmt_data in self.db.load_rmt_profiles([row['profile_id'] for row in due])}
+        budget = ApiBudget(config.api_budget)
+        logger.info(f"{len(due)} RMTs due for refresh ({scheduled} newly scheduled), "
+                    f"budget {budget.limit} Places requests")
+        
+        fetched = {}  # place_id -> (reviews, place_info) fetched by this run
+        for position, row in enumerate(due):
+            rmt_data = profiles.get(row['profile_id'])
+            if rmt_data is None:
+                continue
+            places = self.scheduler.cached_places(row, now)
+            place_rows = self.scheduler.places(place['place_id'] for _, place in places or [])
+            cost = (config.search_cost * sum(1 for location in rmt_data.practice_locations
+                                             if self.extractor.location_query(location))
+                    if places is None else
+                    sum(1 for _, place in places
+                        if place['place_id'] not in fetched
+                        and self.scheduler.place_due(place_rows.get(place['place_id']), now)))
+            if not budget.affordable(cost):
+                logger.info(f"Places budget reached ({budget.spent}/{budget.limit} requests); "
+                            f"{len(due) - position} due RMTs left for later runs")
+                break
+            
+            for extraction in self._refresh_rmt(rmt_data, row, places, place_rows, run_id, budget, fetched, now):
+                stats['reviews_extracted'] += 1
+                logger.info(f"Found new review for {rmt_data.first_name} {rmt_data.last_name}")
+                yield extraction
+            stats['rmts_processed'] += 1
+            self.db.record_run_progress(run_id, 'profile', rmt_data.profile_id)
+        
+        logger.info(f"Scheduled refresh: {stats['rmts_processed']} RMTs, {budget.spent} Places requests")
+    
+    def _refresh_rmt(self, rmt_data: RMTData, row: Dict[str, Any], places: Optional[List[Tuple[str, Dict[str, Any]]]],
+                     place_rows: Dict[str, Dict[str, Any]], run_id: str, budget: ApiBudget,
+                     fetched: Dict[str, Tuple[List[Dict[str, Any]], Dict[str, Any]]],
+                     now: datetime) -> Iterator[ReviewExtraction]:
+        """
+        Refresh one due RMT, yielding its new extractions, then reschedule it
+
+        places is None when the RMT's nearby places need a new search. Places that are
+        not due are matched from the reviews stored at their last fetch.
+        """
+        extractor = self.extractor
+        places_searched_at = row.get('places_searched_at')
+        if places is None:
+            places = []
+            for location in rmt_data.practice_locations:
+                location_str = extractor.location_query(location)
+                if not location_str:
+                    continue
+                logger.info(f"Searching near: {location_str}")
+                places.extend((location_str, place) for place in extractor.find_nearby_places(location_str)
+                              if place.get('place_id'))
+                budget.spend(self.refresh_config.search_cost)
+            places_searched_at = now
+            place_rows = self.scheduler.places(place['place_id'] for _, place in places)
+        
+        name_variations = extractor.generate_name_variations(rmt_data)
+        location_variations = extractor.generate_location_variations(rmt_data.practice_locations)
+        new_reviews = 0
+        for location_str, place in places:
+            place_id = place['place_id']
+            place_row = place_rows.get(place_id)
+            if place_id in fetched:
+                reviews, place_info = fetched[place_id]
+            elif self.scheduler.place_due(place_row, now):
+                reviews, place_info = extractor.get_place_reviews(place_id)
+                budget.spend()
+                time.sleep(extractor.request_delay)
+                fetched[place_id] = (reviews, place_info)
+                if place_info:
+                    self.scheduler.record_place(place_id, place_row, reviews, place_info, now)
+            else:
+                reviews, place_info = self.scheduler.stored_reviews(place_row)
+            
+            for review in reviews:
+                extraction = extractor.match_review(rmt_data, review, place, place_info, location_str,
+                                                    name_variations, location_variations)
+                # save_review_extraction returns True only if it's new
+                if extraction and self.db.save_review_extraction(extraction, run_id):
+                    new_reviews += 1
+                    yield extraction
+        
+        self.scheduler.record_rmt(rmt_data.profile_id, row, new_reviews, places, places_searched_at, now)
+    
+    def _iter_staged_extractions(self, search_keywords: List[str], run_id: str,
+                                 stats: Dict[str, int]) -> Iterator[ReviewExtraction]:
+        """
+        Full-run extraction as a staged pipeline, yielding new extractions as they are saved
+
+        Keywords flow through discovery -> profiles -> places -> reviews -> matching ->
+        persistence, each stage with its own workers (self.stage_workers) and a bounded
+        input queue, so several keywords, RMTs and places are in flight at once. Results
+        match _extract_new_reviews() up to ordering, including the
+        checkpoints: an RMT is checkpointed once all of its places have gone through
+        persistence.
+        """
+        extractor = self.extractor
+        keyword_checkpoints = self.db.get_run_progress(run_id, 'keyword')
+        extracted_rmts = set(self.db.get_run_progress(run_id, 'profile'))
+        processed_rmts = set()
+        outstanding = {}  # profile_id -> places and extractions of the RMT still in the pipeline
+        lock = threading.Lock()
+
+        def settle(profile_id: str, delta: int):
+            with lock:
+                outstanding[profile_id] = outstanding.get(profile_id, 0) + delta
+                finished = outstanding[profile_id] == 0
+                if finished:
+                    del outstanding[profile_id]
+            if finished:
+                self.db.record_run_progress(run_id, 'profile', profile_id)
+
+        def discover(keyword: str) -> List[RMTData]:
+            if keyword in keyword_checkpoints:
+                rmt_profiles = [RMTData(**rmt) for rmt in keyword_checkpoints[keyword]]
+                logger.info(f"Keyword already searched: {keyword} ({len(rmt_profiles)} RMTs from checkpoint)")
+            else:
+                logger.info(f"Processing keyword: {keyword}")
+                rmt_profiles = extractor.search_cmto_profiles(keyword, limit=self.max_rmts_per_keyword,
+                                                              get_all_pages=True)
+                self.db.record_run_progress(run_id, 'keyword', keyword, [asdict(rmt) for rmt in rmt_profiles])
+            new_profiles = []
+            with lock:
+                for rmt_data in rmt_profiles:
+                    if rmt_data.profile_id not in processed_rmts and rmt_data.profile_id not in extracted_rmts:
+                        processed_rmts.add(rmt_data.profile_id)
+                        new_profiles.append(rmt_data)
+            return new_profiles
+
+        def save_profile(rmt_data: RMTData) -> List[Tuple[RMTData, List[str], List[str]]]:
+            self.db.save_rmt_profile(rmt_data, run_id)
+            with lock:
+                stats['rmts_processed'] += 1
+            logger.info(f"Processing RMT: {rmt_data.first_name} {rmt_data.last_name}")
+            return [(rmt_data, extractor.generate_name_variations(rmt_data),
+                     extractor.generate_location_variations(rmt_data.practice_locations))]
+
+        def search_places(rmt: Tuple[RMTData, List[str], List[str]]) -> List[Tuple[Any, ...]]:
+            found = []
+            for location in rmt[0].practice_locations:
+                try:
+                    location_str = extractor.location_query(location)
+                    if not location_str:
+                        continue
+                    logger.info(f"Searching near: {location_str}")
+                    found.extend((rmt, location_str, place) for place in extractor.find_nearby_places(location_str)
+                                 if place.get('place_id'))
+                except Exception as e:
+                    logger.error(f"Error processing location {location}: {e}")
+            settle(rmt[0].profile_id, len(found))
+            return found
+
+        def fetch_reviews(item: Tuple[Any, ...]) -> List[Tuple[Any, ...]]:
+            rmt, location_str, place = item
+            reviews, place_info = extractor.get_place_reviews(place['place_id'])
+            time.sleep(extractor.request_delay)
+            if not reviews:
+                settle(rmt[0].profile_id, -1)
+                return []
+            return [(rmt, location_str, place, place_info, reviews)]
+
+        def match(item: Tuple[Any, ...]) -> List[ReviewExtraction]:
+            (rmt_data, name_variations, location_variations), location_str, place, place_info, reviews = item
+            extractions = []
+            try:
+                for review in reviews:
+                    extraction = extractor.match_review(rmt_data, review, place, place_info, location_str,
+                                                        name_variations, location_variations)
+                    if extraction:
+                        extractions.append(extraction)
+            except Exception as e:
+                logger.error(f"Error matching reviews of place {place['place_id']}: {e}")
+            settle(rmt_data.profile_id, len(extractions) - 1)
+            return extractions
+
+        def persist(extraction: ReviewExtraction) -> List[ReviewExtraction]:
+            # save_review_extraction returns True only if it's new
+            is_new = self.db.save_review_extraction(extraction, run_id)
+            if is_new:
+                with lock:
+                    stats['reviews_extracted'] += 1
+            settle(extraction.rmt_data['profile_id'], -1)
+            return [extraction] if is_new else []
+
+        functions = {'discovery': discover, 'profiles': save_profile, 'places': search_places,
+                     'reviews': fetch_reviews, 'matching': match, 'persistence': persist}
+        pipeline = StagedPipeline(
+            [Stage(name, functions[name], workers=self.stage_workers[name], queue_size=self.pipeline_queue_size)
+             for name in PIPELINE_STAGE_WORKERS],
+            sink_name='analysis', sink_queue_size=self.pipeline_queue_size, log_interval=self.pipeline_log_interval
+        )
+        yield from pipeline.run(search_keywords)
+        logger.info(f"Staged extraction complete: {stats['reviews_extracted']} new reviews")
+
+    def _iter_incremental_work(self, new_extractions: Iterable[ReviewExtraction]) -> Iterator[Dict[str, Any]]:
+        """New extractions, then previously unanalyzed ones (queried once extraction is done)"""
+        queued = set()
+        for extraction in new_extractions:
+            queued.add(extraction.extraction_id)
+            yield self._extraction_to_dict(extraction)
+        logger.info(f"Incremental extraction: {len(queued)} new reviews")
+        
+        # New extractions may still be in flight, so skip them here
+        unanalyzed = [row for row in self.db.get_unanalyzed_extractions(limit=50)
+                      if row['extraction_id'] not in queued]
+        logger.info(f"Found {len(unanalyzed)} previously unanalyzed extractions")
+        for extraction_data in unanalyzed:
+            yield self._db_extraction_to_dict(extraction_data)
+
+    async def _analyze_and_save_async(self, extraction_dicts: Iterable[Dict[str, Any]], run_id: str,
+                                      stats: Dict[str, int]):
+        """
+        Async pipeline: the blocking extraction generator runs in worker threads and feeds
+        AsyncGeminiReviewAnalyzer.analyze_many(), so reviews are analyzed while later RMTs
+        are still being extracted
+        """
+        counters_before = self._analyzer_counters()
+        async for _, analysis in self.analyzer.analyze_many(_iterate_in_thread(extraction_dicts)):
+            if analysis:
+                await asyncio.to_thread(self._save_analysis, analysis, run_id)
+                stats['reviews_analyzed'] += 1
+        self._add_analyzer_stats(stats, counters_before)
+        logger.info(f"Pipeline complete: {stats['reviews_extracted']} new reviews, "
+                    f"{stats['reviews_analyzed']} analyzed")
+
+    def _analyze_and_save(self, extraction_dicts, run_id: str, stats: Dict[str, int]):
+        """Analyze extractions through the analyzer's worker pool, saving each result as it completes"""
+        counters_before = self._analyzer_counters()
+        for _, analysis in self.analyzer.iter_analyses(extraction_dicts):
+            if analysis:
+                self._save_analysis(analysis, run_id)
+                stats['reviews_analyzed'] += 1
+        self._add_analyzer_stats(stats, counters_before)
+
+    def _save_analysis(self, analysis: ComprehensiveRMTAnalysis, run_id: str):
+        self.db.save_ai_analysis(analysis, run_id, self.analyzer.model_used_for(analysis),
+                                 self.analyzer.pop_token_usage(analysis.extraction_id))
+
+    def _analyzer_counters(self) -> Tuple[int, int, TokenUsage]:
+        return self.analyzer.cache_hits, self.analyzer.triage_skipped, self.analyzer.token_usage
+
+    def _add_analyzer_stats(self, stats: Dict[str, int], counters_before: Tuple[int, int, TokenUsage]):
+        """Add the analyzer's cache, triage and token counters accrued since counters_before to stats"""
+        hits_before, skipped_before, usage_before = counters_before
+        usage = self.analyzer.token_usage - usage_before
+        for key, value in (('cache_hits', self.analyzer.cache_hits - hits_before),
+                           ('triage_skipped', self.analyzer.triage_skipped - skipped_before),
+                           ('prompt_tokens', usage.prompt_tokens),
+                           ('output_tokens', usage.output_tokens),
+                           ('cached_tokens', usage.cached_tokens)):
+            stats[key] = stats.get(key, 0) + value
+        if usage.calls:
+            logger.info(f"Gemini usage: {usage.calls} calls, {usage.prompt_tokens} prompt tokens "
+                        f"({usage.cached_tokens} cached), {usage.output_tokens} output tokens")
+
     def _extraction_to_dict(self, extraction: ReviewExtraction) -> Dict[str, Any]:
         """Convert ReviewExtraction to dictionary for analysis"""
         return {
@@ -628,7 +1893,9 @@ class IncrementalRMTMonitor:
             'extraction_id': extraction_data['extraction_id'],
             'rmt_information': {
                 'profile_id': extraction_data['profile_id'],
-                'full_name': f"Profile {extraction_data['profile_id']}"  # Simplified for unanalyzed
+                'full_name': f"Profile {extraction_data['profile_id']}",  # Simplified for unanalyzed
+                'first_name': extraction_data.get('first_name'),  # Used by the triage stage
+                'last_name': extraction_data.get('last_name')
             },
             'review_content': {
                 'text': extraction_data['review_text'],
@@ -642,63 +1909,22 @@ class IncrementalRMTMonitor:
                 'address': extraction_data['place_address']
             },
             'matching_analysis': {
-                'matched_text_segments': json.loads(extraction_data['matched_text_segments'] or '[]'),
-                'confidence_scores': json.loads(extraction_data['confidence_scores'] or '[]'),
+                'matched_text_segments': self._json_list(extraction_data['matched_text_segments']),
+                'confidence_scores': self._json_list(extraction_data['confidence_scores']),
                 'max_confidence': extraction_data['max_confidence'] or 0
             }
         }
     
+    @staticmethod
+    def _json_list(value: Any) -> List[Any]:
+        # reviews_data entries hold decoded lists; older extraction rows hold JSON text
+        return json.loads(value or '[]') if isinstance(value, str) else list(value or [])
+    
     def _generate_leaderboard_snapshot(self, run_id: str):
-        """Generate leaderboard snapshot from current data"""
+        """Generate leaderboard snapshot for RMTs whose analyses changed since the last snapshot"""
         logger.info("Generating leaderboard snapshot")
-        
-        with sqlite3.connect(self.db.db_path) as conn:
-            # Get aggregated metrics per RMT
-            results = conn.execute("""
-                SELECT 
-                    rp.profile_id,
-                    rp.first_name || ' ' || rp.last_name as rmt_name,
-                    COUNT(aa.analysis_id) as total_reviews,
-                    SUM(CASE WHEN aa.sentiment_overall IN ('positive', 'very_positive') THEN 1 ELSE 0 END) as positive_count,
-                    SUM(CASE WHEN aa.sentiment_overall IN ('negative', 'very_negative') THEN 1 ELSE 0 END) as negative_count,
-                    AVG(aa.sentiment_confidence) as avg_sentiment,
-                    AVG(aa.overall_analysis_confidence) as avg_confidence,
-                    SUM(CASE WHEN aa.potential_false_positive = 1 THEN 1 ELSE 0 END) as false_positives
-                FROM rmt_profiles rp
-                LEFT JOIN ai_analyses aa ON rp.profile_id = aa.profile_id
-                WHERE aa.analysis_id IS NOT NULL
-                GROUP BY rp.profile_id, rp.first_name, rp.last_name
-                HAVING total_reviews > 0
-            """).fetchall()
-            
-            # Save leaderboard snapshots
-            for row in results:
-                profile_id, rmt_name, total_reviews, positive_count, negative_count, avg_sentiment, avg_confidence, false_positives = row
-                
-                # Calculate composite score (simplified)
-                sentiment_score = ((positive_count - negative_count) / total_reviews) * 50 + 50 if total_reviews > 0 else 50
-                confidence_penalty = max(0, (1 - avg_confidence) * 20) if avg_confidence else 0
-                false_positive_penalty = min(20, false_positives * 5)
-                
-                composite_score = max(0, min(100, sentiment_score - confidence_penalty - false_positive_penalty))
-                
-                snapshot_id = f"snapshot_{profile_id}_{int(time.time())}"
-                
-                conn.execute("""
-                    INSERT INTO leaderboard_snapshots 
-                    (snapshot_id, run_id, profile_id, rmt_name, total_reviews_analyzed,
-                     positive_sentiment_count, negative_sentiment_count, average_sentiment_score,
-                     composite_reputation_score, recommendation_rate, repeat_client_rate,
-                     potential_false_positives, snapshot_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    snapshot_id, run_id, profile_id, rmt_name, total_reviews,
-                    positive_count, negative_count, avg_sentiment or 0,
-                    composite_score, 0.0, 0.0,  # Placeholder rates
-                    false_positives, datetime.now()
-                ))
-        
-        logger.info("Leaderboard snapshot generated")
+        written = self.db.write_leaderboard_snapshots(run_id, self.leaderboard_config)
+        logger.info(f"Leaderboard snapshot generated ({written} changed RMTs)")
     
     def export_latest_results(self, output_dir: str = None) -> Dict[str, str]:
         """Export latest results to JSON files"""
@@ -714,7 +1940,7 @@ class IncrementalRMTMonitor:
             json.dump(leaderboard, f, indent=2, default=str)
         
         # Export monitoring runs history
-        with sqlite3.connect(self.db.db_path) as conn:
+        with self.db.backend.connect() as conn:
             conn.row_factory = sqlite3.Row
             runs = [dict(row) for row in conn.execute("""
                 SELECT * FROM monitoring_runs 
@@ -733,20 +1959,79 @@ class IncrementalRMTMonitor:
             'output_directory': output_dir
         }
 
+async def _iterate_in_thread(items: Iterable[Any]) -> AsyncIterator[Any]:
+    """Drive a blocking iterator from a worker thread without blocking the event loop"""
+    iterator = iter(items)
+    finished = object()
+    while True:
+        item = await asyncio.to_thread(next, iterator, finished)
+        if item is finished:
+            return
+        yield item
+
+
 def main():
     """Main CLI interface"""
     parser = argparse.ArgumentParser(description='Incremental RMT Monitoring System')
-    parser.add_argument('--mode', choices=['full', 'incremental', 'rebuild', 'export', 'test'], 
+    parser.add_argument('--mode', choices=['full', 'incremental', 'rebuild', 'export', 'test', 'compact', 'rescore'], 
                        default='incremental', help='Monitoring mode')
     parser.add_argument('--google-api-key', help='Google Places API key')
     parser.add_argument('--gemini-api-key', help='Gemini AI API key')
-    parser.add_argument('--db-path', default='rmt_monitoring.db', help='Database file path')
+    parser.add_argument('--db-path', default='rmt_monitoring.db', help='Database file path or postgresql:// URL')
     parser.add_argument('--keywords', nargs='+', 
                        default=['Toronto massage therapy', 'Mississauga RMT'],
                        help='Search keywords')
+    parser.add_argument('--keep-runs', type=int, default=10,
+                       help='Compact mode: runs whose snapshots are kept in full')
+    parser.add_argument('--daily-days', type=int, default=90,
+                       help='Compact mode: keep daily snapshots for this many days, weekly after')
+    parser.add_argument('--run-retention-days', type=int, default=365,
+                       help='Compact mode: delete unreferenced runs older than this')
+    parser.add_argument('--concurrency', type=int, default=8,
+                       help='Maximum Gemini requests in flight')
+    parser.add_argument('--rpm', type=int, help='Gemini requests-per-minute budget (default 60)')
+    parser.add_argument('--tpm', type=int, help='Gemini tokens-per-minute budget (default unlimited)')
+    parser.add_argument('--batch-reviews', action='store_true',
+                       help='Pack several reviews (grouped by RMT) into each Gemini request')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='Always call Gemini, ignoring the analysis cache')
+    parser.add_argument('--async-pipeline', action='store_true',
+                       help='Analyze reviews with the async Gemini client while extraction is still running')
+    parser.add_argument('--staged-pipeline', action='store_true',
+                       help='Full runs: run extraction as concurrent stages connected by bounded queues')
+    parser.add_argument('--stage-workers', nargs='+', default=[], metavar='STAGE=N',
+                       help=f"Staged pipeline worker counts, e.g. places=8 (stages: {', '.join(PIPELINE_STAGE_WORKERS)})")
+    parser.add_argument('--pipeline-queue-size', type=int, default=DEFAULT_QUEUE_SIZE,
+                       help='Staged pipeline: bound of each stage input queue')
+    parser.add_argument('--pipeline-log-interval', type=float, default=DEFAULT_LOG_INTERVAL,
+                       help='Staged pipeline: seconds between stage throughput/queue depth log lines')
+    parser.add_argument('--api-budget', type=int, default=RefreshConfig.api_budget,
+                       help='Incremental mode: Google Places requests per run (stalest RMTs first)')
+    parser.add_argument('--min-refresh-days', type=float, default=RefreshConfig.min_interval_days,
+                       help='Incremental mode: shortest interval between refreshes of an RMT or place')
+    parser.add_argument('--max-refresh-days', type=float, default=RefreshConfig.max_interval_days,
+                       help='Incremental mode: longest interval between refreshes of an RMT or place')
+    parser.add_argument('--resume', metavar='RUN_ID',
+                       help='Continue a failed or interrupted full/incremental run from its checkpoints')
+    parser.add_argument('--compact-prompts', action='store_true',
+                       help='Send the static analysis instructions as a system instruction instead of in every prompt')
+    parser.add_argument('--triage', action='store_true',
+                       help='Skip likely false-positive matches locally instead of sending them to Gemini')
+    parser.add_argument('--triage-skip-below', type=float, default=TriageConfig.skip_below,
+                       help='Triage score below which a review is skipped (see review_triage.py)')
     
     args = parser.parse_args()
     
+    stage_workers = {}
+    for setting in args.stage_workers:
+        stage, _, count = setting.partition('=')
+        if stage not in PIPELINE_STAGE_WORKERS or not count.isdigit() or int(count) < 1:
+            parser.error(f"--stage-workers expects STAGE=N with N >= 1 and STAGE one of "
+                         f"{', '.join(PIPELINE_STAGE_WORKERS)} (got {setting!r})")
+        stage_workers[stage] = int(count)
+    if args.staged_pipeline and args.async_pipeline:
+        parser.error("--staged-pipeline and --async-pipeline cannot be combined")
+    
     # Handle test mode
     if args.mode == 'test':
         from rmt_review_extractor import test_cmto_api
@@ -757,6 +2042,20 @@ def main():
             print("\n❌ CMTO API test failed. Please check the error messages above.")
         exit(0 if success else 1)
     
+    # Handle compact mode (database only, no API keys needed)
+    if args.mode == 'compact':
+        db = RMTMonitoringDatabase(args.db_path)
+        result = db.compact_history(args.keep_runs, args.daily_days, args.run_retention_days)
+        print(f"✅ Compaction complete: {result['snapshots_deleted']} snapshots, "
+              f"{result['runs_deleted']} runs deleted")
+        exit(0)
+    
+    # Handle rescore mode (database only): bring every current leaderboard row to one as_of
+    if args.mode == 'rescore':
+        run_id = RMTMonitoringDatabase(args.db_path).rescore_leaderboard()
+        print(f"✅ Leaderboard re-scored: {run_id}")
+        exit(0)
+    
     # Validate API keys for other modes
     if not args.google_api_key or not args.gemini_api_key:
         print("❌ Error: --google-api-key and --gemini-api-key are required for this mode")
@@ -767,11 +2066,29 @@ def main():
     monitor = IncrementalRMTMonitor(
         google_api_key=args.google_api_key,
         gemini_api_key=args.gemini_api_key,
-        db_path=args.db_path
+        db_path=args.db_path,
+        max_concurrency=args.concurrency,
+        requests_per_minute=args.rpm,
+        tokens_per_minute=args.tpm,
+        batch_reviews=args.batch_reviews,
+        use_cache=not args.no_cache,
+        async_pipeline=args.async_pipeline,
+        triage_config=TriageConfig(skip_below=args.triage_skip_below) if args.triage else None,
+        compact_prompts=args.compact_prompts,
+        staged_pipeline=args.staged_pipeline,
+        stage_workers=stage_workers,
+        pipeline_queue_size=args.pipeline_queue_size,
+        pipeline_log_interval=args.pipeline_log_interval,
+        refresh_config=RefreshConfig(api_budget=args.api_budget, min_interval_days=args.min_refresh_days,
+                                     max_interval_days=args.max_refresh_days)
     )
     
     try:
-        if args.mode == 'full':
+        if args.resume:
+            run_id = monitor.resume_run(args.resume)
+            print(f"✅ Resumed run complete: {run_id}")
+            
+        elif args.mode == 'full':
             run_id = monitor.run_full_analysis(args.keywords)
             print(f"✅ Full analysis complete: {run_id}")
             
@@ -790,7 +2107,7 @@ def main():
                 print(f"   📄 {file_type}: {file_path}")
         
         # Always export latest results
-        if args.mode != 'export':
+        if args.resume or args.mode != 'export':
             files = monitor.export_latest_results()
             print(f"\n📊 Latest results exported to: {files['output_directory']}")
         
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Read-through cache for leaderboard reads
+
+RMTMonitoringDatabase.get_latest_leaderboard() and leaderboard_queries.top_k() /
+top_k_per_city() go through one LeaderboardCache per database. Cached results are
+tagged with the database's run tag: the latest completed monitoring run and the
+latest meta-leaderboard run. Leaderboard data only changes when one of those moves,
+so repeated reads between runs are served from memory.
+
+The tag is invalidated as soon as this process writes a run
+(complete_monitoring_run(), store_meta_leaderboard() and store_meta_leaderboard_run()
+call invalidate()). Runs written by other processes are picked up when the tag is
+re-read, at most RECHECK_SECONDS after the last check.
+
+Set RMT_LEADERBOARD_CACHE_FILE to a JSON file to keep the cache across processes
+(for example repeated CLI exports); the file holds one database's entries and is
+ignored once a new run changes the run tag. Values read back from the file have
+been through JSON, so timestamps come back as strings.
+Set RMT_LEADERBOARD_CACHE=off to disable the cache.
+"""
+
+import copy
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from storage_backends import create_backend
+
+logger = logging.getLogger(__name__)
+
+CACHE_ENABLED = os.environ.get('RMT_LEADERBOARD_CACHE', 'on').lower() not in ('0', 'off', 'false', 'no')
+CACHE_FILE = os.environ.get('RMT_LEADERBOARD_CACHE_FILE') or None
+
+RECHECK_SECONDS = 30.0
+MAX_ENTRIES = 256
+
+
+def read_run_tag(backend, conn) -> Tuple[Optional[str], Optional[str]]:
+    """(latest completed monitoring run, latest meta-leaderboard run); None where a table is missing or empty"""
+    tag = []
+    for table, sql in (
+        ('monitoring_runs',
+         "SELECT run_id FROM monitoring_runs WHERE status = 'completed' ORDER BY completed_at DESC LIMIT 1"),
+        ('meta_leaderboard_runs', "SELECT run_id FROM meta_leaderboard_runs ORDER BY created_at DESC LIMIT 1"),
+    ):
+        row = conn.execute(sql).fetchone() if backend.table_columns(conn, table) else None
+        tag.append(row['run_id'] if row else None)
+    return tuple(tag)
+
+
+class LeaderboardCache:
+    """Results of leaderboard reads for one database, valid for one run tag"""
+
+    def __init__(self, db_path: str, path: Optional[str] = None, recheck_seconds: float = RECHECK_SECONDS,
+                 max_entries: int = MAX_ENTRIES):
+        self.db_path = db_path
+        self.backend = create_backend(db_path)
+        self.path = path
+        self.recheck_seconds = recheck_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[str, Any]' = OrderedDict()
+        self._tag: Optional[Tuple[Optional[str], Optional[str]]] = None
+        self._checked_at = 0.0
+        self._file_loaded = path is None
+
+    def get(self, key: Tuple[Hashable, ...], loader: Callable[[], Any]) -> Any:
+        """Cached result for key, or loader()'s result (cached under the current run tag)"""
+        self._refresh_tag()
+        name = json.dumps(key, default=str)
+        with self._lock:
+            if name in self._entries:
+                self._entries.move_to_end(name)
+                self.hits += 1
+                return copy.deepcopy(self._entries[name])
+            tag = self._tag
+            self.misses += 1
+
+        value = loader()
+        with self._lock:
+            # A run written while loading invalidated the tag; the result may predate it
+            if self._tag == tag:
+                self._entries[name] = copy.deepcopy(value)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                self._save()
+        return value
+
+    def invalidate(self):
+        """Drop every entry; the run tag is re-read on the next get()"""
+        with self._lock:
+            self._entries.clear()
+            self._tag = None
+            self._file_loaded = True
+
+    def _refresh_tag(self):
+        if self._tag is not None and time.monotonic() - self._checked_at < self.recheck_seconds:
+            return
+        with self.backend.connect() as conn:
+            tag = read_run_tag(self.backend, conn)
+        with self._lock:
+            if not self._file_loaded:
+                self._load(tag)
+            if tag != self._tag:
+                if self._tag is not None:
+                    logger.info(f"Leaderboard cache invalidated: run tag {self._tag} -> {tag}")
+                    self._entries.clear()
+                self._tag = tag
+            self._checked_at = time.monotonic()
+
+    def _load(self, tag: Tuple[Optional[str], Optional[str]]):
+        self._file_loaded = True
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        if saved.get('db_path') == self.db_path and tuple(saved.get('tag') or ()) == tag:
+            self._entries.update(saved.get('entries') or {})
+            self._tag = tag
+
+    def _save(self):
+        if not self.path:
+            return
+        temp_path = f"{self.path}.tmp"
+        try:
+            with open(temp_path, 'w') as f:
+                json.dump({'db_path': self.db_path, 'tag': self._tag, 'entries': self._entries}, f, default=str)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not write leaderboard cache file {self.path}: {e}")
+
+
+_caches: Dict[str, LeaderboardCache] = {}
+_caches_lock = threading.Lock()
+
+
+def leaderboard_cache(db_path: str) -> LeaderboardCache:
+    """The process-wide cache of a database"""
+    with _caches_lock:
+        if db_path not in _caches:
+            _caches[db_path] = LeaderboardCache(db_path, path=CACHE_FILE)
+        return _caches[db_path]
+
+
+def cached(db_path: str, key: Tuple[Hashable, ...], loader: Callable[[], Any]) -> Any:
+    """Read through the database's cache (calls loader() directly when the cache is off)"""
+    if not CACHE_ENABLED:
+        return loader()
+    return leaderboard_cache(db_path).get(key, loader)
+
+
+def invalidate(db_path: str):
+    """Called after writing a run to the database"""
+    with _caches_lock:
+        cache = _caches.get(db_path)
+    if cache is not None:
+        cache.invalidate()
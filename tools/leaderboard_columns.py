@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Columnar leaderboard aggregation
+
+Loads a list of ComprehensiveRMTAnalysis objects into one pandas DataFrame (a single
+pass over the pydantic objects) and computes the per-RMT totals and summary counts
+behind GeminiReviewAnalyzer.calculate_leaderboard_metrics() and
+_generate_summary_stats() with group-by reductions.
+
+The totals use the same keys as LeaderboardAccumulator in gemini_review_analyzer.py,
+which turns them into RMTLeaderboardMetrics, so both paths share the scoring and
+rounding code and produce identical output. Group order is order of first
+appearance, as in the list-based path, so ties in the final sort break the same way.
+
+Requirements:
+    pip install numpy pandas
+"""
+
+from typing import Any, Dict, Iterable
+
+try:
+    import numpy as np
+    import pandas as pd
+except ImportError:
+    np = None
+    pd = None
+
+# Sentiment label -> score used for average_sentiment_score (unknown labels score 0)
+SENTIMENT_SCORES = {"very_positive": 1.0, "positive": 0.5, "neutral": 0.0,
+                    "negative": -0.5, "very_negative": -1.0}
+POSITIVE_SENTIMENTS = ("very_positive", "positive")
+NEGATIVE_SENTIMENTS = ("very_negative", "negative")
+AUTHENTICITY_LABELS = ("authentic", "suspicious", "unclear")
+QUALITY_DIMENSIONS = ("technical", "communication", "professionalism")
+
+COLUMNS = ("profile_id", "mention_confidence", "sentiment", "authenticity",
+           "technical", "communication", "professionalism",
+           "recommendation_given", "repeat_client_indicated", "potential_false_positive")
+
+
+def available() -> bool:
+    """True when numpy and pandas are installed"""
+    return pd is not None
+
+
+def analyses_frame(analyses: Iterable[Any]) -> "pd.DataFrame":
+    """One row per analysis with the fields the leaderboard needs (missing ratings are NaN)"""
+    rows = [(
+        a.extraction_id.split('_')[0],
+        a.rmt_mention_analysis.mention_confidence,
+        a.sentiment_analysis.overall_sentiment,
+        a.review_classification.review_authenticity,
+        a.service_quality_metrics.technical_skill_rating,
+        a.service_quality_metrics.communication_rating,
+        a.service_quality_metrics.professionalism_rating,
+        a.review_classification.recommendation_given,
+        a.review_classification.repeat_client_indicated,
+        a.potential_false_positive,
+    ) for a in analyses]
+    frame = pd.DataFrame.from_records(rows, columns=COLUMNS)
+    for name in QUALITY_DIMENSIONS:
+        frame[name] = pd.to_numeric(frame[name], errors='coerce').astype('float64')
+    return frame
+
+
+def group_totals(frame: "pd.DataFrame") -> Dict[str, Dict[str, float]]:
+    """Per-RMT counts and sums keyed by profile_id, in order of first appearance"""
+    # factorize() numbers groups in order of first appearance; bincount() does the group-by sums
+    codes, profile_ids = pd.factorize(frame['profile_id'])
+    groups = len(profile_ids)
+
+    def count(mask) -> list:
+        return np.bincount(codes[np.asarray(mask, dtype=bool)], minlength=groups).tolist()
+
+    def total(weights) -> list:
+        return np.bincount(codes, weights=np.asarray(weights, dtype='float64'), minlength=groups).tolist()
+
+    confidence = frame['mention_confidence'].to_numpy(dtype='float64')
+    sentiment = frame['sentiment']
+    columns = {
+        'total': np.bincount(codes, minlength=groups).tolist(),
+        'high_confidence': count(confidence > 0.8),
+        'authentic': count(frame['authenticity'] == "authentic"),
+        'positive': count(sentiment.isin(POSITIVE_SENTIMENTS)),
+        'negative': count(sentiment.isin(NEGATIVE_SENTIMENTS)),
+        'sentiment_sum': total(sentiment.map(SENTIMENT_SCORES).fillna(0.0)),
+        'recommendations': count(frame['recommendation_given']),
+        'repeat_clients': count(frame['repeat_client_indicated']),
+        'false_positives': count(frame['potential_false_positive']),
+        'low_confidence': count(confidence < 0.6),
+    }
+    for name in QUALITY_DIMENSIONS:
+        ratings = frame[name]
+        columns[f'{name}_sum'] = total(ratings.fillna(0.0))
+        columns[f'{name}_count'] = count(ratings.notna())
+
+    # tolist() gives native ints/floats, so the metrics match the list-based path exactly
+    return {
+        profile_id: {name: column[i] for name, column in columns.items()}
+        for i, profile_id in enumerate(profile_ids.tolist())
+    }
+
+
+def summary_counts(frame: "pd.DataFrame") -> Dict[str, Any]:
+    """Distribution counts for _generate_summary_stats()"""
+    codes, labels = pd.factorize(frame['sentiment'])
+    sentiment_counts = np.bincount(codes[codes >= 0], minlength=len(labels))
+    confidence = frame['mention_confidence'].to_numpy(dtype='float64')
+    high = confidence > 0.8
+    medium = ~high & (confidence >= 0.5)
+    authenticity = frame['authenticity'].value_counts()
+    return {
+        "sentiment_distribution": dict(zip(labels.tolist(), sentiment_counts.tolist())),
+        "confidence_distribution": {
+            "high_confidence": int(high.sum()),
+            "medium_confidence": int(medium.sum()),
+            "low_confidence": int(len(confidence) - high.sum() - medium.sum()),
+        },
+        "authenticity_stats": {label: int(authenticity.get(label, 0)) for label in AUTHENTICITY_LABELS},
+        "potential_false_positives": int(frame['potential_false_positive'].sum()),
+    }
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Deterministic local leaderboard engine
+
+One scoring model shared by GeminiReviewAnalyzer's leaderboard metrics, the
+leaderboard snapshots in incremental_rmt_system.py and `run_meta_leaderboard.py
+--local`, which writes rmt_leaderboard without a Gemini call.
+
+Every facet is a ratio on a 0-1 scale (sentiment, service quality and its three
+dimensions, authenticity, recommendation rate, repeat client rate, mention
+confidence) and is scored as:
+
+- Bayesian-smoothed: `prior_reviews` pseudo-reviews at the population mean are
+  added to each RMT, so an RMT with one glowing review stays near the mean until
+  more reviews back it up.
+- With a confidence interval: the normal approximation of the Beta posterior,
+  p +/- z * sqrt(p (1 - p) / (n + prior_reviews + 1)).
+- Time-decayed: reviews count 0.5 ** (age / half_life_days), so old reviews fade
+  and carry less evidence (more smoothing).
+
+The composite is the weighted mean of the facets times (1 - smoothed false positive
+rate), on 0-100. Ranking can use any facet, by its score or by the lower end of
+its interval.
+
+The totals are the per-RMT counts and sums kept by LeaderboardAccumulator in
+gemini_review_analyzer.py; in the database they are kept per RMT and month in
+rmt_aggregate_periods (maintained by triggers on ai_analyses), so a leaderboard
+reads RMTs x months rows and no analysis_json.
+"""
+
+import math
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from storage_backends import create_backend
+
+QUALITY_DIMENSIONS = ('technical', 'communication', 'professionalism')
+
+# Per-RMT totals (same keys as LeaderboardAccumulator)
+TOTAL_KEYS = (
+    'total', 'high_confidence', 'authentic', 'positive', 'negative', 'sentiment_sum',
+    'technical_sum', 'technical_count', 'communication_sum', 'communication_count',
+    'professionalism_sum', 'professionalism_count', 'recommendations', 'repeat_clients',
+    'false_positives', 'low_confidence',
+)
+
+# Monthly per-RMT totals maintained by the ai_analyses triggers in incremental_rmt_system.py
+PERIOD_TABLE = 'rmt_aggregate_periods'
+
+# SQL for each total's contribution from one ai_analyses row ({r} is the row prefix, e.g. "NEW.")
+PERIOD_TOTALS = {
+    'total': "1",
+    'high_confidence': "CASE WHEN {r}mention_confidence > 0.8 THEN 1 ELSE 0 END",
+    'authentic': "CASE WHEN {r}review_authenticity = 'authentic' THEN 1 ELSE 0 END",
+    'positive': "CASE WHEN {r}sentiment_overall IN ('positive', 'very_positive') THEN 1 ELSE 0 END",
+    'negative': "CASE WHEN {r}sentiment_overall IN ('negative', 'very_negative') THEN 1 ELSE 0 END",
+    'sentiment_sum': ("CASE {r}sentiment_overall WHEN 'very_positive' THEN 1.0 WHEN 'positive' THEN 0.5 "
+                      "WHEN 'negative' THEN -0.5 WHEN 'very_negative' THEN -1.0 ELSE 0.0 END"),
+    'technical_sum': "COALESCE({r}technical_skill_rating, 0)",
+    'technical_count': "CASE WHEN {r}technical_skill_rating IS NOT NULL THEN 1 ELSE 0 END",
+    'communication_sum': "COALESCE({r}communication_rating, 0)",
+    'communication_count': "CASE WHEN {r}communication_rating IS NOT NULL THEN 1 ELSE 0 END",
+    'professionalism_sum': "COALESCE({r}professionalism_rating, 0)",
+    'professionalism_count': "CASE WHEN {r}professionalism_rating IS NOT NULL THEN 1 ELSE 0 END",
+    'recommendations': "CASE WHEN {r}recommendation_given THEN 1 ELSE 0 END",
+    'repeat_clients': "CASE WHEN {r}repeat_client_indicated THEN 1 ELSE 0 END",
+    'false_positives': "CASE WHEN {r}potential_false_positive THEN 1 ELSE 0 END",
+    'low_confidence': "CASE WHEN {r}mention_confidence < 0.6 THEN 1 ELSE 0 END",
+}
+
+
+def _quality(totals: Dict[str, float], dimensions: Tuple[str, ...]) -> Tuple[float, float]:
+    # 1-5 ratings rescaled to 0-1
+    count = sum(totals[f'{name}_count'] for name in dimensions)
+    return (sum(totals[f'{name}_sum'] for name in dimensions) - count) / 4, count
+
+
+# Facet -> (numerator, denominator) of its 0-1 ratio; the order is the output order
+FACETS: Dict[str, Callable[[Dict[str, float]], Tuple[float, float]]] = {
+    'sentiment': lambda t: ((t['sentiment_sum'] + t['total']) / 2, t['total']),
+    'service_quality': lambda t: _quality(t, QUALITY_DIMENSIONS),
+    'technical': lambda t: _quality(t, ('technical',)),
+    'communication': lambda t: _quality(t, ('communication',)),
+    'professionalism': lambda t: _quality(t, ('professionalism',)),
+    'authenticity': lambda t: (t['authentic'], t['total']),
+    'recommendation_rate': lambda t: (t['recommendations'], t['total']),
+    'repeat_client_rate': lambda t: (t['repeat_clients'], t['total']),
+    'confidence': lambda t: (t['high_confidence'], t['total']),
+}
+
+
+def _false_positive_rate(totals: Dict[str, float]) -> Tuple[float, float]:
+    return totals['false_positives'], totals['total']
+
+
+# Composite weights: sentiment and quality as in the original 40/30 split; the volume
+# bonus is replaced by smoothing, its 10 points moved to recommendations and repeat clients
+DEFAULT_WEIGHTS = {
+    'sentiment': 0.4,
+    'service_quality': 0.3,
+    'confidence': 0.1,
+    'recommendation_rate': 0.1,
+    'repeat_client_rate': 0.1,
+}
+
+# Prior means used when nobody has data for a facet
+NEUTRAL_PRIOR = 0.5
+FALSE_POSITIVE_PRIOR = 0.0
+
+RANK_BY = ('score', 'lower_bound')
+
+# IN (...) lists are split so large profile sets stay under the bound-parameter limit
+PROFILE_ID_CHUNK = 500
+
+
+@dataclass
+class EngineConfig:
+    """Leaderboard engine settings"""
+    prior_reviews: float = 5.0  # Pseudo-reviews at the population mean added to every RMT
+    half_life_days: Optional[float] = 365.0  # None or 0 disables time decay
+    z: float = 1.96  # Interval width (1.96 = 95%)
+    weights: Dict[str, float] = field(default_factory=lambda: dict(DEFAULT_WEIGHTS))
+
+
+def empty_totals() -> Dict[str, float]:
+    return dict.fromkeys(TOTAL_KEYS, 0)
+
+
+def add_totals(into: Dict[str, float], totals: Any, weight: float = 1.0) -> Dict[str, float]:
+    """Add weight * totals (a dict or row with TOTAL_KEYS) into `into`"""
+    for key in TOTAL_KEYS:
+        into[key] += float(totals[key] or 0) * weight  # float(): PostgreSQL SUM() returns Decimal
+    return into
+
+
+def period_weight(period: str, as_of: datetime, half_life_days: Optional[float]) -> float:
+    """Decay weight of a 'YYYY-MM' period, measured from the middle of the month"""
+    if not half_life_days:
+        return 1.0
+    year, month = (int(part) for part in period.split('-')[:2])
+    age_days = max(0.0, (as_of - datetime(year, month, 15)).total_seconds() / 86400)
+    return 0.5 ** (age_days / half_life_days)
+
+
+def population_prior(groups: Iterable[Dict[str, float]]) -> Dict[str, float]:
+    """Prior mean of every facet (and the false positive rate) from all RMTs' totals"""
+    population = empty_totals()
+    for totals in groups:
+        add_totals(population, totals)
+    prior = {}
+    for facet, ratio in list(FACETS.items()) + [('false_positive', _false_positive_rate)]:
+        numerator, denominator = ratio(population)
+        default = FALSE_POSITIVE_PRIOR if facet == 'false_positive' else NEUTRAL_PRIOR
+        prior[facet] = numerator / denominator if denominator else default
+    return prior
+
+
+def _smoothed(numerator: float, denominator: float, prior: float, config: EngineConfig) -> Tuple[float, float]:
+    """Posterior mean and standard error of a 0-1 ratio"""
+    evidence = denominator + config.prior_reviews
+    if evidence <= 0:
+        return prior, 0.5
+    mean = min(1.0, max(0.0, (numerator + config.prior_reviews * prior) / evidence))
+    return mean, math.sqrt(mean * (1 - mean) / (evidence + 1))
+
+
+def _interval(mean: float, error: float, config: EngineConfig, scale: float = 100.0) -> List[float]:
+    return [round(max(0.0, mean - config.z * error) * scale, 1), round(min(1.0, mean + config.z * error) * scale, 1)]
+
+
+def score_totals(totals: Dict[str, float], prior: Dict[str, float], config: Optional[EngineConfig] = None,
+                 raw: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """
+    Scores, intervals and rates for one RMT
+
+    totals are the (time-decayed) totals used for scoring; raw are the undecayed
+    totals used for counts and rates (defaults to totals).
+    """
+    config = config or EngineConfig()
+    raw = raw or totals
+    scores, intervals, errors = {}, {}, {}
+    for facet, ratio in FACETS.items():
+        mean, error = _smoothed(*ratio(totals), prior[facet], config)
+        scores[facet] = mean
+        errors[facet] = error
+        intervals[facet] = _interval(mean, error, config)
+
+    false_positive_rate, _ = _smoothed(*_false_positive_rate(totals), prior['false_positive'], config)
+    weight_total = sum(config.weights.values()) or 1.0
+    weights = {facet: weight / weight_total for facet, weight in config.weights.items()}
+    keep = 1 - false_positive_rate
+    composite = sum(weight * scores[facet] for facet, weight in weights.items()) * keep
+    composite_error = keep * math.sqrt(sum((weight * errors[facet]) ** 2 for facet, weight in weights.items()))
+    intervals['composite'] = _interval(composite, composite_error, config)
+
+    reviews = raw['total']
+    return {
+        'reviews_analyzed': int(reviews),
+        'effective_reviews': round(totals['total'], 2),
+        'scores': {**{facet: round(score * 100, 1) for facet, score in scores.items()},
+                   'composite': round(composite * 100, 2)},
+        'intervals': intervals,
+        'rates': {
+            'recommendation': round(raw['recommendations'] / reviews, 3) if reviews else 0.0,
+            'repeat_client': round(raw['repeat_clients'] / reviews, 3) if reviews else 0.0,
+            'authentic': round(raw['authentic'] / reviews, 3) if reviews else 0.0,
+            'false_positive': round(raw['false_positives'] / reviews, 3) if reviews else 0.0,
+        },
+        'average_sentiment_score': round(raw['sentiment_sum'] / reviews, 3) if reviews else 0.0,
+        'potential_false_positives': int(raw['false_positives']),
+    }
+
+
+def score_groups(groups: Dict[str, Dict[str, float]], config: Optional[EngineConfig] = None,
+                 prior: Optional[Dict[str, float]] = None) -> Dict[str, Dict[str, Any]]:
+    """score_totals() for every RMT, with the prior taken from the groups themselves by default"""
+    prior = prior or population_prior(groups.values())
+    return {profile_id: score_totals(totals, prior, config) for profile_id, totals in groups.items()}
+
+
+def rank_entries(entries: List[Dict[str, Any]], facet: str = 'composite', by: str = 'score') -> List[Dict[str, Any]]:
+    """
+    Sort entries (dicts with 'scores' and 'intervals') by one facet and set 'rank'
+
+    by='lower_bound' ranks by the low end of the interval, which favours RMTs whose
+    score is backed by more reviews. Every entry also gets 'facet_ranks' with its
+    rank on each facet. Ties break by profile_id.
+    """
+    if by not in RANK_BY:
+        raise ValueError(f"by must be one of {RANK_BY}, not {by!r}")
+
+    def key(name):
+        if by == 'lower_bound':
+            return lambda entry: (-entry['intervals'][name][0], -entry['scores'][name], entry['profile_id'])
+        return lambda entry: (-entry['scores'][name], entry['profile_id'])
+
+    for name in list(FACETS) + ['composite']:
+        for rank, entry in enumerate(sorted(entries, key=key(name)), 1):
+            entry.setdefault('facet_ranks', {})[name] = rank
+    ranked = sorted(entries, key=key(facet))
+    for rank, entry in enumerate(ranked, 1):
+        entry['rank'] = rank
+    return ranked
+
+
+def _period_rows(backend, conn, profile_ids: Optional[Iterable[str]]) -> Iterable[Any]:
+    sql = f"SELECT profile_id, period, {', '.join(TOTAL_KEYS)} FROM {PERIOD_TABLE}"
+    if profile_ids is None:
+        return backend.iter_query(conn, sql)
+    profile_ids = sorted(set(profile_ids))
+    rows = []
+    for start in range(0, len(profile_ids), PROFILE_ID_CHUNK):
+        chunk = profile_ids[start:start + PROFILE_ID_CHUNK]
+        rows.extend(conn.execute(f"{sql} WHERE profile_id IN ({', '.join('?' * len(chunk))})", chunk).fetchall())
+    return rows
+
+
+def load_totals(backend, conn, profile_ids: Optional[Iterable[str]] = None, as_of: Optional[datetime] = None,
+                half_life_days: Optional[float] = None) -> Dict[str, Tuple[Dict[str, float], Dict[str, float]]]:
+    """(raw, decayed) totals per RMT from rmt_aggregate_periods (all RMTs, or only profile_ids)"""
+    as_of = as_of or datetime.now()
+    weights: Dict[str, float] = {}
+    totals: Dict[str, Tuple[Dict[str, float], Dict[str, float]]] = {}
+    for row in _period_rows(backend, conn, profile_ids):
+        period = row['period']
+        if period not in weights:
+            weights[period] = period_weight(period, as_of, half_life_days)
+        raw, decayed = totals.setdefault(row['profile_id'], (empty_totals(), empty_totals()))
+        add_totals(raw, row)
+        add_totals(decayed, row, weights[period])
+    return totals
+
+
+def load_prior(conn, as_of: Optional[datetime] = None, half_life_days: Optional[float] = None) -> Dict[str, float]:
+    """Population prior from one GROUP BY period over rmt_aggregate_periods (a row per month)"""
+    as_of = as_of or datetime.now()
+    sums = ', '.join(f"SUM({key}) AS {key}" for key in TOTAL_KEYS)
+    population = empty_totals()
+    for row in conn.execute(f"SELECT period, {sums} FROM {PERIOD_TABLE} GROUP BY period").fetchall():
+        add_totals(population, row, period_weight(row['period'], as_of, half_life_days))
+    return population_prior([population])
+
+
+def build_leaderboard(db_path: str, config: Optional[EngineConfig] = None, facet: str = 'composite',
+                      by: str = 'score', as_of: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """
+    Ranked leaderboard of every RMT with analyses, from rmt_aggregate_periods
+
+    Entries have the rmt_leaderboard shape used by the Gemini meta-analysis
+    (profile_id, name, scores with 'composite', rank) plus intervals, rates and
+    facet_ranks.
+    """
+    config = config or EngineConfig()
+    if facet not in FACETS and facet != 'composite':
+        raise ValueError(f"Unknown facet {facet!r}; expected 'composite' or one of {list(FACETS)}")
+    backend = create_backend(db_path)
+    with backend.connect() as conn:
+        totals = load_totals(backend, conn, as_of=as_of, half_life_days=config.half_life_days)
+        names = {row['profile_id']: f"{row['first_name']} {row['last_name']}" for row in
+                 backend.iter_query(conn, "SELECT profile_id, first_name, last_name FROM rmt_profiles")}
+
+    prior = population_prior(decayed for _, decayed in totals.values())
+    entries = []
+    for profile_id, (raw, decayed) in totals.items():
+        if not raw['total']:
+            continue
+        entries.append({'profile_id': profile_id, 'name': names.get(profile_id, f"RMT_{profile_id}"),
+                        **score_totals(decayed, prior, config, raw), 'engine': 'local'})
+    return rank_entries(entries, facet, by)
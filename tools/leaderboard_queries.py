@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Ranked leaderboard queries
+
+store_meta_leaderboard() in run_meta_leaderboard.py writes each numeric score of every
+rmt_leaderboard entry to leaderboard_scores: one row per run, facet and RMT, with the
+RMT's primary practice city taken from rmt_profiles.practice_locations at write time.
+top_k() reads one page of a ranked list straight off the (run_id, facet, score) and
+(run_id, facet, city, score) indexes, so UI and API callers never load the full
+leaderboard.
+
+Pages are keyset-paginated: next_cursor encodes the last row's (score, profile_id),
+and the next page starts strictly after it. Pages stay consistent because a run's
+scores never change once written.
+
+Results are read through leaderboard_cache, so repeating a query between runs does
+not touch the database.
+
+Usage:
+    from leaderboard_queries import top_k, top_k_per_city
+    page = top_k("rmt_monitoring.db", city="Toronto", facet="composite", k=10)
+    more = top_k("rmt_monitoring.db", cursor=page["next_cursor"])
+    sidebar = top_k_per_city("rmt_monitoring.db", k=3)
+"""
+
+import base64
+import json
+from typing import Any, Dict, Iterable, List, Optional
+
+from leaderboard_cache import cached
+from storage_backends import create_backend
+
+DEFAULT_K = 20
+MAX_K = 500
+
+LEADERBOARD_SCORES_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS leaderboard_scores (
+    run_id TEXT NOT NULL,
+    facet TEXT NOT NULL,  -- 'composite' or any other key of the entry's scores
+    profile_id TEXT NOT NULL,
+    score DOUBLE PRECISION NOT NULL,
+    city TEXT,  -- Primary practice city at write time
+    rmt_name TEXT,
+    PRIMARY KEY (run_id, facet, profile_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_leaderboard_scores_rank ON leaderboard_scores(run_id, facet, score DESC, profile_id);
+CREATE INDEX IF NOT EXISTS idx_leaderboard_scores_city ON leaderboard_scores(run_id, facet, city, score DESC, profile_id);
+"""
+
+# IN (...) lists are split so large profile sets stay under the bound-parameter limit
+PROFILE_ID_CHUNK = 500
+
+
+def normalize_city(city: Optional[str]) -> Optional[str]:
+    """Cities are stored title-cased, so 'ottawa' and 'Ottawa' rank together"""
+    city = (city or '').strip()
+    return city.title() if city else None
+
+
+def primary_city(practice_locations: Any) -> Optional[str]:
+    """City of an RMT's first practice location (rmt_profiles.practice_locations JSON)"""
+    if isinstance(practice_locations, str):
+        try:
+            practice_locations = json.loads(practice_locations)
+        except ValueError:
+            return None
+    for location in practice_locations or []:
+        if isinstance(location, dict):
+            city = normalize_city(location.get('businessCity') or location.get('city'))
+            if city:
+                return city
+    return None
+
+
+def ensure_leaderboard_scores(backend, conn):
+    backend.executescript(conn, LEADERBOARD_SCORES_TABLE_SQL)
+
+
+def cities_for(conn, profile_ids: Iterable[str]) -> Dict[str, Optional[str]]:
+    """profile_id -> primary practice city for the given RMTs"""
+    profile_ids = sorted(set(profile_ids))
+    cities = {}
+    for start in range(0, len(profile_ids), PROFILE_ID_CHUNK):
+        chunk = profile_ids[start:start + PROFILE_ID_CHUNK]
+        for row in conn.execute(
+                f"SELECT profile_id, practice_locations FROM rmt_profiles "
+                f"WHERE profile_id IN ({', '.join('?' * len(chunk))})", chunk).fetchall():
+            cities[row['profile_id']] = primary_city(row['practice_locations'])
+    return cities
+
+
+def write_scores(backend, conn, run_id: str, entries: List[Dict[str, Any]]) -> int:
+    """Replace a run's leaderboard_scores rows with every numeric score of its entries"""
+    cities = cities_for(conn, (entry['profile_id'] for entry in entries))
+    rows = []
+    for entry in entries:
+        for facet, score in (entry.get('scores') or {}).items():
+            try:
+                score = float(score)
+            except (TypeError, ValueError):
+                continue
+            rows.append((run_id, facet, entry['profile_id'], score, cities.get(entry['profile_id']),
+                         entry.get('name')))
+    conn.execute("DELETE FROM leaderboard_scores WHERE run_id = ?", (run_id,))
+    return backend.bulk_insert(conn, 'leaderboard_scores',
+                               ('run_id', 'facet', 'profile_id', 'score', 'city', 'rmt_name'), rows)
+
+
+def latest_run_id(conn) -> Optional[str]:
+    """Newest meta-leaderboard run (a run is visible once its meta_leaderboard_runs row exists)"""
+    row = conn.execute("SELECT run_id FROM meta_leaderboard_runs ORDER BY created_at DESC LIMIT 1").fetchone()
+    return row['run_id'] if row else None
+
+
+def encode_cursor(state: Dict[str, Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(state, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except ValueError as e:
+        raise ValueError(f"Invalid leaderboard cursor: {cursor!r}") from e
+
+
+def top_k(db_path: str, city: Optional[str] = None, facet: str = 'composite', k: int = DEFAULT_K,
+          run_id: Optional[str] = None, cursor: Optional[str] = None) -> Dict[str, Any]:
+    """
+    One page of RMTs ranked by a facet score, best first (ties by profile_id)
+
+    Defaults to the latest meta-leaderboard run. A cursor carries the run, facet and
+    city of the page it came from, so passing only the cursor continues that list.
+    Returns {'run_id', 'facet', 'city', 'entries', 'next_cursor'}; entries have
+    rank, profile_id, name, city and score, and next_cursor is None on the last page.
+    """
+    k = max(1, min(int(k), MAX_K))
+    after = decode_cursor(cursor) if cursor else None
+    if after:
+        run_id, facet, city = after['run_id'], after['facet'], after['city']
+    return cached(db_path, ('top_k', run_id, facet, normalize_city(city), k, cursor),
+                  lambda: _top_k(db_path, city, facet, k, run_id, after))
+
+
+def _top_k(db_path: str, city: Optional[str], facet: str, k: int, run_id: Optional[str],
+           after: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    with create_backend(db_path).connect() as conn:
+        run_id = run_id or latest_run_id(conn)
+        if run_id is None:
+            return {'run_id': None, 'facet': facet, 'city': city, 'entries': [], 'next_cursor': None}
+        sql = "SELECT profile_id, rmt_name, city, score FROM leaderboard_scores WHERE run_id = ? AND facet = ?"
+        params: List[Any] = [run_id, facet]
+        if city is not None:
+            sql += " AND city = ?"
+            params.append(normalize_city(city))
+        if after:
+            sql += " AND (score < ? OR (score = ? AND profile_id > ?))"
+            params += [after['score'], after['score'], after['profile_id']]
+        rows = conn.execute(f"{sql} ORDER BY score DESC, profile_id LIMIT ?", params + [k + 1]).fetchall()
+
+    position = after['position'] if after else 0
+    entries = [{'rank': position + i, 'profile_id': row['profile_id'], 'name': row['rmt_name'],
+                'city': row['city'], 'score': row['score']} for i, row in enumerate(rows[:k], 1)]
+    next_cursor = None
+    if len(rows) > k:
+        last = entries[-1]
+        next_cursor = encode_cursor({'run_id': run_id, 'facet': facet, 'city': city, 'score': last['score'],
+                                     'profile_id': last['profile_id'], 'position': last['rank']})
+    return {'run_id': run_id, 'facet': facet, 'city': city, 'entries': entries, 'next_cursor': next_cursor}
+
+
+def top_k_per_city(db_path: str, facet: str = 'composite', k: int = 3,
+                   run_id: Optional[str] = None) -> Dict[Optional[str], List[Dict[str, Any]]]:
+    """The k best RMTs of every city in one query (city None = no known practice city)"""
+    k = max(1, int(k))
+    # Cached as (city, entries) pairs because JSON object keys cannot be None
+    return dict(cached(db_path, ('top_k_per_city', run_id, facet, k),
+                       lambda: list(_top_k_per_city(db_path, facet, k, run_id).items())))
+
+
+def _top_k_per_city(db_path: str, facet: str, k: int,
+                    run_id: Optional[str]) -> Dict[Optional[str], List[Dict[str, Any]]]:
+    with create_backend(db_path).connect() as conn:
+        run_id = run_id or latest_run_id(conn)
+        if run_id is None:
+            return {}
+        rows = conn.execute("""
+            SELECT city, city_rank, profile_id, rmt_name, score FROM (
+                SELECT city, profile_id, rmt_name, score,
+                       ROW_NUMBER() OVER (PARTITION BY city ORDER BY score DESC, profile_id) AS city_rank
+                FROM leaderboard_scores
+                WHERE run_id = ? AND facet = ?
+            ) ranked
+            WHERE city_rank <= ?
+            ORDER BY city, city_rank
+        """, (run_id, facet, k)).fetchall()
+
+    by_city: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    for row in rows:
+        by_city.setdefault(row['city'], []).append({
+            'rank': row['city_rank'], 'profile_id': row['profile_id'], 'name': row['rmt_name'],
+            'city': row['city'], 'score': row['score'],
+        })
+    return by_city
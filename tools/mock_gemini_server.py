@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+Local mock Gemini API server
+
+A stand-in for the generateContent endpoint so the analysis pipeline can be load
+tested without spending quota:
+
+- POST /v1beta/models/<model>:generateContent answers with JSON that matches the
+  request's response schema (ComprehensiveRMTAnalysis, or a list of them for batched
+  prompts, one per "### REVIEW <id>" heading). Requests without a schema that carry
+  the meta-leaderboard input JSON get a leaderboard with one entry per RMT.
+- Responses are deterministic: the same prompt always gets the same answer.
+- Latency, jitter, server errors (500) and rate-limit errors (429) are configurable.
+  Fault injection is seeded, and --rpm returns real 429s above a request budget.
+- GET /stats returns request counters and the peak number of requests in flight.
+
+Point the analyzer at it with GeminiReviewAnalyzer(base_url=...) or by setting
+GEMINI_BASE_URL, and point run_meta_leaderboard.py at it with --gemini-base-url.
+
+Usage:
+    # Serve on port 8089 with 300 ms latency, 2% errors and 5% injected 429s
+    python mock_gemini_server.py serve --port 8089 --latency-ms 300 --error-rate 0.02 --rate-limit-rate 0.05
+    GEMINI_BASE_URL=http://127.0.0.1:8089 python run_analysis_only.py --gemini-api-key=mock ...
+
+    # Benchmark GeminiReviewAnalyzer against an in-process mock
+    python mock_gemini_server.py bench --reviews 500 --max-concurrency 16 --latency-ms 500
+    python mock_gemini_server.py bench --reviews 500 --max-concurrency 4 --batch-reviews
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import random
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+GENERATE_PATH = re.compile(r'^/(?:v1|v1beta|v1alpha)/models/([^/:]+):generateContent$')
+REVIEW_HEADING = re.compile(r'^### REVIEW (\S+)$', re.MULTILINE)
+META_INPUT_MARKER = 'Here is the input JSON for all RMTs'
+
+
+@dataclass
+class MockGeminiConfig:
+    """Behaviour of the mock server"""
+    latency_ms: float = 200.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0  # Fraction of requests answered with a 500
+    rate_limit_rate: float = 0.0  # Fraction of requests answered with a 429
+    requests_per_minute: Optional[int] = None  # Requests above this budget get a 429
+    seed: int = 0
+
+
+def estimate_tokens(text: str) -> int:
+    """Same rough 4-characters-per-token estimate as gemini_review_analyzer"""
+    return len(text) // 4 + 1
+
+
+class SchemaFaker:
+    """Deterministic values for a Gemini response schema (OpenAPI-style or JSON Schema)"""
+
+    def __init__(self, rng: random.Random, defs: Optional[Dict[str, Any]] = None):
+        self.rng = rng
+        self.defs = defs or {}
+
+    def value(self, schema: Dict[str, Any], name: str = 'value') -> Any:
+        if '$ref' in schema:
+            schema = self.defs.get(schema['$ref'].rsplit('/', 1)[-1], {})
+        options = schema.get('anyOf') or schema.get('any_of')
+        if options:
+            non_null = [option for option in options if str(option.get('type', '')).lower() != 'null']
+            if len(non_null) < len(options) and self.rng.random() < 0.2:
+                return None
+            return self.value(non_null[0] if non_null else options[0], name)
+        if schema.get('nullable') and self.rng.random() < 0.2:
+            return None
+        if schema.get('enum'):
+            return self.rng.choice(schema['enum'])
+
+        schema_type = schema.get('type') or ('object' if 'properties' in schema else 'string')
+        if isinstance(schema_type, list):
+            schema_type = next((t for t in schema_type if t != 'null'), 'string')
+        schema_type = schema_type.lower()
+
+        if schema_type == 'object':
+            return {key: self.value(prop, key) for key, prop in schema.get('properties', {}).items()}
+        if schema_type == 'array':
+            low = int(schema.get('minItems', schema.get('min_items', 0)))
+            high = max(low, min(int(schema.get('maxItems', schema.get('max_items', 3))), 3))
+            return [self.value(schema.get('items', {}), name) for _ in range(self.rng.randint(low, high))]
+        if schema_type == 'integer':
+            return self.rng.randint(int(schema.get('minimum', 0)), int(schema.get('maximum', 100)))
+        if schema_type == 'number':
+            return round(self.rng.uniform(float(schema.get('minimum', 0.0)), float(schema.get('maximum', 1.0))), 3)
+        if schema_type == 'boolean':
+            return self.rng.random() < 0.5
+        return f"mock {name.replace('_', ' ')} {self.rng.randint(1, 999)}"
+
+
+def _request_text(request: Dict[str, Any]) -> str:
+    parts = []
+    for content in request.get('contents', []):
+        parts.extend(part.get('text', '') for part in content.get('parts', []))
+    return "\n".join(parts)
+
+
+def _meta_leaderboard(prompt: str, rng: random.Random) -> Dict[str, Any]:
+    """Leaderboard for run_meta_leaderboard's prompt, one entry per RMT in its input JSON"""
+    rmts = []
+    start = prompt.find('{', prompt.find(META_INPUT_MARKER))
+    try:
+        rmts = json.JSONDecoder().raw_decode(prompt, start)[0].get('RMTs', [])
+    except ValueError:
+        pass
+    entries = []
+    for rmt in rmts:
+        scores = {facet: rng.randint(40, 100) for facet in (
+            'sentiment', 'service_quality', 'communication', 'professionalism',
+            'authenticity', 'recommendation_rate', 'repeat_client_rate')}
+        scores['composite'] = round(sum(scores.values()) / len(scores))
+        entries.append({
+            'profile_id': rmt.get('profile_id'),
+            'name': rmt.get('name'),
+            'scores': scores,
+            'summary': f"Mock summary from {len(rmt.get('analyses', []))} analyses.",
+        })
+    entries.sort(key=lambda entry: entry['scores']['composite'], reverse=True)
+    for rank, entry in enumerate(entries, 1):
+        entry['rank'] = rank
+    return {'leaderboard': entries}
+
+
+def build_response_text(request: Dict[str, Any], model: str) -> str:
+    """The JSON text the mock model answers with (deterministic for a given prompt)"""
+    prompt = _request_text(request)
+    digest = hashlib.sha256(f"{model}\n{prompt}".encode('utf-8')).hexdigest()
+    rng = random.Random(int(digest[:16], 16))
+
+    generation_config = request.get('generationConfig', {})
+    schema = generation_config.get('responseJsonSchema') or generation_config.get('responseSchema')
+    if not schema:
+        if META_INPUT_MARKER in prompt:
+            return json.dumps(_meta_leaderboard(prompt, rng))
+        return json.dumps({'text': f"mock response {digest[:12]}"})
+
+    faker = SchemaFaker(rng, schema.get('$defs') or schema.get('defs'))
+    if str(schema.get('type', '')).lower() == 'array':
+        items = []
+        for extraction_id in REVIEW_HEADING.findall(prompt) or [f"mock_{digest[:12]}"]:
+            item = faker.value(schema.get('items', {}))
+            if isinstance(item, dict) and 'extraction_id' in item:
+                item['extraction_id'] = extraction_id
+            items.append(item)
+        return json.dumps(items)
+
+    value = faker.value(schema)
+    if isinstance(value, dict) and 'extraction_id' in value:
+        value['extraction_id'] = f"mock_{digest[:12]}"
+    return json.dumps(value)
+
+
+class MockGeminiServer:
+    """Threaded HTTP server; start() returns the base URL to hand to the client"""
+
+    def __init__(self, config: Optional[MockGeminiConfig] = None, host: str = '127.0.0.1', port: int = 0):
+        self.config = config or MockGeminiConfig()
+        self._fault_rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._window = deque()
+        self._in_flight = 0
+        self.stats = dict.fromkeys(('requests', 'ok', 'server_errors', 'rate_limited',
+                                    'max_in_flight', 'prompt_tokens', 'output_tokens'), 0)
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> str:
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _admit(self) -> Optional[int]:
+        """HTTP status for an injected failure, or None to answer normally"""
+        with self._lock:
+            self.stats['requests'] += 1
+            now = time.monotonic()
+            if self.config.requests_per_minute:
+                while self._window and now - self._window[0] >= 60:
+                    self._window.popleft()
+                if len(self._window) >= self.config.requests_per_minute:
+                    return 429
+                self._window.append(now)
+            roll = self._fault_rng.random()
+            if roll < self.config.rate_limit_rate:
+                return 429
+            if roll < self.config.rate_limit_rate + self.config.error_rate:
+                return 500
+            return None
+
+    def _latency(self) -> float:
+        with self._lock:
+            jitter = self._fault_rng.uniform(-self.config.jitter_ms, self.config.jitter_ms)
+        return max(0.0, self.config.latency_ms + jitter) / 1000
+
+    def _handle_generate(self, model: str, request: Dict[str, Any]):
+        """(status, body) for a generateContent call"""
+        with self._lock:
+            self._in_flight += 1
+            self.stats['max_in_flight'] = max(self.stats['max_in_flight'], self._in_flight)
+        try:
+            time.sleep(self._latency())
+            failure = self._admit()
+            if failure == 429:
+                with self._lock:
+                    self.stats['rate_limited'] += 1
+                return 429, {'error': {'code': 429, 'status': 'RESOURCE_EXHAUSTED',
+                                       'message': 'Resource has been exhausted (e.g. check quota).'}}
+            if failure == 500:
+                with self._lock:
+                    self.stats['server_errors'] += 1
+                return 500, {'error': {'code': 500, 'status': 'INTERNAL',
+                                       'message': 'An internal error has occurred.'}}
+
+            text = build_response_text(request, model)
+            prompt_tokens = estimate_tokens(_request_text(request))
+            output_tokens = estimate_tokens(text)
+            with self._lock:
+                self.stats['ok'] += 1
+                self.stats['prompt_tokens'] += prompt_tokens
+                self.stats['output_tokens'] += output_tokens
+            return 200, {
+                'candidates': [{'content': {'role': 'model', 'parts': [{'text': text}]},
+                                'finishReason': 'STOP', 'index': 0}],
+                'usageMetadata': {'promptTokenCount': prompt_tokens,
+                                  'candidatesTokenCount': output_tokens,
+                                  'totalTokenCount': prompt_tokens + output_tokens},
+                'modelVersion': model,
+            }
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _send(self, status: int, body: Dict[str, Any]):
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=UTF-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path.split('?')[0] == '/stats':
+                    with server._lock:
+                        self._send(200, dict(server.stats, config=asdict(server.config)))
+                else:
+                    self._send(404, {'error': {'code': 404, 'status': 'NOT_FOUND', 'message': self.path}})
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                match = GENERATE_PATH.match(self.path.split('?')[0])
+                if not match:
+                    self._send(404, {'error': {'code': 404, 'status': 'NOT_FOUND', 'message': self.path}})
+                    return
+                try:
+                    request = json.loads(body or b'{}')
+                except ValueError as e:
+                    self._send(400, {'error': {'code': 400, 'status': 'INVALID_ARGUMENT', 'message': str(e)}})
+                    return
+                self._send(*server._handle_generate(match.group(1), request))
+
+            def log_message(self, format, *args):
+                logger.debug("mock gemini: " + format, *args)
+
+        return Handler
+
+
+def synthetic_extractions(count: int) -> List[Dict[str, Any]]:
+    """Extractor-shaped records for benchmarking (20 RMTs, distinct review texts)"""
+    return [{
+        'extraction_id': f"{i % 20}_mock_{i}",
+        'rmt_information': {'full_name': f"Test Therapist {i % 20}", 'profile_id': str(i % 20)},
+        'review_content': {'full_text': f"Review {i}: great massage, very professional RMT.", 'rating': 5},
+        'business_context': {'name': 'Mock Wellness Clinic'},
+        'matching_analysis': {'match_type': 'exact_full_name', 'confidence_score': 95},
+    } for i in range(count)]
+
+
+def run_benchmark(args) -> Dict[str, Any]:
+    """Analyze synthetic reviews through GeminiReviewAnalyzer against an in-process mock"""
+    from gemini_review_analyzer import GeminiReviewAnalyzer
+
+    config = MockGeminiConfig(args.latency_ms, args.jitter_ms, args.error_rate,
+                              args.rate_limit_rate, args.rpm, args.seed)
+    with MockGeminiServer(config) as server:
+        analyzer = GeminiReviewAnalyzer(
+            api_key='mock', max_concurrency=args.max_concurrency,
+            requests_per_minute=args.analyzer_rpm, batch_reviews=args.batch_reviews,
+            base_url=server.base_url
+        )
+        start = time.time()
+        analyzed = sum(1 for _, analysis in analyzer.iter_analyses(synthetic_extractions(args.reviews))
+                       if analysis)
+        elapsed = time.time() - start
+        stats = dict(server.stats)
+    return {
+        'reviews': args.reviews,
+        'analyzed': analyzed,
+        'seconds': round(elapsed, 2),
+        'reviews_per_second': round(analyzed / elapsed, 2) if elapsed else 0.0,
+        'final_concurrency': analyzer.rate_limiter.concurrency,
+        'prompt_tokens': analyzer.token_usage.prompt_tokens,
+        'output_tokens': analyzer.token_usage.output_tokens,
+        'server': stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local mock Gemini API server for load testing')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_behaviour_args(sub):
+        sub.add_argument('--latency-ms', type=float, default=200.0, help='Response latency (default: 200)')
+        sub.add_argument('--jitter-ms', type=float, default=0.0, help='Uniform +/- latency jitter')
+        sub.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with 500')
+        sub.add_argument('--rate-limit-rate', type=float, default=0.0, help='Fraction of requests answered with 429')
+        sub.add_argument('--rpm', type=int, help='Answer 429 above this many requests per minute')
+        sub.add_argument('--seed', type=int, default=0, help='Seed for latency jitter and fault injection')
+
+    serve = subparsers.add_parser('serve', help='Run the mock server in the foreground')
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8089)
+    add_behaviour_args(serve)
+
+    bench = subparsers.add_parser('bench', help='Benchmark GeminiReviewAnalyzer against the mock')
+    bench.add_argument('--reviews', type=int, default=200, help='Synthetic reviews to analyze')
+    bench.add_argument('--max-concurrency', type=int, default=8, help='Analyzer max concurrency')
+    bench.add_argument('--analyzer-rpm', type=int, default=100000, help='Analyzer requests-per-minute budget')
+    bench.add_argument('--batch-reviews', action='store_true', help='Pack several reviews into each request')
+    add_behaviour_args(bench)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.command == 'bench':
+        print(json.dumps(run_benchmark(args), indent=2))
+        return
+
+    config = MockGeminiConfig(args.latency_ms, args.jitter_ms, args.error_rate,
+                              args.rate_limit_rate, args.rpm, args.seed)
+    server = MockGeminiServer(config, args.host, args.port)
+    print(f"🧪 Mock Gemini server listening on {server.base_url}")
+    print(f"   export GEMINI_BASE_URL={server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n📊 {json.dumps(server.stats)}")
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Staleness scheduling for incremental runs
+
+Every RMT and every Google place gets a next_refresh_at. After each refresh, the
+item's review velocity (new reviews per day, smoothed) is updated from what the
+refresh found, and the next refresh is set for when about target_new_reviews new
+reviews are expected. Items that keep coming back unchanged back off
+geometrically. Intervals are clamped to [min_interval_days, max_interval_days].
+
+An incremental run refreshes the due RMTs in priority order until its Google Places
+request budget is spent:
+- never-refreshed RMTs come first;
+- then the RMTs with the most expected new reviews (velocity x days since refresh);
+- then the most overdue.
+
+Within an RMT, the places found near its practice locations are remembered for
+place_search_days. Only places that are due are fetched again; the others are
+matched from the reviews stored at their last fetch.
+
+For places, velocity comes from Google's userRatingCount. A place whose review
+sample changed without a count change counts as one new review.
+"""
+
+import hashlib
+import json
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+REFRESH_SCHEDULE_SQL = """
+CREATE TABLE IF NOT EXISTS rmt_refresh_schedule (
+    profile_id TEXT PRIMARY KEY,
+    last_refreshed_at TIMESTAMP,
+    last_changed_at TIMESTAMP,
+    review_velocity DOUBLE PRECISION DEFAULT 0,  -- New reviews per day (smoothed)
+    refresh_interval_days DOUBLE PRECISION,
+    next_refresh_at TIMESTAMP NOT NULL,
+    places_json TEXT,  -- [[location_query, place], ...] found at places_searched_at
+    places_searched_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS place_refresh_schedule (
+    place_id TEXT PRIMARY KEY,
+    last_refreshed_at TIMESTAMP,
+    last_changed_at TIMESTAMP,
+    review_velocity DOUBLE PRECISION DEFAULT 0,
+    refresh_interval_days DOUBLE PRECISION,
+    next_refresh_at TIMESTAMP NOT NULL,
+    user_ratings_total INTEGER,
+    review_signature TEXT,  -- Hash of the fetched reviews
+    reviews_json TEXT,      -- Reviews and place details of the last fetch
+    place_json TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_rmt_refresh_schedule_next ON rmt_refresh_schedule(next_refresh_at);
+CREATE INDEX IF NOT EXISTS idx_place_refresh_schedule_next ON place_refresh_schedule(next_refresh_at);
+"""
+
+# IN (...) lists are split so large place sets stay under the bound-parameter limit
+PLACE_ID_CHUNK = 500
+
+
+@dataclass
+class RefreshConfig:
+    """Incremental-run scheduling settings"""
+    api_budget: int = 500               # Google Places requests per incremental run
+    min_interval_days: float = 1.0
+    max_interval_days: float = 30.0
+    initial_interval_days: float = 7.0  # After a first refresh (no velocity observed yet)
+    target_new_reviews: float = 1.0     # Refresh when about this many new reviews are expected
+    backoff: float = 1.5                # Interval growth after a refresh that found nothing
+    velocity_smoothing: float = 0.5     # Weight of the latest velocity observation
+    place_search_days: float = 30.0     # How long an RMT's nearby-place search is reused
+    search_cost: int = 12               # Places requests per nearby-place search (one per place type)
+
+
+class ApiBudget:
+    """Google Places requests spent by one run"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.spent = 0
+
+    def affordable(self, cost: int) -> bool:
+        # The first item always runs, so a budget below one RMT's cost still makes progress
+        return self.spent == 0 or self.spent + cost <= self.limit
+
+    def spend(self, cost: int = 1):
+        self.spent += cost
+
+
+def to_datetime(value: Any) -> Optional[datetime]:
+    """TIMESTAMP column value as a datetime (SQLite returns ISO strings)"""
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
+
+
+def next_refresh(config: RefreshConfig, row: Optional[Mapping[str, Any]], now: datetime,
+                 new_reviews: float) -> Dict[str, Any]:
+    """Schedule columns after a refresh that found new_reviews new reviews"""
+    row = row or {}
+    last_refreshed = to_datetime(row.get('last_refreshed_at'))
+    velocity = float(row.get('review_velocity') or 0.0)
+    previous_interval = row.get('refresh_interval_days')
+    changed = new_reviews > 0
+
+    if last_refreshed is None:
+        # A first refresh finds the backlog, not a rate
+        interval = config.initial_interval_days
+    else:
+        days = max((now - last_refreshed).total_seconds() / 86400, 1 / 24)
+        smoothing = config.velocity_smoothing
+        velocity = smoothing * (new_reviews / days) + (1 - smoothing) * velocity
+        interval = config.target_new_reviews / velocity if velocity > 0 else config.max_interval_days
+        if not changed and previous_interval:
+            interval = max(interval, float(previous_interval) * config.backoff)
+    interval = min(max(interval, config.min_interval_days), config.max_interval_days)
+
+    return {
+        'last_refreshed_at': now,
+        'last_changed_at': now if changed else row.get('last_changed_at'),
+        'review_velocity': velocity,
+        'refresh_interval_days': interval,
+        'next_refresh_at': now + timedelta(days=interval),
+    }
+
+
+def priority(row: Mapping[str, Any], now: datetime) -> Tuple[bool, float, float]:
+    """Sort key of a due item, highest first: never refreshed, expected new reviews, days overdue"""
+    last_refreshed = to_datetime(row.get('last_refreshed_at'))
+    overdue = (now - to_datetime(row['next_refresh_at'])).total_seconds() / 86400
+    if last_refreshed is None:
+        return True, 0.0, overdue
+    days = (now - last_refreshed).total_seconds() / 86400
+    return False, float(row.get('review_velocity') or 0.0) * days, overdue
+
+
+def review_signature(reviews: Iterable[Mapping[str, Any]]) -> str:
+    content = sorted(f"{r.get('author_name', '')}|{r.get('text', '')}" for r in reviews)
+    return hashlib.md5(json.dumps(content).encode('utf-8')).hexdigest()
+
+
+class RefreshScheduler:
+    """Reads and updates rmt_refresh_schedule and place_refresh_schedule"""
+
+    def __init__(self, backend, config: Optional[RefreshConfig] = None):
+        self.backend = backend
+        self.config = config or RefreshConfig()
+
+    def seed(self, now: Optional[datetime] = None) -> int:
+        """Schedule every profile that has no schedule row yet, due immediately"""
+        with self.backend.connect() as conn:
+            return conn.execute("""
+                INSERT INTO rmt_refresh_schedule (profile_id, next_refresh_at)
+                SELECT rp.profile_id, ? FROM rmt_profiles rp
+                WHERE NOT EXISTS (SELECT 1 FROM rmt_refresh_schedule rs WHERE rs.profile_id = rp.profile_id)
+            """, (now or datetime.now(),)).rowcount
+
+    def due_rmts(self, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Schedule rows of the RMTs due at now, highest priority first"""
+        now = now or datetime.now()
+        with self.backend.connect() as conn:
+            rows = [dict(row) for row in conn.execute(
+                "SELECT * FROM rmt_refresh_schedule WHERE next_refresh_at <= ?", (now,)
+            ).fetchall()]
+        return sorted(rows, key=lambda row: priority(row, now), reverse=True)
+
+    def cached_places(self, row: Mapping[str, Any], now: datetime) -> Optional[List[Tuple[str, Dict[str, Any]]]]:
+        """The RMT's remembered (location_query, place) pairs, or None when they need a new search"""
+        searched_at = to_datetime(row.get('places_searched_at'))
+        if searched_at is None or not row.get('places_json'):
+            return None
+        if now - searched_at > timedelta(days=self.config.place_search_days):
+            return None
+        return [(location, place) for location, place in json.loads(row['places_json'])]
+
+    def places(self, place_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """place_id -> schedule row for the places that have one"""
+        place_ids = sorted(set(place_ids))
+        rows = {}
+        with self.backend.connect() as conn:
+            for start in range(0, len(place_ids), PLACE_ID_CHUNK):
+                chunk = place_ids[start:start + PLACE_ID_CHUNK]
+                for row in conn.execute(
+                        f"SELECT * FROM place_refresh_schedule WHERE place_id IN ({', '.join('?' * len(chunk))})",
+                        chunk).fetchall():
+                    rows[row['place_id']] = dict(row)
+        return rows
+
+    @staticmethod
+    def place_due(row: Optional[Mapping[str, Any]], now: datetime) -> bool:
+        return row is None or not row.get('reviews_json') or to_datetime(row['next_refresh_at']) <= now
+
+    @staticmethod
+    def stored_reviews(row: Mapping[str, Any]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Reviews and place details kept from the place's last fetch"""
+        return json.loads(row['reviews_json']), json.loads(row.get('place_json') or '{}')
+
+    def record_place(self, place_id: str, row: Optional[Mapping[str, Any]], reviews: List[Dict[str, Any]],
+                     place_info: Dict[str, Any], now: Optional[datetime] = None) -> bool:
+        """Update a place's schedule after fetching it; returns True when its reviews changed"""
+        now = now or datetime.now()
+        signature = review_signature(reviews)
+        ratings_total = place_info.get('user_ratings_total')
+        previous_total = row.get('user_ratings_total') if row else None
+        if row is None:
+            new_reviews = 0
+        elif ratings_total is not None and previous_total is not None and ratings_total != previous_total:
+            new_reviews = max(ratings_total - previous_total, 0)
+        else:
+            new_reviews = 1 if signature != row.get('review_signature') else 0
+
+        schedule = next_refresh(self.config, row, now, new_reviews)
+        with self.backend.connect() as conn:
+            self.backend.upsert(conn, 'place_refresh_schedule', ('place_id',), {
+                'place_id': place_id,
+                **schedule,
+                'user_ratings_total': ratings_total,
+                'review_signature': signature,
+                'reviews_json': json.dumps(reviews),
+                'place_json': json.dumps(place_info),
+            })
+        return new_reviews > 0
+
+    def record_rmt(self, profile_id: str, row: Optional[Mapping[str, Any]], new_reviews: int,
+                   places: List[Tuple[str, Dict[str, Any]]], places_searched_at: Any,
+                   now: Optional[datetime] = None):
+        """Update an RMT's schedule after refreshing it"""
+        now = now or datetime.now()
+        with self.backend.connect() as conn:
+            self.backend.upsert(conn, 'rmt_refresh_schedule', ('profile_id',), {
+                'profile_id': profile_id,
+                **next_refresh(self.config, row, now, new_reviews),
+                'places_json': json.dumps([list(pair) for pair in places]),
+                'places_searched_at': places_searched_at,
+            })
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Local triage of review extractions before Gemini analysis
+
+Every extraction with any name match used to go to Gemini, including reviews matched
+only on a bare first name from generate_name_variations(), which the prompt then flags
+as potential_false_positive. ReviewTriage scores an extraction from its matched text
+segments, match confidences, place types and review text, and labels it:
+
+- likely_false_positive - skipped; recorded with a rule-based analysis
+- ambiguous             - sent to Gemini
+- likely_true           - sent to Gemini
+
+Thresholds and weights live in TriageConfig. evaluate_triage() replays the rules over
+reviews that already have a Gemini analysis and reports precision/recall of the skip
+decision against Gemini's potential_false_positive flag, so thresholds can be tuned
+before enabling the stage (--triage in the analysis scripts):
+
+    python review_triage.py --db-path rmt_monitoring.db --skip-below 0.2 0.3 0.4
+"""
+
+import argparse
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from gemini_review_analyzer import (ComprehensiveRMTAnalysis, SentimentAnalysis, RMTMentionAnalysis,
+                                    ServiceQualityMetrics, BusinessContextAnalysis, ReviewClassification)
+from blob_codec import decode_blob
+
+LABEL_LIKELY_FALSE_POSITIVE = 'likely_false_positive'
+LABEL_AMBIGUOUS = 'ambiguous'
+LABEL_LIKELY_TRUE = 'likely_true'
+
+# Stored as ai_analyses.gemini_model_used for skipped reviews
+TRIAGE_MODEL_NAME = 'rule-based-triage'
+RULE_BASED_NOTE_PREFIX = 'Rule-based triage'
+
+# Place types where an RMT is likely to practice (see find_nearby_places)
+MASSAGE_PLACE_TYPES = {'massage', 'massage_therapist', 'physiotherapist', 'chiropractor',
+                       'wellness_center', 'spa'}
+
+_WORD = re.compile(r"[a-z]+")
+_MASSAGE_KEYWORDS = re.compile(r'\b(rmt|massage|massages|therapist|deep tissue)\b', re.IGNORECASE)
+_TITLE_WORDS = {'dr', 'rmt'}
+_STRENGTH_ORDER = {'first': 0, 'last': 1, 'full': 2}
+
+
+@dataclass
+class TriageConfig:
+    """Tunable triage thresholds and weights (scores are 0.0 to 1.0)"""
+    skip_below: float = 0.3          # Scores below this are skipped as likely false positives
+    likely_true_above: float = 0.7   # Scores at or above this are labelled likely_true
+    min_exact_confidence: int = 90   # Name matches below this confidence count as fuzzy
+    full_name_score: float = 0.9     # First and last name in one segment
+    last_name_score: float = 0.6     # Last name without the first name
+    first_name_score: float = 0.2    # Bare first name only
+    fuzzy_name_score: float = 0.35   # Only approximate name matches
+    location_bonus: float = 0.1      # Employer, city or street of the RMT also matched
+    massage_place_bonus: float = 0.1
+    other_place_penalty: float = 0.15  # Place types known, none massage-related
+    keyword_bonus: float = 0.1       # Review mentions massage / RMT / therapist
+
+
+@dataclass
+class TriageResult:
+    """Triage decision for one extraction"""
+    score: float
+    label: str
+    reasons: List[str] = field(default_factory=list)
+
+    @property
+    def skipped(self) -> bool:
+        return self.label == LABEL_LIKELY_FALSE_POSITIVE
+
+
+def _tokens(text: Any) -> Set[str]:
+    return set(_WORD.findall(str(text or '').lower()))
+
+
+def _practice_locations(rmt_info: Dict[str, Any]) -> List[Dict[str, Any]]:
+    locations = rmt_info.get('practice_locations') or []
+    if isinstance(locations, str):
+        try:
+            locations = json.loads(locations)
+        except ValueError:
+            return []
+    return [location for location in locations if isinstance(location, dict)]
+
+
+class ReviewTriage:
+    """Scores extractions and builds rule-based analyses for the ones it skips"""
+
+    model_name = TRIAGE_MODEL_NAME
+
+    def __init__(self, config: Optional[TriageConfig] = None):
+        self.config = config or TriageConfig()
+
+    def score(self, extraction: Dict[str, Any]) -> TriageResult:
+        """Triage an extraction in any of the analyzer input formats"""
+        config = self.config
+        rmt_info = extraction.get('rmt_information') or {}
+        first_names = _tokens(rmt_info.get('first_name')) | _tokens(rmt_info.get('common_first_name'))
+        last_names = _tokens(rmt_info.get('last_name')) | _tokens(rmt_info.get('common_last_name'))
+        if not first_names and not last_names:
+            # Nothing to check the matches against; let Gemini decide
+            return TriageResult(0.5, LABEL_AMBIGUOUS, ['RMT name unknown'])
+
+        location_tokens = set()
+        for location in _practice_locations(rmt_info):
+            for key in ('employerName', 'businessCity', 'city', 'businessAddress'):
+                location_tokens |= _tokens(location.get(key))
+        location_tokens -= first_names | last_names
+
+        matching = extraction.get('matching_analysis') or {}
+        segments = matching.get('matched_text_segments') or []
+        confidences = matching.get('confidence_scores') or []
+
+        name_strength = None
+        location_matched = False
+        for segment, confidence in zip(segments, confidences):
+            words = _tokens(segment) - _TITLE_WORDS
+            has_first = bool(words & first_names)
+            has_last = bool(words & last_names)
+            if (has_first or has_last) and confidence >= config.min_exact_confidence:
+                strength = 'full' if has_first and has_last else 'last' if has_last else 'first'
+                if name_strength is None or _STRENGTH_ORDER[strength] > _STRENGTH_ORDER[name_strength]:
+                    name_strength = strength
+            elif words and words & location_tokens:
+                location_matched = True
+
+        reasons = []
+        if name_strength == 'full':
+            score = config.full_name_score
+            reasons.append('full name matched')
+        elif name_strength == 'last':
+            score = config.last_name_score
+            reasons.append('last name matched without first name')
+        elif name_strength == 'first':
+            score = config.first_name_score
+            reasons.append('only the bare first name matched')
+        else:
+            score = config.fuzzy_name_score
+            reasons.append('only fuzzy name matches')
+
+        if location_matched:
+            score += config.location_bonus
+            reasons.append('practice location matched')
+
+        business = extraction.get('business_context') or {}
+        metadata = extraction.get('extraction_metadata') or {}
+        place_types = set(business.get('business_types') or business.get('types') or
+                          metadata.get('place_types') or [])
+        if place_types & MASSAGE_PLACE_TYPES:
+            score += config.massage_place_bonus
+            reasons.append('massage-related place')
+        elif place_types:
+            score -= config.other_place_penalty
+            reasons.append('place is not massage-related')
+
+        review = extraction.get('review_content') or {}
+        text = review.get('full_text') or review.get('text') or ''
+        if _MASSAGE_KEYWORDS.search(text):
+            score += config.keyword_bonus
+            reasons.append('review mentions massage')
+
+        score = round(min(1.0, max(0.0, score)), 3)
+        if score < config.skip_below:
+            label = LABEL_LIKELY_FALSE_POSITIVE
+        elif score >= config.likely_true_above:
+            label = LABEL_LIKELY_TRUE
+        else:
+            label = LABEL_AMBIGUOUS
+        return TriageResult(score, label, reasons)
+
+    def skip_analysis(self, extraction: Dict[str, Any]) -> Optional[ComprehensiveRMTAnalysis]:
+        """Rule-based analysis if the extraction should skip Gemini, else None"""
+        result = self.score(extraction)
+        if not result.skipped:
+            return None
+        return self.rule_based_analysis(extraction, result)
+
+    def rule_based_analysis(self, extraction: Dict[str, Any], result: TriageResult) -> ComprehensiveRMTAnalysis:
+        """Analysis recorded for a skipped extraction: a potential false positive with neutral content"""
+        segments = (extraction.get('matching_analysis') or {}).get('matched_text_segments') or []
+        return ComprehensiveRMTAnalysis(
+            extraction_id=extraction.get('extraction_id', ''),
+            sentiment_analysis=SentimentAnalysis(
+                overall_sentiment='neutral', confidence_score=0.0, emotional_tone='not analyzed'
+            ),
+            rmt_mention_analysis=RMTMentionAnalysis(
+                mention_type='unclear', mention_confidence=result.score,
+                mention_context='not analyzed', name_variations_detected=list(segments)
+            ),
+            service_quality_metrics=ServiceQualityMetrics(),
+            business_context_analysis=BusinessContextAnalysis(
+                business_name_confidence=0.0, staff_context='unclear',
+                appointment_booking_mentioned=False, facility_quality_mentioned=False
+            ),
+            review_classification=ReviewClassification(
+                review_authenticity='unclear', review_detail_level='minimal',
+                specific_treatment_mentioned=False, repeat_client_indicated=False,
+                recommendation_given=False
+            ),
+            key_positive_points=[],
+            key_negative_points=[],
+            notable_quotes=[],
+            overall_analysis_confidence=round(1.0 - result.score, 3),
+            potential_false_positive=True,
+            analysis_notes=f"{RULE_BASED_NOTE_PREFIX} (score {result.score}): {'; '.join(result.reasons)}"
+        )
+
+    @staticmethod
+    def is_rule_based(analysis: ComprehensiveRMTAnalysis) -> bool:
+        return analysis.analysis_notes.startswith(RULE_BASED_NOTE_PREFIX)
+
+
+
+def load_labelled_extractions(backend) -> List[Tuple[Dict[str, Any], bool]]:
+    """
+    Stored reviews that have a Gemini analysis, as (triage input, potential_false_positive)
+
+    Place types are not stored with reviews, so replayed scores never get the place bonus
+    or penalty.
+    """
+    with backend.connect() as conn:
+        labels = {}
+        for row in conn.execute(
+            "SELECT profile_id, review_hash, potential_false_positive FROM ai_analyses WHERE gemini_model_used != ?",
+            (TRIAGE_MODEL_NAME,)
+        ).fetchall():
+            labels[(row[0], row[1])] = bool(row[2])
+
+        labelled = []
+        for row in conn.execute("""
+            SELECT profile_id, first_name, last_name, common_first_name, common_last_name,
+                   practice_locations, reviews_data, reviews_data_codec
+            FROM rmt_profiles
+            WHERE reviews_data IS NOT NULL AND reviews_data != '[]'
+        """).fetchall():
+            profile_id = row[0]
+            rmt_information = {
+                'profile_id': profile_id, 'first_name': row[1], 'last_name': row[2],
+                'common_first_name': row[3], 'common_last_name': row[4], 'practice_locations': row[5]
+            }
+            for review in json.loads(decode_blob(conn, row[6], row[7]) or '[]'):
+                extraction_id = review.get('extraction_id') or ''
+                label = labels.get((profile_id, extraction_id.split('_')[-1]),
+                                   labels.get((profile_id, review.get('review_hash'))))
+                if label is None:
+                    continue
+                labelled.append(({
+                    'extraction_id': extraction_id,
+                    'rmt_information': rmt_information,
+                    'review_content': {'full_text': review.get('review_text', '')},
+                    'business_context': {},
+                    'matching_analysis': {
+                        'matched_text_segments': review.get('matched_text_segments', []),
+                        'confidence_scores': review.get('confidence_scores', []),
+                    }
+                }, label))
+        return labelled
+
+
+def evaluate_triage(labelled: Sequence[Tuple[Dict[str, Any], bool]], config: Optional[TriageConfig] = None,
+                    skip_thresholds: Optional[Sequence[float]] = None) -> List[Dict[str, Any]]:
+    """
+    Precision/recall of the skip decision against Gemini's potential_false_positive flag
+
+    Precision is the share of skipped reviews Gemini flagged as false positives; recall is
+    the share of Gemini's false positives that would have been skipped.
+    """
+    config = config or TriageConfig()
+    scores = [(ReviewTriage(config).score(extraction).score, is_false_positive)
+              for extraction, is_false_positive in labelled]
+    false_positives = sum(1 for _, is_false_positive in scores if is_false_positive)
+
+    report = []
+    for threshold in skip_thresholds or [config.skip_below]:
+        skipped = [is_false_positive for score, is_false_positive in scores if score < threshold]
+        true_positives = sum(skipped)
+        report.append({
+            'skip_below': threshold,
+            'reviews': len(scores),
+            'skipped': len(skipped),
+            'true_positives': true_positives,
+            'precision': true_positives / len(skipped) if skipped else None,
+            'recall': true_positives / false_positives if false_positives else None,
+        })
+    return report
+
+
+def main():
+    from storage_backends import create_backend
+
+    parser = argparse.ArgumentParser(description='Evaluate review triage thresholds against past analyses')
+    parser.add_argument('--db-path', default='rmt_monitoring.db', help='Database file path or postgresql:// URL')
+    parser.add_argument('--skip-below', type=float, nargs='+', default=[0.2, 0.3, 0.4, 0.5],
+                        help='Skip thresholds to evaluate')
+    args = parser.parse_args()
+
+    labelled = load_labelled_extractions(create_backend(args.db_path))
+    print(f"📊 {len(labelled)} reviews with Gemini analyses, "
+          f"{sum(1 for _, fp in labelled if fp)} flagged as potential false positives")
+    for row in evaluate_triage(labelled, skip_thresholds=args.skip_below):
+        precision = f"{row['precision']:.1%}" if row['precision'] is not None else 'n/a'
+        recall = f"{row['recall']:.1%}" if row['recall'] is not None else 'n/a'
+        print(f"   skip_below={row['skip_below']:.2f}: skipped {row['skipped']:>5}, "
+              f"precision {precision:>6}, recall {recall:>6}")
+
+
+if __name__ == "__main__":
+    main()
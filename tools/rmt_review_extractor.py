@@ -682,6 +682,71 @@ class RMTReviewExtractor:
         
         return unique_matches
     
+    def location_query(self, location: Dict[str, Any]) -> str:
+        """Place search query for one practice location ('' when the location has no usable fields)"""
+        location_parts = [
+            location.get('employerName', ''),
+            location.get('businessAddress', ''),
+            location.get('businessCity', ''),
+            location.get('province', '')
+        ]
+        return ', '.join(filter(None, location_parts))
+    
+    def match_review(self, rmt_data: RMTData, review: Dict[str, Any], place: Dict[str, Any],
+                     place_info: Dict[str, Any], location_str: str, name_variations: List[str],
+                     location_variations: List[str]) -> Optional[ReviewExtraction]:
+        """Extraction for one review of a place, or None when the review does not mention the RMT"""
+        review_text = review.get('text', '')
+        if not review_text or len(review_text.strip()) < 10:
+            return None
+        
+        # Find name matches
+        name_matches = self.find_text_matches(review_text, name_variations, "name")
+        if not name_matches:
+            return None
+        
+        # Find location matches (optional - adds context)
+        location_matches = self.find_text_matches(review_text, location_variations, "location")
+        
+        # Combine all matches
+        all_matches = name_matches + location_matches
+        matched_segments = [match[2] for match in all_matches]
+        confidence_scores = [match[1] for match in all_matches]
+        
+        # Create a more unique extraction_id using review text hash
+        place_id = place.get('place_id')
+        review_hash = hashlib.md5(review_text.encode()).hexdigest()[:8]
+        extraction_id = f"{rmt_data.profile_id}_{place_id}_{review_hash}"
+        
+        extraction = ReviewExtraction(
+            extraction_id=extraction_id,
+            rmt_data=asdict(rmt_data),
+            matched_text_segments=matched_segments,
+            confidence_scores=confidence_scores,
+            review_data={
+                'text': review_text,
+                'rating': review.get('rating', 0),
+                'time': review.get('time', 0),
+                'author_name': review.get('author_name', ''),
+                'relative_time_description': review.get('relative_time_description', ''),
+                'text_length': len(review_text)
+            },
+            place_data=place_info,
+            extraction_metadata={
+                'extraction_timestamp': time.time(),
+                'search_location': location_str,
+                'name_match_count': len(name_matches),
+                'location_match_count': len(location_matches),
+                'max_name_confidence': max([m[1] for m in name_matches]) if name_matches else 0,
+                'max_location_confidence': max([m[1] for m in location_matches]) if location_matches else 0,
+                'fuzzy_threshold_used': self.fuzzy_threshold,
+                'place_search_method': place.get('search_type', 'unknown'),  # Track search method
+                'place_types': place.get('types', [])  # Include place types for analysis
+            }
+        )
+        logger.info(f"Extracted review: {len(matched_segments)} matches, max confidence: {max(confidence_scores)}")
+        return extraction
+    
     def extract_review_data(self, rmt_data: RMTData) -> List[ReviewExtraction]:
         """Extract review data for a specific RMT"""
         extractions = []
@@ -695,13 +760,7 @@ class RMTReviewExtractor:
         # Search near each practice location
         for location in rmt_data.practice_locations:
             try:
-                location_parts = [
-                    location.get('employerName', ''),
-                    location.get('businessAddress', ''),
-                    location.get('businessCity', ''),
-                    location.get('province', '')
-                ]
-                location_str = ', '.join(filter(None, location_parts))
+                location_str = self.location_query(location)
                 
                 if not location_str:
                     continue
@@ -717,56 +776,10 @@ class RMTReviewExtractor:
                     reviews, place_info = self.get_place_reviews(place_id)
                     
                     for review in reviews:
-                        review_text = review.get('text', '')
-                        if not review_text or len(review_text.strip()) < 10:
-                            continue
-                        
-                        # Find name matches
-                        name_matches = self.find_text_matches(review_text, name_variations, "name")
-                        
-                        # Find location matches (optional - adds context)
-                        location_matches = self.find_text_matches(review_text, location_variations, "location")
-                        
-                        # If we have name matches, create extraction
-                        if name_matches:
-                            # Combine all matches
-                            all_matches = name_matches + location_matches
-                            matched_segments = [match[2] for match in all_matches]
-                            confidence_scores = [match[1] for match in all_matches]
-                            
-                            # Create a more unique extraction_id using review text hash
-                            review_hash = hashlib.md5(review_text.encode()).hexdigest()[:8]
-                            extraction_id = f"{rmt_data.profile_id}_{place_id}_{review_hash}"
-                            
-                            extraction = ReviewExtraction(
-                                extraction_id=extraction_id,
-                                rmt_data=asdict(rmt_data),
-                                matched_text_segments=matched_segments,
-                                confidence_scores=confidence_scores,
-                                review_data={
-                                    'text': review_text,
-                                    'rating': review.get('rating', 0),
-                                    'time': review.get('time', 0),
-                                    'author_name': review.get('author_name', ''),
-                                    'relative_time_description': review.get('relative_time_description', ''),
-                                    'text_length': len(review_text)
-                                },
-                                place_data=place_info,
-                                extraction_metadata={
-                                    'extraction_timestamp': time.time(),
-                                    'search_location': location_str,
-                                    'name_match_count': len(name_matches),
-                                    'location_match_count': len(location_matches),
-                                    'max_name_confidence': max([m[1] for m in name_matches]) if name_matches else 0,
-                                    'max_location_confidence': max([m[1] for m in location_matches]) if location_matches else 0,
-                                    'fuzzy_threshold_used': self.fuzzy_threshold,
-                                    'place_search_method': place.get('search_type', 'unknown'),  # Track search method
-                                    'place_types': place.get('types', [])  # Include place types for analysis
-                                }
-                            )
-                            
+                        extraction = self.match_review(rmt_data, review, place, place_info, location_str,
+                                                       name_variations, location_variations)
+                        if extraction:
                             extractions.append(extraction)
-                            logger.info(f"Extracted review: {len(matched_segments)} matches, max confidence: {max(confidence_scores)}")
                     
                     time.sleep(self.request_delay)
                     
@@ -2,17 +2,33 @@
 """
 Standalone script to run AI analysis on existing reviews in the database.
 This script only performs the analysis step, skipping extraction.
+
+With --worker-id the script runs as a queue worker: unanalyzed reviews are enqueued in
+the shared work_queue table and each worker claims batches from it, so several workers
+(on different hosts when --db-path is a PostgreSQL URL) can split one backlog without
+analyzing the same review twice.
+
+With --offline-batch the reviews are written to JSONL job files and submitted as batch
+jobs (see batch_jobs.py) instead of interactive requests. Results are ingested when the
+jobs finish; --no-wait submits and exits, and --resume-batch-jobs ingests later.
 """
 
 import argparse
 import json
 import logging
-import sqlite3
+import os
+import socket
 import time
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 
-from gemini_review_analyzer import GeminiReviewAnalyzer, ComprehensiveRMTAnalysis
+from gemini_review_analyzer import GeminiReviewAnalyzer, ComprehensiveRMTAnalysis, TokenUsage
+from blob_codec import ensure_codec_schema, encode_blob, decode_blob
+from storage_backends import create_backend
+from analysis_cache import DatabaseAnalysisCache
+from review_triage import TRIAGE_MODEL_NAME, ReviewTriage, TriageConfig
+from batch_jobs import (BATCH_JOBS_TABLE_SQL, STATE_FAILED, STATE_RUNNING,
+                        BatchJobClient, create_batch_client, iter_result_lines, write_job_files)
 
 # Configure logging
 logging.basicConfig(
@@ -21,15 +37,50 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+WORK_KIND = 'analysis'
+MAX_ATTEMPTS = 3
+
+# Columns this script writes that were added after the tables were first created
+ADDED_COLUMNS = {
+    'monitoring_runs': [('cache_hits', 'INTEGER DEFAULT 0'), ('triage_skipped', 'INTEGER DEFAULT 0'),
+                        ('prompt_tokens', 'BIGINT DEFAULT 0'), ('output_tokens', 'BIGINT DEFAULT 0'),
+                        ('cached_tokens', 'BIGINT DEFAULT 0')],
+    'ai_analyses': [('prompt_tokens', 'INTEGER'), ('output_tokens', 'INTEGER'),
+                    ('recommendation_given', 'BOOLEAN'), ('repeat_client_indicated', 'BOOLEAN')],
+}
+
 class AnalysisOnlyRunner:
-    def __init__(self, gemini_api_key: str, db_path: str = "rmt_monitoring.db"):
-        self.analyzer = GeminiReviewAnalyzer(gemini_api_key)
+    def __init__(self, gemini_api_key: str, db_path: str = "rmt_monitoring.db",
+                 max_concurrency: int = 8, requests_per_minute: Optional[int] = None,
+                 tokens_per_minute: Optional[int] = None, batch_reviews: bool = False,
+                 use_cache: bool = True, triage_config: Optional[TriageConfig] = None,
+                 compact_prompts: bool = False):
+        self.analyzer = GeminiReviewAnalyzer(
+            gemini_api_key,
+            max_concurrency=max_concurrency,
+            requests_per_minute=requests_per_minute,
+            tokens_per_minute=tokens_per_minute,
+            batch_reviews=batch_reviews,
+            compact_prompts=compact_prompts
+        )
         self.db_path = db_path
+        self.backend = create_backend(db_path)
+        with self.backend.connect() as conn:
+            ensure_codec_schema(conn)
+            for table, added in ADDED_COLUMNS.items():
+                columns = self.backend.table_columns(conn, table)
+                for column, definition in added:
+                    if columns and column not in columns:
+                        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        if use_cache:
+            self.analyzer.cache = DatabaseAnalysisCache(self.backend)
+        if triage_config:
+            self.analyzer.triage = ReviewTriage(triage_config)
         
-    def get_unanalyzed_reviews(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
-        """Get reviews that haven't been analyzed yet"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+    def get_unanalyzed_reviews(self, limit: Optional[int] = None,
+                               profile_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Get reviews that haven't been analyzed yet (optionally only those of profile_ids)"""
+        with self.backend.connect() as conn:
             
             query = """
                 SELECT 
@@ -40,41 +91,43 @@ class AnalysisOnlyRunner:
                     rp.authorized_to_practice,
                     rp.practice_locations,
                     rp.reviews_data,
-                    aa.analysis_id
+                    rp.reviews_data_codec
                 FROM rmt_profiles rp
-                LEFT JOIN ai_analyses aa ON rp.profile_id = aa.profile_id
                 WHERE rp.reviews_data IS NOT NULL 
                 AND rp.reviews_data != '[]'
                 AND rp.reviews_data != 'null'
             """
+            params = []
+            if profile_ids is not None:
+                query += f" AND rp.profile_id IN ({', '.join('?' * len(profile_ids))})"
+                params = list(profile_ids)
             
             if limit:
                 query += f" LIMIT {limit}"
                 
-            rows = conn.execute(query).fetchall()
+            rows = conn.execute(query, params).fetchall()
             
             unanalyzed_reviews = []
             
             for row in rows:
                 profile_data = dict(row)
-                reviews_data = json.loads(profile_data['reviews_data'])
+                reviews_data = json.loads(decode_blob(conn, profile_data['reviews_data'], profile_data['reviews_data_codec']))
+                # ai_analyses.review_hash is the last part of the extraction_id (see save_analysis),
+                # not the review's own review_hash
+                analyzed = {analysis['review_hash'] for analysis in conn.execute(
+                    "SELECT review_hash FROM ai_analyses WHERE profile_id = ?", (profile_data['profile_id'],)
+                ).fetchall()}
                 
                 # Check which reviews haven't been analyzed
                 for review in reviews_data:
                     review_hash = review.get('review_hash', '')
                     
-                    # Check if this review has been analyzed
-                    existing_analysis = conn.execute(
-                        "SELECT analysis_id FROM ai_analyses WHERE profile_id = ? AND review_hash = ?",
-                        (profile_data['profile_id'], review_hash)
-                    ).fetchone()
+                    # Ensure extraction_id is well-formed
+                    extraction_id = review.get('extraction_id')
+                    if not extraction_id or not isinstance(extraction_id, str) or extraction_id.strip() == '' or any(x in extraction_id for x in ['N/A', 'id', 'review', 'unknown', 'placeholder', 'prompt', 'not', 'provided']):
+                        extraction_id = f"{profile_data['profile_id']}_{review.get('place_id', 'unknown')}_{review_hash or review.get('review_timestamp', 'unknown')}"
                     
-                    if not existing_analysis:
-                        # Ensure extraction_id is well-formed
-                        extraction_id = review.get('extraction_id')
-                        if not extraction_id or not isinstance(extraction_id, str) or extraction_id.strip() == '' or any(x in extraction_id for x in ['N/A', 'id', 'review', 'unknown', 'placeholder', 'prompt', 'not', 'provided']):
-                            extraction_id = f"{profile_data['profile_id']}_{review.get('place_id', 'unknown')}_{review_hash or review.get('review_timestamp', 'unknown')}"
-                        
+                    if extraction_id.split('_')[-1] not in analyzed:
                         analysis_data = {
                             'extraction_id': extraction_id,
                             'rmt_information': {
@@ -109,11 +162,13 @@ class AnalysisOnlyRunner:
                         }
                         
                         unanalyzed_reviews.append(analysis_data)
+                        analyzed.add(extraction_id.split('_')[-1])
             
             return unanalyzed_reviews
     
-    def save_analysis(self, analysis: ComprehensiveRMTAnalysis, run_id: str):
-        """Save analysis results to database"""
+    def save_analysis(self, analysis: ComprehensiveRMTAnalysis, run_id: str,
+                      token_usage: Optional[TokenUsage] = None):
+        """Save analysis results to database (token usage defaults to the analyzer's record for the review)"""
         # Check extraction_id validity
         extraction_id = analysis.extraction_id
         if not extraction_id or not isinstance(extraction_id, str) or extraction_id.strip() == '' or any(x in extraction_id for x in ['N/A', 'id', 'review', 'unknown', 'placeholder', 'prompt', 'not', 'provided']):
@@ -122,17 +177,29 @@ class AnalysisOnlyRunner:
         profile_id = extraction_id.split('_')[0]
         review_hash = extraction_id.split('_')[-1]
         logger.debug(f"Saving analysis: profile_id={profile_id}, extraction_id={extraction_id}, review_hash={review_hash}")
-        with sqlite3.connect(self.db_path) as conn:
-            # Generate analysis_id
-            analysis_id = f"analysis_{profile_id}_{int(time.time())}"
+        token_usage = token_usage or self.analyzer.pop_token_usage(extraction_id)
+        with self.backend.connect() as conn:
+            # A queue item can be analysed twice (lease expiry, or a crash before complete_work);
+            # the profile row lock makes the existence check and the insert one step per RMT
+            self.backend.select_for_update(conn, "SELECT profile_id FROM rmt_profiles WHERE profile_id = ?",
+                                           (profile_id,))
+            if conn.execute("SELECT 1 FROM ai_analyses WHERE profile_id = ? AND review_hash = ?",
+                            (profile_id, review_hash)).fetchone():
+                logger.info(f"Review {extraction_id} already analyzed, keeping the existing analysis")
+                return
+            
+            # Generate analysis_id (review_hash keeps concurrent workers from colliding)
+            analysis_id = f"analysis_{profile_id}_{review_hash}_{int(time.time())}"
+            analysis_blob, analysis_codec = encode_blob(conn, analysis.model_dump_json(), 'analysis')
             
             conn.execute("""
                 INSERT INTO ai_analyses (
                     analysis_id, profile_id, analysis_run_id, review_hash, sentiment_overall, 
-                    sentiment_confidence, technical_skill_rating, communication_rating,
+                    sentiment_confidence, mention_confidence, technical_skill_rating, communication_rating,
                     professionalism_rating, review_authenticity, potential_false_positive,
-                    overall_analysis_confidence, analysis_json, analyzed_at, gemini_model_used
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    overall_analysis_confidence, analysis_json, analysis_json_codec, analyzed_at, gemini_model_used,
+                    prompt_tokens, output_tokens, recommendation_given, repeat_client_indicated
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (
                 analysis_id,
                 profile_id,
@@ -140,20 +207,26 @@ class AnalysisOnlyRunner:
                 review_hash,
                 analysis.sentiment_analysis.overall_sentiment,
                 analysis.sentiment_analysis.confidence_score,
+                analysis.rmt_mention_analysis.mention_confidence,
                 analysis.service_quality_metrics.technical_skill_rating,
                 analysis.service_quality_metrics.communication_rating,
                 analysis.service_quality_metrics.professionalism_rating,
                 analysis.review_classification.review_authenticity,
                 analysis.potential_false_positive,
                 analysis.overall_analysis_confidence,
-                analysis.model_dump_json(),
+                analysis_blob,
+                analysis_codec,
                 datetime.now(),
-                "gemini-2.5-flash-preview-04-17"
+                self.analyzer.model_used_for(analysis),
+                token_usage.prompt_tokens if token_usage else None,
+                token_usage.output_tokens if token_usage else None,
+                analysis.review_classification.recommendation_given,
+                analysis.review_classification.repeat_client_indicated
             ))
     
     def create_monitoring_run(self, run_id: str):
         """Create a monitoring run record for the analysis session"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.backend.connect() as conn:
             conn.execute("""
                 INSERT INTO monitoring_runs (
                     run_id, run_type, started_at, completed_at, search_keywords,
@@ -172,23 +245,32 @@ class AnalysisOnlyRunner:
                 None
             ))
     
-    def update_monitoring_run(self, run_id: str, reviews_analyzed: int, successful: int, failed: int):
+    def update_monitoring_run(self, run_id: str, reviews_analyzed: int, successful: int, failed: int,
+                              cache_hits: int = 0, triage_skipped: int = 0,
+                              token_usage: Optional[TokenUsage] = None):
         """Update the monitoring run with final statistics"""
-        with sqlite3.connect(self.db_path) as conn:
+        token_usage = token_usage or TokenUsage()
+        with self.backend.connect() as conn:
             conn.execute("""
                 UPDATE monitoring_runs 
-                SET completed_at = ?, reviews_analyzed = ?, status = ?, error_message = ?
+                SET completed_at = ?, reviews_analyzed = ?, cache_hits = ?, triage_skipped = ?,
+                    prompt_tokens = ?, output_tokens = ?, cached_tokens = ?, status = ?, error_message = ?
                 WHERE run_id = ?
             """, (
                 datetime.now(),
                 reviews_analyzed,
+                cache_hits,
+                triage_skipped,
+                token_usage.prompt_tokens,
+                token_usage.output_tokens,
+                token_usage.cached_tokens,
                 'completed' if failed == 0 else 'completed_with_errors',
                 f"Analysis complete: {successful} successful, {failed} failed" if failed > 0 else None,
                 run_id
             ))
     
-    def run_analysis(self, limit: Optional[int] = None, delay: float = 1.0):
-        """Run analysis on unanalyzed reviews"""
+    def run_analysis(self, limit: Optional[int] = None):
+        """Run analysis on unanalyzed reviews, saving each result as its request completes"""
         logger.info("Starting analysis of unanalyzed reviews...")
         
         # Get unanalyzed reviews
@@ -208,13 +290,13 @@ class AnalysisOnlyRunner:
         # Process reviews
         successful = 0
         failed = 0
+        hits_before, skipped_before = self.analyzer.cache_hits, self.analyzer.triage_skipped
+        usage_before = self.analyzer.token_usage
         
-        for i, review_data in enumerate(unanalyzed, 1):
+        # Requests run concurrently within the analyzer's rate limit
+        for i, (review_data, analysis) in enumerate(self.analyzer.iter_analyses(unanalyzed), 1):
             try:
-                logger.info(f"Analyzing review {i}/{len(unanalyzed)}: {review_data['extraction_id']}")
-                
-                # Run analysis
-                analysis = self.analyzer.analyze_single_review(review_data)
+                logger.info(f"Analyzed review {i}/{len(unanalyzed)}: {review_data['extraction_id']}")
                 
                 if analysis:
                     # Save to database
@@ -224,10 +306,6 @@ class AnalysisOnlyRunner:
                 else:
                     failed += 1
                     logger.error(f"❌ Analysis failed for {review_data['extraction_id']}")
-                
-                # Rate limiting
-                if i < len(unanalyzed):
-                    time.sleep(delay)
                     
             except Exception as e:
                 failed += 1
@@ -235,26 +313,320 @@ class AnalysisOnlyRunner:
                 continue
         
         # Update monitoring run with final stats
-        self.update_monitoring_run(run_id, len(unanalyzed), successful, failed)
+        cache_hits = self.analyzer.cache_hits - hits_before
+        triage_skipped = self.analyzer.triage_skipped - skipped_before
+        usage = self.analyzer.token_usage - usage_before
+        self.update_monitoring_run(run_id, len(unanalyzed), successful, failed, cache_hits, triage_skipped, usage)
         
-        logger.info(f"Analysis complete: {successful} successful, {failed} failed")
+        logger.info(f"Analysis complete: {successful} successful, {failed} failed, {cache_hits} from cache, "
+                    f"{triage_skipped} skipped by triage")
+        logger.info(f"Token usage: {usage.prompt_tokens} prompt ({usage.cached_tokens} cached), "
+                    f"{usage.output_tokens} output over {usage.calls} calls")
+        return run_id
+
+    def enqueue_unanalyzed_reviews(self, limit: Optional[int] = None) -> int:
+        """Add unanalyzed reviews to the work queue (reviews already queued are skipped)"""
+        self.backend.ensure_work_queue()
+        items = [
+            (review_data['extraction_id'], json.dumps(review_data, default=str))
+            for review_data in self.get_unanalyzed_reviews(limit)
+        ]
+        return self.backend.enqueue_work(WORK_KIND, items)
+
+    def run_queue_worker(self, worker_id: str, batch_size: int = 10, limit: Optional[int] = None):
+        """Claim and analyze queued reviews until the queue is drained"""
+        self.enqueue_unanalyzed_reviews(limit)
+
+        run_id = f"analysis_only_{worker_id}_{int(time.time())}"
+        self.create_monitoring_run(run_id)
+        logger.info(f"Worker {worker_id} started, queue status: {self.backend.work_status(WORK_KIND)}")
+
+        successful = 0
+        failed = 0
+        hits_before, skipped_before = self.analyzer.cache_hits, self.analyzer.triage_skipped
+        usage_before = self.analyzer.token_usage
+
+        while True:
+            items = self.backend.claim_work(WORK_KIND, worker_id, batch_size)
+            if not items:
+                break
+
+            done, retry, given_up = [], [], []
+            attempts = {item.item_key: item.attempts for item in items}
+            batch = [json.loads(item.payload) for item in items]
+            for review_data, analysis in self.analyzer.iter_analyses(batch):
+                item_key = review_data['extraction_id']
+                try:
+                    logger.info(f"[{worker_id}] Analyzed review {item_key} (attempt {attempts[item_key]})")
+                    if not analysis:
+                        raise ValueError("no analysis returned")
+                    self.save_analysis(analysis, run_id)
+                    done.append(item_key)
+                    successful += 1
+                except Exception as e:
+                    logger.error(f"❌ Error analyzing review {item_key}: {e}")
+                    if attempts[item_key] < MAX_ATTEMPTS:
+                        retry.append(item_key)
+                    else:
+                        given_up.append(item_key)
+                        failed += 1
+
+            self.backend.complete_work(WORK_KIND, done)
+            self.backend.complete_work(WORK_KIND, retry, status='pending')
+            self.backend.complete_work(WORK_KIND, given_up, status='failed')
+
+        self.update_monitoring_run(run_id, successful + failed, successful, failed,
+                                   self.analyzer.cache_hits - hits_before,
+                                   self.analyzer.triage_skipped - skipped_before,
+                                   self.analyzer.token_usage - usage_before)
+        logger.info(f"Worker {worker_id} finished: {successful} successful, {failed} failed")
+        return run_id
+
+    def submit_batch_jobs(self, client: BatchJobClient, job_dir: str = 'batch_jobs',
+                          limit: Optional[int] = None) -> Optional[str]:
+        """Write unanalyzed reviews to JSONL job files and submit them; returns the run ID"""
+        unanalyzed = self.get_unanalyzed_reviews(limit)
+        logger.info(f"Found {len(unanalyzed)} unanalyzed reviews")
+        if not unanalyzed:
+            return None
+
+        run_id = f"analysis_batch_{int(time.time())}"
+        self.create_monitoring_run(run_id)
+
+        # Likely false positives and cached analyses are recorded now instead of being submitted
+        if self.analyzer.triage is not None or self.analyzer.cache is not None:
+            hits_before, skipped_before = self.analyzer.cache_hits, self.analyzer.triage_skipped
+            submit = []
+            for review_data in unanalyzed:
+                analysis = self.analyzer._triage_skip(review_data) or self.analyzer._cache_lookup(review_data)
+                if analysis:
+                    self.save_analysis(analysis, run_id)
+                else:
+                    submit.append(review_data)
+            cache_hits = self.analyzer.cache_hits - hits_before
+            logger.info(f"Triage skipped {self.analyzer.triage_skipped - skipped_before} reviews, "
+                        f"{cache_hits} served from cache")
+            with self.backend.connect() as conn:
+                conn.execute("UPDATE monitoring_runs SET cache_hits = ? WHERE run_id = ?", (cache_hits, run_id))
+            unanalyzed = submit
+            if not unanalyzed:
+                self._complete_batch_run(run_id)
+                return run_id
+
+        job_files = write_job_files(
+            job_dir, run_id,
+            ((r['extraction_id'], self.analyzer._build_analysis_prompt(r)) for r in unanalyzed),
+            self.analyzer.generation_config_dict(),
+            system_instruction=self.analyzer.system_instruction
+        )
+
+        with self.backend.connect() as conn:
+            conn.execute(BATCH_JOBS_TABLE_SQL)
+        for job_file, request_count in job_files:
+            display_name = os.path.splitext(os.path.basename(job_file))[0]
+            job_name = client.submit(job_file, display_name)
+            with self.backend.connect() as conn:
+                conn.execute("""
+                    INSERT INTO analysis_batch_jobs
+                    (job_name, run_id, backend, job_file, state, request_count, submitted_at)
+                    VALUES (?, ?, ?, ?, 'submitted', ?, ?)
+                """, (job_name, run_id, client.name, job_file, request_count, datetime.now()))
+            logger.info(f"📤 Submitted {request_count} requests as {job_name}")
+
         return run_id
 
+    def poll_batch_jobs(self, client: BatchJobClient, job_dir: str = 'batch_jobs', wait: bool = True,
+                        poll_interval: float = 60.0) -> Dict[str, int]:
+        """Check outstanding batch jobs and ingest the results of finished ones"""
+        with self.backend.connect() as conn:
+            conn.execute(BATCH_JOBS_TABLE_SQL)
+            jobs = conn.execute("""
+                SELECT job_name, run_id FROM analysis_batch_jobs
+                WHERE backend = ? AND state IN ('submitted', 'succeeded')
+                ORDER BY submitted_at
+            """, (client.name,)).fetchall()
+
+        totals = {'jobs_finished': 0, 'jobs_running': 0, 'ingested': 0, 'failed': 0}
+        finished_runs = set()
+
+        for job_name, run_id in jobs:
+            state = client.wait(job_name, poll_interval) if wait else client.get_state(job_name)
+            if state == STATE_RUNNING:
+                totals['jobs_running'] += 1
+                continue
+
+            totals['jobs_finished'] += 1
+            finished_runs.add(run_id)
+            if state == STATE_FAILED:
+                logger.error(f"❌ Batch job {job_name} failed")
+                self._update_batch_job(job_name, state='failed', completed_at=datetime.now())
+                continue
+
+            result_file = os.path.join(job_dir, f"{job_name.replace('/', '_')}.results.jsonl")
+            client.download_results(job_name, result_file)
+            self._update_batch_job(job_name, state='succeeded', result_file=result_file, completed_at=datetime.now())
+
+            ingested, failed = self.ingest_batch_results(result_file, run_id)
+            self._update_batch_job(job_name, state='ingested', ingested_count=ingested)
+            totals['ingested'] += ingested
+            totals['failed'] += failed
+            logger.info(f"📥 Ingested {ingested} analyses from {job_name} ({failed} failed)")
+
+        for run_id in finished_runs:
+            self._complete_batch_run(run_id)
+        return totals
+
+    def ingest_batch_results(self, result_file: str, run_id: str) -> Tuple[int, int]:
+        """
+        Save a result file's analyses; safe to repeat
+
+        Reviews that already have an analysis (from an earlier ingest or another mode)
+        are skipped, so re-ingesting a file never creates duplicates. New analyses are
+        added to the analysis cache.
+        """
+        ingested = 0
+        failed = 0
+        pending: Dict[str, Dict[str, Dict[str, Any]]] = {}  # profile_id -> unanalyzed reviews by extraction_id
+
+        for key, text, error, usage in iter_result_lines(result_file):
+            if error:
+                logger.error(f"❌ Batch request {key} failed: {error}")
+                failed += 1
+                continue
+            try:
+                analysis = ComprehensiveRMTAnalysis(**json.loads(text))
+            except Exception as e:
+                logger.error(f"❌ Unparseable batch result for {key}: {e}")
+                failed += 1
+                continue
+            # The job key is authoritative; the prompt does not carry the extraction ID
+            analysis.extraction_id = key
+
+            with self.backend.connect() as conn:
+                already_analyzed = conn.execute(
+                    "SELECT 1 FROM ai_analyses WHERE profile_id = ? AND review_hash = ?",
+                    (key.split('_')[0], key.split('_')[-1])
+                ).fetchone()
+            if already_analyzed:
+                continue
+
+            # The cache key is built from the review's content, read before its analysis is saved
+            profile_id = key.split('_')[0]
+            if self.analyzer.cache is not None and profile_id not in pending:
+                pending[profile_id] = {review_data['extraction_id']: review_data
+                                       for review_data in self.get_unanalyzed_reviews(profile_ids=[profile_id])}
+
+            token_usage = None
+            if usage:
+                token_usage = TokenUsage(usage.get('promptTokenCount', 0),
+                                         usage.get('candidatesTokenCount', 0) + usage.get('thoughtsTokenCount', 0),
+                                         usage.get('cachedContentTokenCount', 0), 1, 0)
+            self.save_analysis(analysis, run_id, token_usage)
+            if key in pending.get(profile_id, {}):
+                self.analyzer._cache_store(pending[profile_id][key], analysis)
+            ingested += 1
+
+        return ingested, failed
+
+    def _update_batch_job(self, job_name: str, **fields):
+        with self.backend.connect() as conn:
+            conn.execute(
+                f"UPDATE analysis_batch_jobs SET {', '.join(f'{column} = ?' for column in fields)} WHERE job_name = ?",
+                (*fields.values(), job_name)
+            )
+
+    def _complete_batch_run(self, run_id: str):
+        """Close the monitoring run once none of its jobs is outstanding"""
+        with self.backend.connect() as conn:
+            row = conn.execute("""
+                SELECT SUM(CASE WHEN state IN ('submitted', 'succeeded') THEN 1 ELSE 0 END),
+                       SUM(request_count),
+                       SUM(CASE WHEN state = 'ingested' THEN ingested_count ELSE 0 END)
+                FROM analysis_batch_jobs WHERE run_id = ?
+            """, (run_id,)).fetchone()
+            triage_skipped = conn.execute(
+                "SELECT COUNT(*) FROM ai_analyses WHERE analysis_run_id = ? AND gemini_model_used = ?",
+                (run_id, TRIAGE_MODEL_NAME)
+            ).fetchone()[0]
+            # Batch results report usage per request; the run total is their sum
+            tokens = conn.execute(
+                "SELECT SUM(prompt_tokens), SUM(output_tokens), COUNT(prompt_tokens) FROM ai_analyses WHERE analysis_run_id = ?",
+                (run_id,)
+            ).fetchone()
+            cache_hits = conn.execute(
+                "SELECT cache_hits FROM monitoring_runs WHERE run_id = ?", (run_id,)
+            ).fetchone()[0] or 0
+        outstanding, requested, ingested = row[0] or 0, row[1] or 0, row[2] or 0
+        served = triage_skipped + cache_hits
+        if outstanding == 0:
+            self.update_monitoring_run(run_id, requested + served, ingested + served,
+                                       requested - ingested, cache_hits=cache_hits, triage_skipped=triage_skipped,
+                                       token_usage=TokenUsage(tokens[0] or 0, tokens[1] or 0, 0, tokens[2] or 0, 0))
+
 def main():
     parser = argparse.ArgumentParser(description='Run AI analysis on existing reviews')
     parser.add_argument('--gemini-api-key', required=True, help='Gemini AI API key')
-    parser.add_argument('--db-path', default='rmt_monitoring.db', help='Database file path')
+    parser.add_argument('--db-path', default='rmt_monitoring.db', help='Database file path or postgresql:// URL')
     parser.add_argument('--limit', type=int, help='Limit number of reviews to analyze')
-    parser.add_argument('--delay', type=float, default=1.0, help='Delay between API calls (seconds)')
+    parser.add_argument('--delay', type=float, default=1.0,
+                        help='Average delay between API calls (seconds); sets the default --rpm')
+    parser.add_argument('--concurrency', type=int, default=8, help='Maximum Gemini requests in flight')
+    parser.add_argument('--rpm', type=int, help='Gemini requests-per-minute budget (default: 60 / --delay)')
+    parser.add_argument('--tpm', type=int, help='Gemini tokens-per-minute budget (default unlimited)')
+    parser.add_argument('--batch-reviews', action='store_true',
+                        help='Pack several reviews (grouped by RMT) into each Gemini request')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Always call Gemini, ignoring the analysis cache')
+    parser.add_argument('--offline-batch', action='store_true',
+                        help='Submit unanalyzed reviews as offline batch jobs instead of live requests')
+    parser.add_argument('--resume-batch-jobs', action='store_true',
+                        help='Poll previously submitted batch jobs and ingest finished ones')
+    parser.add_argument('--no-wait', action='store_true',
+                        help='With --offline-batch/--resume-batch-jobs: do not wait for running jobs')
+    parser.add_argument('--batch-backend', choices=['gemini', 'fake'], default='gemini',
+                        help='Batch job backend (fake completes jobs locally, for tests)')
+    parser.add_argument('--job-dir', default='batch_jobs', help='Directory for batch job and result files')
+    parser.add_argument('--poll-interval', type=float, default=60.0, help='Seconds between batch job polls')
+    parser.add_argument('--worker-id', nargs='?', const=f"{socket.gethostname()}-{os.getpid()}",
+                        help='Run as a work-queue worker (default id: <hostname>-<pid>)')
+    parser.add_argument('--batch-size', type=int, default=10, help='Reviews claimed per batch in worker mode')
+    parser.add_argument('--compact-prompts', action='store_true',
+                        help='Send the static analysis instructions as a system instruction instead of in every prompt')
+    parser.add_argument('--triage', action='store_true',
+                        help='Skip likely false-positive matches locally instead of sending them to Gemini')
+    parser.add_argument('--triage-skip-below', type=float, default=TriageConfig.skip_below,
+                        help='Triage score below which a review is skipped (see review_triage.py)')
     
     args = parser.parse_args()
     
     # Initialize runner
-    runner = AnalysisOnlyRunner(args.gemini_api_key, args.db_path)
+    runner = AnalysisOnlyRunner(
+        args.gemini_api_key, args.db_path,
+        max_concurrency=args.concurrency,
+        requests_per_minute=args.rpm or int(60 / args.delay),
+        tokens_per_minute=args.tpm,
+        batch_reviews=args.batch_reviews,
+        use_cache=not args.no_cache,
+        triage_config=TriageConfig(skip_below=args.triage_skip_below) if args.triage else None,
+        compact_prompts=args.compact_prompts
+    )
     
     try:
         # Run analysis
-        run_id = runner.run_analysis(args.limit, args.delay)
+        if args.offline_batch or args.resume_batch_jobs:
+            client = create_batch_client(args.batch_backend, args.gemini_api_key,
+                                         runner.analyzer.model_name, os.path.join(args.job_dir, 'fake'))
+            run_id = runner.submit_batch_jobs(client, args.job_dir, args.limit) if args.offline_batch else None
+            totals = runner.poll_batch_jobs(client, args.job_dir, not args.no_wait, args.poll_interval)
+            if run_id:
+                print(f"\n📤 Submitted batch run: {run_id}")
+            print(f"\n📦 Batch jobs: {totals['jobs_finished']} finished, {totals['jobs_running']} still running, "
+                  f"{totals['ingested']} analyses ingested, {totals['failed']} failed")
+            return
+        elif args.worker_id:
+            run_id = runner.run_queue_worker(args.worker_id, args.batch_size, args.limit)
+        else:
+            run_id = runner.run_analysis(args.limit)
         
         if run_id:
             print(f"\n✅ Analysis complete! Run ID: {run_id}")
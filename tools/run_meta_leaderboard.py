@@ -2,19 +2,34 @@
 """
 Run Gemini meta-analysis to generate RMT leaderboard stats from all review analyses.
 Saves input/output JSON to disk and stores results in rmt_leaderboard table.
+
+By default the RMTs are split into shards (in input order, or by city) that are scored
+in parallel, and the resulting score records are ranked globally in a final merge,
+either locally by composite score or with a small Gemini pass over the records only.
+--single-prompt sends everything in one prompt as before.
 """
 import argparse
 import json
 import logging
 import os
-import sqlite3
+import re
+import textwrap
 import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from collections import Counter
+from dataclasses import asdict
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Set, Tuple
 
 import google.generativeai as genai
 
-from gemini_review_analyzer import GeminiReviewAnalyzer
+from gemini_review_analyzer import GeminiReviewAnalyzer, TokenUsage
+from leaderboard_columns import SENTIMENT_SCORES
+from leaderboard_cache import invalidate as invalidate_leaderboard_cache
+from leaderboard_engine import FACETS, RANK_BY, EngineConfig, build_leaderboard
+from leaderboard_queries import ensure_leaderboard_scores, primary_city, write_scores
+from blob_codec import ensure_codec_schema, encode_blob, decode_blob
+from storage_backends import create_backend
 
 # Configure logging
 logging.basicConfig(
@@ -24,6 +39,20 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 DB_PATH = "rmt_monitoring.db"
+META_MODEL_NAME = 'gemini-2.5-flash-preview-04-17'
+
+# Sharded meta-analysis defaults: RMTs and prompt characters per shard, shards in flight
+DEFAULT_SHARD_SIZE = 20
+DEFAULT_SHARD_MAX_CHARS = 400_000
+DEFAULT_SHARD_WORKERS = 4
+SHARD_ATTEMPTS = 2
+
+# Compact meta input: per-RMT statistics plus the top-k points and quotes instead of raw analyses
+SUMMARY_FORMAT = 'analysis_summaries'
+SUMMARY_TOP_K = 5
+SUMMARY_QUOTE_CHARS = 240
+SENTIMENT_LABELS = ('very_positive', 'positive', 'neutral', 'negative', 'very_negative')
+_WORD = re.compile(r"[a-z']+")
 
 LEADERBOARD_TABLE_SQL = """
 CREATE TABLE IF NOT EXISTS rmt_leaderboard (
@@ -36,44 +65,244 @@ CREATE TABLE IF NOT EXISTS rmt_leaderboard (
 );
 """
 
+# PostgreSQL enforces foreign keys, and the meta-analysis may return profile_ids that are
+# not in rmt_profiles, so the constraint is dropped there (SQLite never enforced it)
+POSTGRES_LEADERBOARD_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS rmt_leaderboard (
+    profile_id TEXT NOT NULL,
+    run_id TEXT NOT NULL,
+    meta_leaderboard_json TEXT NOT NULL,
+    created_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (profile_id, run_id)
+);
+"""
+
 META_LEADERBOARD_RUNS_TABLE_SQL = """
 CREATE TABLE IF NOT EXISTS meta_leaderboard_runs (
     run_id TEXT PRIMARY KEY,
     input_json TEXT NOT NULL,
     output_json TEXT NOT NULL,
+    input_codec TEXT DEFAULT 'raw',
+    output_codec TEXT DEFAULT 'raw',
     created_at TIMESTAMP NOT NULL
 );
 """
 
+# Columns added to meta_leaderboard_runs after its first release:
+# analyses_through is the newest ai_analyses.analyzed_at the run saw (incremental watermark)
+META_RUN_ADDED_COLUMNS = [
+    ('analyses_through', 'TIMESTAMP'),
+    ('mode', "TEXT DEFAULT 'full'"),
+    ('input_format', "TEXT DEFAULT 'analyses'"),
+    ('prompt_tokens', 'BIGINT DEFAULT 0'),
+    ('output_tokens', 'BIGINT DEFAULT 0'),
+]
+
+# IN (...) lists are split so large profile sets stay under the bound-parameter limit
+PROFILE_ID_CHUNK = 500
+
 def ensure_tables(db_path: str):
-    with sqlite3.connect(db_path) as conn:
-        conn.execute(LEADERBOARD_TABLE_SQL)
+    backend = create_backend(db_path)
+    with backend.connect() as conn:
+        conn.execute(POSTGRES_LEADERBOARD_TABLE_SQL if backend.dialect == 'postgres' else LEADERBOARD_TABLE_SQL)
         conn.execute(META_LEADERBOARD_RUNS_TABLE_SQL)
+        columns = backend.table_columns(conn, 'meta_leaderboard_runs')
+        for column, definition in META_RUN_ADDED_COLUMNS:
+            if column not in columns:
+                conn.execute(f"ALTER TABLE meta_leaderboard_runs ADD COLUMN {column} {definition}")
+        ensure_leaderboard_scores(backend, conn)
+        ensure_codec_schema(conn)
+
+
+def _profile_chunks(profile_ids: Optional[Iterable[str]]) -> Iterator[Optional[List[str]]]:
+    """Sorted chunks of profile_ids for IN (...) lists, or a single None for all profiles"""
+    if profile_ids is None:
+        yield None
+        return
+    profile_ids = sorted(set(profile_ids))
+    for start in range(0, len(profile_ids), PROFILE_ID_CHUNK):
+        yield profile_ids[start:start + PROFILE_ID_CHUNK]
 
 
-def aggregate_analyses(db_path: str) -> Dict[str, Any]:
-    """Aggregate all review analyses per RMT from the database."""
-    with sqlite3.connect(db_path) as conn:
-        conn.row_factory = sqlite3.Row
-        # Get all RMTs
-        rmts = conn.execute("SELECT profile_id, first_name, last_name FROM rmt_profiles").fetchall()
-        # Get all analyses
-        analyses = conn.execute("SELECT * FROM ai_analyses").fetchall()
-    # Group analyses by profile_id
-    rmt_map = {r['profile_id']: {
-        'profile_id': r['profile_id'],
-        'name': f"{r['first_name']} {r['last_name']}",
-        'analyses': []
-    } for r in rmts}
-    for a in analyses:
-        pid = a['profile_id']
-        if pid in rmt_map:
+def _stream_for_profiles(backend, conn, sql: str, profile_ids: Optional[Iterable[str]],
+                         suffix: str = '', column: str = 'profile_id') -> Iterator[Any]:
+    """
+    Stream sql's rows for all profiles or only profile_ids
+
+    suffix (GROUP BY / ORDER BY) is applied per chunk; chunks are in profile_id order,
+    so results ordered by profile_id stay ordered across chunks.
+    """
+    for chunk in _profile_chunks(profile_ids):
+        if chunk is None:
+            yield from backend.iter_query(conn, f"{sql} {suffix}")
+        else:
+            yield from backend.iter_query(
+                conn, f"{sql} WHERE {column} IN ({', '.join('?' * len(chunk))}) {suffix}", chunk)
+
+
+RMT_BUNDLE_SQL = """
+SELECT p.profile_id, p.first_name, p.last_name, a.analysis_id, a.analysis_json, a.analysis_json_codec
+FROM rmt_profiles p LEFT JOIN ai_analyses a ON a.profile_id = p.profile_id"""
+
+
+def iter_rmt_bundles(db_path: str, profile_ids: Optional[Iterable[str]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yield {'profile_id', 'name', 'analyses'} one RMT at a time, in profile_id order
+
+    Rows come from a cursor ordered by profile_id, so only the current RMT's analyses
+    are held in memory. Analyses are parsed JSON (or the raw text if they don't parse).
+    """
+    backend = create_backend(db_path)
+    with backend.connect() as conn:
+        bundle = None
+        for row in _stream_for_profiles(backend, conn, RMT_BUNDLE_SQL, profile_ids,
+                                        "ORDER BY p.profile_id, a.analyzed_at, a.analysis_id", 'p.profile_id'):
+            if bundle is None or row['profile_id'] != bundle['profile_id']:
+                if bundle is not None:
+                    yield bundle
+                bundle = {'profile_id': row['profile_id'], 'name': f"{row['first_name']} {row['last_name']}",
+                          'analyses': []}
+            if row['analysis_id'] is None:
+                continue
+            analysis_text = decode_blob(conn, row['analysis_json'], row['analysis_json_codec'])
             try:
-                analysis_json = json.loads(a['analysis_json'])
+                bundle['analyses'].append(json.loads(analysis_text))
             except Exception:
-                analysis_json = a['analysis_json']
-            rmt_map[pid]['analyses'].append(analysis_json)
-    return {'RMTs': list(rmt_map.values())}
+                bundle['analyses'].append(analysis_text)
+        if bundle is not None:
+            yield bundle
+
+
+def aggregate_analyses(db_path: str, profile_ids: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """Aggregate all review analyses per RMT from the database (optionally only profile_ids)."""
+    return {'RMTs': list(iter_rmt_bundles(db_path, profile_ids))}
+
+
+ANALYSIS_STATS_SQL = """
+SELECT profile_id,
+       COUNT(*) AS reviews,
+       SUM(CASE WHEN sentiment_overall = 'very_positive' THEN 1 ELSE 0 END) AS very_positive,
+       SUM(CASE WHEN sentiment_overall = 'positive' THEN 1 ELSE 0 END) AS positive,
+       SUM(CASE WHEN sentiment_overall = 'neutral' THEN 1 ELSE 0 END) AS neutral,
+       SUM(CASE WHEN sentiment_overall = 'negative' THEN 1 ELSE 0 END) AS negative,
+       SUM(CASE WHEN sentiment_overall = 'very_negative' THEN 1 ELSE 0 END) AS very_negative,
+       AVG(technical_skill_rating) AS technical_skill,
+       AVG(communication_rating) AS communication,
+       AVG(professionalism_rating) AS professionalism,
+       AVG(mention_confidence) AS mention_confidence,
+       SUM(CASE WHEN mention_confidence < 0.6 THEN 1 ELSE 0 END) AS low_confidence,
+       SUM(CASE WHEN review_authenticity = 'authentic' THEN 1 ELSE 0 END) AS authentic,
+       SUM(CASE WHEN potential_false_positive THEN 1 ELSE 0 END) AS false_positives
+FROM ai_analyses"""
+
+
+def _rounded(value: Any, digits: int = 2) -> Optional[float]:
+    return round(float(value), digits) if value is not None else None
+
+
+def _top_points(points: List[str], k: int) -> List[Dict[str, Any]]:
+    """The k most frequent points (case-insensitive), with counts"""
+    counts = Counter()
+    first_seen = {}
+    for point in points:
+        key = ' '.join(str(point).lower().split())
+        if key:
+            counts[key] += 1
+            first_seen.setdefault(key, str(point).strip())
+    return [{'point': first_seen[key], 'count': count} for key, count in counts.most_common(k)]
+
+
+def _distinctive_quotes(quotes: List[str], k: int) -> List[str]:
+    """Greedily pick up to k quotes that each add the most words not already covered"""
+    candidates = {}
+    for quote in quotes:
+        quote = ' '.join(str(quote).split())
+        if quote:
+            candidates.setdefault(quote.lower(), quote)
+    covered, chosen = set(), []
+    remaining = {quote: set(_WORD.findall(key)) for key, quote in candidates.items()}
+    while remaining and len(chosen) < k:
+        quote, words = max(remaining.items(), key=lambda item: len(item[1] - covered))
+        if not words - covered:
+            break
+        chosen.append(quote if len(quote) <= SUMMARY_QUOTE_CHARS else quote[:SUMMARY_QUOTE_CHARS - 3] + '...')
+        covered |= words
+        del remaining[quote]
+    return chosen
+
+
+def _summarize_rmt(bundle: Dict[str, Any], stats: Any, top_k: int) -> Dict[str, Any]:
+    """Compact summary of one RMT from its GROUP BY row and parsed analyses"""
+    summary = {'profile_id': bundle['profile_id'], 'name': bundle['name'], 'reviews_analyzed': 0}
+    if not stats or not stats['reviews']:
+        return summary
+
+    recommendations = repeat_clients = 0
+    positive, negative, quotes = [], [], []
+    for analysis in bundle['analyses']:
+        if not isinstance(analysis, dict):
+            continue
+        classification = analysis.get('review_classification') or {}
+        recommendations += bool(classification.get('recommendation_given'))
+        repeat_clients += bool(classification.get('repeat_client_indicated'))
+        if not analysis.get('potential_false_positive'):
+            positive.extend(analysis.get('key_positive_points') or [])
+            negative.extend(analysis.get('key_negative_points') or [])
+            quotes.extend(analysis.get('notable_quotes') or [])
+
+    reviews = int(stats['reviews'])
+    distribution = {label: int(stats[label] or 0) for label in SENTIMENT_LABELS if stats[label]}
+    summary.update({
+        'reviews_analyzed': reviews,
+        'sentiment_distribution': distribution,
+        'average_sentiment_score': round(
+            sum(SENTIMENT_SCORES[label] * count for label, count in distribution.items()) / reviews, 3),
+        'mean_ratings': {name: _rounded(stats[name])
+                         for name in ('technical_skill', 'communication', 'professionalism')},
+        'mean_mention_confidence': _rounded(stats['mention_confidence'], 3),
+        'rates': {
+            'recommendation': round(recommendations / reviews, 3),
+            'repeat_client': round(repeat_clients / reviews, 3),
+            'authentic': round(int(stats['authentic'] or 0) / reviews, 3),
+        },
+        'potential_false_positives': int(stats['false_positives'] or 0),
+        'low_confidence_matches': int(stats['low_confidence'] or 0),
+        'top_positive_points': _top_points(positive, top_k),
+        'top_negative_points': _top_points(negative, top_k),
+        'notable_quotes': _distinctive_quotes(quotes, top_k),
+    })
+    return summary
+
+
+def iter_analysis_summaries(db_path: str, profile_ids: Optional[Iterable[str]] = None,
+                            top_k: int = SUMMARY_TOP_K) -> Iterator[Dict[str, Any]]:
+    """
+    Compact per-RMT meta-analysis input, one RMT at a time in profile_id order
+
+    Counts, sentiment distribution, mean ratings and confidence come from one GROUP BY
+    over the ai_analyses columns. Recommendation and repeat-client rates, the most
+    frequent positive/negative points and the most distinctive quotes come from
+    analysis_json. Text from analyses flagged as potential false positives is left
+    out. Both are streamed in profile_id order and merged, so memory is bounded by
+    the largest RMT.
+    """
+    backend = create_backend(db_path)
+    with backend.connect() as conn:
+        stats_rows = _stream_for_profiles(backend, conn, ANALYSIS_STATS_SQL, profile_ids,
+                                          "GROUP BY profile_id ORDER BY profile_id")
+        stats = next(stats_rows, None)
+        for bundle in iter_rmt_bundles(db_path, profile_ids):
+            # Both streams are ordered by profile_id; skip stats for analyses without a profile
+            while stats is not None and stats['profile_id'] < bundle['profile_id']:
+                stats = next(stats_rows, None)
+            matched = stats if stats is not None and stats['profile_id'] == bundle['profile_id'] else None
+            yield _summarize_rmt(bundle, matched, top_k)
+
+
+def aggregate_analysis_summaries(db_path: str, profile_ids: Optional[Iterable[str]] = None,
+                                 top_k: int = SUMMARY_TOP_K) -> Dict[str, Any]:
+    """Compact per-RMT meta-analysis input (see iter_analysis_summaries); a fraction of aggregate_analyses()"""
+    return {'format': SUMMARY_FORMAT, 'RMTs': list(iter_analysis_summaries(db_path, profile_ids, top_k))}
 
 
 def save_json(obj: Any, prefix: str) -> str:
@@ -85,14 +314,74 @@ def save_json(obj: Any, prefix: str) -> str:
     return fname
 
 
-def run_gemini_meta_analysis(gemini_api_key: str, input_json: Dict[str, Any]) -> Dict[str, Any]:
-    # Build the prompt with the input JSON appended at the end
-    prompt = (
-        "You are an expert in healthcare reputation analysis. Below is a JSON object containing "
-        "AI-generated review analyses (you had generated these analyses) for several Registered Massage Therapists (RMTs). Each analysis includes "
-        "sentiment, service quality, professionalism, and authenticity metrics.\n\n"
-        "For each RMT:\n"
-        "- Aggregate the analyses.\n"
+class StreamingInputWriter:
+    """
+    Writes the meta-analysis input JSON one RMT at a time
+
+    The file is laid out exactly as save_json() would write {'format': ..., 'RMTs': [...]},
+    but RMTs are written as they pass through tee(), so the whole input never has to
+    be in memory.
+    """
+
+    def __init__(self, prefix: str, input_format: Optional[str] = None):
+        self.path = f"{prefix}_{int(time.time())}.json"
+        self.input_format = input_format
+        self.rmts = 0
+        self._file = None
+
+    def __enter__(self) -> 'StreamingInputWriter':
+        self._file = open(self.path, 'w')
+        self._file.write('{\n')
+        if self.input_format:
+            self._file.write(f'  "format": {json.dumps(self.input_format)},\n')
+        self._file.write('  "RMTs": [')
+        return self
+
+    def write(self, rmt: Dict[str, Any]):
+        text = json.dumps(rmt, indent=2, default=str)
+        self._file.write((',\n' if self.rmts else '\n') + textwrap.indent(text, '    '))
+        self.rmts += 1
+
+    def tee(self, rmts: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        for rmt in rmts:
+            self.write(rmt)
+            yield rmt
+
+    def __exit__(self, *exc):
+        self._file.write('\n  ]\n}' if self.rmts else ']\n}')
+        self._file.close()
+        logger.info(f"Saved meta_leaderboard_input JSON ({self.rmts} RMTs) to {self.path}")
+
+    def manifest(self) -> Dict[str, Any]:
+        """Stored in meta_leaderboard_runs.input_json in place of the full streamed input"""
+        return {'format': self.input_format or 'analyses', 'input_file': self.path, 'rmts': self.rmts,
+                'streamed': True}
+
+
+def build_meta_prompt(input_json: Dict[str, Any]) -> str:
+    """Meta-analysis prompt with the input JSON appended at the end"""
+    if input_json.get('format') == SUMMARY_FORMAT:
+        intro = (
+            "You are an expert in healthcare reputation analysis. Below is a JSON object summarizing "
+            "AI-generated review analyses (you had generated these analyses) for several Registered Massage Therapists (RMTs). Each RMT has "
+            "its review count, sentiment distribution, mean service quality ratings (1-5), recommendation, repeat client and "
+            "authenticity rates, potential false positive counts, its most frequent positive and negative points, and its most "
+            "distinctive quotes.\n\n"
+            "For each RMT:\n"
+            "- Weigh the summary, trusting RMTs with few reviews or many potential false positives less.\n"
+        )
+        input_label = "their analysis summaries"
+    else:
+        intro = (
+            "You are an expert in healthcare reputation analysis. Below is a JSON object containing "
+            "AI-generated review analyses (you had generated these analyses) for several Registered Massage Therapists (RMTs). Each analysis includes "
+            "sentiment, service quality, professionalism, and authenticity metrics.\n\n"
+            "For each RMT:\n"
+            "- Aggregate the analyses.\n"
+        )
+        input_label = "their analyses"
+    return (
+        intro +
         "- Assign scores (0-100) for these dimensions: Sentiment, Service Quality, Communication, Professionalism, "
         "Authenticity, Recommendation Rate, Repeat Client Rate, and any other relevant facet you find.\n"
         "- Calculate an overall composite score (0-100).\n"
@@ -122,13 +411,28 @@ def run_gemini_meta_analysis(gemini_api_key: str, input_json: Dict[str, Any]) ->
         "    ...\n"
         "  ]\n"
         "}\n"
-        "\nHere is the input JSON for all RMTs and their analyses:\n"
+        f"\nHere is the input JSON for all RMTs and {input_label}:\n"
         f"{json.dumps(input_json, indent=2)}"
     )
+
+
+def create_meta_model(gemini_api_key: str, base_url: Optional[str] = None):
+    """Configured Gemini model for meta-analysis prompts"""
+    base_url = base_url or os.environ.get('GEMINI_BASE_URL')
+    if base_url:
+        # Custom endpoints (e.g. mock_gemini_server.py) are reached over REST, not gRPC
+        genai.configure(api_key=gemini_api_key, transport='rest', client_options={'api_endpoint': base_url})
+    else:
+        genai.configure(api_key=gemini_api_key)
+    return genai.GenerativeModel(META_MODEL_NAME)
+
+
+def run_gemini_meta_analysis(gemini_api_key: str, input_json: Dict[str, Any],
+                             base_url: Optional[str] = None) -> Dict[str, Any]:
+    prompt = build_meta_prompt(input_json)
     # Use Gemini to generate the leaderboard
     logger.info("Sending meta-analysis prompt to Gemini...")
-    genai.configure(api_key=gemini_api_key)
-    model = genai.GenerativeModel('gemini-2.5-flash-preview-04-17')
+    model = create_meta_model(gemini_api_key, base_url)
     response = model.generate_content(prompt)
     # Parse response
     if hasattr(response, 'text'):
@@ -139,60 +443,447 @@ def run_gemini_meta_analysis(gemini_api_key: str, input_json: Dict[str, Any]) ->
     else:
         output_json = response
     logger.info("Received meta-analysis output from Gemini.")
+    if isinstance(output_json, dict):
+        output_json['token_usage'] = asdict(TokenUsage.from_response(response, prompt))
     return output_json
 
 
+def load_rmt_cities(db_path: str) -> Dict[str, Optional[str]]:
+    """profile_id -> primary practice city"""
+    with create_backend(db_path).connect() as conn:
+        rows = conn.execute("SELECT profile_id, practice_locations FROM rmt_profiles").fetchall()
+    return {row['profile_id']: primary_city(row['practice_locations']) for row in rows}
+
+
+def iter_shards(rmts: Iterable[Dict[str, Any]], shard_size: int = DEFAULT_SHARD_SIZE,
+                max_chars: int = DEFAULT_SHARD_MAX_CHARS,
+                cities: Optional[Dict[str, Optional[str]]] = None) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Split RMTs into shards of at most shard_size RMTs and about max_chars of input JSON
+
+    With cities, RMTs are grouped by city first and a shard never mixes cities. An RMT
+    whose analyses alone exceed max_chars gets a shard of its own. Shards are yielded
+    as soon as they fill, so at most one open shard per city is held in memory.
+    """
+    open_shards: Dict[Optional[str], Tuple[List[Dict[str, Any]], int]] = {}
+    for rmt in rmts:
+        group = cities.get(rmt['profile_id']) if cities else None
+        shard, shard_chars = open_shards.get(group, ([], 0))
+        size = len(json.dumps(rmt, indent=2, default=str))
+        if shard and (len(shard) >= shard_size or shard_chars + size > max_chars):
+            yield shard
+            shard, shard_chars = [], 0
+        shard.append(rmt)
+        open_shards[group] = (shard, shard_chars + size)
+    for shard, _ in open_shards.values():
+        if shard:
+            yield shard
+
+
+def build_shards(rmts: List[Dict[str, Any]], shard_size: int = DEFAULT_SHARD_SIZE,
+                 max_chars: int = DEFAULT_SHARD_MAX_CHARS,
+                 cities: Optional[Dict[str, Optional[str]]] = None) -> List[List[Dict[str, Any]]]:
+    """All shards from iter_shards() as a list"""
+    return list(iter_shards(rmts, shard_size, max_chars, cities))
+
+
+def _parse_leaderboard(text: str) -> List[Dict[str, Any]]:
+    """Leaderboard entries from a meta-analysis response (tolerates ```json fences)"""
+    text = text.strip()
+    if text.startswith('```'):
+        text = text.split('\n', 1)[-1].rsplit('```', 1)[0]
+    entries = json.loads(text).get('leaderboard', [])
+    return [entry for entry in entries if isinstance(entry, dict) and entry.get('profile_id') is not None]
+
+
+def _composite(entry: Dict[str, Any]) -> float:
+    try:
+        return float((entry.get('scores') or {}).get('composite', 0))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def run_meta_shard(model, shard: List[Dict[str, Any]],
+                   input_format: Optional[str] = None) -> Tuple[List[Dict[str, Any]], TokenUsage]:
+    """Score records for one shard of RMTs (ranks within the shard are dropped) and the tokens used"""
+    wanted = {str(rmt['profile_id']) for rmt in shard}
+    shard_input = {'format': input_format, 'RMTs': shard} if input_format else {'RMTs': shard}
+    prompt = build_meta_prompt(shard_input)
+    usage = TokenUsage()
+    for attempt in range(1, SHARD_ATTEMPTS + 1):
+        try:
+            response = model.generate_content(prompt, generation_config={'response_mime_type': 'application/json'})
+            usage += TokenUsage.from_response(response, prompt)
+            records = []
+            for entry in _parse_leaderboard(response.text):
+                entry['profile_id'] = str(entry['profile_id'])
+                if entry['profile_id'] in wanted:
+                    entry.pop('rank', None)
+                    records.append(entry)
+            return records, usage
+        except Exception as e:
+            logger.warning(f"Meta-analysis shard of {len(shard)} RMTs failed (attempt {attempt}/{SHARD_ATTEMPTS}): {e}")
+    return [], usage
+
+
+def rank_locally(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Global ranking by composite score (ties by profile_id)"""
+    ranked = sorted(records, key=lambda entry: (-_composite(entry), entry['profile_id']))
+    for rank, entry in enumerate(ranked, 1):
+        entry['rank'] = rank
+    return ranked
+
+
+def rank_with_llm(model, records: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], TokenUsage]:
+    """
+    Global ranking from a small Gemini pass over the score records only
+
+    RMTs the model leaves out are ranked after the others by composite score; if the
+    response cannot be used at all the ranking falls back to rank_locally(). Also
+    returns the tokens used.
+    """
+    summaries = [{key: entry.get(key) for key in ('profile_id', 'name', 'scores', 'summary')} for entry in records]
+    prompt = (
+        "You are an expert in healthcare reputation analysis. Below are score records for Registered Massage "
+        "Therapists (RMTs), each produced by a separate meta-analysis of that RMT's review analyses. "
+        "Rank all RMTs from best to worst, comparing them on a consistent scale across records.\n\n"
+        "Output JSON format:\n"
+        "{\n  \"leaderboard\": [\n    {\"profile_id\": \"...\", \"rank\": 1}, ...\n  ]\n}\n"
+        "\nHere is the input JSON for all RMTs and their score records:\n"
+        f"{json.dumps({'RMTs': summaries}, indent=2)}"
+    )
+    usage = TokenUsage()
+    try:
+        response = model.generate_content(prompt, generation_config={'response_mime_type': 'application/json'})
+        usage = TokenUsage.from_response(response, prompt)
+        llm_ranks = {str(entry['profile_id']): entry.get('rank') for entry in _parse_leaderboard(response.text)}
+    except Exception as e:
+        logger.warning(f"LLM merge failed, ranking locally: {e}")
+        return rank_locally(records), usage
+
+    def order(entry):
+        rank = llm_ranks.get(entry['profile_id'])
+        ranked = isinstance(rank, (int, float))
+        return (0 if ranked else 1, rank if ranked else 0, -_composite(entry), entry['profile_id'])
+
+    ordered = sorted(records, key=order)
+    for rank, entry in enumerate(ordered, 1):
+        entry['rank'] = rank
+    return ordered, usage
+
+
+def run_sharded_meta_analysis(gemini_api_key: str, input_json: Dict[str, Any], shard_by: str = 'rmt',
+                              shard_size: int = DEFAULT_SHARD_SIZE, max_chars: int = DEFAULT_SHARD_MAX_CHARS,
+                              workers: int = DEFAULT_SHARD_WORKERS, merge: str = 'local',
+                              cities: Optional[Dict[str, Optional[str]]] = None,
+                              base_url: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Map-reduce meta-analysis: score shards of RMTs in parallel, then merge the records
+
+    Only RMTs with at least one analysis are scored. input_json['RMTs'] may be a
+    generator (e.g. iter_analysis_summaries()): shards are built as RMTs arrive and at
+    most twice `workers` shards are in flight, so only the leaderboard records are
+    kept. The merge ranks the records locally by composite score, or with one small
+    Gemini pass over the records (merge='llm'). The output has the same 'leaderboard'
+    shape as run_gemini_meta_analysis(), plus a 'shards' summary.
+    """
+    scored_rmts = 0
+
+    def rmts_to_score():
+        nonlocal scored_rmts
+        for rmt in input_json.get('RMTs', []):
+            if rmt.get('analyses') or rmt.get('reviews_analyzed'):
+                scored_rmts += 1
+                yield rmt
+
+    city_map = cities if shard_by == 'city' else None
+    workers = max(1, workers)
+    logger.info(f"Scoring RMTs in shards of up to {shard_size} ({workers} in parallel)...")
+
+    model = create_meta_model(gemini_api_key, base_url)
+    shard_records: Dict[int, List[Dict[str, Any]]] = {}
+    shards_info: List[Dict[str, Any]] = []
+    usage = TokenUsage()
+
+    def collect(future):
+        nonlocal usage
+        index = pending.pop(future)
+        shard_records[index], shard_usage = future.result()
+        usage += shard_usage
+        for entry in shard_records[index]:
+            entry['shard'] = index
+        shards_info[index]['scored'] = len(shard_records[index])
+        logger.info(f"Shard {index + 1}: {len(shard_records[index])}/{len(shards_info[index]['profile_ids'])} "
+                    f"RMTs scored")
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending: Dict[Any, int] = {}
+        for index, shard in enumerate(iter_shards(rmts_to_score(), shard_size, max_chars, city_map)):
+            shards_info.append({
+                'shard': index,
+                'city': city_map.get(shard[0]['profile_id']) if city_map else None,
+                'profile_ids': [rmt['profile_id'] for rmt in shard],
+                'scored': 0,
+            })
+            pending[pool.submit(run_meta_shard, model, shard, input_json.get('format'))] = index
+            while len(pending) >= workers * 2:
+                for future in wait(pending, return_when=FIRST_COMPLETED).done:
+                    collect(future)
+        for future in as_completed(list(pending)):
+            collect(future)
+
+    records = [entry for index in sorted(shard_records) for entry in shard_records[index]]
+    if merge == 'llm':
+        leaderboard, merge_usage = rank_with_llm(model, records)
+        usage += merge_usage
+    else:
+        leaderboard = rank_locally(records)
+    for entry in leaderboard:
+        entry['merge'] = merge
+
+    missing = scored_rmts - len(records)
+    if missing:
+        logger.warning(f"{missing} RMTs were not scored by their shard and are left out of the leaderboard")
+    return {
+        'leaderboard': leaderboard,
+        'shards': shards_info,
+        'merge': merge,
+        'token_usage': asdict(usage),
+    }
+
+
 def store_meta_leaderboard(db_path: str, run_id: str, leaderboard: List[Dict[str, Any]]):
-    with sqlite3.connect(db_path) as conn:
+    backend = create_backend(db_path)
+    with backend.connect() as conn:
         for entry in leaderboard:
-            conn.execute(
-                """
-                INSERT OR REPLACE INTO rmt_leaderboard (profile_id, run_id, meta_leaderboard_json, created_at)
-                VALUES (?, ?, ?, ?)
-                """,
-                (
-                    entry['profile_id'],
-                    run_id,
-                    json.dumps(entry, default=str),
-                    datetime.now()
-                )
-            )
+            backend.upsert(conn, 'rmt_leaderboard', ('profile_id', 'run_id'), {
+                'profile_id': entry['profile_id'],
+                'run_id': run_id,
+                'meta_leaderboard_json': json.dumps(entry, default=str),
+                'created_at': datetime.now(),
+            })
+        # Per-facet scores and cities for leaderboard_queries.top_k()
+        write_scores(backend, conn, run_id, leaderboard)
+    invalidate_leaderboard_cache(db_path)
 
 
-def store_meta_leaderboard_run(db_path: str, run_id: str, input_json: Any, output_json: Any):
-    with sqlite3.connect(db_path) as conn:
+def store_meta_leaderboard_run(db_path: str, run_id: str, input_json: Any, output_json: Any,
+                               analyses_through: Any = None, mode: str = 'full'):
+    usage = (output_json.get('token_usage') if isinstance(output_json, dict) else None) or {}
+    with create_backend(db_path).connect() as conn:
+        input_blob, input_codec = encode_blob(conn, json.dumps(input_json, default=str), 'meta_run')
+        output_blob, output_codec = encode_blob(conn, json.dumps(output_json, default=str), 'meta_run')
         conn.execute(
             """
-            INSERT INTO meta_leaderboard_runs (run_id, input_json, output_json, created_at)
-            VALUES (?, ?, ?, ?)
+            INSERT INTO meta_leaderboard_runs (run_id, input_json, output_json, input_codec, output_codec, created_at,
+                                               analyses_through, mode, input_format, prompt_tokens, output_tokens)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """,
             (
                 run_id,
-                json.dumps(input_json, default=str),
-                json.dumps(output_json, default=str),
-                datetime.now()
+                input_blob,
+                output_blob,
+                input_codec,
+                output_codec,
+                datetime.now(),
+                analyses_through,
+                mode,
+                input_json.get('format') or 'analyses',
+                usage.get('prompt_tokens', 0),
+                usage.get('output_tokens', 0)
             )
         )
+    # The run is visible to latest_run_id() from here on
+    invalidate_leaderboard_cache(db_path)
+
+
+def analyses_watermark(db_path: str) -> Any:
+    """Newest ai_analyses.analyzed_at, read before aggregating so later analyses count as new"""
+    with create_backend(db_path).connect() as conn:
+        return conn.execute("SELECT MAX(analyzed_at) FROM ai_analyses").fetchone()[0]
+
+
+def latest_meta_run(db_path: str) -> Optional[Dict[str, Any]]:
+    """
+    run_id and watermark of the most recent Gemini meta-leaderboard run (runs without one use created_at)
+
+    Local engine runs are skipped: their entries are not Gemini scores, so they cannot be
+    carried forward into an incremental run.
+    """
+    with create_backend(db_path).connect() as conn:
+        row = conn.execute("""
+            SELECT run_id, analyses_through, created_at FROM meta_leaderboard_runs
+            WHERE COALESCE(mode, 'full') != 'local'
+            ORDER BY created_at DESC LIMIT 1
+        """).fetchone()
+    if not row:
+        return None
+    return {'run_id': row['run_id'], 'analyses_through': row['analyses_through'] or row['created_at']}
+
+
+def load_leaderboard_entries(db_path: str, run_id: str) -> List[Dict[str, Any]]:
+    """rmt_leaderboard entries stored for a run"""
+    with create_backend(db_path).connect() as conn:
+        rows = conn.execute(
+            "SELECT meta_leaderboard_json FROM rmt_leaderboard WHERE run_id = ?", (run_id,)
+        ).fetchall()
+    return [json.loads(row['meta_leaderboard_json']) for row in rows]
+
+
+def profiles_to_rescore(db_path: str, since: Any, previous: List[Dict[str, Any]]) -> Set[str]:
+    """
+    RMTs whose meta-analysis entry is out of date
+
+    These are RMTs with analyses newer than the previous run's watermark, RMTs with
+    analyses but no entry in the previous run, and entries that were carried forward
+    stale because their re-score failed.
+    """
+    with create_backend(db_path).connect() as conn:
+        changed = {row[0] for row in conn.execute(
+            "SELECT DISTINCT profile_id FROM ai_analyses WHERE analyzed_at > ?", (since,)
+        ).fetchall()}
+        analysed = {row[0] for row in conn.execute("SELECT DISTINCT profile_id FROM ai_analyses").fetchall()}
+    scored = {str(entry['profile_id']) for entry in previous if not entry.get('stale')}
+    return changed | (analysed - scored)
+
+
+def run_incremental_meta_analysis(db_path: str, score_rmts, previous_run: Dict[str, Any],
+                                  aggregate=aggregate_analysis_summaries) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Re-score only the RMTs returned by profiles_to_rescore() and carry the rest forward
+
+    aggregate(db_path, profile_ids) builds the input for the changed RMTs and
+    score_rmts(input_json) runs the meta-analysis (sharded or single prompt) on it.
+    Entries for the other RMTs are copied from the previous run's rmt_leaderboard rows.
+    Changed RMTs whose re-score fails keep their old entry, marked stale. The global
+    rank is recomputed locally by composite score.
+    Returns (input_json, output_json).
+    """
+    previous = load_leaderboard_entries(db_path, previous_run['run_id'])
+    rescore = profiles_to_rescore(db_path, previous_run['analyses_through'], previous)
+    logger.info(f"Incremental meta-analysis: {len(rescore)} RMTs changed since {previous_run['run_id']}, "
+                f"{len(previous)} previous entries")
+
+    input_json = aggregate(db_path, rescore) if rescore else {'RMTs': []}
+    scored_output = score_rmts(input_json) if input_json['RMTs'] else {'leaderboard': []}
+    rescored = [dict(entry, profile_id=str(entry['profile_id'])) for entry in scored_output.get('leaderboard', [])
+                if isinstance(entry, dict) and entry.get('profile_id') is not None]
+    rescored_ids = {entry['profile_id'] for entry in rescored}
+
+    carried = []
+    for entry in previous:
+        profile_id = str(entry['profile_id'])
+        if profile_id in rescored_ids:
+            continue
+        entry = dict(entry, carried_from=entry.get('carried_from') or previous_run['run_id'])
+        if profile_id in rescore:
+            entry['stale'] = True
+        carried.append(entry)
+    for entry in rescored:
+        entry.pop('carried_from', None)
+        entry.pop('stale', None)
+
+    leaderboard = rank_locally(rescored + carried)
+    output_json = dict(scored_output, leaderboard=leaderboard, previous_run_id=previous_run['run_id'],
+                       rescored=len(rescored), carried_forward=len(carried))
+    return input_json, output_json
 
 
 def main():
     parser = argparse.ArgumentParser(description='Run Gemini meta-analysis leaderboard')
-    parser.add_argument('--gemini-api-key', required=True, help='Gemini API key')
-    parser.add_argument('--db-path', default=DB_PATH, help='Database file path')
+    parser.add_argument('--gemini-api-key', help='Gemini API key (not needed with --local)')
+    parser.add_argument('--db-path', default=DB_PATH, help='Database file path or postgresql:// URL')
+    parser.add_argument('--single-prompt', action='store_true',
+                        help='Send every RMT in one prompt instead of the sharded map-reduce')
+    parser.add_argument('--shard-by', choices=['rmt', 'city'], default='rmt',
+                        help='Shard RMTs in input order, or never mix cities in a shard (default: rmt)')
+    parser.add_argument('--shard-size', type=int, default=DEFAULT_SHARD_SIZE,
+                        help=f'Max RMTs per shard (default: {DEFAULT_SHARD_SIZE})')
+    parser.add_argument('--shard-max-chars', type=int, default=DEFAULT_SHARD_MAX_CHARS,
+                        help=f'Approximate max input JSON characters per shard (default: {DEFAULT_SHARD_MAX_CHARS})')
+    parser.add_argument('--workers', type=int, default=DEFAULT_SHARD_WORKERS,
+                        help=f'Shards scored in parallel (default: {DEFAULT_SHARD_WORKERS})')
+    parser.add_argument('--merge', choices=['local', 'llm'], default='local',
+                        help='Rank shard records by composite score, or with a small Gemini pass (default: local)')
+    parser.add_argument('--raw-analyses', action='store_true',
+                        help='Send every full analysis_json instead of compact per-RMT summaries')
+    parser.add_argument('--summary-top-k', type=int, default=SUMMARY_TOP_K,
+                        help=f'Points and quotes kept per RMT in the compact summaries (default: {SUMMARY_TOP_K})')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only re-score RMTs with analyses added since the last meta run; carry the rest forward')
+    parser.add_argument('--gemini-base-url', help='Gemini API endpoint override, e.g. a local mock_gemini_server.py '
+                                                  '(default: GEMINI_BASE_URL environment variable)')
+    parser.add_argument('--local', action='store_true',
+                        help='Score with the deterministic local leaderboard engine instead of Gemini')
+    parser.add_argument('--facet', choices=['composite'] + list(FACETS), default='composite',
+                        help='Facet the local leaderboard is ranked by (default: composite)')
+    parser.add_argument('--rank-by', choices=RANK_BY, default='score',
+                        help='Rank local scores by value or by the lower end of their interval (default: score)')
+    parser.add_argument('--prior-reviews', type=float, default=EngineConfig.prior_reviews,
+                        help=f'Local engine smoothing strength in pseudo-reviews (default: {EngineConfig.prior_reviews})')
+    parser.add_argument('--half-life-days', type=float, default=EngineConfig.half_life_days,
+                        help=f'Local engine review half-life, 0 for no decay (default: {EngineConfig.half_life_days})')
     args = parser.parse_args()
+    if not args.local and not args.gemini_api_key:
+        parser.error('--gemini-api-key is required unless --local is given')
 
     ensure_tables(args.db_path)
-
-    # Aggregate all analyses
-    logger.info("Aggregating all Gemini review analyses per RMT...")
-    input_json = aggregate_analyses(args.db_path)
     run_id = f"meta_{int(time.time())}"
+    watermark = analyses_watermark(args.db_path)
 
-    # Save input JSON
-    input_json_file = save_json(input_json, f"meta_leaderboard_input_{run_id}")
+    def score_rmts(input_json):
+        # Run Gemini meta-analysis
+        if args.single_prompt:
+            return run_gemini_meta_analysis(args.gemini_api_key, input_json, args.gemini_base_url)
+        return run_sharded_meta_analysis(
+            args.gemini_api_key, input_json, args.shard_by, args.shard_size, args.shard_max_chars,
+            args.workers, args.merge, load_rmt_cities(args.db_path) if args.shard_by == 'city' else None,
+            args.gemini_base_url
+        )
 
-    # Run Gemini meta-analysis
-    output_json = run_gemini_meta_analysis(args.gemini_api_key, input_json)
+    def aggregate(db_path, profile_ids=None):
+        if args.raw_analyses:
+            return aggregate_analyses(db_path, profile_ids)
+        return aggregate_analysis_summaries(db_path, profile_ids, args.summary_top_k)
+
+    previous_run = latest_meta_run(args.db_path) if args.incremental and not args.local else None
+    if args.local:
+        # Deterministic scores from the aggregate tables, no Gemini call
+        config = EngineConfig(prior_reviews=args.prior_reviews, half_life_days=args.half_life_days or None)
+        input_json = {'format': 'local_engine', 'config': asdict(config), 'facet': args.facet,
+                      'rank_by': args.rank_by}
+        input_json_file = save_json(input_json, f"meta_leaderboard_input_{run_id}")
+        output_json = {'leaderboard': build_leaderboard(args.db_path, config, args.facet, args.rank_by),
+                       'token_usage': asdict(TokenUsage())}
+    elif previous_run:
+        input_json, output_json = run_incremental_meta_analysis(args.db_path, score_rmts, previous_run, aggregate)
+        input_json_file = save_json(input_json, f"meta_leaderboard_input_{run_id}")
+    elif args.single_prompt:
+        if args.incremental:
+            logger.info("No previous meta-leaderboard run; running a full meta-analysis")
+        # Aggregate all analyses
+        logger.info("Aggregating all Gemini review analyses per RMT...")
+        input_json = aggregate(args.db_path)
+
+        # Save input JSON
+        input_json_file = save_json(input_json, f"meta_leaderboard_input_{run_id}")
+        output_json = score_rmts(input_json)
+    else:
+        if args.incremental:
+            logger.info("No previous meta-leaderboard run; running a full meta-analysis")
+        # Stream RMTs from the database to the input file and the shards one at a time
+        logger.info("Streaming Gemini review analyses per RMT from the database...")
+        if args.raw_analyses:
+            input_format, rmts = None, iter_rmt_bundles(args.db_path)
+        else:
+            input_format, rmts = SUMMARY_FORMAT, iter_analysis_summaries(args.db_path, top_k=args.summary_top_k)
+        with StreamingInputWriter(f"meta_leaderboard_input_{run_id}", input_format) as writer:
+            streamed = {'RMTs': writer.tee(rmts)}
+            if input_format:
+                streamed['format'] = input_format
+            output_json = score_rmts(streamed)
+        input_json_file = writer.path
+        input_json = writer.manifest()
 
     # Save output JSON
     output_json_file = save_json(output_json, f"meta_leaderboard_output_{run_id}")
@@ -200,8 +891,12 @@ def main():
     # Store meta leaderboard in DB
     leaderboard = output_json.get('leaderboard', [])
     store_meta_leaderboard(args.db_path, run_id, leaderboard)
-    store_meta_leaderboard_run(args.db_path, run_id, input_json, output_json)
+    store_meta_leaderboard_run(args.db_path, run_id, input_json, output_json, watermark,
+                               'local' if args.local else 'incremental' if previous_run else 'full')
 
+    usage = output_json.get('token_usage') or {}
+    logger.info(f"Meta-analysis tokens: {usage.get('prompt_tokens', 0)} input, {usage.get('output_tokens', 0)} output "
+                f"over {usage.get('calls', 0)} calls")
     logger.info(f"Meta leaderboard run complete. Run ID: {run_id}")
     logger.info(f"Input JSON: {input_json_file}")
     logger.info(f"Output JSON: {output_json_file}")
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Thread-based staged pipeline with bounded queues
+
+Each Stage has its own worker threads and a bounded input queue. A stage function
+takes one item and returns the items it passes downstream (any iterable, possibly
+empty), so a stage can fan out (one keyword -> many RMTs) or filter. Bounded queues
+give backpressure: a slow stage blocks its producers instead of letting work pile
+up in memory. run() yields the last stage's output on the calling thread, so the
+caller is the final "sink" stage (e.g. the Gemini analyzer's own worker pool).
+
+While running, one line per stage is logged every log_interval seconds with items in
+and out, throughput, worker utilisation and queue depth; a summary is logged at the
+end. A stage that is always busy with a full input queue is the one to give more
+workers.
+
+Usage:
+    pipeline = StagedPipeline([
+        Stage('search', search, workers=2),
+        Stage('fetch', fetch, workers=8, queue_size=32),
+    ], sink_name='save')
+    for result in pipeline.run(keywords):
+        save(result)
+"""
+
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_SIZE = 64
+DEFAULT_LOG_INTERVAL = 30.0
+_POLL_SECONDS = 0.2
+_DONE = object()
+
+
+@dataclass
+class Stage:
+    """One pipeline stage: fn(item) -> iterable of output items"""
+    name: str
+    fn: Callable[[Any], Iterable[Any]]
+    workers: int = 1
+    queue_size: int = DEFAULT_QUEUE_SIZE  # Bound of the stage's input queue
+
+
+@dataclass
+class StageStats:
+    workers: int
+    items_in: int = 0
+    items_out: int = 0
+    busy_seconds: float = 0.0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def as_dict(self, elapsed: float, queue_depth: int) -> Dict[str, Any]:
+        return {
+            'workers': self.workers,
+            'items_in': self.items_in,
+            'items_out': self.items_out,
+            'per_second': round(self.items_in / elapsed, 2) if elapsed else 0.0,
+            'utilisation': round(self.busy_seconds / (self.workers * elapsed), 2) if elapsed else 0.0,
+            'queue_depth': queue_depth,
+        }
+
+
+class PipelineStopped(Exception):
+    """Raised inside workers when the pipeline is shutting down"""
+
+
+class StagedPipeline:
+    """Stages connected by bounded queues, each stage with its own worker threads"""
+
+    def __init__(self, stages: List[Stage], sink_name: str = 'sink', sink_queue_size: int = DEFAULT_QUEUE_SIZE,
+                 log_interval: float = DEFAULT_LOG_INTERVAL):
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage")
+        self.stages = stages
+        self.sink_name = sink_name
+        self.sink_queue_size = sink_queue_size
+        self.log_interval = log_interval
+        self.sink_consumed = 0
+        self._queues: List[queue.Queue] = []
+        self._stats: Dict[str, StageStats] = {}
+        self._stop = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._started_at = 0.0
+
+    def run(self, inputs: Iterable[Any]) -> Iterator[Any]:
+        """Feed inputs through every stage, yielding the last stage's outputs as they arrive"""
+        self._queues = [queue.Queue(maxsize=max(1, stage.queue_size)) for stage in self.stages]
+        self._queues.append(queue.Queue(maxsize=max(1, self.sink_queue_size)))
+        self._stats = {stage.name: StageStats(workers=max(1, stage.workers)) for stage in self.stages}
+        self._stop.clear()
+        self._error = None
+        self.sink_consumed = 0
+        self._started_at = time.monotonic()
+
+        threads = [threading.Thread(target=self._feed, args=(inputs,), name='pipeline-feed', daemon=True)]
+        for index, stage in enumerate(self.stages):
+            remaining = [self._stats[stage.name].workers]
+            for number in range(remaining[0]):
+                threads.append(threading.Thread(target=self._work, args=(index, remaining),
+                                                name=f'pipeline-{stage.name}-{number}', daemon=True))
+        threads.append(threading.Thread(target=self._report, name='pipeline-report', daemon=True))
+        for thread in threads:
+            thread.start()
+
+        try:
+            output = self._queues[-1]
+            while True:
+                item = self._get(output)
+                if item is _DONE:
+                    break
+                self.sink_consumed += 1
+                yield item
+        except PipelineStopped:
+            pass
+        finally:
+            # Also reached when the consumer stops early: workers exit at their next put/get
+            self._stop.set()
+            for thread in threads:
+                thread.join(timeout=_POLL_SECONDS * 5)
+            self._log_stats("Pipeline finished")
+        if self._error is not None:
+            raise self._error
+
+    def stage_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-stage counters, throughput, utilisation and queue depth (sink last)"""
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+        stats = {stage.name: self._stats[stage.name].as_dict(elapsed, self._queues[i].qsize())
+                 for i, stage in enumerate(self.stages)}
+        stats[self.sink_name] = {
+            'items_in': self.sink_consumed,
+            'per_second': round(self.sink_consumed / elapsed, 2) if elapsed else 0.0,
+            'queue_depth': self._queues[-1].qsize(),
+        }
+        return stats
+
+    def _feed(self, inputs: Iterable[Any]):
+        try:
+            for item in inputs:
+                self._put(self._queues[0], item)
+            for _ in range(self._stats[self.stages[0].name].workers):
+                self._put(self._queues[0], _DONE)
+        except PipelineStopped:
+            pass
+        except BaseException as e:
+            self._fail(e)
+
+    def _work(self, index: int, remaining: List[int]):
+        stage = self.stages[index]
+        stats = self._stats[stage.name]
+        inbox, outbox = self._queues[index], self._queues[index + 1]
+        try:
+            while True:
+                item = self._get(inbox)
+                if item is _DONE:
+                    break
+                started = time.monotonic()
+                outputs = list(stage.fn(item))
+                with stats.lock:
+                    stats.items_in += 1
+                    stats.items_out += len(outputs)
+                    stats.busy_seconds += time.monotonic() - started
+                for output in outputs:
+                    self._put(outbox, output)
+
+            # The last worker of a stage to finish ends the next stage's input
+            with stats.lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                downstream = self._stats[self.stages[index + 1].name].workers if index + 1 < len(self.stages) else 1
+                for _ in range(downstream):
+                    self._put(outbox, _DONE)
+        except PipelineStopped:
+            pass
+        except BaseException as e:
+            logger.error(f"Pipeline stage '{stage.name}' failed: {e}")
+            self._fail(e)
+
+    def _fail(self, error: BaseException):
+        if self._error is None:
+            self._error = error
+        self._stop.set()
+
+    def _put(self, target: queue.Queue, item: Any):
+        while True:
+            if self._stop.is_set():
+                raise PipelineStopped()
+            try:
+                target.put(item, timeout=_POLL_SECONDS)
+                return
+            except queue.Full:
+                continue
+
+    def _get(self, source: queue.Queue) -> Any:
+        while True:
+            if self._stop.is_set():
+                raise PipelineStopped()
+            try:
+                return source.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                continue
+
+    def _report(self):
+        while not self._stop.wait(self.log_interval):
+            self._log_stats("Pipeline progress")
+
+    def _log_stats(self, heading: str):
+        stats = self.stage_stats()
+        lines = []
+        for name, stage in stats.items():
+            if name == self.sink_name:
+                lines.append(f"  {name}: {stage['items_in']} in ({stage['per_second']}/s), "
+                             f"queue {stage['queue_depth']}/{self.sink_queue_size}")
+            else:
+                bound = next(s.queue_size for s in self.stages if s.name == name)
+                lines.append(f"  {name} x{stage['workers']}: {stage['items_in']} in, {stage['items_out']} out "
+                             f"({stage['per_second']}/s), {stage['utilisation']:.0%} busy, "
+                             f"queue {stage['queue_depth']}/{bound}")
+        logger.info(heading + "\n" + "\n".join(lines))
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Checks of batched review analysis (--batch-reviews)
+
+Gemini is replaced by a local function that answers from the "### REVIEW <id>" headings
+of each prompt, so no API key is needed. Covers the shared RMT headers of
+_build_batch_prompt(), salvaging truncated arrays in _parse_json_array(), splitting
+reviews missing from a response (dropped, invalid, truncated or a failed call) in half
+down to single-review requests, serving triage skips and cache hits before the batched
+request, and the RMT grouping and bounded window of _iter_batches().
+
+Run with pytest or directly:
+    python test_batch_prompts.py
+"""
+
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+import gemini_review_analyzer
+from analysis_cache import DatabaseAnalysisCache
+from gemini_review_analyzer import ANALYSIS_INSTRUCTIONS, GeminiReviewAnalyzer, _parse_json_array
+from review_triage import ReviewTriage
+from storage_backends import create_backend
+from test_leaderboard_columns import synthetic_analyses
+
+ANALYSIS_TEMPLATE = synthetic_analyses(count=1, seed=32)[0].model_dump()
+_REVIEW_TEXT = re.compile(r'Review of (\S+?)"')
+
+
+def _extraction(profile_id, index, first_name='Jane', segments=('Jane Doe',)):
+    extraction_id = f"{profile_id}_place1_r{index:02d}"
+    return {
+        'extraction_id': extraction_id,
+        'rmt_information': {'profile_id': profile_id, 'first_name': first_name, 'last_name': f'Doe{profile_id}'},
+        'review_content': {'full_text': f'Review of {extraction_id}', 'rating': 5, 'author': f'Author {index}'},
+        'business_context': {'business_name': 'Harbour Wellness', 'business_types': ['massage']},
+        'matching_analysis': {'matched_text_segments': list(segments), 'confidence_scores': [100] * len(segments),
+                              'max_confidence': 100},
+    }
+
+
+class FakeGemini:
+    """Stands in for _generate_with_rate_limit, recording the review IDs of every request"""
+
+    def __init__(self, dropped=(), invalid=(), truncate=False, fail_batches=False):
+        self.dropped = set(dropped)    # Left out of batched responses
+        self.invalid = set(invalid)    # Answered with an analysis that fails validation
+        self.truncate = truncate       # Cut the batched response inside its last element
+        self.fail_batches = fail_batches
+        self.calls = []
+
+    def __call__(self, prompt, config=None):
+        ids = _REVIEW_TEXT.findall(prompt)
+        self.calls.append(ids)
+        if '### REVIEW' not in prompt:
+            return self._response(json.dumps(dict(ANALYSIS_TEMPLATE, extraction_id='')))
+        if self.fail_batches:
+            raise RuntimeError('503 Service Unavailable')
+        items = [{'extraction_id': extraction_id} if extraction_id in self.invalid
+                 else dict(ANALYSIS_TEMPLATE, extraction_id=extraction_id)
+                 for extraction_id in ids if extraction_id not in self.dropped]
+        text = json.dumps(items)
+        if self.truncate:
+            text = text[:-len(json.dumps(items[-1])) // 2]
+        return self._response(text)
+
+    @staticmethod
+    def _response(text):
+        return SimpleNamespace(text=text, usage_metadata=None, candidates=[])
+
+    def request_sizes(self):
+        return [len(ids) for ids in self.calls]
+
+
+def _analyzer(fake=None, **kwargs):
+    analyzer = GeminiReviewAnalyzer('test-key', **kwargs)
+    analyzer._generate_with_rate_limit = fake or FakeGemini()
+    return analyzer
+
+
+def _check_results(results, extractions):
+    assert sorted(extraction['extraction_id'] for extraction, _ in results) == \
+        sorted(extraction['extraction_id'] for extraction in extractions)
+    assert all(analysis is not None and analysis.extraction_id == extraction['extraction_id']
+               for extraction, analysis in results)
+
+
+def test_batch_prompt_shares_rmt_headers():
+    extractions = [_extraction('3001', 0), _extraction('3002', 1), _extraction('3001', 2)]
+    for compact in (False, True):
+        prompt = _analyzer(compact_prompts=compact)._build_batch_prompt(extractions)
+        assert prompt.count('## RMT INFORMATION:') == 2
+        headings = re.findall(r'### REVIEW (\d\S*)', prompt)
+        # Reviews follow their RMT's header, in arrival order within the RMT
+        assert headings == ['3001_place1_r00', '3001_place1_r02', '3002_place1_r01']
+        assert prompt.index('Profile ID: 3001') < prompt.index('### REVIEW 3001_place1_r00')
+        assert prompt.index('Profile ID: 3002') < prompt.index('### REVIEW 3002_place1_r01')
+        assert 'Return a JSON array with exactly one analysis per review' in prompt
+        assert prompt.count(ANALYSIS_INSTRUCTIONS) == (0 if compact else 1)
+    assert 'each of the 3 Google reviews' in _analyzer()._build_batch_prompt(extractions)
+
+
+def test_parse_json_array_salvages_truncated_responses():
+    assert _parse_json_array('[{"a": 1}, {"b": 2}]') == [{'a': 1}, {'b': 2}]
+    assert _parse_json_array('{"a": 1}') == [{'a': 1}]
+    assert _parse_json_array('[{"a": 1},\n {"b": [2, 3]}, {"c": ') == [{'a': 1}, {'b': [2, 3]}]
+    assert _parse_json_array('[{"a": 1}, {"b"') == [{'a': 1}]
+    assert _parse_json_array('not json') == []
+    assert _parse_json_array('') == []
+
+
+def test_complete_batch_is_one_request():
+    fake = FakeGemini()
+    extractions = [_extraction('3001', index) for index in range(5)]
+    results = _analyzer(fake).analyze_review_batch(extractions)
+    _check_results(results, extractions)
+    assert fake.request_sizes() == [5]
+
+
+def test_missing_reviews_are_split_and_retried():
+    fake = FakeGemini(dropped={'3001_place1_r01'}, invalid={'3001_place1_r02'})
+    fake.dropped.add('3001_place1_r03')
+    extractions = [_extraction('3001', index) for index in range(5)]
+    results = _analyzer(fake).analyze_review_batch(extractions)
+    _check_results(results, extractions)
+    # r01-r03 are retried as [r01, r02] and [r03]; r02 is still invalid in a batch, r01 still
+    # dropped, so both end as single requests. The whole batch is never re-sent.
+    assert fake.request_sizes() == [5, 2, 1, 1, 1]
+    assert fake.calls[1] == ['3001_place1_r01', '3001_place1_r02']
+
+
+def test_truncated_response_keeps_complete_analyses():
+    fake = FakeGemini(truncate=True)
+    extractions = [_extraction('3001', index) for index in range(4)]
+    results = _analyzer(fake).analyze_review_batch(extractions)
+    _check_results(results, extractions)
+    # The cut-off last review goes on alone
+    assert fake.request_sizes() == [4, 1]
+    assert fake.calls[1] == ['3001_place1_r03']
+
+
+def test_failed_request_splits_down_to_single_reviews():
+    fake = FakeGemini(fail_batches=True)
+    extractions = [_extraction('3001', index) for index in range(4)]
+    results = _analyzer(fake).analyze_review_batch(extractions)
+    _check_results(results, extractions)
+    assert fake.request_sizes() == [4, 2, 1, 1, 2, 1, 1]
+
+
+def test_triage_skips_and_cache_hits_are_served_first():
+    extractions = [_extraction('3001', index) for index in range(4)]
+    # Bare first name at a place that is not massage-related: skipped by triage
+    extractions.append(_extraction('3001', 4, segments=('Jane',)))
+    extractions[-1]['business_context']['business_types'] = ['restaurant']
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = DatabaseAnalysisCache(create_backend(os.path.join(temp_dir, 'cache.db')))
+        first = _analyzer()
+        first.cache = cache
+        first.analyze_review_batch(extractions[:2])
+
+        fake = FakeGemini()
+        analyzer = _analyzer(fake)
+        analyzer.cache = cache
+        analyzer.triage = ReviewTriage()
+        results = analyzer.analyze_review_batch(extractions)
+
+    _check_results(results, extractions)
+    assert [extraction['extraction_id'] for extraction, _ in results[:3]] == \
+        ['3001_place1_r00', '3001_place1_r01', '3001_place1_r04']
+    assert fake.calls == [['3001_place1_r02', '3001_place1_r03']]
+    assert (analyzer.cache_hits, analyzer.triage_skipped) == (2, 1)
+    assert analyzer.triage.is_rule_based(results[2][1])
+
+
+def test_batch_size_follows_the_output_estimate():
+    analyzer = _analyzer()
+    analyzer._output_tokens_per_review = analyzer.batch_config.max_output_tokens * 0.8 / 5
+    assert analyzer.batch_size() == 5
+    analyzer._output_tokens_per_review = 1.0
+    assert analyzer.batch_size() == analyzer.max_batch_size
+    analyzer._output_tokens_per_review = analyzer.batch_config.max_output_tokens * 10
+    assert analyzer.batch_size() == 1
+
+
+def test_iter_batches_groups_by_rmt_within_a_window():
+    analyzer = _analyzer()
+    analyzer.max_batch_size = 3
+    consumed = []
+
+    def stream(extractions):
+        for extraction in extractions:
+            consumed.append(extraction['extraction_id'])
+            yield extraction
+
+    # An RMT's reviews go out as soon as they fill a batch
+    mixed = [_extraction('3001' if index % 2 == 0 else '3002', index) for index in range(8)]
+    batches = analyzer._iter_batches(stream(mixed))
+    assert [extraction['extraction_id'] for extraction in next(batches)] == \
+        ['3001_place1_r00', '3001_place1_r02', '3001_place1_r04']
+    assert len(consumed) == 5
+    rest = list(batches)
+    assert [[extraction['extraction_id'] for extraction in batch] for batch in rest] == [
+        ['3002_place1_r01', '3002_place1_r03', '3002_place1_r05'],
+        ['3001_place1_r06', '3002_place1_r07']]
+
+    # With one review per RMT, at most BATCH_WINDOW_BATCHES batches are buffered
+    consumed.clear()
+    spread = [_extraction(str(4000 + index), index) for index in range(20)]
+    batches = analyzer._iter_batches(stream(spread))
+    first = next(batches)
+    assert len(consumed) == 3 * gemini_review_analyzer.BATCH_WINDOW_BATCHES
+    assert [extraction['extraction_id'] for extraction in first] == [
+        extraction['extraction_id'] for extraction in spread[:3]]
+    rest = list(batches)
+    assert all(len(batch) <= 3 for batch in rest)
+    assert sorted(extraction['extraction_id'] for batch in [first] + rest for extraction in batch) == \
+        sorted(extraction['extraction_id'] for extraction in spread)
+
+
+def test_iter_analyses_batches_every_review_once():
+    fake = FakeGemini(dropped={'3002_place1_r04'})
+    analyzer = _analyzer(fake, max_concurrency=2)
+    analyzer.max_batch_size = 4
+    extractions = [_extraction(str(3001 + index % 3), index) for index in range(12)]
+    results = list(analyzer.iter_analyses(extractions, batch=True))
+    _check_results(results, extractions)
+    assert len(fake.calls) == 4
+    assert sum(fake.request_sizes()) == 13
+
+
+def main():
+    checks = [
+        test_batch_prompt_shares_rmt_headers,
+        test_parse_json_array_salvages_truncated_responses,
+        test_complete_batch_is_one_request,
+        test_missing_reviews_are_split_and_retried,
+        test_truncated_response_keeps_complete_analyses,
+        test_failed_request_splits_down_to_single_reviews,
+        test_triage_skips_and_cache_hits_are_served_first,
+        test_batch_size_follows_the_output_estimate,
+        test_iter_batches_groups_by_rmt_within_a_window,
+        test_iter_analyses_batches_every_review_once,
+    ]
+    failed = 0
+    for check in checks:
+        started = time.time()
+        try:
+            check()
+            print(f"  ✅ {check.__name__} ({time.time() - started:.2f}s)")
+        except Exception as e:
+            failed += 1
+            print(f"  ❌ {check.__name__}: {type(e).__name__}: {e}")
+    print(f"{'❌' if failed else '✅'} {len(checks) - failed}/{len(checks)} checks passed")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
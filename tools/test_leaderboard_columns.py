@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Equivalence test of the columnar leaderboard path
+
+calculate_leaderboard_metrics() and _generate_summary_stats() switch to pandas
+group-by reductions (leaderboard_columns.py) from COLUMNAR_MIN_ANALYSES analyses up.
+These checks build seeded synthetic analyses, including missing ratings and the
+mention-confidence bucket boundaries, and assert that the columnar path returns the
+same RMTLeaderboardMetrics and summary statistics as the per-analysis path.
+
+Run with pytest or directly (skipped without numpy and pandas):
+    python test_leaderboard_columns.py
+"""
+
+import random
+import sys
+import time
+from unittest import SkipTest
+
+import gemini_review_analyzer
+import leaderboard_columns
+from gemini_review_analyzer import ComprehensiveRMTAnalysis, GeminiReviewAnalyzer, LeaderboardAccumulator
+
+SENTIMENTS = ("very_positive", "positive", "neutral", "negative", "very_negative")
+AUTHENTICITY = ("authentic", "suspicious", "unclear")
+# Bucket boundaries of the high/medium/low confidence counts are included on purpose
+MENTION_CONFIDENCES = (0.0, 0.3, 0.5, 0.59, 0.6, 0.75, 0.8, 0.81, 0.95, 1.0)
+
+
+def synthetic_analyses(count: int = 3000, rmts: int = 60, seed: int = 39):
+    rng = random.Random(seed)
+    analyses = []
+    for index in range(count):
+        profile_id = str(1000 + rng.randrange(rmts))
+        analyses.append(ComprehensiveRMTAnalysis(
+            extraction_id=f"{profile_id}_place{index % 7}_{index:08x}",
+            sentiment_analysis={"overall_sentiment": rng.choice(SENTIMENTS),
+                                "confidence_score": round(rng.random(), 2), "emotional_tone": "calm"},
+            rmt_mention_analysis={"mention_type": "direct_name", "mention_confidence": rng.choice(MENTION_CONFIDENCES),
+                                  "mention_context": "primary", "name_variations_detected": []},
+            service_quality_metrics={"technical_skill_rating": rng.choice((None, 1, 2, 3, 4, 5)),
+                                     "communication_rating": rng.choice((None, 1, 3, 5)),
+                                     "professionalism_rating": rng.choice((None, None, 4, 5))},
+            business_context_analysis={"business_name_confidence": 0.9, "staff_context": "solo_practice",
+                                       "appointment_booking_mentioned": False, "facility_quality_mentioned": False},
+            review_classification={"review_authenticity": rng.choice(AUTHENTICITY), "review_detail_level": "brief",
+                                   "specific_treatment_mentioned": False,
+                                   "repeat_client_indicated": rng.random() < 0.3,
+                                   "recommendation_given": rng.random() < 0.6},
+            key_positive_points=[], key_negative_points=[], notable_quotes=[],
+            overall_analysis_confidence=round(rng.random(), 2),
+            potential_false_positive=rng.random() < 0.1,
+            analysis_notes="synthetic"
+        ))
+    return analyses
+
+
+def _require_columnar():
+    if not leaderboard_columns.available():
+        raise SkipTest("numpy and pandas are not installed")
+
+
+def _dump(metrics):
+    return [m.model_dump() for m in metrics]
+
+
+def test_accumulator_from_frame_matches_add():
+    _require_columnar()
+    analyses = synthetic_analyses()
+
+    per_analysis = LeaderboardAccumulator()
+    for analysis in analyses:
+        per_analysis.add(analysis)
+    columnar = LeaderboardAccumulator.from_frame(leaderboard_columns.analyses_frame(analyses))
+
+    expected = per_analysis.leaderboard_metrics()
+    actual = columnar.leaderboard_metrics()
+    assert len(actual) == 60
+    assert _dump(actual) == _dump(expected)
+    assert columnar.summary_stats(actual) == per_analysis.summary_stats(expected)
+
+
+def test_analyzer_paths_match():
+    _require_columnar()
+    analyses = synthetic_analyses()
+    analyzer = GeminiReviewAnalyzer('test-key')
+    assert gemini_review_analyzer.use_columnar(analyses)
+
+    columnar_metrics = analyzer.calculate_leaderboard_metrics(analyses)
+    columnar_summary = analyzer._generate_summary_stats(analyses, columnar_metrics)
+
+    threshold = gemini_review_analyzer.COLUMNAR_MIN_ANALYSES
+    gemini_review_analyzer.COLUMNAR_MIN_ANALYSES = len(analyses) + 1
+    try:
+        assert not gemini_review_analyzer.use_columnar(analyses)
+        list_metrics = analyzer.calculate_leaderboard_metrics(analyses)
+        list_summary = analyzer._generate_summary_stats(analyses, list_metrics)
+    finally:
+        gemini_review_analyzer.COLUMNAR_MIN_ANALYSES = threshold
+
+    assert _dump(columnar_metrics) == _dump(list_metrics)
+    assert columnar_summary == list_summary
+    assert sum(columnar_summary['confidence_distribution'].values()) == len(analyses)
+
+
+def test_single_rmt_and_single_analysis():
+    _require_columnar()
+    for analyses in (synthetic_analyses(count=40, rmts=1, seed=1), synthetic_analyses(count=1, seed=2)):
+        per_analysis = LeaderboardAccumulator()
+        for analysis in analyses:
+            per_analysis.add(analysis)
+        columnar = LeaderboardAccumulator.from_frame(leaderboard_columns.analyses_frame(analyses))
+        assert _dump(columnar.leaderboard_metrics()) == _dump(per_analysis.leaderboard_metrics())
+
+
+def main():
+    checks = [test_accumulator_from_frame_matches_add, test_analyzer_paths_match, test_single_rmt_and_single_analysis]
+    failed = 0
+    for check in checks:
+        started = time.time()
+        try:
+            check()
+            print(f"  ✅ {check.__name__} ({time.time() - started:.2f}s)")
+        except SkipTest as e:
+            print(f"  ⚠️  {check.__name__} skipped: {e}")
+        except Exception as e:
+            failed += 1
+            print(f"  ❌ {check.__name__}: {type(e).__name__}: {e}")
+    print(f"{'❌' if failed else '✅'} {len(checks) - failed}/{len(checks)} checks passed")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
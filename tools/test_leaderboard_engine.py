@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Checks of the local leaderboard engine (leaderboard_engine.py)
+
+Covers the scoring model on hand-built totals (smoothing toward the prior,
+intervals, the composite formula, time decay, ranking) and its database side:
+rmt_aggregate_periods totals match LeaderboardAccumulator, snapshots only
+re-score dirty RMTs, and rescore_leaderboard() brings every current row to the
+scores build_leaderboard() computes.
+
+Run with pytest or directly:
+    python test_leaderboard_engine.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import leaderboard_engine
+from gemini_review_analyzer import LeaderboardAccumulator
+from incremental_rmt_system import RMTMonitoringDatabase
+from leaderboard_engine import EngineConfig, empty_totals, period_weight, rank_entries, score_groups, score_totals
+from rmt_review_extractor import RMTData
+from test_leaderboard_columns import synthetic_analyses
+
+
+def _totals(**values):
+    totals = empty_totals()
+    totals.update(values)
+    return totals
+
+
+def _database(temp_dir, analyses):
+    db = RMTMonitoringDatabase(os.path.join(temp_dir, 'engine.db'))
+    for profile_id in sorted({analysis.extraction_id.split('_')[0] for analysis in analyses}):
+        db.save_rmt_profile(RMTData(profile_id, 'Test', profile_id, '', '', [], '', 'active', True), 'seed')
+    for analysis in analyses:
+        db.save_ai_analysis(analysis, 'seed', 'test-model')
+    return db
+
+
+def _current_scores(db):
+    with db.backend.connect() as conn:
+        return {row['profile_id']: row['composite_reputation_score'] for row in conn.execute(
+            "SELECT profile_id, composite_reputation_score FROM current_leaderboard").fetchall()}
+
+
+def test_smoothing_keeps_single_reviews_near_the_prior():
+    groups = {
+        'one': _totals(total=1, sentiment_sum=1, recommendations=1, high_confidence=1,
+                       technical_sum=5, technical_count=1),
+        'many': _totals(total=50, sentiment_sum=30, recommendations=40, high_confidence=40,
+                        technical_sum=210, technical_count=50),
+        'weak': _totals(total=50, sentiment_sum=-20, recommendations=15, high_confidence=15,
+                        technical_sum=110, technical_count=50),
+    }
+    scored = score_groups(groups)
+    one, many = scored['one'], scored['many']
+    # A single perfect review is pulled toward the ~55% population mean, below 50 reviews at 80%
+    assert one['scores']['recommendation_rate'] < many['scores']['recommendation_rate'] < 80.0
+    assert many['scores']['composite'] > one['scores']['composite'] > scored['weak']['scores']['composite']
+    one_width = one['intervals']['composite'][1] - one['intervals']['composite'][0]
+    many_width = many['intervals']['composite'][1] - many['intervals']['composite'][0]
+    assert many_width < one_width
+
+
+def test_no_evidence_scores_the_prior():
+    prior = {facet: 0.25 for facet in leaderboard_engine.FACETS}
+    prior['false_positive'] = 0.0
+    entry = score_totals(empty_totals(), prior)
+    assert all(entry['scores'][facet] == 25.0 for facet in leaderboard_engine.FACETS)
+    assert entry['scores']['composite'] == 25.0
+    assert entry['reviews_analyzed'] == 0 and entry['rates']['recommendation'] == 0.0
+
+
+def test_composite_without_smoothing_matches_hand_calculation():
+    config = EngineConfig(prior_reviews=0)
+    totals = _totals(total=10, sentiment_sum=4, high_confidence=8, recommendations=6, repeat_clients=2,
+                     technical_sum=40, technical_count=10, false_positives=1)
+    prior = leaderboard_engine.population_prior([totals])
+    entry = score_totals(totals, prior, config)
+
+    sentiment = (4 + 10) / 2 / 10
+    quality = (40 - 10) / 4 / 10
+    expected = (0.4 * sentiment + 0.3 * quality + 0.1 * 0.8 + 0.1 * 0.6 + 0.1 * 0.2) * (1 - 0.1)
+    assert entry['scores']['sentiment'] == round(sentiment * 100, 1)
+    assert entry['scores']['service_quality'] == round(quality * 100, 1)
+    assert entry['scores']['composite'] == round(expected * 100, 2)
+    assert entry['rates'] == {'recommendation': 0.6, 'repeat_client': 0.2, 'authentic': 0.0, 'false_positive': 0.1}
+
+
+def test_period_weight_halves_per_half_life():
+    as_of = datetime(2026, 10, 15)
+    assert period_weight('2026-10', as_of, 365) == 1.0
+    assert abs(period_weight('2025-10', as_of, 365) - 0.5) < 1e-9
+    assert period_weight('2027-01', as_of, 365) == 1.0  # Future periods are not boosted
+    assert period_weight('2001-01', as_of, None) == period_weight('2001-01', as_of, 0) == 1.0
+
+
+def test_rank_entries_orders_by_score_or_lower_bound():
+    entries = [
+        {'profile_id': 'b', 'scores': {facet: 60.0 for facet in list(leaderboard_engine.FACETS) + ['composite']},
+         'intervals': {facet: [20.0, 90.0] for facet in list(leaderboard_engine.FACETS) + ['composite']}},
+        {'profile_id': 'a', 'scores': {facet: 55.0 for facet in list(leaderboard_engine.FACETS) + ['composite']},
+         'intervals': {facet: [50.0, 60.0] for facet in list(leaderboard_engine.FACETS) + ['composite']}},
+    ]
+    assert [entry['profile_id'] for entry in rank_entries(entries)] == ['b', 'a']
+    ranked = rank_entries(entries, by='lower_bound')
+    assert [(entry['profile_id'], entry['rank']) for entry in ranked] == [('a', 1), ('b', 2)]
+    assert ranked[0]['facet_ranks']['sentiment'] == 1
+    try:
+        rank_entries(entries, by='median')
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("unknown ranking accepted")
+
+
+def test_database_totals_match_accumulator():
+    analyses = synthetic_analyses(count=600, rmts=12, seed=45)
+    accumulator = LeaderboardAccumulator()
+    for analysis in analyses:
+        accumulator.add(analysis)
+    expected = score_groups(accumulator._groups)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db = _database(temp_dir, analyses)
+        leaderboard = leaderboard_engine.build_leaderboard(db.db_path, EngineConfig(half_life_days=None))
+
+    assert len(leaderboard) == 12
+    for entry in leaderboard:
+        assert entry['scores'] == expected[entry['profile_id']]['scores']
+        assert entry['rates'] == expected[entry['profile_id']]['rates']
+
+
+def test_snapshots_rescore_only_dirty_rmts_until_rescored():
+    analyses = synthetic_analyses(count=90, rmts=3, seed=7)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db = _database(temp_dir, analyses)
+        config = EngineConfig()
+        assert db.write_leaderboard_snapshots('first', config) == 3
+
+        # Age every review by two years, then change one RMT only
+        with db.backend.connect() as conn:
+            conn.execute("UPDATE rmt_aggregate_periods SET period = '2024-01'")
+        changed = analyses[0].extraction_id.split('_')[0]
+        for analysis in synthetic_analyses(count=5, rmts=1, seed=8):
+            analysis.extraction_id = f"{changed}_later_{analysis.extraction_id.split('_')[-1]}"
+            db.save_ai_analysis(analysis, 'seed', 'test-model')
+        before = _current_scores(db)
+        time.sleep(1.1)  # Snapshot IDs carry a one-second timestamp
+        assert db.write_leaderboard_snapshots('second', config) == 1
+        with db.backend.connect() as conn:
+            assert [row[0] for row in conn.execute(
+                "SELECT profile_id FROM leaderboard_snapshots WHERE run_id = 'second'").fetchall()] == [changed]
+        unchanged = {pid: score for pid, score in _current_scores(db).items() if pid != changed}
+        assert unchanged == {pid: score for pid, score in before.items() if pid != changed}
+
+        fresh = {entry['profile_id']: entry['scores']['composite']
+                 for entry in leaderboard_engine.build_leaderboard(db.db_path, config)}
+        assert any(abs(score - fresh[pid]) > 0.01 for pid, score in unchanged.items())
+
+        time.sleep(1.1)
+        run_id = db.rescore_leaderboard(config)
+        assert db.get_monitoring_run(run_id)['status'] == 'completed'
+        current = _current_scores(db)
+        assert all(abs(current[pid] - fresh[pid]) < 0.01 for pid in fresh)
+
+
+def main():
+    checks = [
+        test_smoothing_keeps_single_reviews_near_the_prior,
+        test_no_evidence_scores_the_prior,
+        test_composite_without_smoothing_matches_hand_calculation,
+        test_period_weight_halves_per_half_life,
+        test_rank_entries_orders_by_score_or_lower_bound,
+        test_database_totals_match_accumulator,
+        test_snapshots_rescore_only_dirty_rmts_until_rescored,
+    ]
+    failed = 0
+    for check in checks:
+        started = time.time()
+        try:
+            check()
+            print(f"  ✅ {check.__name__} ({time.time() - started:.2f}s)")
+        except Exception as e:
+            failed += 1
+            print(f"  ❌ {check.__name__}: {type(e).__name__}: {e}")
+    print(f"{'❌' if failed else '✅'} {len(checks) - failed}/{len(checks)} checks passed")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Checks of the local review triage stage (review_triage.py)
+
+Covers the labels ReviewTriage gives full-name, last-name, bare first-name and fuzzy
+matches, the location, place-type and keyword adjustments, the rule-based analysis
+recorded for skipped reviews, the analyzer short-circuit (no Gemini call, triage model
+name), and evaluate_triage() precision/recall, including over reviews replayed from a
+database by load_labelled_extractions().
+
+Run with pytest or directly:
+    python test_review_triage.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from gemini_review_analyzer import AsyncGeminiReviewAnalyzer
+from incremental_rmt_system import RMTMonitoringDatabase
+from review_triage import (LABEL_AMBIGUOUS, LABEL_LIKELY_FALSE_POSITIVE, LABEL_LIKELY_TRUE, TRIAGE_MODEL_NAME,
+                           ReviewTriage, TriageConfig, evaluate_triage, load_labelled_extractions)
+from rmt_review_extractor import RMTData, ReviewExtraction
+
+RMT_INFORMATION = {
+    'profile_id': '2001', 'first_name': 'Jane', 'last_name': 'Doe',
+    'common_first_name': '', 'common_last_name': '',
+    'practice_locations': [{'employerName': 'Harbour Wellness', 'businessCity': 'Toronto'}],
+}
+
+
+def _extraction(segments, confidences, text='Great visit', place_types=None, extraction_id='2001_place1_abc'):
+    return {
+        'extraction_id': extraction_id,
+        'rmt_information': dict(RMT_INFORMATION),
+        'review_content': {'full_text': text},
+        'business_context': {'business_types': place_types or []},
+        'matching_analysis': {'matched_text_segments': segments, 'confidence_scores': confidences},
+    }
+
+
+def test_name_match_labels():
+    triage = ReviewTriage()
+    full = triage.score(_extraction(['Jane Doe'], [100]))
+    assert (full.score, full.label) == (0.9, LABEL_LIKELY_TRUE)
+    last = triage.score(_extraction(['Dr. Doe'], [95]))
+    assert (last.score, last.label) == (0.6, LABEL_AMBIGUOUS)
+    first = triage.score(_extraction(['Jane'], [100]))
+    assert (first.score, first.label) == (0.2, LABEL_LIKELY_FALSE_POSITIVE) and first.skipped
+    # Name words below min_exact_confidence only count as fuzzy matches
+    for segments, confidences in ((['Jayne'], [85]), (['Jane'], [80])):
+        fuzzy = triage.score(_extraction(segments, confidences))
+        assert (fuzzy.score, fuzzy.label) == (0.35, LABEL_AMBIGUOUS)
+    # The strongest match wins regardless of segment order
+    assert triage.score(_extraction(['Jane', 'Jane Doe', 'Doe'], [100, 92, 100])).score == 0.9
+
+
+def test_unknown_rmt_name_is_ambiguous():
+    extraction = _extraction(['Jane'], [100])
+    extraction['rmt_information'] = {'profile_id': '2001'}
+    result = ReviewTriage().score(extraction)
+    assert (result.score, result.label, result.reasons) == (0.5, LABEL_AMBIGUOUS, ['RMT name unknown'])
+
+
+def test_location_place_and_keyword_adjustments():
+    triage = ReviewTriage()
+    located = triage.score(_extraction(['Jane', 'Harbour Wellness'], [100, 80]))
+    assert (located.score, located.label) == (0.3, LABEL_AMBIGUOUS)
+    assert 'practice location matched' in located.reasons
+    assert triage.score(_extraction(['Jane'], [100], place_types=['spa'])).score == 0.3
+    assert triage.score(_extraction(['Jane'], [100], place_types=['restaurant'])).score == 0.05
+    assert triage.score(_extraction(['Jane'], [100], text='Best RMT in town')).score == 0.3
+    capped = triage.score(_extraction(['Jane Doe', 'Toronto'], [100, 90], text='deep tissue massage',
+                                      place_types=['massage']))
+    assert (capped.score, capped.label) == (1.0, LABEL_LIKELY_TRUE)
+    # Place types also come from the extractor's metadata
+    extraction = _extraction(['Jane'], [100])
+    extraction['business_context'] = {}
+    extraction['extraction_metadata'] = {'place_types': ['restaurant']}
+    assert triage.score(extraction).score == 0.05
+
+
+def test_thresholds_come_from_config():
+    extraction = _extraction(['Dr. Doe'], [95])
+    assert ReviewTriage(TriageConfig(skip_below=0.7)).score(extraction).label == LABEL_LIKELY_FALSE_POSITIVE
+    assert ReviewTriage(TriageConfig(likely_true_above=0.6)).score(extraction).label == LABEL_LIKELY_TRUE
+    assert ReviewTriage(TriageConfig(last_name_score=0.8)).score(extraction).score == 0.8
+
+
+def test_skip_analysis_records_a_rule_based_false_positive():
+    triage = ReviewTriage()
+    assert triage.skip_analysis(_extraction(['Jane Doe'], [100])) is None
+    analysis = triage.skip_analysis(_extraction(['Jane'], [100], extraction_id='2001_place1_fff'))
+    assert analysis.extraction_id == '2001_place1_fff'
+    assert analysis.potential_false_positive and triage.is_rule_based(analysis)
+    assert analysis.rmt_mention_analysis.mention_confidence == 0.2
+    assert analysis.overall_analysis_confidence == 0.8
+    assert analysis.rmt_mention_analysis.name_variations_detected == ['Jane']
+    assert analysis.sentiment_analysis.overall_sentiment == 'neutral'
+    assert not analysis.review_classification.recommendation_given
+
+
+def test_analyzer_skips_without_calling_gemini():
+    analyzer = AsyncGeminiReviewAnalyzer('test-key')
+    analyzer.triage = ReviewTriage()
+
+    def no_api_call(*args, **kwargs):
+        raise AssertionError("Gemini called for a skipped review")
+
+    analyzer._generate_with_rate_limit = no_api_call
+    analyzer._generate_with_rate_limit_async = no_api_call
+
+    analysis = analyzer.analyze_single_review(_extraction(['Jane'], [100], extraction_id='2001_place1_aaa'))
+    assert analysis.extraction_id == '2001_place1_aaa' and analysis.potential_false_positive
+    assert analyzer.model_used_for(analysis) == TRIAGE_MODEL_NAME
+    assert analyzer.pop_token_usage('2001_place1_aaa') is None
+    analysis = asyncio.run(analyzer.analyze_single_review_async(
+        _extraction(['Jane'], [100], place_types=['restaurant'], extraction_id='2001_place1_bbb')))
+    assert analysis.extraction_id == '2001_place1_bbb'
+    assert analyzer.triage_skipped == 2
+
+    analyzer.triage = None
+    assert analyzer.model_used_for(analysis) == analyzer.model_name
+
+
+def test_evaluate_triage_precision_and_recall():
+    labelled = [
+        (_extraction(['Jane'], [100]), True),                              # 0.2
+        (_extraction(['Jane'], [100], place_types=['restaurant']), True),  # 0.05
+        (_extraction(['Dr. Doe'], [95]), True),                            # 0.6
+        (_extraction(['Jayne'], [85]), False),                             # 0.35
+        (_extraction(['Jane Doe'], [100]), False),                         # 0.9
+    ]
+    default, wide = evaluate_triage(labelled, skip_thresholds=[0.3, 0.7])
+    assert default == {'skip_below': 0.3, 'reviews': 5, 'skipped': 2, 'true_positives': 2,
+                       'precision': 1.0, 'recall': 2 / 3}
+    assert (wide['skipped'], wide['true_positives'], wide['precision'], wide['recall']) == (4, 3, 0.75, 1.0)
+    assert evaluate_triage(labelled) == [default]
+    nothing = evaluate_triage([(_extraction(['Jane Doe'], [100]), False)])[0]
+    assert (nothing['skipped'], nothing['precision'], nothing['recall']) == (0, None, None)
+
+
+def test_labelled_extractions_from_database():
+    triage = ReviewTriage()
+    reviews = [
+        ('aaa', ['Jane'], [100], 'gemini', True),
+        ('bbb', ['Jane Doe'], [100], 'gemini', False),
+        ('ccc', ['Jane'], [100], TRIAGE_MODEL_NAME, True),   # Triage's own analyses are not labels
+        ('ddd', ['Doe'], [100], None, None),                  # Not analyzed yet
+    ]
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db = RMTMonitoringDatabase(os.path.join(temp_dir, 'triage.db'))
+        db.save_rmt_profile(RMTData('2001', 'Jane', 'Doe', '', '', RMT_INFORMATION['practice_locations'],
+                                    '', 'active', True), 'seed')
+        for index, (review_hash, segments, confidences, model, flagged) in enumerate(reviews):
+            extraction_id = f"2001_place1_{review_hash}"
+            db.save_review_extraction(ReviewExtraction(
+                extraction_id, {'profile_id': '2001'}, segments, confidences,
+                {'text': f'Review {index}', 'author_name': f'Author {index}', 'time': index},
+                {'place_id': 'place1'}, {}), 'seed')
+            if model:
+                analysis = triage.rule_based_analysis(
+                    _extraction(segments, confidences, extraction_id=extraction_id),
+                    triage.score(_extraction(segments, confidences)))
+                analysis.potential_false_positive = flagged
+                db.save_ai_analysis(analysis, 'seed', model)
+        labelled = load_labelled_extractions(db.backend)
+
+    assert sorted((extraction['extraction_id'], flagged) for extraction, flagged in labelled) == [
+        ('2001_place1_aaa', True), ('2001_place1_bbb', False)]
+    assert all(extraction['rmt_information']['last_name'] == 'Doe' for extraction, _ in labelled)
+    report = evaluate_triage(labelled)[0]
+    assert (report['skipped'], report['precision'], report['recall']) == (1, 1.0, 1.0)
+
+
+def main():
+    checks = [
+        test_name_match_labels,
+        test_unknown_rmt_name_is_ambiguous,
+        test_location_place_and_keyword_adjustments,
+        test_thresholds_come_from_config,
+        test_skip_analysis_records_a_rule_based_false_positive,
+        test_analyzer_skips_without_calling_gemini,
+        test_evaluate_triage_precision_and_recall,
+        test_labelled_extractions_from_database,
+    ]
+    failed = 0
+    for check in checks:
+        started = time.time()
+        try:
+            check()
+            print(f"  ✅ {check.__name__} ({time.time() - started:.2f}s)")
+        except Exception as e:
+            failed += 1
+            print(f"  ❌ {check.__name__}: {type(e).__name__}: {e}")
+    print(f"{'❌' if failed else '✅'} {len(checks) - failed}/{len(checks)} checks passed")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()